@@ -0,0 +1,62 @@
+"""
+异步并发会话基准测试
+对比线程池驱动同步智能体与单事件循环驱动异步智能体的并发吞吐量
+
+用法:
+    python -m benchmarks.bench_async --sessions 500 --latency 0.2 --threads 64
+"""
+
+import argparse
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from travel_assistant import SiliconFlowClient, TravelAssistantAgent
+from travel_assistant.async_client import AsyncSiliconFlowClient
+from benchmarks.mock_server import MockServer
+
+
+def bench_sync(base_url: str, sessions: int, threads: int) -> float:
+    """线程池驱动同步智能体，返回每秒完成的会话数"""
+    client = SiliconFlowClient(api_key="bench", base_url=base_url, pool_maxsize=threads)
+
+    def one_session(i):
+        # 每个会话独立的智能体，避免共享对话历史
+        return TravelAssistantAgent(client).run(f"查询{i}", verbose=False)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        list(executor.map(one_session, range(sessions)))
+    elapsed = time.perf_counter() - start
+    client.close()
+    return sessions / elapsed
+
+
+async def bench_async(base_url: str, sessions: int) -> float:
+    """单事件循环驱动异步智能体，返回每秒完成的会话数"""
+    async with AsyncSiliconFlowClient(api_key="bench", base_url=base_url,
+                                      pool_maxsize=sessions) as client:
+        start = time.perf_counter()
+        await asyncio.gather(*(
+            TravelAssistantAgent(client).arun(f"查询{i}") for i in range(sessions)
+        ))
+        return sessions / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="异步并发会话基准测试")
+    parser.add_argument("--sessions", type=int, default=500)
+    parser.add_argument("--latency", type=float, default=0.2, help="模拟LLM延迟（秒）")
+    parser.add_argument("--threads", type=int, default=64, help="同步模式线程数")
+    args = parser.parse_args()
+
+    with MockServer(latency=args.latency) as server:
+        sync_rate = bench_sync(server.base_url, args.sessions, args.threads)
+        async_rate = asyncio.run(bench_async(server.base_url, args.sessions))
+
+    print(f"同步+{args.threads}线程: {sync_rate:8.1f} sessions/s")
+    print(f"异步单事件循环: {async_rate:8.1f} sessions/s  ({async_rate / sync_rate:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
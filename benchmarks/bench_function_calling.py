@@ -0,0 +1,78 @@
+"""
+函数调用模式基准测试
+对比 ReAct 模式与函数调用模式每轮请求的提示词大小，以及一次三城市查询的请求轮数
+
+用法:
+    python -m benchmarks.bench_function_calling
+"""
+
+import json
+
+from travel_assistant.agent import TravelAssistantAgent
+from travel_assistant.history import estimate_tokens
+
+
+CITIES = ["北京", "上海", "杭州"]
+
+
+class ScriptedReActClient:
+    """每轮只输出一个动作的 ReAct 模型"""
+
+    def __init__(self):
+        self.requests = []
+
+    def chat(self, messages, stream=False, **kwargs):
+        self.requests.append(messages)
+        step = sum(1 for m in messages if m["role"] == "assistant")
+        if step < len(CITIES):
+            return f'Thought: 查询{CITIES[step]}的天气\nAction: get_weather(city="{CITIES[step]}")'
+        return 'Thought: 信息足够\nAction: finish(answer="三地都适合出行")'
+
+
+class ScriptedFunctionClient:
+    """一轮同时返回三个工具调用的模型"""
+
+    def __init__(self):
+        self.requests = []
+
+    def chat(self, messages, stream=False, tools=None, **kwargs):
+        self.requests.append((messages, tools))
+        if messages[-1]["role"] == "tool":
+            return {"content": "三地都适合出行"}
+        return {"content": None, "tool_calls": [
+            {"id": f"call_{i}", "type": "function",
+             "function": {"name": "get_weather", "arguments": json.dumps({"city": city}, ensure_ascii=False)}}
+            for i, city in enumerate(CITIES)
+        ]}
+
+
+def request_tokens(messages, tools=None) -> int:
+    """估算一次请求的输入token数，tools 按序列化后的JSON计算"""
+    text = json.dumps(messages, ensure_ascii=False)
+    if tools:
+        text += json.dumps(tools, ensure_ascii=False)
+    return estimate_tokens(text)
+
+
+def main():
+    tools = {"get_weather": lambda city: f"{city}: 晴 22°C"}
+
+    react = ScriptedReActClient()
+    TravelAssistantAgent(react, tools=tools).run("北京、上海、杭州的天气", verbose=False)
+    react_tokens = [request_tokens(m) for m in react.requests]
+
+    function = ScriptedFunctionClient()
+    TravelAssistantAgent(function, tools=tools, mode="function_calling").run(
+        "北京、上海、杭州的天气", verbose=False)
+    function_tokens = [request_tokens(m, t) for m, t in function.requests]
+
+    react_system = estimate_tokens(TravelAssistantAgent(react).system_prompt)
+    schemas = TravelAssistantAgent(function, mode="function_calling")
+    function_system = estimate_tokens(schemas.system_prompt) + request_tokens([], schemas.tool_schemas)
+    print(f"系统提示词 + 工具说明（全部工具）  ReAct: {react_system:5d} tokens   函数调用: {function_system:5d} tokens")
+    print(f"请求轮数                          ReAct: {len(react_tokens):5d}          函数调用: {len(function_tokens):5d}")
+    print(f"累计输入                          ReAct: {sum(react_tokens):5d} tokens   函数调用: {sum(function_tokens):5d} tokens")
+
+
+if __name__ == "__main__":
+    main()
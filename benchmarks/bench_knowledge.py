@@ -0,0 +1,110 @@
+"""
+知识库查询基准测试
+对比原有每次调用重建字典 + 逐关键词扫描的实现与预建索引 + 单正则分类的吞吐量
+
+用法:
+    python -m benchmarks.bench_knowledge --lookups 200000
+"""
+
+import argparse
+import random
+import time
+
+from travel_assistant.config import CITY_MAPPING
+from travel_assistant.tools import get_attraction, get_hotels
+
+
+# wttr.in 常见的天气描述
+# 不传天气时 get_attraction 会查询实时天气，这里只测知识库查询
+WEATHER = ["Sunny", "Clear", "Partly cloudy", "Overcast", "Light rain", "Patchy rain possible",
+           "Moderate snow", "Mist", "Fog", "晴", "小雨", "阴", "雾", ""]
+BUDGETS = ["经济", "中等", "豪华"]
+
+
+def legacy_get_attraction(city: str, weather: str = None) -> str:
+    """原实现：每次调用重建数据库字典，逐类型扫描关键词"""
+    attractions_db = {
+        "北京": {
+            "晴天": "北京晴天推荐景点:\n1. 故宫 - 晴天下的红墙黄瓦格外壮观\n2. 颐和园 - 游湖赏景最佳时机\n3. 八达岭长城 - 登高望远，视野开阔\n4. 天坛公园 - 古建筑在阳光下更显宏伟\n5. 奥林匹克公园 - 适合户外运动",
+            "雨天": "北京雨天推荐景点:\n1. 国家博物馆 - 丰富的文物收藏\n2. 首都博物馆 - 了解北京历史文化\n3. 中国科学技术馆 - 有趣的科学体验\n4. 798艺术区 - 室内画廊和咖啡馆\n5. 王府井百货 - 购物美食一站式",
+            "阴天": "北京阴天推荐景点:\n1. 颐和园 - 阴天游园别有一番风味\n2. 圆明园 - 历史文化遗址\n3. 什刹海 - 漫步湖边很舒适\n4. 南锣鼓巷 - 逛胡同小店\n5. 雍和宫 - 参观佛教寺庙",
+            "雪天": "北京雪天推荐景点:\n1. 故宫 - 雪中紫禁城宛如仙境\n2. 颐和园 - 雪景中的皇家园林\n3. 景山公园 - 俯瞰雪中故宫全景\n4. 北海公园 - 雪中划船别有情趣",
+            "雾天": "北京雾天建议室内景点:\n1. 国家大剧院 - 欣赏演出\n2. 北京天文馆 - 探索宇宙\n3. 老舍茶馆 - 体验传统文化"
+        },
+    }
+    weather_type = "一般"
+    if weather:
+        weather_lower = weather.lower()
+        if any(k in weather_lower for k in ["晴", "sunny"]):
+            weather_type = "晴天"
+        elif any(k in weather_lower for k in ["雨", "rain"]):
+            weather_type = "雨天"
+        elif any(k in weather_lower for k in ["阴", "cloud"]):
+            weather_type = "阴天"
+        elif any(k in weather_lower for k in ["雪", "snow"]):
+            weather_type = "雪天"
+        elif any(k in weather_lower for k in ["雾", "fog"]):
+            weather_type = "雾天"
+    if city in attractions_db:
+        if weather_type in attractions_db[city]:
+            return f"根据{weather_type}天气，为您推荐{city}的景点:\n\n{attractions_db[city][weather_type]}"
+        first_type = next(iter(attractions_db[city]))
+        return f"为您推荐{city}的景点:\n\n{attractions_db[city][first_type]}"
+    if weather_type == "雨天":
+        return f"由于{city}是{weather_type}，建议游览室内景点：博物馆、美术馆、科技馆、购物中心等。"
+    if weather_type == "晴天":
+        return f"{city}是{weather_type}，适合户外活动：公园、湖边、山区、历史古迹等。"
+    return f"推荐{city}的知名景点：市中心、文化街区、美食街等。"
+
+
+def legacy_get_hotels(city: str, budget: str = "中等") -> str:
+    """原实现：每次调用重建酒店字典"""
+    hotels_db = {
+        "北京": {
+            "经济": "经济型酒店:\n1. 如家酒店（王府井店）\n2. 7天连锁酒店\n3. 汉庭酒店\n4. 格林豪泰酒店",
+            "中等": "中等价位酒店:\n1. 全季酒店\n2. 亚朵酒店\n3. 桔子水晶酒店\n4. 和颐酒店",
+            "豪华": "豪华酒店:\n1. 北京王府半岛酒店\n2. 北京华尔道夫酒店\n3. 北京瑰丽酒店\n4. 北京柏悦酒店"
+        },
+        "上海": {
+            "经济": "经济型酒店:\n1. 如家酒店（南京路店）\n2. 锦江之星\n3. 布丁酒店\n4. 速8酒店",
+            "中等": "中等价位酒店:\n1. 全季酒店\n2. 亚朵酒店\n3. 桔子水晶酒店\n4. 和颐酒店",
+            "豪华": "豪华酒店:\n1. 上海外滩华尔道夫酒店\n2. 上海浦东丽思卡尔顿酒店\n3. 上海半岛酒店\n4. 上海宝格丽酒店"
+        }
+    }
+    if city in hotels_db and budget in hotels_db[city]:
+        return hotels_db[city][budget]
+    return f"建议您通过携程、去哪儿等平台查询{city}的{budget}价位酒店。"
+
+
+def _rate(fn, calls: list) -> float:
+    """返回每秒查询次数"""
+    start = time.perf_counter()
+    for args in calls:
+        fn(*args)
+    return len(calls) / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="知识库查询基准测试")
+    parser.add_argument("--lookups", type=int, default=200000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    cities = list(CITY_MAPPING)
+    attraction_calls = [(rng.choice(cities), rng.choice(WEATHER)) for _ in range(args.lookups)]
+    hotel_calls = [(rng.choice(cities), rng.choice(BUDGETS)) for _ in range(args.lookups)]
+
+    # 新实现覆盖全部城市，原实现只有北京/上海，其余城市走通用回复
+    for name, legacy, new, calls in [
+        ("景点", legacy_get_attraction, get_attraction, attraction_calls),
+        ("酒店", legacy_get_hotels, get_hotels, hotel_calls),
+    ]:
+        old_rate = _rate(legacy, calls)
+        new_rate = _rate(new, calls)
+        print(f"{name}: 原实现 {old_rate:10.0f} lookups/s, "
+              f"知识库 {new_rate:10.0f} lookups/s ({new_rate / old_rate:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
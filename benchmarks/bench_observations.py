@@ -0,0 +1,61 @@
+"""
+观察结果压缩基准测试
+对比原样发送观察结果与压缩发送时每个会话的提示token数：
+单次请求使用基准套件的智能体场景，多轮对话在同一会话中连续提问
+
+用法:
+    python -m benchmarks.bench_observations --requests 50 --turns 5
+"""
+
+import argparse
+
+from travel_assistant import SiliconFlowClient, TravelAssistantAgent
+from travel_assistant.cache import get_tool_cache
+from travel_assistant.config import DEFAULT_CONFIG
+from travel_assistant.sessions import AgentSession
+from benchmarks.mock_server import MockServer
+from benchmarks.suite import CITIES, run_suite, scripted_reply
+
+
+def multi_turn(turns: int) -> int:
+    """同一会话中连续询问 turns 个城市，返回发送的提示token总数"""
+    weather_url = DEFAULT_CONFIG["weather_base_url"]
+    with MockServer(reply=scripted_reply) as llm, MockServer() as weather:
+        DEFAULT_CONFIG["weather_base_url"] = weather.url
+        get_tool_cache().clear()
+        try:
+            with SiliconFlowClient(api_key="bench", base_url=llm.base_url) as client:
+                agent = TravelAssistantAgent(client)
+                session = AgentSession()
+                for i in range(turns):
+                    agent.run(f"{CITIES[i]} 三日游", verbose=False, session=session)
+                agent.close()
+        finally:
+            DEFAULT_CONFIG["weather_base_url"] = weather_url
+    return session.history.sent_tokens
+
+
+def main():
+    parser = argparse.ArgumentParser(description="观察结果压缩基准测试")
+    parser.add_argument("--requests", type=int, default=50)
+    parser.add_argument("--turns", type=int, default=5)
+    args = parser.parse_args()
+
+    enabled = DEFAULT_CONFIG["observation_compaction"]
+    results = {}
+    try:
+        for compaction in (False, True):
+            DEFAULT_CONFIG["observation_compaction"] = compaction
+            report = run_suite(["agent_run"], requests=args.requests, concurrency=4, memory_requests=0)
+            results[compaction] = (report["scenarios"]["agent_run"]["prompt_tokens"], multi_turn(args.turns))
+    finally:
+        DEFAULT_CONFIG["observation_compaction"] = enabled
+
+    (single_old, multi_old), (single_new, multi_new) = results[False], results[True]
+    print(f"{'':18s}{'原样发送':>10s}{'压缩发送':>10s}{'变化':>10s}")
+    print(f"{'单次请求/会话':16s}{single_old:10.0f}{single_new:10.0f}{(single_new - single_old) / single_old:+10.1%}")
+    print(f"{f'{args.turns}轮对话/会话':15s}{multi_old:10.0f}{multi_new:10.0f}{(multi_new - multi_old) / multi_old:+10.1%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+并行工具执行基准测试
+使用脚本化的假客户端，对比"每轮一个动作"与"一轮多个并行动作"的迭代次数和耗时
+
+用法:
+    python -m benchmarks.bench_parallel_tools --llm-latency 0.3 --tool-latency 0.2
+"""
+
+import argparse
+import time
+
+from travel_assistant import TravelAssistantAgent
+
+
+class ScriptedClient:
+    """按顺序返回预设输出的假客户端"""
+
+    def __init__(self, script, latency: float):
+        self.script = list(script)
+        self.latency = latency
+        self.calls = 0
+
+    def chat(self, messages, stream=False, **kwargs):
+        time.sleep(self.latency)
+        output = self.script[min(self.calls, len(self.script) - 1)]
+        self.calls += 1
+        return output
+
+
+SEQUENTIAL_SCRIPT = [
+    'Thought: 先查天气\nAction: get_weather(city="北京")',
+    'Thought: 再查景点\nAction: get_attraction(city="北京", weather="晴天")',
+    'Thought: 再查酒店\nAction: get_hotels(city="北京", budget="中等")',
+    'Thought: 信息齐全\nAction: finish(answer="行程已规划")',
+]
+
+PARALLEL_SCRIPT = [
+    'Thought: 三项查询互不依赖，一起执行\n'
+    'Action: get_weather(city="北京")\n'
+    'Action: get_attraction(city="北京", weather="晴天")\n'
+    'Action: get_hotels(city="北京", budget="中等")',
+    'Thought: 信息齐全\nAction: finish(answer="行程已规划")',
+]
+
+
+def make_tools(latency: float) -> dict:
+    """构造带固定延迟的模拟工具"""
+    def slow(name):
+        def tool(**kwargs):
+            time.sleep(latency)
+            return f"{name} {kwargs}"
+        return tool
+    return {name: slow(name) for name in ("get_weather", "get_attraction", "get_hotels")}
+
+
+def run_script(script, llm_latency: float, tool_latency: float) -> tuple:
+    """运行脚本，返回 (LLM调用次数, 耗时)"""
+    client = ScriptedClient(script, llm_latency)
+    agent = TravelAssistantAgent(client, tools=make_tools(tool_latency))
+    start = time.perf_counter()
+    agent.run("查询北京天气、景点和中等价位酒店", max_iterations=8, verbose=False)
+    elapsed = time.perf_counter() - start
+    agent.close()
+    return client.calls, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="并行工具执行基准测试")
+    parser.add_argument("--llm-latency", type=float, default=0.3)
+    parser.add_argument("--tool-latency", type=float, default=0.2)
+    args = parser.parse_args()
+
+    seq_calls, seq_time = run_script(SEQUENTIAL_SCRIPT, args.llm_latency, args.tool_latency)
+    par_calls, par_time = run_script(PARALLEL_SCRIPT, args.llm_latency, args.tool_latency)
+
+    print(f"逐个动作: {seq_calls} 次LLM调用, {seq_time:.2f}s")
+    print(f"并行动作: {par_calls} 次LLM调用, {par_time:.2f}s  ({seq_time / par_time:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+"""
+ReAct 解析器基准测试
+对比原有多正则实现与预编译单遍解析器在模糊语料上的吞吐量（MB/s）
+
+用法:
+    python -m benchmarks.bench_parser --size-mb 2
+"""
+
+import argparse
+import random
+import re
+import time
+
+from travel_assistant.parser import ParseError, parse_action, parse_output
+
+
+CITIES = ["北京", "上海", "Xi'an", "杭州", "New York"]
+TOOLS = ["get_weather", "get_attraction", "get_hotels", "finish"]
+JUNK = ["", "  ", "\n", "Observation: 晴", "（括号）", '"', "'", ",", "\\n", "😀", "::", "Action", "思考"]
+
+
+def _value(rng: random.Random) -> str:
+    value = rng.choice(CITIES + ["中等, 含早", '他说"你好"', "a(b)c", "多行\n内容", ""])
+    quote = rng.choice(['"', "'", ""])
+    return f"{quote}{value}{quote}"
+
+
+def make_output(rng: random.Random) -> str:
+    """生成一条随机的 LLM 输出，包含正常、畸形和噪声内容"""
+    thought_label = rng.choice(["Thought:", "思考：", "THOUGHT:", "thought :", "思考:"])
+    action_label = rng.choice(["Action:", "行动：", "ACTION:", "行动:"])
+    lines = [f"{thought_label} 需要查询{rng.choice(CITIES)}的信息{rng.choice(JUNK)}"]
+    for _ in range(rng.randint(0, 3)):
+        tool = rng.choice(TOOLS)
+        args = ", ".join(
+            f"{rng.choice(['city', 'weather', 'budget', 'answer'])}={_value(rng)}"
+            for _ in range(rng.randint(0, 3))
+        )
+        close = rng.choice([")", ")", ")", ""])
+        lines.append(f"{action_label} {tool}({args}{close}{rng.choice(JUNK)}")
+    if rng.random() < 0.3:
+        lines.append(rng.choice(JUNK) * rng.randint(1, 20))
+    return "\n".join(lines)
+
+
+# 典型的模型输出
+CLEAN_OUTPUTS = [
+    'Thought: 用户想去北京旅游，我需要先查询北京今天的天气情况，然后根据天气推荐合适的景点。\n'
+    'Action: get_weather(city="北京")',
+    'Thought: 已经知道天气是晴天，现在同时查询景点和酒店\n'
+    'Action: get_attraction(city="北京", weather="晴天")\n'
+    'Action: get_hotels(city="北京", budget="中等")',
+    'Thought: 信息已经齐全，可以给出最终答案\n'
+    'Action: finish(answer="北京今天晴，推荐故宫、颐和园，入住全季酒店，预算约500元/晚。")',
+]
+
+
+def make_corpus(count: int = 1000, seed: int = 0) -> list:
+    """生成确定性的模糊测试语料"""
+    rng = random.Random(seed)
+    return [make_output(rng) for _ in range(count)]
+
+
+def legacy_parse(llm_output: str):
+    """原有实现：每次编译并运行多组正则，再用 findall 解析参数"""
+    patterns = [
+        (r"Thought:\s*(.*?)(?=\r?\nAction:|$)", r"Action:\s*(.*?)(?=\r?\nThought:|$)"),
+        (r"思考[:：]\s*(.*?)(?=\r?\n行动[:：]|$)", r"(?:行动|Action)[:：]\s*(.*?)(?=\r?\n|$)"),
+        (r"THOUGHT:\s*(.*?)(?=\r?\nACTION:|$)", r"ACTION:\s*(.*?)(?=\r?\n|$)"),
+    ]
+    action_str = None
+    for thought_pattern, action_pattern in patterns:
+        thought_match = re.search(thought_pattern, llm_output, re.IGNORECASE | re.MULTILINE)
+        action_match = re.search(action_pattern, llm_output, re.IGNORECASE | re.MULTILINE)
+        if thought_match and action_match:
+            action_str = action_match.group(1).strip()
+            break
+    if not action_str:
+        return None
+    if action_str.lower().startswith("finish"):
+        match = re.search(r'finish\(answer="(.*)"\)', action_str, re.DOTALL)
+        return match.group(1) if match else action_str[6:].strip('()"\'')
+    match = re.match(r'(\w+)\((.*)\)', action_str)
+    if not match:
+        return None
+    return dict(re.findall(r'(\w+)=["\']?([^\"\',]+)["\']?', match.group(2)))
+
+
+def new_parse(llm_output: str):
+    """新实现：单遍解析全部动作并解析参数"""
+    parsed = parse_output(llm_output)
+    results = []
+    for action_str in parsed.actions:
+        try:
+            results.append(parse_action(action_str))
+        except ParseError:
+            results.append(None)
+    return results
+
+
+def _throughput(fn, corpus: list) -> float:
+    """返回处理语料的吞吐量（MB/s）"""
+    size_mb = sum(len(text.encode("utf-8")) for text in corpus) / (1024 * 1024)
+    start = time.perf_counter()
+    for text in corpus:
+        fn(text)
+    return size_mb / (time.perf_counter() - start)
+
+
+def _build(size_mb: float, next_output) -> list:
+    corpus = []
+    size = 0
+    while size < size_mb * 1024 * 1024:
+        text = next_output()
+        corpus.append(text)
+        size += len(text.encode("utf-8"))
+    return corpus
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ReAct 解析器基准测试")
+    parser.add_argument("--size-mb", type=float, default=2.0, help="每种语料的大小（MB）")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    corpora = {
+        "典型输出": _build(args.size_mb, lambda: rng.choice(CLEAN_OUTPUTS)),
+        "模糊语料": _build(args.size_mb, lambda: make_output(rng)),
+    }
+    # 注意：原实现每条输出只解析第一个动作，新解析器解析全部动作及其参数
+    for name, corpus in corpora.items():
+        legacy = _throughput(legacy_parse, corpus)
+        new = _throughput(new_parse, corpus)
+        print(f"{name} ({len(corpus)} 条): 原实现 {legacy:6.2f} MB/s, "
+              f"新解析器 {new:6.2f} MB/s ({new / legacy:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""
+计划模板缓存基准测试
+在模拟的 LLM 接口和天气服务上重复同一形状的请求，对比开启计划缓存前后的
+LLM 调用次数和端到端延迟
+
+用法:
+    python -m benchmarks.bench_plan_cache --queries 20 --latency 0.3
+"""
+
+import argparse
+import time
+
+from travel_assistant import SiliconFlowClient, TravelAssistantAgent
+from travel_assistant.config import DEFAULT_CONFIG
+from travel_assistant.plan_cache import PlanCache
+from travel_assistant.stats import summarize_latencies
+from benchmarks.mock_server import MockServer
+from benchmarks.suite import CITIES, scripted_reply
+
+
+class CountingClient(SiliconFlowClient):
+    """统计 chat 调用次数"""
+
+    calls = 0
+
+    def chat(self, *args, **kwargs):
+        self.calls += 1
+        return super().chat(*args, **kwargs)
+
+
+def run(base_url: str, plan_cache, queries: int) -> dict:
+    with CountingClient(api_key="bench", base_url=base_url) as client:
+        agent = TravelAssistantAgent(client, plan_cache=plan_cache)
+        latencies = []
+        for i in range(queries):
+            start = time.perf_counter()
+            agent.run(f"{CITIES[i % len(CITIES)]} 周末旅行怎么安排", verbose=False)
+            latencies.append(time.perf_counter() - start)
+        agent.close()
+        return {"llm_calls": client.calls, "latency": summarize_latencies(latencies, (50, 95))}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="计划模板缓存基准测试")
+    parser.add_argument("--queries", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.3, help="LLM接口延迟（秒）")
+    args = parser.parse_args()
+
+    weather_url = DEFAULT_CONFIG["weather_base_url"]
+    cache = PlanCache()
+    with MockServer(latency=args.latency, reply=scripted_reply) as llm, MockServer() as weather:
+        DEFAULT_CONFIG["weather_base_url"] = weather.url
+        try:
+            baseline = run(llm.base_url, None, args.queries)
+            planned = run(llm.base_url, cache, args.queries)
+        finally:
+            DEFAULT_CONFIG["weather_base_url"] = weather_url
+
+    for label, result in (("关闭计划缓存", baseline), ("开启计划缓存", planned)):
+        latency = result["latency"]
+        print(f"{label}  LLM调用 {result['llm_calls']:4d} 次  mean {latency['mean'] * 1000:7.1f} ms  "
+              f"p95 {latency['p95'] * 1000:7.1f} ms")
+    stats = cache.stats()
+    print(f"记录 {stats['recorded']} 次，重放 {stats['replays']} 次（确认 {stats['confirmed']}，"
+          f"否决 {stats['rejected']}），省去 LLM 调用 {stats['llm_calls_avoided']} 次")
+
+
+if __name__ == "__main__":
+    main()
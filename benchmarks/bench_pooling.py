@@ -0,0 +1,54 @@
+"""
+连接池基准测试
+对比每次新建连接与复用连接池时的请求吞吐量
+
+用法:
+    python -m benchmarks.bench_pooling --requests 500 --threads 8
+"""
+
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from travel_assistant.http_pool import create_session
+from benchmarks.mock_server import MockServer
+
+
+def _run(fn, total: int, threads: int) -> float:
+    """并发执行total次fn，返回每秒请求数"""
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        list(executor.map(lambda _: fn(), range(total)))
+    return total / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="连接池基准测试")
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--threads", type=int, default=8)
+    args = parser.parse_args()
+
+    with MockServer() as server:
+        url = f"{server.base_url}/chat/completions"
+        payload = {"model": "mock-model", "messages": [{"role": "user", "content": "hi"}]}
+
+        def without_pool():
+            requests.post(url, json=payload, timeout=10).json()
+
+        session = create_session(pool_maxsize=args.threads)
+
+        def with_pool():
+            session.post(url, json=payload, timeout=10).json()
+
+        baseline = _run(without_pool, args.requests, args.threads)
+        pooled = _run(with_pool, args.requests, args.threads)
+        session.close()
+
+    print(f"无连接池: {baseline:8.1f} req/s")
+    print(f"连接池:   {pooled:8.1f} req/s  ({pooled / baseline:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""
+工具预取基准测试
+在模拟的 LLM 接口和天气服务上运行智能体，对比开启预取前后的端到端延迟，
+并输出预取命中率和节省的工具等待时间
+
+用法:
+    python -m benchmarks.bench_prefetch --queries 20 --latency 0.3 --weather-latency 0.2
+"""
+
+import argparse
+import time
+
+from travel_assistant import SiliconFlowClient, TravelAssistantAgent
+from travel_assistant.cache import get_tool_cache
+from travel_assistant.config import DEFAULT_CONFIG
+from travel_assistant.prefetch import get_prefetch_stats
+from travel_assistant.stats import summarize_latencies
+from benchmarks.mock_server import MockServer
+from benchmarks.suite import CITIES, scripted_reply
+
+
+# 一半请求提到住宿，一半只问行程
+QUERIES = ["{city} 周末旅行，帮我找中等价位的酒店", "{city} 一日游有什么推荐"]
+
+
+def run(client, prefetch: bool, queries: int) -> dict:
+    agent = TravelAssistantAgent(client, prefetch=prefetch)
+    get_prefetch_stats().reset()
+    latencies = []
+    for i in range(queries):
+        # 每次清空工具缓存，模拟首次查询的城市
+        get_tool_cache().clear()
+        query = QUERIES[i % len(QUERIES)].format(city=CITIES[i % len(CITIES)])
+        start = time.perf_counter()
+        agent.run(query, verbose=False)
+        latencies.append(time.perf_counter() - start)
+    agent.close()
+    return {"latency": summarize_latencies(latencies, (50, 95)), "prefetch": get_prefetch_stats().stats()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="工具预取基准测试")
+    parser.add_argument("--queries", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.3, help="LLM接口延迟（秒）")
+    parser.add_argument("--weather-latency", type=float, default=0.2, help="天气服务延迟（秒）")
+    args = parser.parse_args()
+
+    weather_url = DEFAULT_CONFIG["weather_base_url"]
+    with MockServer(latency=args.latency, reply=scripted_reply) as llm, \
+            MockServer(latency=args.weather_latency) as weather:
+        DEFAULT_CONFIG["weather_base_url"] = weather.url
+        try:
+            with SiliconFlowClient(api_key="bench", base_url=llm.base_url) as client:
+                baseline = run(client, False, args.queries)
+                prefetched = run(client, True, args.queries)
+        finally:
+            DEFAULT_CONFIG["weather_base_url"] = weather_url
+
+    for label, result in (("关闭预取", baseline), ("开启预取", prefetched)):
+        latency = result["latency"]
+        print(f"{label}  mean {latency['mean'] * 1000:7.1f} ms  "
+              f"p50 {latency['p50'] * 1000:7.1f} ms  p95 {latency['p95'] * 1000:7.1f} ms")
+    stats = prefetched["prefetch"]
+    print(f"预取 {stats['issued']} 次，命中 {stats['hits']} 次（{stats['hit_rate']:.0%}），"
+          f"丢弃 {stats['wasted']} 次，共节省工具等待 {stats['saved_seconds'] * 1000:.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
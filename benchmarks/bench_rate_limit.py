@@ -0,0 +1,78 @@
+"""
+限流优先级基准测试
+批量任务以固定并发持续占满 RPM 配额，同时每隔一段时间发起一个交互请求；
+对比交互请求按 interactive 优先级排队与和批量请求同等排队（FIFO）时的等待时间
+
+用法:
+    python -m benchmarks.bench_rate_limit --rpm 600 --batch-concurrency 16 --interactive 20
+"""
+
+import argparse
+import threading
+import time
+
+from travel_assistant.client import SiliconFlowClient
+from travel_assistant.rate_limit import RateLimiter, request_priority
+from travel_assistant.stats import summarize_latencies
+from benchmarks.mock_server import MockServer
+
+MESSAGES = [{"role": "user", "content": "北京三日游"}]
+
+
+def run(base_url: str, rpm: int, batch_concurrency: int, interactive: int,
+        interval: float, interactive_priority: str) -> dict:
+    limiter = RateLimiter(rpm=rpm, burst=1, timeout=60)
+    client = SiliconFlowClient(api_key="bench", base_url=base_url, rate_limiter=limiter)
+    stop = threading.Event()
+
+    def batch_worker():
+        with request_priority("batch"):
+            while not stop.is_set():
+                client.chat(MESSAGES, max_tokens=50)
+
+    workers = [threading.Thread(target=batch_worker) for _ in range(batch_concurrency)]
+    for worker in workers:
+        worker.start()
+    latencies = []
+    try:
+        time.sleep(interval)
+        for _ in range(interactive):
+            start = time.perf_counter()
+            with request_priority(interactive_priority):
+                client.chat(MESSAGES, max_tokens=50)
+            latencies.append(time.perf_counter() - start)
+            time.sleep(interval)
+    finally:
+        stop.set()
+        for worker in workers:
+            worker.join()
+        client.close()
+    return {
+        "latency": summarize_latencies(latencies, (50, 95)),
+        "peak": limiter.stats()["queue_peak"],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="限流优先级基准测试")
+    parser.add_argument("--rpm", type=int, default=600)
+    parser.add_argument("--batch-concurrency", type=int, default=16)
+    parser.add_argument("--interactive", type=int, default=20, help="交互请求数")
+    parser.add_argument("--interval", type=float, default=0.2, help="交互请求间隔（秒）")
+    parser.add_argument("--latency", type=float, default=0.02, help="模拟LLM延迟（秒）")
+    args = parser.parse_args()
+
+    with MockServer(latency=args.latency) as llm:
+        rows = [(label, run(llm.base_url, args.rpm, args.batch_concurrency, args.interactive,
+                            args.interval, priority))
+                for label, priority in (("同级排队", "batch"), ("交互优先", "interactive"))]
+
+    print(f"RPM {args.rpm}，{args.batch_concurrency} 个批量并发占满配额，{args.interactive} 个交互请求")
+    for label, result in rows:
+        latency = result["latency"]
+        print(f"{label} 交互请求 p50 {latency['p50'] * 1000:7.1f} ms  "
+              f"p95 {latency['p95'] * 1000:7.1f} ms  最大排队 {result['peak']}")
+
+
+if __name__ == "__main__":
+    main()
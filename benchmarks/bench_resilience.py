@@ -0,0 +1,57 @@
+"""
+容错层故障注入测试
+在随机返回 503 的模拟服务器上对比不重试与重试+预算+熔断的成功率和请求放大倍数
+
+用法:
+    python -m benchmarks.bench_resilience --requests 500 --error-rate 0.2
+"""
+
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+
+from travel_assistant import SiliconFlowClient
+from travel_assistant.resilience import Resilience, RetryPolicy, reset_upstreams
+from benchmarks.mock_server import MockServer
+
+
+def run(error_rate: float, total: int, threads: int, max_attempts: int, seed: int) -> tuple:
+    """返回 (成功率, 服务端收到的请求数/逻辑请求数)"""
+    reset_upstreams()
+    with MockServer(error_rate=error_rate, seed=seed) as server:
+        resilience = Resilience(RetryPolicy(max_attempts=max_attempts, base_delay=0.01))
+        client = SiliconFlowClient(api_key="bench", base_url=server.base_url,
+                                   pool_maxsize=threads, resilience=resilience)
+
+        def one(_):
+            try:
+                client.chat([{"role": "user", "content": "你好"}])
+                return True
+            except ConnectionError:
+                return False
+
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            ok = sum(executor.map(one, range(total)))
+        client.close()
+        return ok / total, server.requests / total
+
+
+def main():
+    parser = argparse.ArgumentParser(description="容错层故障注入测试")
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--error-rate", type=float, default=0.2)
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    for label, attempts in [("不重试", 1), ("重试(3次)", 3)]:
+        success, amplification = run(args.error_rate, args.requests, args.threads, attempts, args.seed)
+        print(f"{label:8s} 错误率 {args.error_rate:.0%}: 成功率 {success:6.1%}, "
+              f"请求放大 {amplification:.2f}x")
+
+    # 上游完全故障时，重试预算和熔断器限制放大倍数
+    success, amplification = run(1.0, args.requests, args.threads, 3, args.seed)
+    print(f"上游完全故障: 成功率 {success:6.1%}, 请求放大 {amplification:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
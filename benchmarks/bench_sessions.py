@@ -0,0 +1,83 @@
+"""
+多会话负载测试
+对比每个请求新建智能体与 SessionManager 共享智能体的吞吐量，并测量每个空闲会话的内存
+
+用法:
+    python -m benchmarks.bench_sessions --sessions 1000 --latency 0.05 --idle 10000
+"""
+
+import argparse
+import asyncio
+import time
+import tracemalloc
+
+from travel_assistant import TravelAssistantAgent
+from travel_assistant.async_client import AsyncSiliconFlowClient
+from travel_assistant.sessions import SessionManager
+from benchmarks.mock_server import MockServer
+
+
+async def bench_per_request(base_url: str, sessions: int) -> float:
+    """每个请求新建一个智能体，返回每秒完成的会话数"""
+    async with AsyncSiliconFlowClient(api_key="bench", base_url=base_url,
+                                      pool_maxsize=sessions) as client:
+        async def one(i):
+            agent = TravelAssistantAgent(client)
+            try:
+                return await agent.arun(f"查询{i}")
+            finally:
+                agent.close()
+
+        start = time.perf_counter()
+        await asyncio.gather(*(one(i) for i in range(sessions)))
+        return sessions / (time.perf_counter() - start)
+
+
+async def bench_manager(base_url: str, sessions: int) -> float:
+    """共享一个智能体，通过 SessionManager 服务所有会话，返回每秒完成的会话数"""
+    async with AsyncSiliconFlowClient(api_key="bench", base_url=base_url,
+                                      pool_maxsize=sessions) as client:
+        manager = SessionManager(TravelAssistantAgent(client))
+        start = time.perf_counter()
+        await asyncio.gather(*(manager.arun(None, f"查询{i}") for i in range(sessions)))
+        return sessions / (time.perf_counter() - start)
+
+
+async def measure_idle_memory(base_url: str, idle: int) -> float:
+    """创建 idle 个完成一轮对话后空闲的会话，返回每个会话的平均内存（字节）"""
+    async with AsyncSiliconFlowClient(api_key="bench", base_url=base_url) as client:
+        manager = SessionManager(TravelAssistantAgent(client), max_sessions=idle + 1)
+        # 预热，排除客户端和智能体本身的一次性分配
+        await manager.arun(None, "预热")
+        tracemalloc.start()
+        before = tracemalloc.take_snapshot()
+        for start in range(0, idle, 200):
+            await asyncio.gather(*(manager.arun(None, f"查询{i}")
+                                   for i in range(start, min(start + 200, idle))))
+        after = tracemalloc.take_snapshot()
+        tracemalloc.stop()
+        assert len(manager) == idle + 1
+        growth = sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+        return growth / idle
+
+
+def main():
+    parser = argparse.ArgumentParser(description="多会话负载测试")
+    parser.add_argument("--sessions", type=int, default=1000, help="并发会话数")
+    parser.add_argument("--latency", type=float, default=0.05, help="模拟LLM延迟（秒）")
+    parser.add_argument("--idle", type=int, default=10000, help="测量内存的空闲会话数")
+    args = parser.parse_args()
+
+    with MockServer(latency=args.latency) as server:
+        per_request = asyncio.run(bench_per_request(server.base_url, args.sessions))
+        shared = asyncio.run(bench_manager(server.base_url, args.sessions))
+        with MockServer(latency=0) as fast:
+            per_session = asyncio.run(measure_idle_memory(fast.base_url, args.idle))
+
+    print(f"每请求新建智能体: {per_request:8.1f} sessions/s")
+    print(f"SessionManager:   {shared:8.1f} sessions/s  ({shared / per_request:.2f}x)")
+    print(f"空闲会话内存:     {per_session / 1024:8.2f} KiB/session ({args.idle} 个会话)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""
+SSE 解码基准测试
+对比原有逐行解码（iter_lines + 每块 json.loads + 吞掉异常）与增量字节解码器的
+解码速度（tokens/s），并对比标准库 json 与 orjson 后端
+
+用法:
+    python -m benchmarks.bench_sse --tokens 200000
+"""
+
+import argparse
+import io
+import json
+import random
+import time
+
+import requests
+
+from travel_assistant import sse
+from travel_assistant.sse import ChatStream
+
+
+WORDS = ["北京", "今天", "晴", "，", "推荐", "故宫", "和", "颐和园", "。", "Thought", ": ", "Action", "\n"]
+
+
+def make_stream(tokens: int, seed: int = 0) -> bytes:
+    """生成 OpenAI 兼容的 SSE 响应体，每个事件一个 token"""
+    rng = random.Random(seed)
+    events = []
+    for i in range(tokens):
+        chunk = {
+            "id": "chatcmpl-bench",
+            "object": "chat.completion.chunk",
+            "created": 1700000000,
+            "model": "deepseek-ai/DeepSeek-V2.5",
+            "choices": [{"index": 0, "delta": {"content": rng.choice(WORDS)}, "finish_reason": None}],
+        }
+        events.append("data: " + json.dumps(chunk, ensure_ascii=False) + "\n\n")
+    events.append('data: {"choices": [], "usage": {"prompt_tokens": 10, "completion_tokens": %d}}\n\n' % tokens)
+    events.append("data: [DONE]\n\n")
+    return "".join(events).encode("utf-8")
+
+
+def split_network(data: bytes, seed: int = 0) -> list:
+    """按随机大小切分，模拟网络分块（会拆开行和多字节字符）"""
+    rng = random.Random(seed)
+    chunks, pos = [], 0
+    while pos < len(data):
+        size = rng.randint(1, 1500)
+        chunks.append(data[pos:pos + size])
+        pos += size
+    return chunks
+
+
+def legacy_decode(chunks: list) -> list:
+    """原有实现：requests 的 iter_lines 逐行解码，每块 json.loads"""
+    response = requests.Response()
+    response.raw = io.BytesIO(b"".join(chunks))
+    output = []
+    for line in response.iter_lines():
+        if line:
+            line = line.decode('utf-8')
+            if line.startswith('data: '):
+                data = line[6:]
+                if data == '[DONE]':
+                    break
+                try:
+                    chunk = json.loads(data)
+                    if (chunk.get('choices') and
+                            chunk['choices'][0].get('delta') and
+                            chunk['choices'][0]['delta'].get('content')):
+                        output.append(chunk['choices'][0]['delta']['content'])
+                except Exception:
+                    continue
+    return output
+
+
+def new_decode(chunks: list) -> list:
+    """增量字节解码器 + ChatStream"""
+    return list(ChatStream(chunks))
+
+
+def measure(fn, chunks: list, tokens: int, repeat: int) -> float:
+    """返回最好一轮的 tokens/s"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(chunks)
+        best = min(best, time.perf_counter() - start)
+    return tokens / best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SSE 解码基准测试")
+    parser.add_argument("--tokens", type=int, default=200000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    chunks = split_network(make_stream(args.tokens))
+    assert legacy_decode(chunks) == new_decode(chunks)
+
+    cases = [("原有逐行解码", legacy_decode, json.loads), ("增量解码 json", new_decode, json.loads)]
+    if sse.orjson is not None:
+        cases.append(("增量解码 orjson", new_decode, sse.orjson.loads))
+
+    baseline = None
+    for label, fn, loads in cases:
+        sse.loads = loads
+        rate = measure(fn, chunks, args.tokens, args.repeat)
+        baseline = baseline or rate
+        print(f"{label:16s} {rate / 1e3:8.1f}k tokens/s  ({rate / baseline:.2f}x)")
+    sse.loads = sse.orjson.loads if sse.orjson is not None else json.loads
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+持久化存储基准测试
+模拟发布后新启动的工作进程：对比空缓存与预热过的持久化存储上第一波天气查询的
+延迟和打到天气服务的请求数
+
+用法:
+    python -m benchmarks.bench_store --weather-latency 0.2
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+from travel_assistant.cache import TTLCache, set_tool_cache
+from travel_assistant.config import CITY_MAPPING, DEFAULT_CONFIG
+from travel_assistant.prewarm import prewarm
+from travel_assistant.stats import summarize_latencies
+from travel_assistant.store import PersistentStore
+from travel_assistant.tools import get_weather
+from benchmarks.mock_server import MockServer
+
+
+def first_wave(cache: TTLCache) -> dict:
+    """新进程的共享工具缓存为 cache，依次查询全部城市"""
+    set_tool_cache(cache)
+    latencies = []
+    try:
+        for city in CITY_MAPPING:
+            start = time.perf_counter()
+            result = get_weather(city)
+            latencies.append(time.perf_counter() - start)
+            if "当前天气" not in result:
+                raise RuntimeError(result)
+    finally:
+        set_tool_cache(None)
+    return summarize_latencies(latencies, (50, 95))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="持久化存储基准测试")
+    parser.add_argument("--weather-latency", type=float, default=0.2, help="天气服务延迟（秒）")
+    args = parser.parse_args()
+
+    weather_url = DEFAULT_CONFIG["weather_base_url"]
+    with tempfile.TemporaryDirectory() as tmp, MockServer(latency=args.weather_latency) as weather:
+        DEFAULT_CONFIG["weather_base_url"] = weather.url
+        path = os.path.join(tmp, "store.db")
+        try:
+            cold = first_wave(TTLCache())
+            cold_requests = weather.requests
+
+            store = PersistentStore(path)
+            warm = prewarm(store)
+            prewarm_requests = weather.requests - cold_requests
+            store.close()
+
+            # 发布后的新进程重新打开存储
+            store = PersistentStore(path)
+            warmed = first_wave(TTLCache(store=store))
+            warm_requests = weather.requests - cold_requests - prewarm_requests
+            file_kib = store.stats()["file_bytes"] / 1024
+            store.close()
+        finally:
+            DEFAULT_CONFIG["weather_base_url"] = weather_url
+
+    print(f"{len(CITY_MAPPING)} 个城市，预热耗时 {warm['elapsed'] * 1000:.0f} ms"
+          f"（{prewarm_requests} 次请求），数据库 {file_kib:.0f} KiB")
+    for label, latency, requests in (("空缓存", cold, cold_requests), ("预热存储", warmed, warm_requests)):
+        print(f"{label:<6} 天气请求 {requests:3d}  mean {latency['mean'] * 1000:7.2f} ms  "
+              f"p95 {latency['p95'] * 1000:7.2f} ms  总计 {latency['mean'] * len(CITY_MAPPING) * 1000:7.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""
+追踪开销基准测试
+使用进程内的假客户端运行智能体循环，对比关闭追踪、回调导出和 Prometheus 导出的单次运行耗时
+
+用法:
+    python -m benchmarks.bench_tracing --runs 2000
+"""
+
+import argparse
+import time
+
+from travel_assistant.agent import TravelAssistantAgent
+from travel_assistant.tracing import CallbackExporter, PrometheusExporter, Tracer, record_usage, set_tracer
+
+
+class ScriptedClient:
+    """按顺序返回预设输出的客户端，不产生网络开销"""
+
+    REPLIES = [
+        'Thought: 查天气\nAction: lookup(city="北京")',
+        'Thought: 完成\nAction: finish(answer="北京晴")',
+    ]
+
+    def __init__(self):
+        self.calls = 0
+
+    def chat(self, messages, stream=False, **kwargs):
+        reply = self.REPLIES[self.calls % len(self.REPLIES)]
+        self.calls += 1
+        record_usage({"prompt_tokens": 10, "completion_tokens": 10, "total_tokens": 20})
+        return reply
+
+
+def measure(runs: int) -> float:
+    """返回单次运行的平均耗时（微秒）"""
+    agent = TravelAssistantAgent(ScriptedClient(), tools={"lookup": lambda city: f"{city}晴"})
+    start = time.perf_counter()
+    for _ in range(runs):
+        agent.run("北京天气", verbose=False)
+    return (time.perf_counter() - start) / runs * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="追踪开销基准测试")
+    parser.add_argument("--runs", type=int, default=2000)
+    args = parser.parse_args()
+
+    cases = [
+        ("关闭追踪", Tracer()),
+        ("回调导出", Tracer([CallbackExporter(lambda span: None)])),
+        ("Prometheus", Tracer([PrometheusExporter()])),
+    ]
+    measure(200)  # 预热
+    baseline = None
+    for label, tracer in cases:
+        set_tracer(tracer)
+        cost = measure(args.runs)
+        baseline = baseline or cost
+        print(f"{label:12s} {cost:8.1f} us/run  ({cost / baseline:.2f}x)")
+    set_tracer(None)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+天气→景点链路基准测试
+对比模型把天气描述转述给 get_attraction（两轮工具调用）与 get_attraction 直接使用
+结构化天气（同一轮调用）的 LLM 调用次数、天气服务请求数和端到端延迟
+
+用法:
+    python -m benchmarks.bench_weather --queries 20 --latency 0.3 --weather-latency 0.2
+"""
+
+import argparse
+import time
+
+from travel_assistant import SiliconFlowClient, TravelAssistantAgent
+from travel_assistant.cache import get_tool_cache
+from travel_assistant.config import DEFAULT_CONFIG
+from travel_assistant.stats import summarize_latencies
+from benchmarks.mock_server import MockServer
+from benchmarks.suite import CITIES
+
+
+# 原链路：先查天气，下一轮把天气描述传给景点推荐
+CHAINED = [
+    'Thought: 先查天气\nAction: get_weather(city="{city}")',
+    'Thought: 根据天气推荐景点\nAction: get_attraction(city="{city}", weather="Sunny")',
+    'Thought: 信息齐全\nAction: finish(answer="{city}的行程已规划")',
+]
+
+# 新链路：景点推荐直接使用结构化天气，与天气查询同一轮执行
+DIRECT = [
+    'Thought: 天气和景点一起查询\n'
+    'Action: get_weather(city="{city}")\nAction: get_attraction(city="{city}")',
+    'Thought: 信息齐全\nAction: finish(answer="{city}的行程已规划")',
+]
+
+
+def make_reply(script: list):
+    def reply(payload: dict) -> str:
+        messages = payload.get("messages", [])
+        query = next((m["content"] for m in messages if m["role"] == "user"), "")
+        city = query.replace("用户请求: ", "").split(" ")[0] or "北京"
+        step = sum(1 for m in messages if m["role"] == "assistant")
+        return script[min(step, len(script) - 1)].format(city=city)
+    return reply
+
+
+def run(script: list, queries: int, latency: float, weather_latency: float) -> dict:
+    weather_url = DEFAULT_CONFIG["weather_base_url"]
+    with MockServer(latency=latency, reply=make_reply(script)) as llm, \
+            MockServer(latency=weather_latency) as weather:
+        DEFAULT_CONFIG["weather_base_url"] = weather.url
+        try:
+            with SiliconFlowClient(api_key="bench", base_url=llm.base_url) as client:
+                agent = TravelAssistantAgent(client)
+                latencies = []
+                for i in range(queries):
+                    # 每次清空工具缓存，模拟首次查询的城市
+                    get_tool_cache().clear()
+                    start = time.perf_counter()
+                    agent.run(f"{CITIES[i % len(CITIES)]} 一日游有什么推荐", verbose=False)
+                    latencies.append(time.perf_counter() - start)
+                agent.close()
+        finally:
+            DEFAULT_CONFIG["weather_base_url"] = weather_url
+        return {
+            "latency": summarize_latencies(latencies, (50, 95)),
+            "llm_calls": llm.requests,
+            "weather_calls": weather.requests,
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="天气→景点链路基准测试")
+    parser.add_argument("--queries", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.3, help="LLM接口延迟（秒）")
+    parser.add_argument("--weather-latency", type=float, default=0.2, help="天气服务延迟（秒）")
+    args = parser.parse_args()
+
+    for label, script in (("转述天气", CHAINED), ("结构化天气", DIRECT)):
+        result = run(script, args.queries, args.latency, args.weather_latency)
+        latency = result["latency"]
+        print(f"{label:<6} LLM调用 {result['llm_calls']:4d}  天气请求 {result['weather_calls']:4d}  "
+              f"mean {latency['mean'] * 1000:7.1f} ms  p95 {latency['p95'] * 1000:7.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+多城市天气查询基准测试
+在模拟的天气服务上对比逐个调用 get_weather 与一次 get_weather_many 并发查询的延迟
+
+用法:
+    python -m benchmarks.bench_weather_many --cities 5 --rounds 10 --weather-latency 0.2
+"""
+
+import argparse
+import time
+
+from travel_assistant.cache import get_tool_cache
+from travel_assistant.config import DEFAULT_CONFIG
+from travel_assistant.stats import summarize_latencies
+from travel_assistant.tools import get_weather, get_weather_many
+from benchmarks.mock_server import MockServer
+from benchmarks.suite import CITIES
+
+
+def sequential(cities: list):
+    for city in cities:
+        result = get_weather(city)
+        if "当前天气" not in result:
+            raise RuntimeError(result)
+
+
+def fan_out(cities: list):
+    result = get_weather_many(cities)
+    if getattr(result, "data", None) is None or "failed" in result.data:
+        raise RuntimeError(result)
+
+
+def run(fn, cities: list, rounds: int) -> dict:
+    latencies = []
+    for _ in range(rounds):
+        # 每轮清空工具缓存，模拟首次查询的城市
+        get_tool_cache().clear()
+        start = time.perf_counter()
+        fn(cities)
+        latencies.append(time.perf_counter() - start)
+    return summarize_latencies(latencies, (50, 95))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="多城市天气查询基准测试")
+    parser.add_argument("--cities", type=int, default=5)
+    parser.add_argument("--rounds", type=int, default=10)
+    parser.add_argument("--weather-latency", type=float, default=0.2, help="天气服务延迟（秒）")
+    args = parser.parse_args()
+
+    cities = CITIES[:args.cities]
+    weather_url = DEFAULT_CONFIG["weather_base_url"]
+    with MockServer(latency=args.weather_latency) as weather:
+        DEFAULT_CONFIG["weather_base_url"] = weather.url
+        try:
+            results = [("逐个 get_weather", run(sequential, cities, args.rounds)),
+                       ("get_weather_many", run(fan_out, cities, args.rounds))]
+        finally:
+            DEFAULT_CONFIG["weather_base_url"] = weather_url
+
+    print(f"{len(cities)} 个城市，每轮清空缓存，共 {args.rounds} 轮")
+    for label, latency in results:
+        print(f"{label:<18} mean {latency['mean'] * 1000:7.1f} ms  "
+              f"p50 {latency['p50'] * 1000:7.1f} ms  p95 {latency['p95'] * 1000:7.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+多进程工作池基准测试
+在模拟的 LLM 和天气服务上，以相同的总并发对比单进程多线程与多进程工作池的吞吐量，
+并统计打到天气服务的请求数（工具缓存经共享存储在进程间复用）
+
+用法:
+    python -m benchmarks.bench_workers --queries 400 --latency 0.02 --concurrency 16
+"""
+
+import argparse
+import functools
+import multiprocessing
+import os
+import tempfile
+import time
+
+from travel_assistant.config import DEFAULT_CONFIG
+from travel_assistant.stats import summarize_latencies
+from travel_assistant.workers import WorkerPool, build_agent
+from benchmarks.mock_server import MockServer
+from benchmarks.suite import CITIES, scripted_reply
+
+
+def serve_llm(latency: float, urls, stop):
+    """在独立进程中运行模拟 LLM 服务，避免与父进程的结果收集争用 GIL"""
+    with MockServer(latency=latency, reply=scripted_reply) as llm:
+        urls.put(llm.base_url)
+        stop.wait()
+
+
+def run(base_url: str, queries: list, workers: int, threads: int, store_path: str) -> dict:
+    factory = functools.partial(build_agent, "bench", None, base_url)
+    with WorkerPool(factory, workers=workers, threads=threads, store_path=store_path) as pool:
+        # 先让每个进程完成启动，计时只包含查询本身
+        list(pool.run([CITIES[0]] * workers))
+        start = time.perf_counter()
+        results = list(pool.run(queries))
+        elapsed = time.perf_counter() - start
+    if not all(r.ok for r in results):
+        raise RuntimeError(next(r.error for r in results if not r.ok))
+    return {
+        "threads": threads,
+        "throughput": len(results) / elapsed,
+        "latency": summarize_latencies((r.latency for r in results), (50, 95)),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="多进程工作池基准测试")
+    parser.add_argument("--queries", type=int, default=400)
+    parser.add_argument("--latency", type=float, default=0.02, help="模拟LLM延迟（秒）")
+    parser.add_argument("--concurrency", type=int, default=16, help="总并发（进程数 × 每进程线程数）")
+    args = parser.parse_args()
+
+    queries = [f"{CITIES[i % len(CITIES)]} 三日游" for i in range(args.queries)]
+    layouts = [w for w in (1, 2, 4) if args.concurrency % w == 0]
+    weather_url = DEFAULT_CONFIG["weather_base_url"]
+    rows = []
+    ctx = multiprocessing.get_context("spawn")
+    urls, stop = ctx.Queue(), ctx.Event()
+    server = ctx.Process(target=serve_llm, args=(args.latency, urls, stop), daemon=True)
+    server.start()
+    with MockServer() as weather:
+        DEFAULT_CONFIG["weather_base_url"] = weather.url
+        try:
+            base_url = urls.get(timeout=30)
+            for workers in layouts:
+                before = weather.requests
+                with tempfile.TemporaryDirectory() as tmp:
+                    stats = run(base_url, queries, workers, args.concurrency // workers,
+                                os.path.join(tmp, "store.db"))
+                rows.append((workers, stats, weather.requests - before))
+        finally:
+            DEFAULT_CONFIG["weather_base_url"] = weather_url
+            stop.set()
+            server.join()
+
+    print(f"{args.queries} 个查询，LLM 延迟 {args.latency * 1000:.0f} ms，总并发 {args.concurrency}")
+    base = rows[0][1]["throughput"]
+    for workers, stats, weather_requests in rows:
+        latency = stats["latency"]
+        print(f"{workers} 进程 × {stats['threads']:>2} 线程: {stats['throughput']:7.1f} queries/s "
+              f"({stats['throughput'] / base:.2f}x)  p50 {latency['p50'] * 1000:6.1f} ms  "
+              f"p95 {latency['p95'] * 1000:6.1f} ms  天气请求 {weather_requests}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,290 @@
+"""
+本地模拟服务器
+提供 OpenAI 兼容的聊天接口和 wttr.in 风格的天气接口，用于离线基准测试
+"""
+
+import json
+import random
+import sys
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
+
+
+def make_weather_payload(city: str) -> dict:
+    """构造 wttr.in format=j1 风格的天气数据"""
+    return {
+        "current_condition": [{
+            "weatherDesc": [{"value": "Sunny"}],
+            "temp_C": "25",
+            "FeelsLikeC": "24",
+            "humidity": "60",
+            "windspeedKmph": "10",
+        }],
+        "nearest_area": [{"areaName": [{"value": city}]}],
+        "weather": [
+            {
+                "date": f"2026-01-0{day + 1}",
+                "maxtempC": str(28 - day),
+                "mintempC": str(18 - day),
+                "hourly": [
+                    {"time": str(hour * 100), "weatherDesc": [{"value": desc}], "chanceofrain": rain}
+                    for hour in range(0, 2400, 300)
+                ],
+            }
+            for day, (desc, rain) in enumerate([("Sunny", "0"), ("Partly cloudy", "20"), ("Light rain", "80")])
+        ],
+    }
+
+
+def make_chat_payload(content: str, model: str = "mock-model") -> dict:
+    """构造 OpenAI 兼容的聊天响应"""
+    return {
+        "id": "chatcmpl-mock",
+        "object": "chat.completion",
+        "model": model,
+        "choices": [{
+            "index": 0,
+            "message": {"role": "assistant", "content": content},
+            "finish_reason": "stop",
+        }],
+        "usage": {"prompt_tokens": 10, "completion_tokens": 10, "total_tokens": 20},
+    }
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    """模拟服务器请求处理器"""
+
+    # 使用HTTP/1.1以支持keep-alive
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, data: dict, status: int = 200):
+        body = json.dumps(data, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_json(self) -> dict:
+        length = int(self.headers.get("Content-Length", 0))
+        if not length:
+            return {}
+        return json.loads(self.rfile.read(length).decode("utf-8"))
+
+    def _inject_fault(self) -> bool:
+        """按脚本或错误率注入故障，返回是否已处理该请求"""
+        fault = self.server.next_fault()
+        if fault is None:
+            return False
+        if fault == "drop":
+            # 不返回任何响应直接断开连接
+            self.close_connection = True
+            return True
+        if fault == "hang":
+            time.sleep(self.server.hang_seconds)
+            self.close_connection = True
+            return True
+        status, retry_after = fault if isinstance(fault, tuple) else (fault, None)
+        body = json.dumps({"error": {"message": "injected fault", "code": status}}).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        if retry_after is not None:
+            self.send_header("Retry-After", str(retry_after))
+        self.end_headers()
+        self.wfile.write(body)
+        return True
+
+    def do_GET(self):
+        server = self.server
+        if server.latency:
+            time.sleep(server.latency)
+        if self._inject_fault():
+            return
+        path = urlparse(self.path).path
+        if path.endswith("/models"):
+            self._send_json({"data": [{"id": "mock-model"}]})
+        else:
+            city = path.strip("/").split("/")[-1] or "Beijing"
+            self._send_json(make_weather_payload(city))
+
+    def _send_chunk(self, data: bytes):
+        """按 chunked 编码写出一块数据"""
+        self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+
+    def _send_stream(self, content: str, model: str, include_usage: bool = False):
+        """以SSE格式分块返回内容，按 tokens_per_sec 控制生成速度"""
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        size = self.server.chunk_size
+        rate = self.server.tokens_per_sec
+        for i in range(0, len(content), size):
+            piece = content[i:i + size]
+            if rate:
+                time.sleep(len(piece) / rate)
+            chunk = {
+                "model": model,
+                "choices": [{"index": 0, "delta": {"content": piece}}],
+            }
+            event = "data: " + json.dumps(chunk, ensure_ascii=False) + "\n\n"
+            self._send_chunk(event.encode("utf-8"))
+        # 最后一个内容块之后单独返回 finish_reason
+        done = {"model": model, "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]}
+        self._send_chunk(("data: " + json.dumps(done) + "\n\n").encode("utf-8"))
+        if include_usage:
+            # stream_options.include_usage 时最后一块只包含用量
+            usage = {"model": model, "choices": [], "usage": make_chat_payload("")["usage"]}
+            self._send_chunk(("data: " + json.dumps(usage) + "\n\n").encode("utf-8"))
+        self._send_chunk(b"data: [DONE]\n\n")
+        self._send_chunk(b"")
+
+    def do_POST(self):
+        server = self.server
+        payload = self._read_json()
+        latency = server.latency_fn(payload) if server.latency_fn else server.latency
+        if latency:
+            time.sleep(latency)
+        if self._inject_fault():
+            return
+        model = payload.get("model", "mock-model")
+        reply = server.next_reply(payload)
+        if payload.get("stream"):
+            include_usage = (payload.get("stream_options") or {}).get("include_usage", False)
+            self._send_stream(reply, model, include_usage)
+        else:
+            if server.tokens_per_sec:
+                time.sleep(len(reply) / server.tokens_per_sec)
+            self._send_json(make_chat_payload(reply, model))
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 1024
+
+    def handle_error(self, request, client_address):
+        # 客户端提前关闭流（如识别到完整动作后停止读取）属于正常情况
+        if isinstance(sys.exc_info()[1], (BrokenPipeError, ConnectionResetError)):
+            return
+        super().handle_error(request, client_address)
+
+    def next_reply(self, payload: dict) -> str:
+        """固定回复直接返回，函数根据请求体生成回复，回复列表按请求顺序循环"""
+        if isinstance(self.reply, str):
+            return self.reply
+        if callable(self.reply):
+            return self.reply(payload)
+        with self.lock:
+            reply = self.reply[self.reply_index % len(self.reply)]
+            self.reply_index += 1
+        return reply
+
+    def next_fault(self):
+        """取出下一个要注入的故障，没有故障时返回 None"""
+        with self.lock:
+            self.requests += 1
+            if self.faults:
+                fault = self.faults.popleft()
+            elif self.error_rate and self.rng.random() < self.error_rate:
+                fault = self.error_status
+            else:
+                return None
+            self.faults_injected += 1
+            return fault
+
+
+class MockServer:
+    """
+    本地模拟服务器
+
+    用法:
+        with MockServer() as server:
+            client = SiliconFlowClient(api_key="x", base_url=server.base_url)
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0,
+                 latency: float = 0.0, reply: str = "Thought: 完成\nAction: finish(answer=\"ok\")",
+                 chunk_size: int = 4, error_rate: float = 0.0,
+                 error_status=503, seed: int = None, latency_fn=None,
+                 tokens_per_sec: float = 0.0):
+        """
+        初始化服务器
+
+        Args:
+            host: 监听地址
+            port: 监听端口，0表示随机端口
+            latency: 每个请求的模拟延迟（秒）
+            reply: 聊天接口返回的固定内容、按请求顺序循环返回的内容列表，
+                或根据请求体生成内容的函数
+            chunk_size: 流式响应每个分块的字符数
+            error_rate: 随机注入故障的概率
+            error_status: 随机注入的故障，格式同 inject
+            seed: 随机故障的种子
+            latency_fn: 根据聊天请求体返回延迟的函数，用于模拟不同模型的延迟分布
+            tokens_per_sec: 生成速度（每秒字符数），0表示不限速；latency 相当于首个token前的等待
+        """
+        self.httpd = _Server((host, port), MockHandler)
+        self.httpd.latency = latency
+        self.httpd.latency_fn = latency_fn
+        self.httpd.reply = reply
+        self.httpd.reply_index = 0
+        self.httpd.chunk_size = chunk_size
+        self.httpd.tokens_per_sec = tokens_per_sec
+        self.httpd.error_rate = error_rate
+        self.httpd.error_status = error_status
+        self.httpd.rng = random.Random(seed)
+        self.httpd.faults = deque()
+        self.httpd.hang_seconds = 5.0
+        self.httpd.lock = threading.Lock()
+        self.httpd.requests = 0
+        self.httpd.faults_injected = 0
+        self._thread = None
+
+    def inject(self, *faults):
+        """
+        按顺序为接下来的请求注入故障
+
+        每个故障可以是状态码（如 503）、(状态码, Retry-After秒数)、
+        "drop"（直接断开连接）或 "hang"（挂起 hang_seconds 秒后断开）。
+        """
+        with self.httpd.lock:
+            self.httpd.faults.extend(faults)
+
+    @property
+    def requests(self) -> int:
+        """已收到的请求数"""
+        return self.httpd.requests
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def base_url(self) -> str:
+        return f"{self.url}/v1"
+
+    def start(self):
+        """在后台线程启动服务器"""
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """停止服务器"""
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
@@ -0,0 +1,394 @@
+"""
+离线基准测试套件
+在本地模拟的 SiliconFlow 接口和 wttr.in 服务上按脚本运行客户端、智能体和工具，
+输出吞吐量、p50/p95/p99 延迟和内存占用，并保存为 JSON 以便在提交之间对比
+
+用法:
+    python -m benchmarks.suite --output results/base.json
+    python -m benchmarks.suite --output results/new.json --compare results/base.json
+    python -m benchmarks.suite --scenarios client_chat agent_run --requests 50
+"""
+
+import argparse
+import datetime
+import json
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List
+
+from travel_assistant import SiliconFlowClient, TravelAssistantAgent
+from travel_assistant.cache import get_tool_cache
+from travel_assistant.config import CITY_MAPPING, DEFAULT_CONFIG
+from travel_assistant.resilience import reset_upstreams
+from travel_assistant.sessions import AgentSession
+from travel_assistant.stats import summarize_latencies
+from travel_assistant.tools import get_attraction, get_hotels, get_weather
+from benchmarks.mock_server import MockServer
+
+try:
+    import resource
+except ImportError:  # pragma: no cover - Windows
+    resource = None
+
+
+CITIES = list(CITY_MAPPING)
+
+# 智能体脚本：按对话中已有的 assistant 消息数决定下一步
+AGENT_SCRIPT = [
+    'Thought: 天气和酒店互不依赖，一起查询\n'
+    'Action: get_weather(city="{city}")\nAction: get_hotels(city="{city}", budget="中等")',
+    'Thought: 根据天气推荐景点\nAction: get_attraction(city="{city}", weather="晴")',
+    'Thought: 信息齐全\nAction: finish(answer="{city}的行程已规划")',
+]
+
+# 结果对比时各指标的方向，True 表示越大越好
+METRICS = {
+    "throughput": True,
+    "p50": False,
+    "p95": False,
+    "p99": False,
+    "peak_kib": False,
+    "prompt_tokens": False,
+}
+
+SCENARIOS: Dict[str, Callable] = {}
+
+
+def scenario(name: str):
+    """注册基准场景"""
+    def register(fn):
+        SCENARIOS[name] = fn
+        return fn
+    return register
+
+
+def scripted_reply(payload: dict) -> str:
+    """模拟服务器的回复函数，根据请求体中的城市和步骤生成智能体输出"""
+    messages = payload.get("messages", [])
+    query = next((m["content"] for m in messages if m["role"] == "user"), "")
+    city = query.replace("用户请求: ", "").split(" ")[0] or "北京"
+    step = sum(1 for m in messages if m["role"] == "assistant")
+    return AGENT_SCRIPT[min(step, len(AGENT_SCRIPT) - 1)].format(city=city)
+
+
+def run_load(fn: Callable[[int], None], total: int, concurrency: int) -> dict:
+    """
+    以固定并发执行 total 次调用
+
+    Args:
+        fn: 接收序号的调用，抛出异常计为错误
+        total: 调用次数
+        concurrency: 并发数
+
+    Returns:
+        requests、errors、elapsed、throughput 和延迟分布
+    """
+    def one(i):
+        start = time.perf_counter()
+        try:
+            fn(i)
+            ok = True
+        except Exception:
+            ok = False
+        return time.perf_counter() - start, ok
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        samples = list(executor.map(one, range(total)))
+    elapsed = time.perf_counter() - start
+    latencies = [latency for latency, ok in samples if ok]
+    return {
+        "requests": total,
+        "errors": total - len(latencies),
+        "elapsed": elapsed,
+        "throughput": len(latencies) / elapsed if elapsed else 0.0,
+        "latency": summarize_latencies(latencies, (50, 95, 99)),
+    }
+
+
+def measure_memory(fn: Callable[[int], None], total: int) -> dict:
+    """
+    单线程执行 total 次调用，统计 Python 堆的峰值增长
+
+    tracemalloc 会显著拖慢执行，因此与计时分开运行。
+    """
+    tracemalloc.start()
+    try:
+        base, _ = tracemalloc.get_traced_memory()
+        for i in range(total):
+            try:
+                fn(i)
+            except Exception:
+                pass
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    memory = {"peak_kib": (peak - base) / 1024}
+    if resource is not None:
+        memory["max_rss_kib"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return memory
+
+
+@scenario("client_chat")
+def client_chat(env: dict) -> Callable[[int], None]:
+    """非流式聊天请求"""
+    client = env["client"]
+
+    def call(i):
+        client.chat([{"role": "user", "content": f"用户请求: {CITIES[i % len(CITIES)]} 天气"}])
+    return call
+
+
+@scenario("client_stream")
+def client_stream(env: dict) -> Callable[[int], None]:
+    """流式聊天请求，完整读取所有分块，并记录首个分块延迟"""
+    client = env["client"]
+    ttft = env["ttft"]
+
+    def call(i):
+        start = time.perf_counter()
+        chunks = client.chat([{"role": "user", "content": f"用户请求: {CITIES[i % len(CITIES)]} 天气"}],
+                             stream=True)
+        for n, _ in enumerate(chunks):
+            if n == 0:
+                ttft.append(time.perf_counter() - start)
+    return call
+
+
+def _agent_call(env: dict, stream: bool) -> Callable[[int], None]:
+    agent = env["agent"]
+
+    prompt_tokens = env["prompt_tokens"]
+
+    def call(i):
+        city = CITIES[i % len(CITIES)]
+        session = AgentSession()
+        answer = agent.run(f"{city} 三日游", stream=stream, verbose=False, session=session)
+        if answer != f"{city}的行程已规划":
+            raise RuntimeError(f"意外的回答: {answer}")
+        prompt_tokens.append(session.history.sent_tokens)
+    return call
+
+
+@scenario("agent_run")
+def agent_run(env: dict) -> Callable[[int], None]:
+    """智能体完整运行：并行查询天气和酒店，再查景点，最后完成"""
+    return _agent_call(env, stream=False)
+
+
+@scenario("agent_stream")
+def agent_stream(env: dict) -> Callable[[int], None]:
+    """流式智能体运行，识别到动作后提前执行工具"""
+    return _agent_call(env, stream=True)
+
+
+@scenario("tools")
+def tools(env: dict) -> Callable[[int], None]:
+    """工具调用：每次天气查询都未命中缓存，景点和酒店查询走知识库"""
+    def call(i):
+        city = CITIES[i % len(CITIES)]
+        result = get_weather(f"{city}{i}", use_english=False)
+        if "当前天气" not in result:
+            raise RuntimeError(result)
+        get_attraction(city, "晴")
+        get_hotels(city, "中等")
+    return call
+
+
+def git_revision() -> dict:
+    """当前提交和工作区是否有未提交修改，不在 git 仓库中时返回空字典"""
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"],
+                                capture_output=True, text=True, check=True).stdout.strip()
+        dirty = bool(subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"],
+                                    capture_output=True, text=True, check=True).stdout.strip())
+    except (OSError, subprocess.CalledProcessError):
+        return {}
+    return {"commit": commit, "dirty": dirty}
+
+
+def run_suite(scenarios: List[str], requests: int = 200, concurrency: int = 8,
+              latency: float = 0.02, tokens_per_sec: float = 2000.0, chunk_size: int = 4,
+              weather_latency: float = 0.01, error_rate: float = 0.0, seed: int = 0,
+              memory_requests: int = 20) -> dict:
+    """
+    运行基准场景
+
+    Args:
+        scenarios: 场景名称列表
+        requests: 每个场景的请求数
+        concurrency: 并发数
+        latency: 模拟LLM首个token前的延迟（秒）
+        tokens_per_sec: 模拟LLM生成速度（每秒字符数）
+        chunk_size: 流式分块字符数
+        weather_latency: 模拟天气接口延迟（秒）
+        error_rate: LLM接口随机返回 503 的概率
+        seed: 故障注入的随机种子
+        memory_requests: 统计内存时的请求数，0表示不统计
+
+    Returns:
+        {"meta": 运行环境和参数, "scenarios": {名称: 结果}}
+    """
+    params = {k: v for k, v in locals().items() if k != "scenarios"}
+    results = {}
+    weather_url = DEFAULT_CONFIG["weather_base_url"]
+    llm = MockServer(latency=latency, reply=scripted_reply, chunk_size=chunk_size,
+                     error_rate=error_rate, seed=seed, tokens_per_sec=tokens_per_sec)
+    weather = MockServer(latency=weather_latency)
+    with llm, weather:
+        DEFAULT_CONFIG["weather_base_url"] = weather.url
+        try:
+            for name in scenarios:
+                reset_upstreams()
+                get_tool_cache().clear()
+                client = SiliconFlowClient(api_key="bench", base_url=llm.base_url,
+                                           pool_maxsize=concurrency)
+                env = {"client": client, "agent": TravelAssistantAgent(client), "ttft": [], "prompt_tokens": []}
+                call = SCENARIOS[name](env)
+                result = run_load(call, requests, concurrency)
+                if env["ttft"]:
+                    result["ttft"] = summarize_latencies(env["ttft"], (50, 95, 99))
+                if env["prompt_tokens"]:
+                    # 每个会话发送的估计提示token数
+                    result["prompt_tokens"] = sum(env["prompt_tokens"]) / len(env["prompt_tokens"])
+                if memory_requests:
+                    result["memory"] = measure_memory(call, memory_requests)
+                env["agent"].close()
+                client.close()
+                results[name] = result
+        finally:
+            DEFAULT_CONFIG["weather_base_url"] = weather_url
+
+    return {
+        "meta": {
+            **git_revision(),
+            "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "params": params,
+        },
+        "scenarios": results,
+    }
+
+
+def _metric(result: dict, metric: str):
+    if metric == "throughput":
+        return result.get("throughput")
+    if metric == "peak_kib":
+        return result.get("memory", {}).get("peak_kib")
+    if metric == "prompt_tokens":
+        return result.get("prompt_tokens")
+    return result.get("latency", {}).get(metric)
+
+
+def compare(baseline: dict, current: dict, threshold: float = 0.1) -> List[dict]:
+    """
+    对比两次运行结果
+
+    Args:
+        baseline: 基线结果
+        current: 当前结果
+        threshold: 变差超过该比例视为回退
+
+    Returns:
+        每个场景每项指标的 {scenario, metric, old, new, change, regression}
+    """
+    rows = []
+    for name, result in current["scenarios"].items():
+        old_result = baseline["scenarios"].get(name)
+        if old_result is None:
+            continue
+        for metric, higher_is_better in METRICS.items():
+            old, new = _metric(old_result, metric), _metric(result, metric)
+            if not old or new is None:
+                continue
+            change = (new - old) / old
+            worse = -change if higher_is_better else change
+            rows.append({
+                "scenario": name,
+                "metric": metric,
+                "old": old,
+                "new": new,
+                "change": change,
+                "regression": worse > threshold,
+            })
+    return rows
+
+
+def format_results(report: dict) -> str:
+    """格式化运行结果"""
+    lines = [f"{'场景':14s}{'吞吐(/s)':>10s}{'p50(ms)':>10s}{'p95(ms)':>10s}{'p99(ms)':>10s}"
+             f"{'错误':>6s}{'峰值内存(KiB)':>14s}"]
+    for name, result in report["scenarios"].items():
+        latency = result["latency"]
+        peak = result.get("memory", {}).get("peak_kib")
+        lines.append(
+            f"{name:16s}{result['throughput']:10.1f}{latency['p50'] * 1000:10.1f}"
+            f"{latency['p95'] * 1000:10.1f}{latency['p99'] * 1000:10.1f}{result['errors']:6d}"
+            f"{peak if peak is not None else float('nan'):14.1f}"
+        )
+        if "ttft" in result:
+            lines.append(f"{'':16s}首个分块 p50={result['ttft']['p50'] * 1000:.1f}ms "
+                         f"p99={result['ttft']['p99'] * 1000:.1f}ms")
+        if "prompt_tokens" in result:
+            lines.append(f"{'':16s}每会话提示token={result['prompt_tokens']:.0f}")
+    return "\n".join(lines)
+
+
+def format_comparison(rows: List[dict]) -> str:
+    """格式化对比结果，回退项以 ! 标出"""
+    lines = []
+    for row in rows:
+        mark = "!" if row["regression"] else " "
+        lines.append(f"{mark} {row['scenario']:14s} {row['metric']:10s} "
+                     f"{row['old']:12.4f} -> {row['new']:12.4f} ({row['change']:+.1%})")
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="离线基准测试套件")
+    parser.add_argument("--scenarios", nargs="+", default=list(SCENARIOS), choices=list(SCENARIOS))
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--latency", type=float, default=0.02, help="LLM首个token前的延迟（秒）")
+    parser.add_argument("--tokens-per-sec", type=float, default=2000.0, help="LLM生成速度（字符/秒）")
+    parser.add_argument("--chunk-size", type=int, default=4)
+    parser.add_argument("--weather-latency", type=float, default=0.01)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--memory-requests", type=int, default=20, help="统计内存时的请求数，0表示不统计")
+    parser.add_argument("--output", help="保存结果的 JSON 文件")
+    parser.add_argument("--compare", help="对比的基线 JSON 文件")
+    parser.add_argument("--threshold", type=float, default=0.1, help="视为回退的变差比例")
+    parser.add_argument("--fail-on-regression", action="store_true", help="有回退时以非零状态退出")
+    args = parser.parse_args()
+
+    report = run_suite(
+        args.scenarios, requests=args.requests, concurrency=args.concurrency,
+        latency=args.latency, tokens_per_sec=args.tokens_per_sec, chunk_size=args.chunk_size,
+        weather_latency=args.weather_latency, error_rate=args.error_rate, seed=args.seed,
+        memory_requests=args.memory_requests,
+    )
+    print(format_results(report))
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"结果已保存到 {args.output}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        rows = compare(baseline, report, args.threshold)
+        print(f"\n对比 {baseline['meta'].get('commit', args.compare)}:")
+        print(format_comparison(rows))
+        if args.fail_on_regression and any(row["regression"] for row in rows):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
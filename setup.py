@@ -13,6 +13,7 @@ setup(
     long_description_content_type="text/markdown",
     url="https://github.com/Lgugeng/travel-assistant-agent",
     packages=find_packages(),
+    package_data={"travel_assistant": ["data/*.json"]},
     classifiers=[
         "Development Status :: 4 - Beta",
         "Intended Audience :: Developers",
@@ -32,6 +33,9 @@ setup(
     ],
     extras_require={
         "openai": ["openai>=1.0.0"],
+        "async": ["aiohttp>=3.9.0"],
+        "otel": ["opentelemetry-api>=1.20.0"],
+        "fast": ["orjson>=3.9.0"],
         "dev": [
             "pytest>=7.0.0",
             "black>=23.0.0",
@@ -2,6 +2,7 @@
 测试智能体
 """
 
+import asyncio
 import pytest
 from unittest.mock import Mock
 from travel_assistant.agent import TravelAssistantAgent
@@ -52,6 +53,62 @@ class TestTravelAssistantAgent:
         assert thought == "我需要查询天气"
         assert action == "get_weather(city=\"北京\")"
   
+    def test_parse_multiple_actions(self):
+        """测试解析同一轮的多个动作"""
+        agent = TravelAssistantAgent(Mock())
+        llm_output = """
+        Thought: 天气和酒店互不依赖
+        Action: get_weather(city="北京")
+        Action: get_hotels(city="北京", budget="豪华")
+        """
+
+        thought, actions = agent.parse_actions(llm_output)
+        assert thought == "天气和酒店互不依赖"
+        assert actions == ['get_weather(city="北京")', 'get_hotels(city="北京", budget="豪华")']
+
+    def test_run_parallel_actions_in_order(self):
+        """测试并行执行的观察结果按动作顺序记录"""
+        import time
+
+        def slow_tool(city):
+            time.sleep(0.05)
+            return f"slow {city}"
+
+        mock_client = Mock()
+        mock_client.chat.side_effect = [
+            'Thought: 并行查询\nAction: slow(city="A")\nAction: fast(city="B")',
+            'Thought: 完成\nAction: finish(answer="done")',
+        ]
+        agent = TravelAssistantAgent(mock_client, tools={"slow": slow_tool, "fast": lambda city: f"fast {city}"})
+
+        assert agent.run("test", verbose=False) == "done"
+        observations = [h for h in agent.conversation_history if h.startswith("Observation:")]
+        assert observations == [
+            'Observation: [slow(city="A")] slow A',
+            'Observation: [fast(city="B")] fast B',
+        ]
+        assert mock_client.chat.call_count == 2
+        agent.close()
+
+    def test_aexecute_action(self):
+        """测试异步执行同步与协程工具"""
+        agent = TravelAssistantAgent(Mock())
+
+        async def async_tool(city):
+            return f"async {city}"
+
+        agent.add_tool("async_tool", async_tool)
+        agent.add_tool("sync_tool", lambda city: f"sync {city}")
+
+        async def main():
+            return await asyncio.gather(
+                agent.aexecute_action('async_tool(city="北京")'),
+                agent.aexecute_action('sync_tool(city="上海")'),
+                agent.aexecute_action('finish(answer="完成")'),
+            )
+
+        assert asyncio.run(main()) == ["async 北京", "sync 上海", "FINISH: 完成"]
+  
     def test_clear_history(self):
         """测试清空历史"""
         mock_client = Mock()
@@ -0,0 +1,65 @@
+"""
+测试异步客户端与异步智能体
+"""
+
+import asyncio
+import pytest
+from travel_assistant.agent import TravelAssistantAgent
+
+aiohttp = pytest.importorskip("aiohttp")
+
+from travel_assistant.async_client import AsyncSiliconFlowClient  # noqa: E402
+from benchmarks.mock_server import MockServer  # noqa: E402
+
+
+@pytest.fixture
+def server():
+    with MockServer(reply="Thought: 已完成\nAction: finish(answer=\"杭州晴\")") as s:
+        yield s
+
+
+class TestAsyncSiliconFlowClient:
+    """测试 AsyncSiliconFlowClient"""
+
+    def test_init_with_alias(self):
+        """测试使用模型别名"""
+        client = AsyncSiliconFlowClient(api_key="test-key", model="qwen2.5-7b")
+        assert "Qwen" in client.model
+
+    def test_missing_api_key(self):
+        """测试缺少API密钥"""
+        with pytest.raises(ValueError):
+            AsyncSiliconFlowClient(api_key="")
+
+    def test_chat(self, server):
+        """测试非流式聊天"""
+        async def main():
+            async with AsyncSiliconFlowClient(api_key="k", base_url=server.base_url) as client:
+                return await client.chat([{"role": "user", "content": "你好"}])
+
+        assert "finish" in asyncio.run(main())
+
+    def test_chat_stream(self, server):
+        """测试流式聊天"""
+        async def main():
+            async with AsyncSiliconFlowClient(api_key="k", base_url=server.base_url) as client:
+                chunks = [c async for c in await client.chat([], stream=True)]
+            return chunks
+
+        chunks = asyncio.run(main())
+        assert len(chunks) > 1
+        assert "".join(chunks) == server.httpd.reply
+
+    def test_agent_arun(self, server):
+        """测试异步智能体"""
+        async def main():
+            async with AsyncSiliconFlowClient(api_key="k", base_url=server.base_url) as client:
+                return await asyncio.gather(*(
+                    TravelAssistantAgent(client).arun("查询杭州天气") for _ in range(5)
+                ))
+
+        assert asyncio.run(main()) == ["杭州晴"] * 5
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
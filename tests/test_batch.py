@@ -0,0 +1,95 @@
+"""
+测试批量查询
+"""
+
+import asyncio
+import json
+import threading
+import time
+from unittest.mock import Mock
+from travel_assistant.agent import TravelAssistantAgent
+from travel_assistant.batch import BatchRunner, load_checkpoint
+from travel_assistant.stats import percentile, summarize_latencies
+
+
+def make_agent(delay: float = 0.0, fail_on: str = None):
+    """返回一个把用户问题作为答案的智能体，并记录最大并发数"""
+    client = Mock()
+    state = {"active": 0, "peak": 0}
+    lock = threading.Lock()
+
+    def chat(messages, stream=False, **kwargs):
+        query = messages[-1]["content"].split(": ", 1)[-1]
+        if query == fail_on:
+            raise ConnectionError("网络错误")
+        with lock:
+            state["active"] += 1
+            state["peak"] = max(state["peak"], state["active"])
+        time.sleep(delay)
+        with lock:
+            state["active"] -= 1
+        return f'Thought: 完成\nAction: finish(answer="{query}")'
+
+    client.chat.side_effect = chat
+    return TravelAssistantAgent(client), state
+
+
+def test_percentile():
+    """测试百分位数插值"""
+    assert percentile([], 50) == 0.0
+    assert percentile([1, 2, 3, 4], 50) == 2.5
+    assert percentile([5, 1, 3], 100) == 5
+    summary = summarize_latencies([0.1, 0.2, 0.3])
+    assert summary["count"] == 3 and summary["p50"] == 0.2
+
+
+def test_run_many_bounded_concurrency():
+    """测试并发数受限且结果完整"""
+    agent, state = make_agent(delay=0.02)
+    queries = [f"城市{i}" for i in range(20)]
+    results = list(agent.run_many(iter(queries), concurrency=4))
+
+    assert sorted(r.answer for r in results) == sorted(queries)
+    assert 1 < state["peak"] <= 4
+
+
+def test_checkpoint_resume(tmp_path):
+    """测试检查点续跑时跳过已成功的查询，失败的查询会重试"""
+    path = str(tmp_path / "results.jsonl")
+    agent, _ = make_agent(fail_on="成都")
+    runner = BatchRunner(agent, concurrency=2, checkpoint=path)
+    results = list(runner.run(["北京", "成都", "杭州"]))
+
+    assert runner.stats()["failed"] == 1
+    assert load_checkpoint(path) == {"0", "2"}
+    with open(path, "a", encoding="utf-8") as f:
+        f.write('{"id": "9", "que')  # 模拟中断留下的半行
+
+    agent, _ = make_agent()
+    runner = BatchRunner(agent, checkpoint=path)
+    resumed = list(runner.run(["北京", "成都", "杭州"]))
+    assert [r.answer for r in resumed] == ["成都"]
+    assert runner.stats()["skipped"] == 2
+    assert len(results) == 3
+
+
+def test_arun_many():
+    """测试异步批量执行"""
+    client = Mock()
+
+    async def chat(messages, stream=False, **kwargs):
+        await asyncio.sleep(0.01)
+        return 'Thought: 完成\nAction: finish(answer="ok")'
+
+    client.chat = chat
+    agent = TravelAssistantAgent(client)
+
+    async def main():
+        runner = BatchRunner(agent, concurrency=3)
+        results = [r async for r in runner.arun({"id": f"q{i}", "query": "x"} for i in range(7))]
+        return results, runner.stats()
+
+    results, stats = asyncio.run(main())
+    assert {r.id for r in results} == {f"q{i}" for i in range(7)}
+    assert stats["completed"] == 7 and stats["throughput"] > 0
+    assert json.dumps(stats)
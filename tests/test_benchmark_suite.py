@@ -0,0 +1,53 @@
+"""
+测试离线基准测试套件
+"""
+
+import json
+import pytest
+import requests
+from travel_assistant.config import DEFAULT_CONFIG
+from benchmarks.mock_server import MockServer
+from benchmarks.suite import compare, run_suite, scripted_reply
+
+
+def test_scripted_reply_follows_conversation():
+    """测试模拟服务器按对话进度返回智能体脚本"""
+    messages = [{"role": "system", "content": "..."}, {"role": "user", "content": "用户请求: 杭州 三日游"}]
+    assert 'get_weather(city="杭州")' in scripted_reply({"messages": messages})
+    messages += [{"role": "assistant", "content": "..."}] * 2
+    assert 'finish(answer="杭州的行程已规划")' in scripted_reply({"messages": messages})
+
+
+def test_mock_server_token_rate_and_stream_usage():
+    """测试生成速度限制和流式用量块"""
+    with MockServer(reply="x" * 20, tokens_per_sec=1000, chunk_size=5) as server:
+        body = {"messages": [], "stream": True, "stream_options": {"include_usage": True}}
+        response = requests.post(f"{server.base_url}/chat/completions", json=body, stream=True)
+        events = [json.loads(line[6:]) for line in response.iter_lines(decode_unicode=True)
+                  if line.startswith("data: {")]
+    assert len(events) == 6
+    assert events[-2]["choices"][0]["finish_reason"] == "stop"
+    assert events[-1]["usage"]["total_tokens"] == 20
+
+
+def test_run_suite_and_compare():
+    """测试运行场景、记录元数据并对比回退"""
+    weather_url = DEFAULT_CONFIG["weather_base_url"]
+    report = run_suite(["client_chat", "agent_run", "tools"], requests=4, concurrency=2,
+                       latency=0.0, tokens_per_sec=0, weather_latency=0.0, memory_requests=2)
+    assert DEFAULT_CONFIG["weather_base_url"] == weather_url
+    assert report["meta"]["params"]["requests"] == 4
+    for result in report["scenarios"].values():
+        assert result["errors"] == 0
+        assert result["latency"]["count"] == 4
+        assert result["memory"]["peak_kib"] >= 0
+
+    slower = {"scenarios": {"tools": {"throughput": 50, "latency": {"p50": 0.2}}}}
+    faster = {"scenarios": {"tools": {"throughput": 100, "latency": {"p50": 0.1}}}}
+    rows = {row["metric"]: row for row in compare(faster, slower)}
+    assert rows["throughput"]["regression"] and rows["p50"]["regression"]
+    assert not any(row["regression"] for row in compare(slower, faster))
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
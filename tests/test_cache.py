@@ -0,0 +1,93 @@
+"""
+测试缓存
+"""
+
+import threading
+import time
+import pytest
+from travel_assistant.cache import TTLCache, normalize_city
+
+
+class FakeClock:
+    """可手动推进的时钟"""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestTTLCache:
+    """测试 TTLCache"""
+
+    def test_lru_eviction(self):
+        """测试超过容量时淘汰最久未使用的条目"""
+        cache = TTLCache(maxsize=2)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+
+        assert cache.get("b") is None
+        assert cache.get("a") == 1
+        assert cache.stats()["evictions"] == 1
+
+    def test_ttl_expiry(self):
+        """测试过期条目不再命中"""
+        clock = FakeClock()
+        cache = TTLCache(maxsize=10, ttl=60, clock=clock)
+        cache.set("weather", "晴")
+        cache.set("hotel", "全季", ttl=None)
+
+        clock.now = 61
+        assert cache.get("weather") is None
+        assert cache.get("hotel") == "全季"
+
+    def test_single_flight(self):
+        """测试并发未命中只触发一次加载"""
+        cache = TTLCache(maxsize=10)
+        calls = []
+
+        def loader():
+            calls.append(1)
+            time.sleep(0.05)
+            return "晴"
+
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(cache.get_or_load("北京", loader)))
+            for _ in range(100)
+        ]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        assert len(calls) == 1
+        assert results == ["晴"] * 100
+        stats = cache.stats()
+        assert stats["loads"] == 1
+        assert stats["hits"] + stats["misses"] == 100
+
+    def test_loader_error_propagates(self):
+        """测试加载异常不会被缓存"""
+        cache = TTLCache(maxsize=10)
+
+        def failing():
+            raise RuntimeError("upstream down")
+
+        with pytest.raises(RuntimeError):
+            cache.get_or_load("k", failing)
+        assert cache.get_or_load("k", lambda: "ok") == "ok"
+
+    def test_normalize_city(self):
+        """测试城市名称规范化"""
+        assert normalize_city("北京") == "北京"
+        assert normalize_city(" beijing ") == "北京"
+        assert normalize_city("Xian") == "西安"
+        assert normalize_city("未知城市") == "未知城市"
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -28,7 +28,7 @@ class TestSiliconFlowClient:
         with pytest.raises(ValueError):
             SiliconFlowClient(api_key="")
   
-    @patch('requests.post')
+    @patch('requests.Session.post')
     def test_chat(self, mock_post):
         """测试聊天功能"""
         # 模拟响应
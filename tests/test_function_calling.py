@@ -0,0 +1,204 @@
+"""
+测试原生函数调用模式
+"""
+
+import json
+import threading
+from typing import List
+import pytest
+from travel_assistant.agent import TravelAssistantAgent
+from travel_assistant.function_calling import build_tool_schemas, tool_schema
+from travel_assistant.history import ConversationHistory
+from travel_assistant.router import RoutingClient
+from travel_assistant.sse import ChatStream
+from travel_assistant.tools import AVAILABLE_TOOLS
+
+
+def call(index, name, arguments) -> dict:
+    return {"id": f"call_{index}", "type": "function",
+            "function": {"name": name, "arguments": json.dumps(arguments, ensure_ascii=False)}}
+
+
+class FakeClient:
+    """按顺序返回预设 assistant 消息的客户端"""
+
+    def __init__(self, replies):
+        self.replies = list(replies)
+        self.requests = []
+
+    def chat(self, messages, stream=False, tools=None, **kwargs):
+        self.requests.append((list(messages), tools))
+        return self.replies.pop(0)
+
+
+def test_tool_schema_from_signature_and_docstring():
+    """测试根据签名和文档字符串生成 Schema"""
+    def lookup(city: str, days: int = 3):
+        """
+        查询天气
+
+        Args:
+            city: 城市名称
+            days: 天数
+        """
+    schema = tool_schema("lookup", lookup)["function"]
+    assert schema["name"] == "lookup"
+    assert schema["description"] == "查询天气"
+    params = schema["parameters"]
+    assert params["properties"]["city"] == {"type": "string", "description": "城市名称"}
+    assert params["properties"]["days"]["type"] == "integer"
+    assert params["required"] == ["city"]
+
+    def compare(cities: List[str]):
+        """对比天气"""
+    cities = tool_schema("compare", compare)["function"]["parameters"]["properties"]["cities"]
+    assert cities == {"type": "array", "items": {"type": "string"}}
+
+
+def test_hidden_parameters_are_not_exposed():
+    """测试内部参数（如 use_english）不出现在暴露给模型的 Schema 中"""
+    schemas = {s["function"]["name"]: s["function"]["parameters"]
+               for s in build_tool_schemas(AVAILABLE_TOOLS)}
+    assert schemas["get_weather"] == {
+        "type": "object",
+        "properties": {"city": {"type": "string", "description": "城市名称（中文或英文）"}},
+        "required": ["city"],
+    }
+    assert list(schemas["get_weather_many"]["properties"]) == ["cities"]
+
+    def lookup(city: str, verbose: bool = False):
+        """查询"""
+    assert "verbose" not in tool_schema("lookup", lookup, exclude=["verbose"])["function"]["parameters"]["properties"]
+    with pytest.raises(ValueError):
+        tool_schema("lookup", lookup, exclude=["city"])
+
+
+def test_parallel_tool_calls_without_text_parsing():
+    """测试一轮返回多个工具调用时并行执行，结果以 tool 消息回传"""
+    barrier = threading.Barrier(2, timeout=2)
+
+    def get_weather(city: str):
+        """查询天气"""
+        barrier.wait()
+        return f"{city}: 晴"
+
+    client = FakeClient([
+        {"content": None, "tool_calls": [call(0, "get_weather", {"city": "北京"}),
+                                         call(1, "get_weather", {"city": "上海"})]},
+        {"content": "两地都是晴天"},
+    ])
+    agent = TravelAssistantAgent(client, tools={"get_weather": get_weather}, mode="function_calling")
+    assert agent.run("北京和上海的天气", stream=False) == "两地都是晴天"
+
+    messages, tools = client.requests[1]
+    assert tools[0]["function"]["name"] == "get_weather"
+    assert [m["role"] for m in messages[-3:]] == ["assistant", "tool", "tool"]
+    assert messages[-2] == {"role": "tool", "tool_call_id": "call_0", "content": "北京: 晴"}
+    assert 'Action: get_weather(city="上海")' in agent.conversation_history
+
+
+def test_stream_dispatches_tool_calls_before_stream_ends():
+    """测试流式模式下工具调用的参数完整后立即执行"""
+    started = []
+
+    def get_weather(city: str):
+        """查询天气"""
+        started.append(city)
+        return f"{city}: 晴"
+
+    def chunks():
+        yield b'data: {"choices":[{"delta":{"tool_calls":[{"index":0,"id":"a","function":{"name":"get_weather","arguments":"{\\"city\\":"}}]}}]}\n\n'
+        yield 'data: {"choices":[{"delta":{"tool_calls":[{"index":0,"function":{"arguments":"\\"北京\\"}"}}]}}]}\n\n'.encode("utf-8")
+        yield b'data: {"choices":[{"delta":{"tool_calls":[{"index":1,"id":"b","function":{"name":"get_weather","arguments":"{\\"city\\": \\"x\\"}"}}]}}]}\n\n'
+        # 第二个调用开始时第一个调用已经提交执行
+        for _ in range(100):
+            if started:
+                break
+            threading.Event().wait(0.01)
+        assert started[:1] == ["北京"]
+        yield b'data: {"choices":[{"delta":{},"finish_reason":"tool_calls"}]}\n\ndata: [DONE]\n\n'
+
+    final = ChatStream([b'data: {"choices":[{"delta":{"content":"OK"}}]}\n\ndata: [DONE]\n\n'])
+    client = FakeClient([ChatStream(chunks()), final])
+    agent = TravelAssistantAgent(client, tools={"get_weather": get_weather}, mode="function_calling")
+    assert agent.run("天气", stream=True) == "OK"
+    tool_messages = [m for m in client.requests[1][0] if m["role"] == "tool"]
+    assert [m["tool_call_id"] for m in tool_messages] == ["a", "b"]
+
+
+def test_stream_through_routing_client():
+    """测试经由路由客户端的流式函数调用：工具调用照常拼接和提前执行"""
+    tool_call = (b'data: {"choices":[{"delta":{"tool_calls":[{"index":0,"id":"a","function":'
+                 b'{"name":"get_weather","arguments":"{\\"city\\": \\"x\\"}"}}]}}]}\n\ndata: [DONE]\n\n')
+    final = b'data: {"choices":[{"delta":{"content":"OK"}}]}\n\ndata: [DONE]\n\n'
+    client = FakeClient([ChatStream([tool_call]), ChatStream([final])])
+    client.model = "m"
+    client.close = lambda: None
+    with RoutingClient([client], hedge=False) as router:
+        agent = TravelAssistantAgent(router, tools={"get_weather": lambda city: f"{city}: 晴"},
+                                     mode="function_calling")
+        assert agent.run("天气", stream=True) == "OK"
+        assert router.stats["m"].inflight == 0
+    tool_messages = [m for m in client.requests[1][0] if m["role"] == "tool"]
+    assert tool_messages == [{"role": "tool", "tool_call_id": "a", "content": "x: 晴"}]
+
+
+def test_stream_without_tool_call_support_falls_back():
+    """测试客户端的流不是 ChatStream 时改用非流式的函数调用"""
+    class TextStreamClient(FakeClient):
+        def chat(self, messages, stream=False, tools=None, **kwargs):
+            if stream:
+                return iter(["不支持工具调用"])
+            return super().chat(messages, tools=tools)
+
+    client = TextStreamClient([
+        {"content": None, "tool_calls": [call(0, "get_weather", {"city": "北京"})]},
+        {"content": "北京晴"},
+    ])
+    agent = TravelAssistantAgent(client, tools={"get_weather": lambda city: f"{city}: 晴"},
+                                 mode="function_calling")
+    assert agent.run("天气", stream=True) == "北京晴"
+    assert client.requests[1][0][-1] == {"role": "tool", "tool_call_id": "call_0", "content": "北京: 晴"}
+
+
+def test_invalid_arguments_are_reported_to_the_model():
+    """测试参数不是合法JSON、不是字符串或工具未定义时，错误作为工具结果返回"""
+    client = FakeClient([
+        {"content": "", "tool_calls": [
+            {"id": "c1", "type": "function", "function": {"name": "get_weather", "arguments": "{city"}},
+            {"id": "c2", "type": "function", "function": {"name": "missing", "arguments": "{}"}},
+            {"id": "c3", "type": "function", "function": {"name": "get_weather", "arguments": ["北京"]}},
+            {"id": "c4", "type": "function", "function": {"name": "get_weather", "arguments": {"city": "上海"}}},
+        ]},
+        {"content": "抱歉"},
+    ])
+    agent = TravelAssistantAgent(client, tools={"get_weather": lambda city: city}, mode="function_calling")
+    assert agent.run("天气", stream=False) == "抱歉"
+    results = [m["content"] for m in client.requests[1][0] if m["role"] == "tool"]
+    assert results[0].startswith("错误: 工具参数不是合法的JSON对象")
+    assert "未定义的工具" in results[1]
+    # 非字符串参数作为工具调用错误返回，已解析的对象直接使用
+    assert results[2].startswith("错误: 工具参数不是合法的JSON对象") and "list" in results[2]
+    assert results[3] == "上海"
+    with pytest.raises(ValueError):
+        TravelAssistantAgent(client, mode="unknown")
+
+
+def test_history_compaction_keeps_tool_pairs():
+    """测试压缩历史时 tool_calls 与对应的 tool 消息不会被拆开"""
+    history = ConversationHistory("sys", max_prompt_tokens=120, keep_recent=3)
+    history.add_user("问题")
+    for i in range(6):
+        history.add_assistant(None, tool_calls=[call(i, "get_weather", {"city": "北京" * 5})])
+        history.add_tool_result(f"call_{i}", "晴" * 20)
+    messages = history.messages()
+    assert history.compactions > 0
+    # 摘要之后的第一条消息不能是孤立的 tool 消息
+    kept = messages[3:]
+    assert kept[0]["role"] != "tool"
+    ids = {c["id"] for m in kept if m.get("tool_calls") for c in m["tool_calls"]}
+    assert all(m["tool_call_id"] in ids for m in kept if m["role"] == "tool")
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,66 @@
+"""
+测试结构化对话历史
+"""
+
+import pytest
+from unittest.mock import Mock
+from travel_assistant.agent import TravelAssistantAgent
+from travel_assistant.history import ConversationHistory, estimate_tokens
+
+
+class TestConversationHistory:
+    """测试 ConversationHistory"""
+
+    def test_estimate_tokens(self):
+        """测试token估计"""
+        assert estimate_tokens("") == 0
+        assert estimate_tokens("北京天气") == 4
+        assert estimate_tokens("abcdefgh") == 2
+
+    def test_prefix_stable_between_turns(self):
+        """测试追加消息不改变已有前缀"""
+        history = ConversationHistory("系统提示")
+        history.add_user("用户请求: 北京天气")
+        first = history.messages()
+        history.add_assistant('Thought: 查天气\nAction: get_weather(city="北京")')
+        history.add_observation("晴 25°C")
+        second = history.messages()
+
+        assert second[:len(first)] == first
+        assert [m["role"] for m in second] == ["system", "user", "assistant", "user"]
+        assert second[-1]["content"] == "Observation: 晴 25°C"
+
+    def test_compaction_under_budget(self):
+        """测试超出预算时压缩较早的消息"""
+        history = ConversationHistory("系统提示", max_prompt_tokens=200, keep_recent=2)
+        history.add_user("用户请求: 规划行程")
+        for i in range(10):
+            history.add_assistant(f"Thought: 第{i}步\nAction: tool(i={i})")
+            history.add_observation(f"结果{i}\n" + "详细内容" * 20)
+
+        messages = history.messages()
+        assert history.total_tokens <= 200
+        assert history.compactions == 1
+        assert messages[0]["content"] == "系统提示"
+        assert messages[1]["content"] == "用户请求: 规划行程"
+        assert messages[2]["content"].startswith("较早的对话摘要")
+        assert messages[-1]["content"].startswith("Observation: 结果9")
+
+    def test_agent_sends_incremental_messages(self):
+        """测试智能体每轮在上一轮消息基础上追加"""
+        mock_client = Mock()
+        mock_client.chat.side_effect = [
+            'Thought: 查天气\nAction: weather(city="北京")',
+            'Thought: 完成\nAction: finish(answer="晴")',
+        ]
+        agent = TravelAssistantAgent(mock_client, tools={"weather": lambda city: "晴"})
+        agent.run("北京天气", verbose=False)
+
+        first = mock_client.chat.call_args_list[0][0][0]
+        second = mock_client.chat.call_args_list[1][0][0]
+        assert second[:len(first)] == first
+        assert second[-1] == {"role": "user", "content": "Observation: 晴"}
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
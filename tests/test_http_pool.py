@@ -0,0 +1,51 @@
+"""
+测试连接池
+"""
+
+import pytest
+from unittest.mock import Mock
+from travel_assistant.client import SiliconFlowClient
+from travel_assistant.http_pool import (
+    create_session, get_shared_session, set_shared_session
+)
+
+
+class TestHTTPPool:
+    """测试连接池"""
+
+    def test_create_session_mounts_adapter(self):
+        """测试适配器配置"""
+        session = create_session(pool_maxsize=7, max_retries=3)
+        adapter = session.get_adapter("https://api.siliconflow.cn")
+
+        assert adapter._pool_maxsize == 7
+        assert adapter.max_retries.connect == 3
+        # POST请求不应在读取阶段重试
+        assert adapter.max_retries.read == 0
+
+    def test_shared_session_reused(self):
+        """测试共享会话复用"""
+        set_shared_session(None)
+        assert get_shared_session() is get_shared_session()
+
+        custom = create_session()
+        set_shared_session(custom)
+        assert get_shared_session() is custom
+        set_shared_session(None)
+
+    def test_client_context_manager_closes_session(self):
+        """测试客户端关闭自建会话"""
+        with SiliconFlowClient(api_key="test-key") as client:
+            client.session = Mock(wraps=client.session)
+        client.session.close.assert_called_once()
+
+    def test_client_keeps_external_session_open(self):
+        """测试外部传入的会话不会被客户端关闭"""
+        session = Mock()
+        client = SiliconFlowClient(api_key="test-key", session=session)
+        client.close()
+        session.close.assert_not_called()
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,64 @@
+"""
+测试景点/酒店知识库
+"""
+
+import json
+import os
+from travel_assistant.config import CITY_MAPPING
+from travel_assistant.knowledge import (
+    DEFAULT_KNOWLEDGE_PATH, KnowledgeStore, WeatherMatcher, load_index,
+)
+from travel_assistant.tools import get_attraction, get_hotels
+
+
+def test_weather_matcher_priority():
+    """测试关键词分类与原有的逐类型判断顺序一致"""
+    matcher = WeatherMatcher({"晴天": ["晴", "sunny"], "雨天": ["雨", "rain"], "阴天": ["阴", "cloud"]})
+    assert matcher.classify("Sunny") == "晴天"
+    assert matcher.classify("Partly cloudy, light rain") == "雨天"
+    assert matcher.classify("晴转多云") == "晴天"
+    assert matcher.classify("Overcast") == "一般"
+    assert matcher.classify(None) == "一般"
+
+
+def test_index_covers_all_cities():
+    """测试打包的知识库覆盖所有城市、天气类型和预算"""
+    index = load_index(DEFAULT_KNOWLEDGE_PATH)
+    for city in CITY_MAPPING:
+        for weather_type in ("晴天", "雨天", "阴天", "雪天", "雾天", "一般"):
+            assert (city, weather_type) in index.attractions
+        for budget in ("经济", "中等", "豪华"):
+            assert (city, budget) in index.hotels
+
+
+def test_tools_use_knowledge():
+    """测试工具函数的查询结果"""
+    assert "故宫" in get_attraction("Beijing", "Sunny")
+    assert "根据雨天天气" in get_attraction("成都", "Light rain")
+    assert "博物馆" in get_attraction("未知城市", "雨")
+    assert "半岛酒店" in get_hotels("香港", "豪华")
+    assert "携程" in get_hotels("未知城市")
+
+
+def test_hot_reload(tmp_path):
+    """测试文件修改后热加载，损坏的文件不影响旧索引"""
+    path = tmp_path / "knowledge.json"
+    data = {"weather_types": {"晴天": ["晴"]}, "attractions": {"杭州": {"晴天": ["西湖"]}}}
+    path.write_text(json.dumps(data, ensure_ascii=False), encoding="utf-8")
+    now = [0.0]
+    store = KnowledgeStore(str(path), check_interval=1, clock=lambda: now[0])
+    assert "西湖" in store.attraction("杭州", "晴天")
+
+    data["attractions"]["杭州"]["晴天"] = ["灵隐寺"]
+    path.write_text(json.dumps(data, ensure_ascii=False), encoding="utf-8")
+    os.utime(path, ns=(1, 1))
+    assert "西湖" in store.attraction("杭州", "晴天")  # 未到检查时间
+    now[0] = 2
+    assert "灵隐寺" in store.attraction("杭州", "晴天")
+    assert store.reloads == 1
+
+    path.write_text("{broken", encoding="utf-8")
+    os.utime(path, ns=(2, 2))
+    now[0] = 4
+    assert "灵隐寺" in store.attraction("杭州", "晴天")
+    assert store.last_error is not None
@@ -0,0 +1,105 @@
+"""
+测试观察结果压缩
+"""
+
+import pickle
+import pytest
+from unittest.mock import Mock, patch
+from travel_assistant.agent import TravelAssistantAgent
+from travel_assistant.cache import get_tool_cache
+from travel_assistant.history import ConversationHistory
+from travel_assistant.observations import ObservationCompactor, ToolResult, VerbatimCompactor
+from travel_assistant.tools import get_hotels, get_weather
+
+
+class ScriptedClient:
+    """依次返回预设输出，并记录每次请求的消息"""
+
+    def __init__(self, replies):
+        self.replies = list(replies)
+        self.requests = []
+
+    def chat(self, messages, stream=False, **kwargs):
+        self.requests.append(messages)
+        return self.replies.pop(0)
+
+
+REPLIES = [
+    'Thought: 查酒店\nAction: get_hotels(city="北京", budget="经济")',
+    'Thought: 再查上海\nAction: get_hotels(city="上海", budget="经济")',
+    'Thought: 完成\nAction: finish(answer="ok")',
+]
+
+
+def test_tool_result_is_a_string_with_data():
+    """测试 ToolResult 与原来的文本返回值兼容，并附带结构化数据"""
+    result = get_hotels("北京", "经济")
+    assert isinstance(result, ToolResult) and isinstance(result, str)
+    assert result.startswith("经济型酒店:\n1. ")
+    assert result.data["hotels"][0] == "如家酒店（王府井店）"
+    restored = pickle.loads(pickle.dumps(result))
+    assert isinstance(restored, ToolResult) and restored.data == result.data
+    assert restored.summary == result.summary and restored == result
+
+    compactor = ObservationCompactor()
+    assert compactor.compact(result).startswith("city=北京 budget=经济 hotels=如家酒店（王府井店）、")
+    assert compactor.summarize(result) == result.summary
+    # 普通文本去掉装饰字符和空行
+    assert compactor.compact("📍 标题\n\n  内容: 1") == "标题\n内容: 1"
+
+
+@patch('requests.Session.get')
+def test_get_weather_structured_data(mock_get):
+    """测试天气查询附带结构化数据和摘要"""
+    get_tool_cache().clear()
+    mock_get.return_value = Mock(status_code=200, json=Mock(return_value={
+        "current_condition": [{"weatherDesc": [{"value": "Sunny"}], "temp_C": "25", "humidity": "60"}],
+        "weather": [{"maxtempC": "30", "mintempC": "20"}],
+    }))
+    result = get_weather("北京")
+    assert "📍 北京 当前天气" in result
+    assert result.data["weather"] == "Sunny" and result.data["max_c"] == "30"
+    assert result.summary == "北京天气: Sunny 25°C"
+
+
+def test_agent_sends_compact_form_and_summarizes_older_observations():
+    """测试模型收到压缩形式，较早轮次的观察结果替换为摘要，对话记录保留原文"""
+    client = ScriptedClient(REPLIES)
+    agent = TravelAssistantAgent(client)
+    assert agent.run("北京和上海的经济型酒店", verbose=False) == "ok"
+
+    second = client.requests[1][-1]["content"]
+    assert second.startswith("Observation: city=北京 budget=经济 hotels=")
+    last = client.requests[2]
+    observations = [m["content"] for m in last if m["content"].startswith("Observation:")]
+    assert observations[0] == "Observation: " + get_hotels("北京", "经济").summary
+    assert observations[1].startswith("Observation: city=上海")
+    assert "Observation: " + get_hotels("北京", "经济") in agent.conversation_history
+
+
+def test_verbatim_compactor_keeps_previous_behaviour():
+    """测试关闭压缩时观察结果原样发送"""
+    client = ScriptedClient(REPLIES)
+    agent = TravelAssistantAgent(client, compactor=VerbatimCompactor())
+    agent.run("北京和上海的经济型酒店", verbose=False)
+    observations = [m["content"] for m in client.requests[2] if m["content"].startswith("Observation:")]
+    assert observations == ["Observation: " + get_hotels("北京", "经济"),
+                            "Observation: " + get_hotels("上海", "经济")]
+
+
+def test_history_summaries_survive_compaction():
+    """测试摘要替换与预算压缩同时发生时token统计保持一致"""
+    history = ConversationHistory("sys", max_prompt_tokens=60, keep_recent=2, keep_observations=1)
+    history.add_user("问题")
+    for i in range(5):
+        history.add_assistant(f"Action: step{i}")
+        history.add_observation("长" * 30, summary=f"摘要{i}")
+        history.messages()
+    contents = [m["content"] for m in history.messages()]
+    assert contents[-1] == "Observation: " + "长" * 30
+    assert history.total_tokens == sum(history._tokens)
+    assert history._pending == sum(1 for s in history._summaries if s is not None)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,99 @@
+"""
+测试 ReAct 输出解析器
+"""
+
+import pytest
+from travel_assistant.parser import ParseError, parse_action, parse_output
+from benchmarks.bench_parser import make_corpus
+
+
+class TestParser:
+    """测试解析器"""
+
+    def test_parse_output_labels(self):
+        """测试中英文标签"""
+        parsed = parse_output('思考：需要查询天气\n行动：get_weather(city="北京")')
+        assert parsed.thought == "需要查询天气"
+        assert parsed.actions == ['get_weather(city="北京")']
+
+        parsed = parse_output('THOUGHT: check\nACTION: get_hotels(city="上海")')
+        assert parsed.thought == "check"
+        assert parsed.actions == ['get_hotels(city="上海")']
+
+    def test_inline_thought_and_action(self):
+        """测试思考和动作在同一行"""
+        parsed = parse_output('Thought: 查天气 Action: get_weather(city="北京")')
+        assert parsed.thought == "查天气"
+        assert parsed.actions == ['get_weather(city="北京")']
+
+    def test_multiline_finish(self):
+        """测试跨行的 finish 答案"""
+        parsed = parse_output('Thought: 完成\nAction: finish(answer="第一天: 故宫\n第二天: 长城")\n多余')
+        action = parse_action(parsed.actions[0])
+        assert action.is_finish
+        assert action.answer == "第一天: 故宫\n第二天: 长城"
+
+    def test_stops_after_hallucinated_observation(self):
+        """测试动作之后的编造 Observation 及其后的动作和 finish 不被收集，与流式解析一致"""
+        text = ('Thought: 查天气\nAction: get_weather(city="北京")\nObservation: 雨\n'
+                'Action: get_attraction(city="北京", weather="雨")\nAction: finish(answer="编造的答案")')
+        assert parse_output(text).actions == ['get_weather(city="北京")']
+
+        parsed = parse_output('Thought: 并行\nAction: get_weather(city="北京")\n\nThought: 再查酒店\n'
+                              'Action: get_hotels(city="北京")\nAction: finish(answer="好")\nAction: get_weather(city="上海")')
+        assert parsed.actions == ['get_weather(city="北京")', 'get_hotels(city="北京")', 'finish(answer="好")']
+
+    def test_quoted_arguments(self):
+        """测试引号中的逗号、括号、内嵌引号和转义"""
+        action = parse_action('get_hotels(city="北京", budget="中等, 含早(双床)")')
+        assert action.name == "get_hotels"
+        assert action.kwargs == {"city": "北京", "budget": "中等, 含早(双床)"}
+
+        action = parse_action('finish(answer="他说"你好"，\\n再见")')
+        assert action.answer == '他说"你好"，\n再见'
+
+        action = parse_action("get_weather(city=Xi'an)")
+        assert action.kwargs == {"city": "Xi'an"}
+
+    def test_list_arguments(self):
+        """测试列表参数，元素可加引号也可不加"""
+        action = parse_action('get_weather_many(cities=["杭州", "苏州, 园林"], use_english="false")')
+        assert action.kwargs == {"cities": ["杭州", "苏州, 园林"], "use_english": "false"}
+        assert parse_action("get_weather_many(cities=[Xi'an, 'Beijing'])").kwargs == {"cities": ["Xi'an", "Beijing"]}
+        parsed = parse_output('Thought: 对比\nAction: get_weather_many(cities=["杭州",\n "南京"])\n')
+        assert parse_action(parsed.actions[0]).kwargs["cities"] == ["杭州", "南京"]
+        with pytest.raises(ParseError):
+            parse_action('get_weather_many(cities=["杭州"')
+
+    def test_labels_only_at_line_start_and_nested_bare_values(self):
+        """测试参数中的 "action:" 不被当作标签，未加引号的值可以包含嵌套括号中的逗号"""
+        parsed = parse_output('Thought: 完成\nAction: finish(answer="下一步 action: 订酒店\nAction: 出发")')
+        assert len(parsed.actions) == 1
+        assert parse_action(parsed.actions[0]).answer == "下一步 action: 订酒店\nAction: 出发"
+
+        action = parse_action("foo(x=1, y=(2,3))")
+        assert action.kwargs == {"x": "1", "y": "(2,3)"} and action.args == []
+
+    def test_positional_and_simplified_finish(self):
+        """测试位置参数和简化的 finish"""
+        action = parse_action('get_weather("北京")')
+        assert action.args == ["北京"]
+        assert parse_action("finish: 北京今天晴").answer == "北京今天晴"
+
+    def test_unparseable(self):
+        """测试无法解析的动作"""
+        with pytest.raises(ParseError):
+            parse_action("get_weather(city=")
+
+    def test_fuzz_corpus(self):
+        """测试模糊语料不会引发意外异常"""
+        for text in make_corpus(2000, seed=1):
+            for action_str in parse_output(text).actions:
+                try:
+                    parse_action(action_str)
+                except ParseError:
+                    pass
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,123 @@
+"""
+测试计划模板缓存
+"""
+
+import re
+import pytest
+from travel_assistant.agent import TravelAssistantAgent
+from travel_assistant.plan_cache import PlanCache, query_shape
+
+WEATHER = {"北京": "Sunny", "上海": "Rain", "杭州": "Cloudy"}
+
+
+class ScriptedClient:
+    """按对话中已有的 assistant 消息数决定下一步，景点查询使用上一步观察到的天气"""
+
+    def __init__(self, script=None):
+        self.calls = 0
+        self.script = script or ["weather", "attraction", "finish"]
+
+    def chat(self, messages, stream=False, **kwargs):
+        self.calls += 1
+        query = next(m["content"] for m in messages if m["role"] == "user")
+        city = re.search("北京|上海|杭州", query).group(0)
+        step = self.script[min(sum(1 for m in messages if m["role"] == "assistant"), len(self.script) - 1)]
+        if step == "weather":
+            return f'Thought: 查天气\nAction: get_weather(city="{city}")'
+        if step == "attraction":
+            weather = re.search(r"天气状况: (\w+)", messages[-1]["content"]).group(1)
+            return f'Thought: 推荐景点\nAction: get_attraction(city="{city}", weather="{weather}")'
+        if step == "hotel":
+            return f'Thought: 再查酒店\nAction: get_hotels(city="{city}")'
+        return 'Thought: 完成\nAction: finish(answer="done")'
+
+
+def make_tools(log):
+    def get_weather(city: str):
+        log.append(("get_weather", city))
+        return f"📍 {city} 当前天气\n  天气状况: {WEATHER[city]}"
+
+    def get_attraction(city: str, weather: str = None):
+        log.append(("get_attraction", city, weather))
+        return f"{city}景点"
+
+    def get_hotels(city: str, budget: str = "中等"):
+        log.append(("get_hotels", city, budget))
+        return f"{city}酒店"
+    return {"get_weather": get_weather, "get_attraction": get_attraction, "get_hotels": get_hotels}
+
+
+def test_query_shape_abstracts_city_and_budget():
+    """测试城市和预算被抽象为槽位，标点和空白不影响形状"""
+    assert query_shape("查询北京天气并推荐景点。") == ("查询{city0}天气并推荐景点", {"city0": "北京"})
+    assert query_shape("查询 Shanghai 天气并推荐景点")[0] == "查询{city0}天气并推荐景点"
+    assert query_shape("上海的经济价位酒店") == ("{city0}的{budget}价位酒店", {"city0": "上海", "budget": "经济"})
+
+
+def test_replay_after_min_support_calls_llm_once():
+    """测试同形状请求达到记录次数后按模板执行工具，只调用一次 LLM"""
+    cache = PlanCache(min_support=2)
+    log = []
+    for city in ("北京", "上海"):
+        agent = TravelAssistantAgent(ScriptedClient(), tools=make_tools(log), plan_cache=cache)
+        assert agent.run(f"查询{city}天气并推荐景点", verbose=False) == "done"
+    assert cache.stats()["recorded"] == 2 and cache.stats()["replays"] == 0
+
+    log.clear()
+    client = ScriptedClient()
+    agent = TravelAssistantAgent(client, tools=make_tools(log), plan_cache=cache)
+    assert agent.run("查询杭州天气并推荐景点", verbose=False) == "done"
+    assert client.calls == 1
+    # 城市来自槽位，天气来自本次观察结果的字段
+    assert log == [("get_weather", "杭州"), ("get_attraction", "杭州", "Cloudy")]
+    stats = cache.stats()
+    assert (stats["replays"], stats["confirmed"], stats["llm_calls_avoided"]) == (1, 1, 2)
+
+
+def test_inconsistent_plans_are_not_replayed():
+    """测试同形状的动作序列不一致时置信度不足，不会重放"""
+    cache = PlanCache(min_support=2, min_confidence=0.8)
+    log = []
+    scripts = [None, ["weather", "hotel", "finish"], None]
+    for city, script in zip(("北京", "上海", "杭州"), scripts):
+        TravelAssistantAgent(ScriptedClient(script), tools=make_tools(log), plan_cache=cache).run(
+            f"查询{city}天气并推荐景点", verbose=False)
+    client = ScriptedClient()
+    TravelAssistantAgent(client, tools=make_tools(log), plan_cache=cache).run("查询北京天气并推荐景点", verbose=False)
+    assert client.calls == 3
+    assert cache.stats()["replays"] == 0
+
+
+def test_rejected_replays_invalidate_template():
+    """测试重放后 LLM 仍追加步骤时计为失败，超过次数后删除模板"""
+    cache = PlanCache(min_support=1, max_failures=1)
+    log = []
+    TravelAssistantAgent(ScriptedClient(), tools=make_tools(log), plan_cache=cache).run(
+        "查询北京天气并推荐景点", verbose=False)
+    drifted = ["weather", "attraction", "hotel", "finish"]
+    for city in ("上海", "杭州"):
+        agent = TravelAssistantAgent(ScriptedClient(drifted), tools=make_tools(log), plan_cache=cache)
+        assert agent.run(f"查询{city}天气并推荐景点", verbose=False) == "done"
+    stats = cache.stats()
+    assert (stats["replays"], stats["rejected"], stats["invalidated"]) == (2, 2, 1)
+    assert len(cache) == 0
+
+    # 手动失效
+    TravelAssistantAgent(ScriptedClient(), tools=make_tools(log), plan_cache=cache).run(
+        "查询北京天气并推荐景点", verbose=False)
+    cache.invalidate("查询上海天气并推荐景点")
+    assert len(cache) == 0
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
+
+
+def test_city_list_arguments_become_slots():
+    """测试由城市组成的列表参数抽象为槽位列表，按新请求的城市重放"""
+    cache = PlanCache(min_support=1)
+    shape, slots = query_shape("对比杭州和苏州的天气")
+    cache.record(shape, slots, [[("get_weather_many", {"cities": ["杭州", "Suzhou"]})]], ["ok"])
+    run = cache.begin("对比南京和上海的天气")
+    (name, args), = run.template[0]
+    assert name == "get_weather_many" and run.resolve(args) == {"cities": ["南京", "上海"]}
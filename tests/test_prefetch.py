@@ -0,0 +1,120 @@
+"""
+测试工具预取
+"""
+
+import asyncio
+import time
+import pytest
+from travel_assistant.agent import TravelAssistantAgent
+from travel_assistant.prefetch import analyze_query, get_prefetch_stats
+
+
+class SlowClient:
+    """每次调用耗时 delay 秒，依次返回预设输出"""
+
+    def __init__(self, replies, delay=0.2):
+        self.replies = list(replies)
+        self.delay = delay
+
+    def chat(self, messages, stream=False, **kwargs):
+        time.sleep(self.delay)
+        return self.replies.pop(0)
+
+
+def make_tools(calls, delay=0.2):
+    def get_weather(city: str, use_english: bool = True):
+        calls.append(city)
+        time.sleep(delay)
+        return f"{city}: 晴"
+    return {"get_weather": get_weather}
+
+
+@pytest.fixture(autouse=True)
+def reset_stats():
+    get_prefetch_stats().reset()
+    yield
+    get_prefetch_stats().reset()
+
+
+def test_analyze_query_cities_and_budget():
+    """测试识别中英文城市名和预算关键词"""
+    calls = analyze_query("想去北京和shanghai玩，找个便宜点的酒店")
+    assert calls == [
+        ("get_weather", {"city": "北京"}),
+        ("get_weather", {"city": "上海"}),
+        ("get_hotels", {"city": "北京", "budget": "经济"}),
+        ("get_hotels", {"city": "上海", "budget": "经济"}),
+    ]
+    assert analyze_query("今天天气怎么样") == []
+
+
+def test_prefetch_hit_overlaps_llm_call():
+    """测试模型请求与预取相同的调用时直接使用预取结果，工具只执行一次"""
+    calls = []
+    client = SlowClient([
+        'Thought: 查天气\nAction: get_weather(city="Beijing")\nAction: get_weather(city="上海")',
+        'Thought: 完成\nAction: finish(answer="晴")',
+    ])
+    agent = TravelAssistantAgent(client, tools=make_tools(calls), prefetch=True)
+    start = time.perf_counter()
+    assert agent.run("北京和上海天气如何", verbose=False) == "晴"
+    elapsed = time.perf_counter() - start
+
+    # 并行执行的动作在线程池中同样取到预取结果
+    assert sorted(calls) == ["上海", "北京"]
+    # 两次 LLM 调用 0.4 秒，工具执行与第一次调用重叠
+    assert elapsed < 0.55
+    stats = get_prefetch_stats().stats()
+    assert (stats["issued"], stats["hits"], stats["wasted"]) == (2, 2, 0)
+    assert stats["saved_seconds"] > 0.15
+
+
+def test_prefetch_miss_is_discarded():
+    """测试模型请求其他调用时预取结果被丢弃，不影响执行"""
+    calls = []
+    client = SlowClient([
+        'Thought: 查天气\nAction: get_weather(city="上海")',
+        'Thought: 完成\nAction: finish(answer="ok")',
+    ], delay=0.05)
+    agent = TravelAssistantAgent(client, tools=make_tools(calls, delay=0.01), prefetch=True)
+    assert agent.run("北京天气如何", verbose=False) == "ok"
+    assert sorted(calls) == ["上海", "北京"]
+    assert "Observation: 上海: 晴" in agent.conversation_history
+    stats = get_prefetch_stats().stats()
+    assert (stats["hits"], stats["wasted"]) == (0, 1)
+
+    # 默认关闭
+    calls.clear()
+    TravelAssistantAgent(SlowClient(['Thought: 完成\nAction: finish(answer="ok")'], delay=0),
+                         tools=make_tools(calls)).run("北京天气", verbose=False)
+    assert calls == []
+
+
+def test_async_prefetch_hit():
+    """测试异步运行时预取同样生效"""
+    calls = []
+
+    class AsyncClient:
+        def __init__(self):
+            self.replies = ['Thought: 查天气\nAction: get_weather(city="北京")',
+                            'Thought: 完成\nAction: finish(answer="晴")']
+
+        async def chat(self, messages, stream=False, **kwargs):
+            await asyncio.sleep(0.2)
+            return self.replies.pop(0)
+
+    async def get_weather(city: str):
+        calls.append(city)
+        await asyncio.sleep(0.2)
+        return f"{city}: 晴"
+
+    agent = TravelAssistantAgent(AsyncClient(), tools={"get_weather": get_weather}, prefetch=True)
+    start = time.perf_counter()
+    assert asyncio.run(agent.arun("北京天气", verbose=False)) == "晴"
+    assert time.perf_counter() - start < 0.55
+    assert calls == ["北京"]
+    assert get_prefetch_stats().stats()["hits"] == 1
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,173 @@
+"""
+测试客户端限流
+"""
+
+import asyncio
+import threading
+import time
+import pytest
+from travel_assistant.batch import BatchRunner
+from travel_assistant.client import SiliconFlowClient
+from travel_assistant.config import DEFAULT_CONFIG
+from travel_assistant.rate_limit import (
+    RateLimiter, RateLimitExceeded, TokenBucket, estimate_request_tokens,
+    get_rate_limiter, request_priority, reset_rate_limiters,
+)
+from travel_assistant.resilience import Resilience, RetryPolicy, get_breaker, reset_upstreams
+from benchmarks.mock_server import MockServer
+
+
+@pytest.fixture(autouse=True)
+def fresh_limiters():
+    reset_rate_limiters()
+    reset_upstreams()
+    yield
+    reset_rate_limiters()
+    reset_upstreams()
+
+
+def test_token_bucket_and_request_estimate():
+    """测试令牌桶补充、超过容量的请求记为欠额，以及请求token数估计"""
+    bucket = TokenBucket(rate=10, capacity=20, now=0.0)
+    assert bucket.wait_time(20, 0.0) == 0
+    bucket.take(50, 0.0)
+    # 超过容量的请求只需等桶满，但欠额由后续请求承担
+    assert bucket.wait_time(50, 0.0) == pytest.approx(5.0)
+    bucket.refund(25)
+    assert bucket.wait_time(1, 0.0) == pytest.approx(0.6)
+
+    payload = {"messages": [{"role": "user", "content": "北京天气"}], "max_tokens": 100}
+    assert estimate_request_tokens(payload) == 100 + 4 + 4
+    payload["tools"] = [{"type": "function", "function": {"name": "get_weather"}}]
+    assert estimate_request_tokens(payload) > 108
+
+
+def test_acquire_waits_for_refill_and_honours_deadline():
+    """测试令牌用完后等待补充，排队超时和队列已满时失败"""
+    limiter = RateLimiter(rpm=600, burst=0.1, max_queue=1)
+    assert limiter.acquire() < 0.01
+    start = time.perf_counter()
+    limiter.acquire()
+    assert time.perf_counter() - start >= 0.08
+
+    with pytest.raises(RateLimitExceeded):
+        limiter.acquire(timeout=0.02)
+    blocker = threading.Thread(target=limiter.acquire)
+    blocker.start()
+    time.sleep(0.02)
+    with pytest.raises(RateLimitExceeded, match="队列已满"):
+        limiter.acquire()
+    blocker.join()
+    stats = limiter.stats()
+    assert (stats["granted"], stats["timed_out"], stats["rejected"]) == (3, 1, 1)
+    assert stats["queue_depth"] == 0 and stats["wait"]["interactive"]["count"] == 4
+
+
+def test_interactive_requests_overtake_queued_batch():
+    """测试交互请求排在先到的批量请求之前放行"""
+    limiter = RateLimiter(rpm=600, burst=0.1)
+    limiter.acquire()
+    order = []
+
+    def run(priority):
+        with request_priority(priority):
+            limiter.acquire()
+        order.append(priority)
+
+    threads = [threading.Thread(target=run, args=(p,)) for p in ("batch", "batch", "interactive")]
+    for thread in threads:
+        thread.start()
+        time.sleep(0.01)
+    assert limiter.queue_depth() == {"interactive": 1, "batch": 2}
+    for thread in threads:
+        thread.join()
+    assert order == ["interactive", "batch", "batch"]
+
+
+def test_token_budget_settles_actual_usage():
+    """测试按估计token数排队，响应后按 usage 归还多扣的部分"""
+    limiter = RateLimiter(tpm=60000, burst=1)
+    limiter.acquire(900)
+    assert limiter.tokens.tokens == pytest.approx(100, abs=5)
+    limiter.settle(900, 20)
+    assert limiter.tokens.tokens == pytest.approx(980, abs=5)
+
+    async def main():
+        return await asyncio.gather(limiter.aacquire(900), limiter.aacquire(900))
+
+    waits = asyncio.run(main())
+    assert waits[0] < 0.05 and 0.7 < waits[1] < 2
+
+
+def test_async_waiters_do_not_poll():
+    """测试非队首的异步等待者不轮询，只在成为队首或超时时醒来"""
+    class CountingLimiter(RateLimiter):
+        checks = 0
+
+        def _delay(self, waiter, now):
+            CountingLimiter.checks += 1
+            return super()._delay(waiter, now)
+
+    limiter = CountingLimiter(rpm=600, burst=0.1)
+
+    async def main():
+        results = await asyncio.gather(*(limiter.aacquire(timeout=0.3) for _ in range(50)),
+                                       return_exceptions=True)
+        return sum(not isinstance(r, RateLimitExceeded) for r in results)
+
+    granted = asyncio.run(main())
+    assert 2 <= granted <= 6
+    # 每个请求在排队、成为队首和超时时各检查一次左右；按 10ms 轮询则超过 1000 次
+    assert CountingLimiter.checks < 50 * 4
+    assert limiter.stats()["queue_depth"] == 0
+
+
+def test_client_shares_limiter_and_pauses_on_429(monkeypatch):
+    """测试同一密钥的客户端共享限流器，429 时暂停整个队列后重试"""
+    monkeypatch.setitem(DEFAULT_CONFIG, "rate_limit_rpm", 6000)
+    with MockServer() as server:
+        resilience = Resilience(RetryPolicy(rng=lambda: 0.5), sleep=lambda s: None)
+        client = SiliconFlowClient(api_key="k", base_url=server.base_url, resilience=resilience)
+        other = SiliconFlowClient(api_key="k", base_url=server.base_url)
+        assert client.rate_limiter is other.rate_limiter is get_rate_limiter("k")
+        assert SiliconFlowClient(api_key="other", base_url=server.base_url).rate_limiter is not client.rate_limiter
+
+        server.inject((429, 0.2))
+        start = time.perf_counter()
+        assert "finish" in client.chat([{"role": "user", "content": "你好"}])
+        assert time.perf_counter() - start >= 0.2
+    stats = client.rate_limiter.stats()
+    assert stats["throttled"] == 1 and stats["granted"] == 2
+
+
+def test_batch_runner_uses_batch_priority():
+    """测试批量执行器的 LLM 请求以 batch 优先级排队"""
+    limiter = RateLimiter(rpm=60000)
+
+    class Agent:
+        def run(self, query, session=None, **kwargs):
+            limiter.acquire()
+            return query
+
+    results = list(BatchRunner(Agent(), concurrency=2).run(["北京", "上海", "杭州"]))
+    assert all(r.ok for r in results)
+    assert limiter.stats()["wait"]["batch"]["count"] == 3
+    assert limiter.stats()["wait"]["interactive"]["count"] == 0
+
+
+def test_half_open_probe_timing_out_in_limiter_releases_probe():
+    """测试半开状态的探测请求在限流队列中超时后，探测名额交还给下一个请求"""
+    breaker = get_breaker("llm:probe")
+    breaker.recovery_timeout = 0
+    for _ in range(breaker.failure_threshold):
+        breaker.record_failure()
+    resilience = Resilience(sleep=lambda s: None)
+
+    def rejected():
+        raise RateLimitExceeded("限流排队超时")
+
+    with pytest.raises(RateLimitExceeded):
+        resilience.call(rejected, "llm:probe")
+    assert breaker.state == breaker.HALF_OPEN
+    assert resilience.call(lambda: "ok", "llm:probe") == "ok"
+    assert breaker.state == breaker.CLOSED
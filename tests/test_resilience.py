@@ -0,0 +1,205 @@
+"""
+测试重试、熔断与重试预算
+"""
+
+import asyncio
+import pytest
+import requests
+from unittest.mock import Mock, patch
+from travel_assistant.cache import get_tool_cache
+from travel_assistant.client import SiliconFlowClient
+from travel_assistant.resilience import (
+    CircuitBreaker, CircuitOpenError, Resilience, RetryBudget, RetryPolicy,
+    get_breaker, parse_retry_after, reset_upstreams, set_resilience,
+)
+from travel_assistant.tools import get_weather
+from benchmarks.mock_server import MockServer
+
+
+@pytest.fixture(autouse=True)
+def fresh_upstreams():
+    reset_upstreams()
+    yield
+    reset_upstreams()
+    set_resilience(None)
+
+
+def make_client(server, sleeps: list, **policy) -> SiliconFlowClient:
+    resilience = Resilience(RetryPolicy(rng=lambda: 0.5, **policy), sleep=sleeps.append)
+    return SiliconFlowClient(api_key="k", base_url=server.base_url, resilience=resilience)
+
+
+def test_retry_policy_and_retry_after():
+    """测试退避时间计算和 Retry-After 解析"""
+    policy = RetryPolicy(base_delay=1, max_delay=3, max_retry_after=10, rng=lambda: 0.5)
+    assert [policy.delay(n) for n in (1, 2, 3)] == [0.5, 1.0, 1.5]
+    assert policy.delay(1, retry_after=4) == 4
+    assert policy.delay(1, retry_after=60) is None
+    assert parse_retry_after("2") == 2.0
+    assert parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT") == 0.0
+    assert parse_retry_after("soon") is None
+
+
+def test_circuit_breaker_transitions():
+    """测试熔断器的打开、半开探测和恢复"""
+    now = [0.0]
+    breaker = CircuitBreaker("x", failure_threshold=2, recovery_timeout=10, clock=lambda: now[0])
+    breaker.record_failure()
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == "open" and not breaker.allow()
+
+    now[0] = 10
+    assert breaker.allow()          # 半开状态只放行一个探测请求
+    assert not breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == "open"
+
+    now[0] = 20
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == "closed"
+
+
+def test_retry_budget_limits_retries():
+    """测试重试预算限制重试比例"""
+    budget = RetryBudget(ratio=0.5, min_per_sec=0, window=10, clock=lambda: 0.0)
+    for _ in range(4):
+        budget.record_request()
+    assert [budget.try_retry() for _ in range(3)] == [True, True, False]
+    assert budget.exhausted == 1
+
+
+def test_client_retries_transient_errors():
+    """测试客户端对 503/429 退避重试，并遵守 Retry-After"""
+    sleeps = []
+    with MockServer(reply="好的") as server:
+        server.inject(503, (429, 2))
+        client = make_client(server, sleeps)
+        assert client.chat([{"role": "user", "content": "你好"}]) == "好的"
+        assert server.requests == 3
+        assert sleeps == [0.1, 2.0]
+
+        server.inject(400)
+        with pytest.raises(ConnectionError):
+            client.chat([{"role": "user", "content": "你好"}])
+        assert server.requests == 4  # 客户端错误不重试
+
+
+def test_client_circuit_opens_and_fails_fast():
+    """测试上游持续故障时熔断，之后的请求不再发出"""
+    with MockServer(error_rate=1.0) as server:
+        client = make_client(server, [], max_attempts=5)
+        with pytest.raises(ConnectionError):
+            client.chat([{"role": "user", "content": "你好"}])
+        sent = server.requests
+        assert sent == 5
+
+        with pytest.raises(CircuitOpenError):
+            client.chat([{"role": "user", "content": "你好"}])
+        assert server.requests == sent
+
+
+@patch("requests.Session.get")
+def test_get_weather_retries_timeout(mock_get):
+    """测试天气查询超时后重试成功"""
+    get_tool_cache().clear()
+    set_resilience(Resilience(sleep=lambda s: None))
+    response = Mock()
+    response.json.return_value = {
+        "current_condition": [{"weatherDesc": [{"value": "Sunny"}], "temp_C": "20"}]
+    }
+    mock_get.side_effect = [requests.exceptions.Timeout(), response]
+
+    assert "Sunny" in get_weather("南京")
+    assert mock_get.call_count == 2
+
+
+def test_only_client_http_errors_count_as_healthy():
+    """测试只有明确的 4xx 错误重置熔断器的失败计数，其他不可重试的错误不改变熔断器"""
+    breaker = get_breaker("llm:classify")
+    resilience = Resilience(sleep=lambda s: None)
+    response = requests.Response()
+    response.status_code = 400
+
+    def fail(exc):
+        def fn():
+            raise exc
+        return fn
+
+    def trip_all_but_one():
+        for _ in range(breaker.failure_threshold - 1):
+            breaker.record_failure()
+
+    trip_all_but_one()
+    with pytest.raises(ValueError):
+        resilience.call(fail(ValueError("响应不是合法的JSON")), "llm:classify")
+    breaker.record_failure()
+    assert breaker.state == breaker.OPEN
+
+    reset_upstreams()
+    breaker = get_breaker("llm:classify")
+    trip_all_but_one()
+    with pytest.raises(requests.exceptions.HTTPError):
+        resilience.call(fail(requests.exceptions.HTTPError(response=response)), "llm:classify")
+    breaker.record_failure()
+    assert breaker.state == breaker.CLOSED
+
+    # 半开状态的探测遇到其他错误时保持半开，交还探测名额
+    breaker.recovery_timeout = 0
+    for _ in range(breaker.failure_threshold):
+        breaker.record_failure()
+    with pytest.raises(ValueError):
+        resilience.call(fail(ValueError("x")), "llm:classify")
+    assert breaker.state == breaker.HALF_OPEN and breaker.allow()
+
+
+def test_cancelled_half_open_probe_releases_probe():
+    """测试半开状态的探测请求被取消后不计为失败，下一个请求可以继续探测"""
+    breaker = get_breaker("llm:cancel")
+    breaker.recovery_timeout = 0
+    for _ in range(breaker.failure_threshold):
+        breaker.record_failure()
+    resilience = Resilience(sleep=lambda s: None)
+
+    async def cancelled():
+        raise asyncio.CancelledError()
+
+    async def ok():
+        return "ok"
+
+    with pytest.raises(asyncio.CancelledError):
+        asyncio.run(resilience.acall(cancelled, "llm:cancel"))
+    assert breaker.state == breaker.HALF_OPEN
+    assert asyncio.run(resilience.acall(ok, "llm:cancel")) == "ok"
+    assert breaker.state == breaker.CLOSED
+
+
+def test_cancelled_call_keeps_probe_held_by_another_request():
+    """测试熔断器关闭时放行的请求被取消，不会交还其他请求持有的探测名额"""
+    breaker = get_breaker("llm:holder")
+    breaker.recovery_timeout = 0
+    resilience = Resilience(sleep=lambda s: None)
+
+    async def main():
+        release = asyncio.Event()
+
+        async def slow():
+            await release.wait()
+            return "ok"
+
+        before = asyncio.ensure_future(resilience.acall(slow, "llm:holder"))
+        await asyncio.sleep(0)
+        for _ in range(breaker.failure_threshold):
+            breaker.record_failure()
+        probe = asyncio.ensure_future(resilience.acall(slow, "llm:holder"))
+        await asyncio.sleep(0)
+        before.cancel()
+        await asyncio.gather(before, return_exceptions=True)
+        # 探测名额仍由 probe 持有
+        assert not breaker.allow()
+        release.set()
+        return await probe
+
+    assert asyncio.run(main()) == "ok"
+    assert breaker.state == breaker.CLOSED
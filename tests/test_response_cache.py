@@ -0,0 +1,94 @@
+"""
+测试LLM响应缓存
+"""
+
+import pytest
+from unittest.mock import Mock, patch
+from travel_assistant.client import SiliconFlowClient
+from travel_assistant.sse import ChatStream
+from travel_assistant.response_cache import (
+    MemoryBackend, ResponseCache, SQLiteBackend, make_cache_key
+)
+
+
+def _mock_response(content="测试回复"):
+    response = Mock()
+    response.json.return_value = {
+        "choices": [{"message": {"content": content}}],
+        "usage": {"prompt_tokens": 30, "completion_tokens": 12},
+    }
+    return response
+
+
+class TestResponseCache:
+    """测试 ResponseCache"""
+
+    def test_key_ignores_stream_and_order(self):
+        """测试缓存键与字段顺序和stream无关"""
+        a = {"model": "m", "messages": [], "temperature": 0.1, "stream": True}
+        b = {"temperature": 0.1, "messages": [], "model": "m", "stream": False}
+        assert make_cache_key(a) == make_cache_key(b)
+        assert make_cache_key(a) != make_cache_key(dict(a, temperature=0.2))
+
+    @patch('requests.Session.post')
+    def test_chat_hit_skips_request(self, mock_post):
+        """测试命中缓存时不再请求API并统计节省的token"""
+        mock_post.return_value = _mock_response()
+        cache = ResponseCache()
+        client = SiliconFlowClient(api_key="test-key", response_cache=cache)
+        messages = [{"role": "user", "content": "查询北京天气并推荐景点"}]
+
+        assert client.chat(messages) == "测试回复"
+        assert client.chat(messages) == "测试回复"
+        # 流式请求重放缓存内容
+        assert "".join(client.chat(messages, stream=True)) == "测试回复"
+
+        mock_post.assert_called_once()
+        stats = cache.stats()
+        assert stats["hits"] == 2
+        assert stats["saved_total_tokens"] == 84
+
+    def test_stream_replays_chunks(self):
+        """测试流式响应按原分块重放"""
+        cache = ResponseCache()
+        client = SiliconFlowClient(api_key="test-key", response_cache=cache)
+        events = b"".join(
+            b'data: {"choices": [{"delta": {"content": "%s"}}]}\n\n' % c for c in [b"Thought", b": ", b"ok"]
+        )
+        client._handle_stream_response = Mock(return_value=ChatStream([events, b"data: [DONE]\n\n"]))
+
+        with patch('requests.Session.post') as mock_post:
+            assert list(client.chat([], stream=True)) == ["Thought", ": ", "ok"]
+            replayed = client.chat([], stream=True)
+            assert isinstance(replayed, ChatStream)
+            assert list(replayed) == ["Thought", ": ", "ok"]
+            assert replayed.finish_reason == "stop" and replayed.tool_calls == []
+            replayed.close()
+            mock_post.assert_called_once()
+
+    def test_memory_backend_eviction(self):
+        """测试内存后端按容量淘汰"""
+        cache = ResponseCache(MemoryBackend(maxsize=1))
+        cache.put("a", "1")
+        cache.put("b", "2")
+        assert cache.get("a") is None
+        assert cache.get("b")["content"] == "2"
+
+    def test_sqlite_backend(self, tmp_path):
+        """测试SQLite后端持久化和淘汰"""
+        path = str(tmp_path / "responses.db")
+        backend = SQLiteBackend(path, maxsize=2)
+        backend.set("a", {"content": "1"})
+        backend.set("b", {"content": "2"})
+        backend.get("a")
+        backend.set("c", {"content": "3"})
+        backend.close()
+
+        reopened = SQLiteBackend(path, maxsize=2)
+        assert reopened.get("a") == {"content": "1"}
+        assert reopened.get("b") is None
+        assert len(reopened) == 2
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,174 @@
+"""
+测试多模型路由与对冲请求
+"""
+
+import asyncio
+import time
+import pytest
+from travel_assistant.router import AsyncRoutingClient, RoutingClient
+from travel_assistant.sse import AsyncChatStream, ChatStream
+from travel_assistant.stats import LatencyHistogram
+
+
+STREAM_EVENTS = [
+    b'data: {"choices":[{"delta":{"content":"\xe4\xbd\xa0\xe5\xa5\xbd"}}]}\n\n',
+    b'data: {"choices":[{"delta":{"tool_calls":[{"index":0,"id":"a","function":'
+    b'{"name":"get_weather","arguments":"{\\"city\\": \\"x\\"}"}}]}}]}\n\n',
+    b'data: {"choices":[{"delta":{},"finish_reason":"tool_calls"}],"usage":{"total_tokens":7}}\n\n',
+    b'data: [DONE]\n\n',
+]
+
+
+class FakeClient:
+    """按固定延迟返回模型名的客户端，流式请求返回 ChatStream"""
+
+    def __init__(self, model: str, delay: float = 0.0, fail: bool = False):
+        self.model = model
+        self.delay = delay
+        self.fail = fail
+        self.calls = 0
+        self.closed_streams = 0
+
+    def chat(self, messages, stream=False, **kwargs):
+        self.calls += 1
+        time.sleep(self.delay)
+        if self.fail:
+            raise ConnectionError("服务不可用")
+        if stream:
+            return ChatStream(STREAM_EVENTS, on_close=self._stream_closed)
+        return self.model
+
+    def _stream_closed(self):
+        self.closed_streams += 1
+
+    def close(self):
+        pass
+
+
+class AsyncFakeClient(FakeClient):
+    cancelled = 0
+
+    async def chat(self, messages, stream=False, **kwargs):
+        self.calls += 1
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            AsyncFakeClient.cancelled += 1
+            raise
+        if stream:
+            return AsyncChatStream(_aiter(STREAM_EVENTS), on_close=self._stream_closed)
+        return self.model
+
+
+async def _aiter(items):
+    for item in items:
+        yield item
+
+
+def test_latency_histogram():
+    """测试直方图百分位估计"""
+    histogram = LatencyHistogram(buckets=(0.1, 0.2, 0.5))
+    for value in [0.05] * 90 + [0.4] * 10:
+        histogram.record(value)
+    assert histogram.percentile(50) <= 0.1
+    assert 0.2 < histogram.percentile(95) <= 0.4
+    assert histogram.snapshot()["buckets"]["le_0.5"] == 10
+
+
+def test_routes_to_faster_model():
+    """测试探测后优先选择更快的模型"""
+    slow, fast = FakeClient("slow", 0.03), FakeClient("fast", 0.0)
+    with RoutingClient([slow, fast], hedge=False) as router:
+        results = [router.chat([]) for _ in range(6)]
+        assert results[:2] == ["slow", "fast"]
+        assert results[2:] == ["fast"] * 4
+        assert router.routing_stats()["models"]["fast"]["requests"] == 5
+
+
+def test_hedge_and_failover():
+    """测试主模型过慢时对冲，主模型失败时转移"""
+    slow, backup = FakeClient("slow", 0.3), FakeClient("backup", 0.0)
+    with RoutingClient([slow, backup], hedge_delay=0.02) as router:
+        assert router.chat([]) == "backup"
+        stats = router.routing_stats()
+        assert stats["hedges"] == 1
+        assert stats["decisions"][-1]["hedged_to"] == "backup"
+        assert stats["models"]["backup"]["hedge_wins"] == 1
+
+    broken, backup = FakeClient("broken", fail=True), FakeClient("backup")
+    with RoutingClient([broken, backup], hedge=False) as router:
+        assert router.chat([]) == "backup"
+        assert router.routing_stats()["models"]["broken"]["errors"] == 1
+
+
+def test_fallback_under_load():
+    """测试主模型并发已满时降级到小模型"""
+    big, small = FakeClient("big"), FakeClient("small")
+    with RoutingClient([big], [small], max_inflight=1, hedge=False) as router:
+        router.stats["big"].inflight = 1
+        ranked, reason = router.route()
+        assert ranked[0] == "small" and reason == "fallback_load"
+        router.stats["big"].inflight = 0
+        assert router.route() == (["big", "small"], "best")
+
+
+def test_async_hedge_cancels_loser():
+    """测试异步对冲时取消落败的请求，取消既不算成功也不算失败"""
+    AsyncFakeClient.cancelled = 0
+    slow, fast = AsyncFakeClient("slow", 1.0), AsyncFakeClient("fast", 0.0)
+    router = AsyncRoutingClient([slow, fast], hedge_delay=0.02)
+    router.stats["slow"].error_rate = 0.5
+
+    async def main():
+        return await router.chat([])
+
+    assert asyncio.run(main()) == "fast"
+    assert AsyncFakeClient.cancelled == 1
+    slow_stats = router.stats["slow"]
+    assert slow_stats.inflight == 0 and slow_stats.errors == 0
+    assert slow_stats.error_rate == 0.5 and slow_stats.histogram.count == 0
+
+
+def test_stream_keeps_chat_stream_interface():
+    """测试路由客户端返回的流保留 ChatStream 的属性，结束或提前关闭时释放并发计数"""
+    client = FakeClient("m", delay=0.02)
+    with RoutingClient([client], hedge=False) as router:
+        stream = router.chat([], stream=True)
+        completed = []
+        stream.on_tool_call = lambda index, call: completed.append(call["function"]["name"])
+        assert router.stats["m"].inflight == 1
+        assert list(stream) == ["你好"]
+        assert completed == ["get_weather"]
+        assert stream.finish_reason == "tool_calls" and stream.usage == {"total_tokens": 7}
+        assert stream.tool_calls[0]["function"]["arguments"] == '{"city": "x"}'
+        stats = router.stats["m"]
+        assert stats.inflight == 0 and client.closed_streams == 1
+        # 首个分块延迟从发起连接开始计算
+        assert stats.histogram.count == 1 and stats.ewma_latency >= 0.02
+
+        with router.chat([], stream=True) as stream:
+            next(stream)
+        assert stats.inflight == 0 and stats.errors == 0 and client.closed_streams == 2
+
+
+def test_async_stream_keeps_chat_stream_interface():
+    """测试异步流保留 AsyncChatStream 的属性，首个分块延迟与同步路径一样包含建立连接的时间"""
+    client = AsyncFakeClient("m", delay=0.02)
+    router = AsyncRoutingClient([client], hedge=False)
+
+    async def main():
+        stream = await router.chat([], stream=True)
+        assert router.stats["m"].inflight == 1
+        chunks = [chunk async for chunk in stream]
+        return chunks, stream
+
+    chunks, stream = asyncio.run(main())
+    assert chunks == ["你好"] and stream.finish_reason == "tool_calls"
+    assert stream.tool_calls[0]["id"] == "a"
+    stats = router.stats["m"]
+    assert stats.inflight == 0 and client.closed_streams == 1
+    assert stats.histogram.count == 1 and stats.ewma_latency >= 0.02
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,177 @@
+"""
+测试多会话管理
+"""
+
+import asyncio
+import pytest
+from unittest.mock import Mock
+from travel_assistant.agent import TravelAssistantAgent
+from travel_assistant.sessions import AgentSession, SessionManager
+
+
+def make_agent():
+    """返回一个把用户问题原样作为答案的智能体"""
+    client = Mock()
+
+    def chat(messages, stream=False, **kwargs):
+        query = messages[-1]["content"].split(": ", 1)[-1]
+        return f'Thought: 完成\nAction: finish(answer="{query}")'
+
+    client.chat.side_effect = chat
+    return TravelAssistantAgent(client)
+
+
+class TestSessionManager:
+    """测试 SessionManager"""
+
+    def test_sessions_are_isolated(self):
+        """测试不同会话的历史互不影响"""
+        manager = SessionManager(make_agent())
+        a = manager.run(None, "去杭州")
+        b = manager.run(None, "去成都")
+
+        assert a["session_id"] != b["session_id"]
+        assert a["answer"] == "去杭州" and b["answer"] == "去成都"
+        history = manager.get_or_create(a["session_id"]).history.messages()
+        assert not any("成都" in m["content"] for m in history)
+
+    def test_multi_turn_keeps_history(self):
+        """测试同一会话多轮对话保留历史"""
+        agent = make_agent()
+        manager = SessionManager(agent)
+        sid = manager.run(None, "第一轮")["session_id"]
+        manager.run(sid, "第二轮")
+
+        sent = agent.client.chat.call_args[0][0]
+        contents = [m["content"] for m in sent]
+        assert any("第一轮" in c for c in contents)
+        assert any("第二轮" in c for c in contents)
+        assert manager.get_or_create(sid).turns == 2
+
+    def test_evict_by_max_sessions(self):
+        """测试超过会话数上限时淘汰最久未活动的会话"""
+        manager = SessionManager(make_agent(), max_sessions=2)
+        first = manager.run(None, "1")["session_id"]
+        second = manager.run(None, "2")["session_id"]
+        manager.run(first, "1again")
+        manager.run(None, "3")
+
+        assert first in manager and second not in manager
+        assert manager.stats()["evicted"] == 1
+
+    def test_evict_idle_and_memory_cap(self):
+        """测试空闲超时和内存上限淘汰"""
+        manager = SessionManager(make_agent(), idle_timeout=10)
+        sid = manager.run(None, "杭州")["session_id"]
+        manager.get_or_create(sid).last_active -= 60
+        assert manager.evict_idle() == 1
+        assert len(manager) == 0
+
+        capped = SessionManager(make_agent(), max_memory_bytes=1)
+        capped.run(None, "杭州")
+        assert len(capped) == 0 and capped.stats()["memory_bytes"] == 0
+
+    def test_in_flight_async_session_not_evicted(self):
+        """测试异步请求进行中的会话不会被空闲超时或会话数上限淘汰"""
+        class SlowAgent:
+            async def arun(self, query, session=None, **kwargs):
+                session.last_active -= 60
+                await release.wait()
+                return query
+
+        manager = SessionManager(SlowAgent(), max_sessions=1, idle_timeout=10)
+
+        async def main():
+            task = asyncio.ensure_future(manager.arun("s1", "慢"))
+            await asyncio.sleep(0.01)
+            assert manager.evict_idle() == 0
+            manager.get_or_create("s2")
+            assert "s1" in manager
+            release.set()
+            return await task
+
+        release = asyncio.Event()
+        assert asyncio.run(main())["answer"] == "慢"
+        assert "s1" in manager
+
+    def test_default_session_unaffected(self):
+        """测试会话请求不影响智能体的默认会话"""
+        agent = make_agent()
+        agent.run("默认会话", verbose=False)
+        SessionManager(agent).run(None, "其他会话")
+        assert "默认会话" in agent.conversation_history[0]
+        assert isinstance(agent._session, AgentSession)
+
+
+class TestServer:
+    """测试 HTTP / WebSocket 服务"""
+
+    def test_http_and_websocket(self):
+        """测试会话接口和 WebSocket"""
+        pytest.importorskip("aiohttp")
+        from aiohttp.test_utils import TestClient, TestServer
+        from travel_assistant.server import create_app
+
+        manager = SessionManager(make_agent())
+
+        async def main():
+            async with TestClient(TestServer(create_app(manager))) as client:
+                resp = await client.post("/sessions")
+                sid = (await resp.json())["session_id"]
+                resp = await client.post(f"/sessions/{sid}/messages", json={"query": "杭州"})
+                assert (await resp.json())["answer"] == "杭州"
+                resp = await client.post("/sessions/missing/messages", json={"query": "x"})
+                assert resp.status == 404
+
+                ws = await client.ws_connect("/ws")
+                await ws.send_json({"session_id": sid, "query": "成都"})
+                reply = await ws.receive_json()
+                assert reply == {"session_id": sid, "answer": "成都"}
+                await ws.close()
+
+                assert (await client.delete(f"/sessions/{sid}")).status == 200
+                stats = await (await client.get("/stats")).json()
+                assert stats["sessions"] == 0
+
+        asyncio.run(main())
+
+    def test_agent_errors_become_error_responses(self):
+        """测试智能体抛出的上游异常映射为 429/503/502，WebSocket 回复错误后连接保持"""
+        pytest.importorskip("aiohttp")
+        from aiohttp.test_utils import TestClient, TestServer
+        from travel_assistant.rate_limit import RateLimitExceeded
+        from travel_assistant.resilience import CircuitOpenError
+        from travel_assistant.server import create_app
+
+        errors = {"限流": RateLimitExceeded("限流排队超时"), "熔断": CircuitOpenError("llm:x", 2.5),
+                  "超时": TimeoutError("请求超时"), "崩溃": RuntimeError("bug")}
+
+        class FailingAgent:
+            client = Mock()
+
+            def run(self, query, session=None, **kwargs):
+                if query in errors:
+                    raise errors[query]
+                return query
+
+        manager = SessionManager(FailingAgent())
+
+        async def main():
+            async with TestClient(TestServer(create_app(manager))) as client:
+                statuses = {}
+                for query in errors:
+                    resp = await client.post("/chat", json={"query": query})
+                    statuses[query] = resp.status
+                    assert "error" in await resp.json()
+                    if query == "熔断":
+                        assert resp.headers["Retry-After"] == "3"
+                assert statuses == {"限流": 429, "熔断": 503, "超时": 502, "崩溃": 500}
+
+                ws = await client.ws_connect("/ws")
+                await ws.send_json({"query": "熔断"})
+                assert (await ws.receive_json())["status"] == 503
+                await ws.send_json({"query": "北京"})
+                assert (await ws.receive_json())["answer"] == "北京"
+                await ws.close()
+
+        asyncio.run(main())
@@ -0,0 +1,101 @@
+"""
+测试 SSE 流式响应解码
+"""
+
+import asyncio
+import json
+import pytest
+from travel_assistant.client import SiliconFlowClient
+from travel_assistant.sse import ChatStream, SSEDecoder
+from benchmarks.mock_server import MockServer
+
+
+def sse(*chunks) -> bytes:
+    return b"".join(b"data: " + json.dumps(c, ensure_ascii=False).encode("utf-8") + b"\n\n"
+                    for c in chunks)
+
+
+def delta(content=None, finish_reason=None) -> dict:
+    return {"choices": [{"index": 0, "delta": {"content": content} if content else {},
+                         "finish_reason": finish_reason}]}
+
+
+def test_decoder_fields_and_multiline_data():
+    """测试多行 data、event/id/retry 字段和注释"""
+    decoder = SSEDecoder()
+    events = decoder.feed(b": keep-alive\n\nevent: update\nid: 7\nretry: 100\ndata: a\ndata:b\ndata\n\n")
+    assert len(events) == 1
+    event = events[0]
+    assert (event.event, event.id, event.retry) == ("update", "7", 100)
+    assert event.data == "a\nb\n"
+    # id 在后续事件中保持
+    assert decoder.feed(b"data: x\n\n")[0].id == "7"
+    # data 为空的事件不派发
+    assert [e.data for e in decoder.feed(b"data:\n\ndata: y\n\n")] == ["y"]
+    assert list(ChatStream([b"data:\n\n", sse(delta("z")), b"data: [DONE]\n\n"])) == ["z"]
+
+
+def test_decoder_split_crlf_and_utf8():
+    """测试按单字节切分时 CRLF 和多字节字符都能正确还原"""
+    raw = "data: 北京晴\r\n\r\ndata: 上海\r\rdata: 雨\n\n".encode("utf-8")
+    decoder = SSEDecoder()
+    events = []
+    for i in range(len(raw)):
+        events += decoder.feed(raw[i:i + 1])
+    events += decoder.close()
+    assert [e.data for e in events] == ["北京晴", "上海", "雨"]
+
+
+def test_chat_stream_finish_reason_and_usage():
+    """测试 ChatStream 输出内容并保留 finish_reason 和 usage"""
+    closed = []
+    body = sse(delta("你"), delta("好"), delta(finish_reason="stop"),
+               {"choices": [], "usage": {"prompt_tokens": 3, "completion_tokens": 2}})
+    stream = ChatStream([body[:7], body[7:], b"data: [DONE]\n\n"], on_close=lambda: closed.append(1))
+    recorded = []
+    stream.record(lambda chunks, usage: recorded.append((chunks, usage)))
+    assert list(stream) == ["你", "好"]
+    assert stream.finish_reason == "stop"
+    assert stream.usage["completion_tokens"] == 2
+    assert recorded == [(["你", "好"], stream.usage)]
+    assert closed == [1]
+
+    # 没有 [DONE] 也没有最后空行的流
+    assert list(ChatStream([b'data: {"choices": [{"delta": {"content": "x"}}]}'])) == ["x"]
+
+
+def test_chat_stream_errors_are_not_swallowed():
+    """测试格式错误的数据块和错误事件会抛出异常并关闭连接"""
+    closed = []
+    stream = ChatStream([b"data: {broken\n\n"], on_close=lambda: closed.append(1))
+    with pytest.raises(ValueError):
+        list(stream)
+    assert closed == [1]
+    with pytest.raises(ConnectionError):
+        list(ChatStream([sse({"error": {"message": "rate limited"}})]))
+
+
+def test_clients_surface_finish_reason_and_usage():
+    """测试同步和异步客户端的流式响应带有 finish_reason 和 usage"""
+    with MockServer(reply="北京今天晴") as server:
+        client = SiliconFlowClient(api_key="k", base_url=server.base_url)
+        stream = client.chat([{"role": "user", "content": "天气"}], stream=True)
+        assert "".join(stream) == "北京今天晴"
+        assert stream.finish_reason == "stop"
+        assert stream.usage["total_tokens"] == 20
+
+        pytest.importorskip("aiohttp")
+        from travel_assistant.async_client import AsyncSiliconFlowClient
+
+        async def main():
+            async with AsyncSiliconFlowClient(api_key="k", base_url=server.base_url) as aclient:
+                stream = await aclient.chat([{"role": "user", "content": "天气"}], stream=True)
+                text = "".join([chunk async for chunk in stream])
+                return text, stream.finish_reason, stream.usage
+
+        text, finish_reason, usage = asyncio.run(main())
+        assert text == "北京今天晴" and finish_reason == "stop" and usage["total_tokens"] == 20
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,149 @@
+"""
+测试持久化存储
+"""
+
+import multiprocessing
+import os
+import sqlite3
+import pytest
+from unittest.mock import Mock, patch
+from travel_assistant.cache import TTLCache
+from travel_assistant.config import CITY_MAPPING
+from travel_assistant.prewarm import prewarm
+from travel_assistant.response_cache import PersistentBackend, ResponseCache
+from travel_assistant.store import PersistentStore
+from travel_assistant.weather import get_report
+from benchmarks.mock_server import make_weather_payload
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "store.db")
+
+
+def test_roundtrip_ttl_and_namespaces(path):
+    """测试读写、过期和命名空间隔离"""
+    clock = FakeClock()
+    store = PersistentStore(path, clock=clock)
+    store.set("tools", ("get_weather", "北京"), {"temp": 25}, ttl=60)
+    store.set("responses", ("get_weather", "北京"), "cached")
+    assert store.get("tools", ["get_weather", "北京"]) == {"temp": 25}
+    assert store.lookup("tools", ("get_weather", "北京"))[1] == 1060.0
+    clock.now += 61
+    assert store.get("tools", ("get_weather", "北京")) is None
+    assert store.get("responses", ("get_weather", "北京")) == "cached"
+    store.clear("responses")
+    assert store.count("responses") == 0 and store.count() == 1
+    store.close()
+
+
+def test_compaction_drops_expired_and_oldest(path):
+    """测试清理过期条目并按写入时间保留最新的 max_entries 条"""
+    clock = FakeClock()
+    store = PersistentStore(path, max_entries=3, compact_interval=3600, clock=clock)
+    store.set("tools", "short", 1, ttl=5)
+    for i in range(4):
+        clock.now += 1
+        store.set("tools", f"k{i}", i)
+    assert len(store) == 5
+    clock.now += 10
+    assert store.compact() == 2
+    assert [store.get("tools", f"k{i}") for i in range(4)] == [None, 1, 2, 3]
+    store.close()
+
+
+def test_tool_cache_shared_between_instances(path):
+    """测试两个工具缓存（相当于两个进程）共享结果，剩余有效期随条目保存"""
+    first = TTLCache(ttl=600, store=PersistentStore(path))
+    loader = Mock(return_value="晴")
+    assert first.get_or_load(("get_weather", "北京"), loader) == "晴"
+
+    second = TTLCache(ttl=600, store=PersistentStore(path))
+    assert second.get_or_load(("get_weather", "北京"), loader) == "晴"
+    loader.assert_called_once()
+    assert second.stats()["store_hits"] == 1 and second.stats()["loads"] == 0
+
+    second.invalidate(("get_weather", "北京"))
+    assert first.store.get("tools", ("get_weather", "北京")) is None
+
+
+def test_writes_give_up_while_database_locked(path):
+    """测试其他连接占用写锁时，写入、删除和清空都放弃并计入错误数"""
+    store = PersistentStore(path, busy_timeout=0.01)
+    store.set("tools", "k", 1)
+    blocker = sqlite3.connect(path)
+    blocker.execute("BEGIN IMMEDIATE")
+    store.set("tools", "other", 2)
+    store.delete("tools", "k")
+    store.clear("tools")
+    store.clear()
+    assert store.errors == 4
+    blocker.rollback()
+    blocker.close()
+    assert store.get("tools", "k") == 1
+    store.delete("tools", "k")
+    assert store.get("tools", "k") is None and store.errors == 4
+    store.close()
+
+
+def _write_many(path, worker, count):
+    store = PersistentStore(path, compact_interval=0.05)
+    for i in range(count):
+        store.set("tools", (worker, i), {"worker": worker, "i": i}, ttl=600)
+        store.get("tools", (worker, 0))
+    errors = store.errors
+    store.close()
+    if errors:
+        raise SystemExit(1)
+
+
+def test_concurrent_processes_write_and_read(path):
+    """测试多个进程同时读写同一个数据库"""
+    PersistentStore(path).close()
+    processes = [multiprocessing.Process(target=_write_many, args=(path, w, 50)) for w in range(4)]
+    for p in processes:
+        p.start()
+    for p in processes:
+        p.join(timeout=60)
+    assert [p.exitcode for p in processes] == [0, 0, 0, 0]
+    store = PersistentStore(path)
+    assert store.count("tools") == 200
+    assert store.get("tools", (3, 49)) == {"worker": 3, "i": 49}
+    store.close()
+
+
+@patch('requests.Session.get')
+def test_prewarm_fills_store_for_all_cities(mock_get, path):
+    """测试预热写入全部预设城市，新进程直接命中，已有结果时跳过"""
+    response = Mock()
+    response.json.return_value = make_weather_payload("x")
+    mock_get.return_value = response
+
+    store = PersistentStore(path)
+    result = prewarm(store)
+    assert sorted(result["warmed"]) == sorted(CITY_MAPPING) and not result["failed"]
+    assert mock_get.call_count == len(CITY_MAPPING)
+
+    fresh = TTLCache(store=PersistentStore(path))
+    assert get_report("Hangzhou", cache=fresh).weather_type == "晴天"
+    assert mock_get.call_count == len(CITY_MAPPING)
+    assert prewarm(store)["skipped"] == list(CITY_MAPPING)
+    assert os.path.exists(path)
+
+
+def test_response_cache_persistent_backend(path):
+    """测试响应缓存使用持久化存储，重新打开后仍能命中"""
+    cache = ResponseCache(PersistentBackend(PersistentStore(path)))
+    cache.put("key", "你好", usage={"prompt_tokens": 5, "completion_tokens": 2})
+    reopened = ResponseCache(PersistentBackend(PersistentStore(path)))
+    assert reopened.get("key")["content"] == "你好"
+    assert len(reopened.backend) == 1
+    assert reopened.stats()["saved_prompt_tokens"] == 5
@@ -0,0 +1,85 @@
+"""
+测试流式输出增量解析
+"""
+
+import pytest
+from unittest.mock import Mock
+from travel_assistant.agent import TravelAssistantAgent
+from travel_assistant.streaming import StreamingActionParser
+
+
+def _feed_all(parser, text, size=3):
+    actions = []
+    for i in range(0, len(text), size):
+        actions.extend(parser.feed(text[i:i + size]))
+        if parser.done:
+            break
+    return actions
+
+
+class TestStreamingActionParser:
+    """测试 StreamingActionParser"""
+
+    def test_action_detected_before_newline(self):
+        """测试括号闭合时立即识别动作"""
+        parser = StreamingActionParser()
+        assert parser.feed('Thought: 查天气\nAction: get_weather(city="北') == []
+        assert parser.feed('京")') == ['get_weather(city="北京")']
+        assert not parser.done
+
+    def test_stops_on_hallucinated_observation(self):
+        """测试动作之后出现非 Action 内容时停止"""
+        parser = StreamingActionParser()
+        text = 'Thought: 查天气\nAction: get_weather(city="北京")\nObservation: 晴天 25°C\nThought: ...'
+        actions = _feed_all(parser, text)
+
+        assert actions == ['get_weather(city="北京")']
+        assert parser.done
+        assert "Observation" not in parser.text
+        assert parser.text.startswith("Thought: 查天气\nAction: get_weather")
+
+    def test_multiple_actions_and_quoted_parens(self):
+        """测试多个动作以及引号中的括号"""
+        parser = StreamingActionParser()
+        text = ('Thought: 并行\nAction: get_hotels(city="北京", budget="中等(含早)")\n'
+                'Action: get_weather(city="北京")\n')
+        actions = _feed_all(parser, text) + parser.close()
+        assert actions == ['get_hotels(city="北京", budget="中等(含早)")', 'get_weather(city="北京")']
+
+    def test_finish_marks_done(self):
+        """测试识别到 finish 后结束"""
+        parser = StreamingActionParser()
+        actions = _feed_all(parser, 'Thought: 好了\nAction: finish(answer="完成")\n多余的内容')
+        assert actions == ['finish(answer="完成")']
+        assert parser.done
+
+    def test_agent_closes_stream_early(self):
+        """测试智能体提前执行工具并关闭流"""
+        closed = []
+
+        def stream(text):
+            try:
+                for i in range(0, len(text), 4):
+                    yield text[i:i + 4]
+            finally:
+                closed.append(True)
+
+        outputs = [
+            'Thought: 查天气\nAction: weather(city="北京")\nObservation: 编造的结果' + "垃圾" * 100,
+            'Thought: 完成\nAction: finish(answer="北京晴")',
+        ]
+        mock_client = Mock()
+        mock_client.chat.side_effect = lambda messages, stream=False: stream_gen.pop(0)
+        stream_gen = [stream(t) for t in outputs]
+        weather = Mock(return_value="晴")
+        agent = TravelAssistantAgent(mock_client, tools={"weather": weather})
+
+        assert agent.run("北京天气", stream=True, verbose=False) == "北京晴"
+        weather.assert_called_once_with(city="北京")
+        assert closed == [True, True]
+        assert "编造" not in "\n".join(agent.conversation_history)
+        agent.close()
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
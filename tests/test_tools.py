@@ -5,12 +5,17 @@
 import pytest
 from unittest.mock import Mock, patch
 from travel_assistant.tools import get_weather, get_attraction
+from travel_assistant.cache import get_tool_cache
 
 
 class TestTools:
     """测试工具函数"""
+
+    def setup_method(self):
+        """每个测试前清空工具缓存"""
+        get_tool_cache().clear()
   
-    @patch('requests.get')
+    @patch('requests.Session.get')
     def test_get_weather_success(self, mock_get):
         """测试成功获取天气"""
         mock_response = Mock()
@@ -30,7 +35,7 @@ class TestTools:
         assert "晴天" in result
         assert "25" in result
   
-    @patch('requests.get')
+    @patch('requests.Session.get')
     def test_get_weather_failure(self, mock_get):
         """测试获取天气失败"""
         mock_get.side_effect = Exception("网络错误")
@@ -38,6 +43,30 @@ class TestTools:
         result = get_weather("北京")
         assert "失败" in result or "错误" in result
   
+    @patch('requests.Session.get')
+    def test_get_weather_cached_across_names(self, mock_get):
+        """测试中英文城市名共用缓存"""
+        mock_response = Mock()
+        mock_response.json.return_value = {
+            "current_condition": [{
+                "weatherDesc": [{"value": "Sunny"}],
+                "temp_C": "25",
+            }]
+        }
+        mock_get.return_value = mock_response
+
+        assert "北京" in get_weather("北京")
+        assert "Beijing" in get_weather("Beijing")
+        mock_get.assert_called_once()
+
+    @patch('requests.Session.get')
+    def test_get_weather_failure_not_cached(self, mock_get):
+        """测试失败结果不会被缓存"""
+        mock_get.side_effect = Exception("网络错误")
+        get_weather("上海")
+        get_weather("上海")
+        assert mock_get.call_count == 2
+  
     def test_get_attraction(self):
         """测试获取景点推荐"""
         result = get_attraction("北京", "晴天")
@@ -0,0 +1,115 @@
+"""
+测试追踪与指标
+"""
+
+import pytest
+from travel_assistant.agent import TravelAssistantAgent
+from travel_assistant.client import SiliconFlowClient
+from travel_assistant.tracing import (
+    NOOP_SPAN, CallbackExporter, PrometheusExporter, Tracer, bind, get_tracer, set_tracer,
+)
+from benchmarks.mock_server import MockServer
+
+
+REPLIES = [
+    'Thought: 查天气\nAction: lookup(city="北京")',
+    'Thought: 完成\nAction: finish(answer="北京晴")',
+]
+
+
+@pytest.fixture
+def spans():
+    collected = []
+    set_tracer(Tracer([CallbackExporter(collected.append)]))
+    yield collected
+    set_tracer(None)
+
+
+def make_agent(server) -> TravelAssistantAgent:
+    client = SiliconFlowClient(api_key="k", base_url=server.base_url)
+    return TravelAssistantAgent(client, tools={"lookup": lambda city: f"{city}晴"})
+
+
+def test_disabled_tracer_is_noop():
+    """测试没有导出器时返回空 span"""
+    tracer = Tracer()
+    with tracer.span("agent.run") as span:
+        span.set("x", 1)
+        span.add_event("e")
+        assert span is NOOP_SPAN
+        fn = len
+        assert bind(fn) is fn
+
+
+def test_agent_run_spans(spans):
+    """测试运行智能体时记录迭代、LLM调用、解析和工具的 span"""
+    with MockServer(reply=REPLIES) as server:
+        assert make_agent(server).run("北京天气", verbose=False) == "北京晴"
+
+    by_name = {}
+    for span in spans:
+        by_name.setdefault(span.name, []).append(span)
+    root = by_name["agent.run"][0]
+    assert root.attributes["iterations"] == 2
+    assert len(by_name["agent.iteration"]) == 2
+    assert {s.trace_id for s in spans} == {root.span_id}
+
+    llm = by_name["llm.chat"][0]
+    assert llm.attributes["prompt_tokens"] == 10
+    assert llm.attributes["completion_tokens"] == 10
+    assert llm.parent_id == by_name["agent.iteration"][0].span_id
+    assert by_name["tool"][0].attributes["tool"] == "lookup"
+    assert [e[0] for e in by_name["agent.parse"][0].events] == ["thought", "action"]
+
+
+def test_stream_records_ttft(spans):
+    """测试流式调用记录首个分块延迟"""
+    with MockServer(reply=REPLIES, latency=0.01) as server:
+        assert make_agent(server).run("北京天气", stream=True, verbose=False) == "北京晴"
+    llm = next(s for s in spans if s.name == "llm.chat")
+    assert 0 < llm.attributes["ttft"] <= llm.duration
+
+
+def test_verbose_output_built_on_tracing(capsys):
+    """测试 verbose 输出通过追踪事件打印，且不影响全局追踪器"""
+    with MockServer(reply=REPLIES) as server:
+        make_agent(server).run("北京天气", verbose=True)
+    out = capsys.readouterr().out
+    for text in ["🤖 智能体开始处理请求: 北京天气", "🔄 第 1 轮循环", "💭 思考结果",
+                 "🤔 思考: 查天气", '🔧 行动: lookup(city="北京")', "👀 观察: 北京晴",
+                 "✅ 任务完成: 北京晴"]:
+        assert text in out
+    assert not get_tracer().enabled
+
+
+def test_parse_failure_ends_with_distinct_reason(spans, capsys):
+    """测试输出无法解析时在解析 span 内记录错误，并以 parse_error 而非最大迭代次数结束"""
+    with MockServer(reply=["随便说点什么"]) as server:
+        assert make_agent(server).run("北京天气", verbose=True) == "任务未完成"
+
+    parse = next(s for s in spans if s.name == "agent.parse")
+    assert [e[0] for e in parse.events] == ["parse_error"]
+    root = next(s for s in spans if s.name == "agent.run")
+    assert root.attributes["incomplete"] == "parse_error"
+    assert [e[0] for e in root.events] == ["incomplete"]
+    out = capsys.readouterr().out
+    assert "⚠️ 提前结束 (parse_error)" in out and "最大迭代次数" not in out
+
+
+def test_prometheus_exporter():
+    """测试 Prometheus 文本格式输出"""
+    metrics = PrometheusExporter(buckets=(0.1, 1.0))
+    set_tracer(Tracer([metrics]))
+    try:
+        with MockServer(reply=REPLIES) as server:
+            make_agent(server).run("北京天气", verbose=False)
+    finally:
+        set_tracer(None)
+    text = metrics.render()
+    assert 'travel_assistant_span_duration_seconds_count{span="llm.chat"} 2' in text
+    assert 'travel_assistant_span_duration_seconds_bucket{span="tool.lookup",le="+Inf"} 1' in text
+    assert 'travel_assistant_llm_tokens_total{type="prompt"} 20' in text
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,124 @@
+"""
+测试结构化天气数据和多城市天气查询
+"""
+
+import time
+import pytest
+from unittest.mock import Mock, patch
+from travel_assistant.cache import get_tool_cache
+from travel_assistant.config import DEFAULT_CONFIG
+from travel_assistant.tools import get_attraction, get_forecast, get_weather, get_weather_many
+from travel_assistant.weather import get_report, parse_report
+from benchmarks.mock_server import make_weather_payload
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    get_tool_cache().clear()
+    yield
+    get_tool_cache().clear()
+
+
+def mock_weather(mock_get, payload=None):
+    response = Mock()
+    response.json.return_value = payload or make_weather_payload("Beijing")
+    mock_get.return_value = response
+
+
+def test_parse_report_days_and_weather_type():
+    """测试解析当前天气和逐日预报，天气类型在解析时识别"""
+    report = parse_report("北京", make_weather_payload("Beijing"))
+    assert report.temp_c == 25 and report.weather_type == "晴天"
+    assert [d.weather_type for d in report.days] == ["晴天", "阴天", "雨天"]
+    assert report.days[2].chance_of_rain == 80 and report.days[2].max_c == 26
+    assert report.weather_type_on(2) == "雨天"
+    # 超出预报范围时使用当前天气
+    assert report.weather_type_on(5) == "晴天"
+
+
+def test_parse_report_without_forecast():
+    """测试只有当前天气的数据"""
+    report = parse_report("北京", {"current_condition": [{
+        "weatherDesc": [{"value": "Fog"}], "temp_C": "5"}]})
+    assert report.days == [] and report.humidity is None
+    assert "湿度: N/A%" in report.current_result("北京")
+    assert "暂无多日预报" in report.forecast_result("北京", 3)
+
+
+@patch('requests.Session.get')
+def test_weather_forecast_and_attraction_share_one_fetch(mock_get):
+    """测试天气、预报和景点推荐共用同一次查询"""
+    mock_weather(mock_get)
+    assert "当前天气" in get_weather("北京")
+    forecast = get_forecast("Beijing", days=2)
+    assert "Partly cloudy" in forecast and "Light rain" not in forecast
+    assert "根据晴天天气" in get_attraction("北京")
+    assert "根据雨天天气" in get_attraction("北京", day=2)
+    mock_get.assert_called_once()
+
+
+@patch('requests.Session.get')
+def test_attraction_without_weather_fetches_once(mock_get):
+    """测试不传天气时景点推荐自行查询天气，结果供之后的天气查询使用"""
+    mock_weather(mock_get)
+    assert "根据晴天天气" in get_attraction("上海")
+    assert get_report("上海").weather_type == "晴天"
+    assert "上海 当前天气" in get_weather("上海")
+    mock_get.assert_called_once()
+
+
+@patch('requests.Session.get')
+def test_english_and_native_queries_cached_separately(mock_get):
+    """测试英文查询和中文查询分开缓存，中英文城市名仍共用同一个条目"""
+    mock_weather(mock_get)
+    get_report("北京")
+    get_report("Beijing")
+    assert mock_get.call_count == 1
+    assert "北京 当前天气" in get_weather("北京", use_english=False)
+    assert mock_get.call_count == 2
+    urls = [call.args[0] for call in mock_get.call_args_list]
+    assert "/Beijing?" in urls[0] and "/北京?" in urls[1]
+
+
+@patch('requests.Session.get')
+def test_attraction_falls_back_when_weather_unavailable(mock_get):
+    """测试天气服务失败时给出通用推荐，显式传入的天气不查询"""
+    mock_get.side_effect = Exception("网络错误")
+    assert "为您推荐北京的景点" in get_attraction("北京")
+    assert "根据雨天天气" in get_attraction("北京", "小雨")
+    assert "失败" in get_forecast("北京")
+    assert mock_get.call_count == 2
+
+
+@patch('requests.Session.get')
+def test_weather_many_concurrent_with_partial_results(mock_get, monkeypatch):
+    """测试多城市并发查询：共用缓存，超时的城市单独标记，其余照常返回"""
+    monkeypatch.setitem(DEFAULT_CONFIG, "weather_many_timeout", 0.5)
+
+    def fetch(url, timeout=None):
+        if "Nanjing" in url:
+            time.sleep(1)
+        time.sleep(0.2)
+        response = Mock()
+        response.json.return_value = make_weather_payload("x")
+        return response
+    mock_get.side_effect = fetch
+
+    get_weather("杭州")
+    start = time.perf_counter()
+    result = get_weather_many(["杭州", "Suzhou", "苏州", "南京"])
+    assert time.perf_counter() - start < 0.9
+    assert "杭州 当前天气" in result and "Suzhou 当前天气" in result
+    assert "查询南京天气超时" in result
+    assert result.data["failed"] == ["南京"] and "苏州" not in result.data
+    # 杭州命中缓存，苏州去重后只查询一次
+    assert mock_get.call_count == 3
+
+
+def test_weather_many_accepts_string_and_rejects_empty():
+    """测试城市列表写成字符串时按分隔符拆分"""
+    with patch('requests.Session.get') as mock_get:
+        mock_weather(mock_get)
+        result = get_weather_many("杭州、苏州")
+    assert result.summary.startswith("杭州 Sunny 25°C 18~28°C")
+    assert get_weather_many([]).startswith("错误")
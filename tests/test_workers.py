@@ -0,0 +1,88 @@
+"""
+测试多进程工作池
+"""
+
+import os
+import time
+import pytest
+from travel_assistant.agent import TravelAssistantAgent
+from travel_assistant.cache import get_tool_cache
+from travel_assistant.workers import WorkerPool
+
+
+class FakeClient:
+    """第一步调用 lookup，第二步结束"""
+
+    def chat(self, messages, stream=False, **kwargs):
+        query = next(m["content"] for m in messages if m["role"] == "user")
+        if not any(m["role"] == "assistant" for m in messages):
+            return f'Thought: 查询\nAction: lookup(query="{query.replace("用户请求: ", "")}")'
+        return 'Thought: 完成\nAction: finish(answer="done")'
+
+
+def lookup(query: str):
+    """按请求执行：slow 休眠，crash 让进程退出；结果经共享工具缓存加载，加载次数记入文件"""
+    if query.startswith("slow"):
+        time.sleep(0.5)
+    if query == "crash":
+        os._exit(3)
+
+    def load():
+        with open(os.environ["WORKER_TEST_LOADS"], "a") as f:
+            f.write(f"{os.getpid()}\n")
+        return "晴"
+    return get_tool_cache().get_or_load(("lookup", query.split("-")[0]), load)
+
+
+def make_agent():
+    return TravelAssistantAgent(FakeClient(), tools={"lookup": lookup})
+
+
+@pytest.fixture
+def loads(tmp_path, monkeypatch):
+    path = str(tmp_path / "loads.txt")
+    open(path, "w").close()
+    monkeypatch.setenv("WORKER_TEST_LOADS", path)
+
+    def count():
+        with open(path) as f:
+            return len(f.read().split())
+    return count
+
+
+def test_pool_runs_queries_and_shares_tool_cache(loads, tmp_path):
+    """测试多个进程执行查询，工具结果经共享存储只加载一次"""
+    with WorkerPool(make_agent, workers=2, threads=2, store_path=str(tmp_path / "s.db")) as pool:
+        assert pool.submit("北京").result(timeout=30).answer == "done"
+        results = list(pool.run([(f"q{i}", f"北京-{i}") for i in range(8)]))
+    assert sorted(r.id for r in results) == [f"q{i}" for i in range(8)]
+    assert all(r.ok and r.answer == "done" for r in results)
+    assert loads() == 1
+    assert pool.stats()["completed"] == 9
+
+
+def test_close_drains_or_cancels_queued_queries(loads):
+    """测试关闭时排空队列，或只等待在途查询、取消尚未开始的查询"""
+    pool = WorkerPool(make_agent, workers=1, threads=1)
+    futures = [pool.submit(f"slow-{i}") for i in range(3)]
+    pool.close(drain=True)
+    assert [f.result().ok for f in futures] == [True, True, True]
+    with pytest.raises(RuntimeError):
+        pool.submit("北京")
+
+    pool = WorkerPool(make_agent, workers=1, threads=1)
+    futures = [pool.submit(f"slow-{i}") for i in range(4)]
+    futures[0].result(timeout=30)
+    pool.close(drain=False)
+    assert futures[1].result().ok
+    assert all(isinstance(f.exception(), RuntimeError) for f in futures[2:])
+
+
+def test_crashed_worker_is_replaced(loads):
+    """测试工作进程异常退出时在途查询失败，并补充新进程继续执行"""
+    with WorkerPool(make_agent, workers=1, threads=1) as pool:
+        crashed = pool.submit("crash")
+        with pytest.raises(RuntimeError, match="异常退出"):
+            crashed.result(timeout=30)
+        assert pool.submit("北京").result(timeout=30).ok
+    assert pool.restarts == 1
@@ -4,8 +4,10 @@ Travel Assistant Agent Module
 """
 
 from .client import SiliconFlowClient
-from .tools import get_weather, get_attraction, get_hotels
+from .async_client import AsyncSiliconFlowClient
+from .tools import get_weather, get_weather_many, get_forecast, get_attraction, get_hotels
 from .agent import TravelAssistantAgent
+from .sessions import SessionManager
 from .config import DEFAULT_CONFIG
 
 __version__ = "1.0.0"
@@ -14,8 +16,12 @@ __email__ = "your.email@example.com"
 
 __all__ = [
     "SiliconFlowClient",
+    "AsyncSiliconFlowClient",
     "TravelAssistantAgent",
+    "SessionManager",
     "get_weather",
+    "get_weather_many",
+    "get_forecast",
     "get_attraction",
     "get_hotels",
     "DEFAULT_CONFIG"
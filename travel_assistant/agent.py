@@ -2,10 +2,27 @@
 智能体主模块
 """
 
-import re
+import asyncio
+import contextlib
+import functools
+import inspect
+import time
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, List
 from .tools import AVAILABLE_TOOLS
 from .config import DEFAULT_CONFIG
+from .streaming import StreamingActionParser
+from .history import ConversationHistory
+from .sessions import AgentSession
+from .batch import BatchRunner
+from .parser import ParseError, parse_action, parse_output
+from .function_calling import (
+    FUNCTION_CALLING_PROMPT, build_tool_schemas, format_action, format_call, parse_arguments,
+)
+from .observations import ObservationCompactor, VerbatimCompactor
+from .plan_cache import PlanCache, PlanRun, get_plan_cache
+from .prefetch import Prefetcher, active_prefetcher, bind_context, prefetching
+from .tracing import VerboseExporter, current_span, get_tracer
 
 
 class TravelAssistantAgent:
@@ -13,7 +30,11 @@ class TravelAssistantAgent:
     智能旅行助手智能体
     """
   
-    def __init__(self, client, tools: Dict = None, system_prompt: str = None):
+    MODES = ("react", "function_calling")
+
+    def __init__(self, client, tools: Dict = None, system_prompt: str = None, mode: str = None,
+                 prefetch: bool = None, plan_cache: PlanCache = None,
+                 compactor: ObservationCompactor = None):
         """
         初始化智能体
       
@@ -21,18 +42,47 @@ class TravelAssistantAgent:
             client: LLM客户端实例
             tools: 可用工具字典
             system_prompt: 系统提示词
+            mode: 执行模式，"react" 解析 Thought/Action 文本，
+                "function_calling" 使用原生 tools / tool_calls
+            prefetch: 是否在第一次 LLM 调用期间预取请求中城市的天气/酒店，
+                默认取配置 prefetch_enabled
+            plan_cache: 计划模板缓存（仅 ReAct 模式），不传时按配置 plan_cache_enabled
+                使用进程内共享的缓存
+            compactor: 观察结果压缩器，决定发送给模型的形式和较早轮次的摘要，
+                默认按配置 observation_compaction 选择
         """
         self.client = client
         self.tools = tools or AVAILABLE_TOOLS.copy()
-        self.conversation_history = []
+        self.mode = mode or DEFAULT_CONFIG["agent_mode"]
+        if self.mode not in self.MODES:
+            raise ValueError(f"不支持的执行模式: {self.mode}")
+        self._tool_schemas = None
+        self._session = AgentSession()
+        self.max_prompt_tokens = DEFAULT_CONFIG["max_prompt_tokens"]
+        self.max_parallel_tools = DEFAULT_CONFIG["max_parallel_tools"]
+        self.stream_early_stop = DEFAULT_CONFIG["stream_early_stop"]
+        self.prefetch = DEFAULT_CONFIG["prefetch_enabled"] if prefetch is None else prefetch
+        if plan_cache is None and DEFAULT_CONFIG["plan_cache_enabled"]:
+            plan_cache = get_plan_cache()
+        self.plan_cache = plan_cache
+        if compactor is None:
+            compactor = ObservationCompactor() if DEFAULT_CONFIG["observation_compaction"] else VerbatimCompactor()
+        self.compactor = compactor
+        self._executor = None
       
+        if system_prompt is None and self.mode == "function_calling":
+            # 工具说明通过 tools 字段发送，不需要冗长的格式说明
+            system_prompt = FUNCTION_CALLING_PROMPT
+
         # 默认系统提示词
         self.system_prompt = system_prompt or """
         你是一个智能旅行助手。你的任务是分析用户的请求，并使用可用工具一步步地解决问题。
 
         可用工具:
         - `get_weather(city: str)`: 查询指定城市的实时天气。
-        - `get_attraction(city: str, weather: str)`: 根据城市和天气搜索推荐的旅游景点。
+        - `get_weather_many(cities: list)`: 同时查询多个城市的实时天气，例如 get_weather_many(cities=["杭州", "苏州"])，对比多个城市时优先使用。
+        - `get_forecast(city: str, days: int)`: 查询指定城市未来几天（最多3天）的天气预报。
+        - `get_attraction(city: str, weather: str = None, day: int = 0)`: 根据城市和天气搜索推荐的旅游景点。不传 weather 时自动使用该城市第 day 天（0为今天）的天气，可以和 get_weather 在同一轮调用。
         - `get_hotels(city: str, budget: str)`: 根据城市和预算推荐酒店。
 
         行动格式:
@@ -40,12 +90,32 @@ class TravelAssistantAgent:
         Thought: [这里是你的思考过程和下一步计划]
         Action: [这里是你要调用的工具，格式为 function_name(arg_name="arg_value")]
 
+        如果需要调用多个互不依赖的工具（例如同时查询天气和酒店），可以在同一轮中输出多行 `Action:`，它们会被并行执行。
+
         任务完成:
         当你收集到足够的信息，能够回答用户的最终问题时，你必须在`Action:`字段后使用 `finish(answer="...")` 来输出最终答案。
 
         请开始吧！
         """
   
+    @property
+    def conversation_history(self) -> List[str]:
+        """自带会话的对话记录"""
+        return self._session.conversation_history
+
+    @conversation_history.setter
+    def conversation_history(self, value: List[str]):
+        self._session.conversation_history = value
+
+    @property
+    def history(self) -> ConversationHistory:
+        """自带会话的结构化消息历史"""
+        return self._session.history
+
+    @history.setter
+    def history(self, value: ConversationHistory):
+        self._session.history = value
+
     def add_tool(self, name: str, tool_function):
         """
         添加新工具
@@ -55,6 +125,14 @@ class TravelAssistantAgent:
             tool_function: 工具函数
         """
         self.tools[name] = tool_function
+        self._tool_schemas = None
+
+    @property
+    def tool_schemas(self) -> List[Dict]:
+        """函数调用模式发送的工具 Schema，根据工具签名生成并缓存"""
+        if self._tool_schemas is None:
+            self._tool_schemas = build_tool_schemas(self.tools)
+        return self._tool_schemas
   
     def parse_llm_output(self, llm_output: str) -> tuple:
         """
@@ -66,23 +144,54 @@ class TravelAssistantAgent:
         Returns:
             (thought, action_str) 或 (None, None)
         """
-        # 移除re.DOTALL标志，避免.匹配换行符
-        patterns = [
-            (r"Thought:\s*(.*?)(?=\r?\nAction:|$)", r"Action:\s*(.*?)(?=\r?\nThought:|$)"),
-            (r"思考[:：]\s*(.*?)(?=\r?\n行动[:：]|$)", r"(?:行动|Action)[:：]\s*(.*?)(?=\r?\n|$)"),
-            (r"THOUGHT:\s*(.*?)(?=\r?\nACTION:|$)", r"ACTION:\s*(.*?)(?=\r?\n|$)"),
-        ]
-      
-        for thought_pattern, action_pattern in patterns:
-            thought_match = re.search(thought_pattern, llm_output, re.IGNORECASE | re.MULTILINE)
-            action_match = re.search(action_pattern, llm_output, re.IGNORECASE | re.MULTILINE)
-          
-            if thought_match and action_match:
-                thought = thought_match.group(1).strip()
-                action_str = action_match.group(1).strip()
-                return thought, action_str
-      
+        parsed = parse_output(llm_output)
+        if parsed.thought and parsed.actions:
+            return parsed.thought, parsed.actions[0]
         return None, None
+
+    def parse_actions(self, llm_output: str) -> tuple:
+        """
+        解析LLM输出中的全部动作，支持同一轮多个 Action
+
+        Args:
+            llm_output: LLM原始输出
+
+        Returns:
+            (thought, [action_str, ...]) 或 (None, [])
+        """
+        parsed = parse_output(llm_output)
+        if not parsed.thought or not parsed.actions:
+            return None, []
+        return parsed.thought, parsed.actions
+
+    def execute_actions(self, action_strs: List[str]) -> List[str]:
+        """
+        并行执行多个动作，结果顺序与动作顺序一致
+
+        Args:
+            action_strs: 动作字符串列表
+
+        Returns:
+            执行结果列表
+        """
+        if len(action_strs) == 1:
+            return [self.execute_action(action_strs[0])]
+
+        executor = self._get_executor()
+        futures = [executor.submit(bind_context(self.execute_action), a) for a in action_strs]
+        return [future.result() for future in futures]
+
+    async def aexecute_actions(self, action_strs: List[str]) -> List[str]:
+        """
+        异步并行执行多个动作，结果顺序与动作顺序一致
+
+        Args:
+            action_strs: 动作字符串列表
+
+        Returns:
+            执行结果列表
+        """
+        return list(await asyncio.gather(*(self.aexecute_action(a) for a in action_strs)))
   
     def execute_action(self, action_str: str) -> str:
         """
@@ -94,52 +203,138 @@ class TravelAssistantAgent:
         Returns:
             执行结果
         """
-        # 检查是否是finish动作
-        if action_str.lower().startswith("finish"):
-            match = re.search(r'finish\(answer="(.*)"\)', action_str, re.DOTALL)
-            if match:
-                return f"FINISH: {match.group(1)}"
-          
-            match = re.search(r"finish\(answer='(.*)'\)", action_str, re.DOTALL)
-            if match:
-                return f"FINISH: {match.group(1)}"
-          
-            # 简化的finish格式
-            if action_str.lower().startswith("finish"):
-                answer = action_str[6:].strip('()\"\'').strip()
-                return f"FINISH: {answer}"
-          
-            return "错误: finish命令格式不正确"
-      
-        # 解析工具调用
-        match = re.match(r'(\w+)\((.*)\)', action_str.strip())
-        if not match:
-            return f"错误: 无法解析动作 '{action_str}'"
-      
-        tool_name = match.group(1)
-        args_str = match.group(2)
-      
-        # 解析参数
-        kwargs = {}
-        if args_str:
-            # 匹配键值对
-            pattern = r'(\w+)=["\']?([^\"\',]+)["\']?'
-            matches = re.findall(pattern, args_str)
-            for key, value in matches:
-                kwargs[key] = value.strip(' \"\'')
-      
-        # 执行工具
-        if tool_name in self.tools:
+        tool, action = self._resolve_tool(action_str)
+        if tool is None:
+            return action
+        return self._invoke(action.name, tool, action.args, action.kwargs)
+
+    def call_tool(self, name: str, arguments: str) -> str:
+        """
+        执行函数调用模式的工具调用
+
+        Args:
+            name: 工具名称
+            arguments: JSON 格式的参数
+
+        Returns:
+            执行结果，参数错误时返回错误说明供模型修正
+        """
+        tool, kwargs = self._resolve_call(name, arguments)
+        if tool is None:
+            return kwargs
+        return self._invoke(name, tool, (), kwargs)
+
+    async def acall_tool(self, name: str, arguments: str) -> str:
+        """call_tool 的异步版本"""
+        tool, kwargs = self._resolve_call(name, arguments)
+        if tool is None:
+            return kwargs
+        return await self._ainvoke(name, tool, (), kwargs)
+
+    def _resolve_call(self, name: str, arguments: str) -> tuple:
+        """解析函数调用，失败时返回 (None, 错误说明)"""
+        if name not in self.tools:
+            return None, f"错误: 未定义的工具 '{name}'"
+        try:
+            return self.tools[name], parse_arguments(arguments)
+        except ValueError as e:
+            return None, f"错误: 工具参数不是合法的JSON对象 - {e}"
+
+    def _invoke(self, name: str, tool, args, kwargs) -> str:
+        """执行工具，异常转换为错误说明"""
+        with get_tracer().span("tool", tool=name) as span:
             try:
-                result = self.tools[tool_name](**kwargs)
-                return result
+                prefetched = self._take_prefetched(name, tool, args, kwargs, span)
+                if prefetched is not None:
+                    return prefetched.result()
+                return tool(*args, **kwargs)
             except Exception as e:
+                span.set("error", f"{type(e).__name__}: {e}")
                 return f"错误: 执行工具时出错 - {str(e)}"
-        else:
-            return f"错误: 未定义的工具 '{tool_name}'"
-  
+
+    async def _ainvoke(self, name: str, tool, args, kwargs) -> str:
+        """异步执行工具，协程工具直接等待，同步工具放入线程池执行"""
+        with get_tracer().span("tool", tool=name) as span:
+            try:
+                prefetched = self._take_prefetched(name, tool, args, kwargs, span)
+                if prefetched is not None:
+                    return await asyncio.wrap_future(prefetched)
+                if asyncio.iscoroutinefunction(tool):
+                    return await tool(*args, **kwargs)
+                loop = asyncio.get_running_loop()
+                return await loop.run_in_executor(None, functools.partial(tool, *args, **kwargs))
+            except Exception as e:
+                span.set("error", f"{type(e).__name__}: {e}")
+                return f"错误: 执行工具时出错 - {str(e)}"
+
+    @staticmethod
+    def _take_prefetched(name: str, tool, args, kwargs, span):
+        """取出当前运行中与调用匹配的预取结果"""
+        prefetcher = active_prefetcher()
+        if prefetcher is None:
+            return None
+        future = prefetcher.take(name, tool, args, kwargs)
+        if future is not None:
+            span.set("prefetched", True)
+        return future
+
+    def _start_prefetch(self, user_query: str):
+        """开启预取时，在线程池中提前执行请求中城市的只读工具"""
+        if not self.prefetch:
+            return None
+        prefetcher = Prefetcher(self.tools)
+        current_span().set("prefetch_issued", prefetcher.start(user_query, self._get_executor()))
+        return prefetcher
+
+    def _astart_prefetch(self, user_query: str):
+        """_start_prefetch 的异步版本"""
+        if not self.prefetch:
+            return None
+        prefetcher = Prefetcher(self.tools)
+        current_span().set("prefetch_issued", prefetcher.astart(user_query))
+        return prefetcher
+
+    def _resolve_tool(self, action_str: str) -> tuple:
+        """
+        解析工具调用
+
+        Args:
+            action_str: 动作字符串
+
+        Returns:
+            (工具函数, Action)；finish 动作或解析失败时返回 (None, 结果字符串)
+        """
+        try:
+            action = parse_action(action_str)
+        except ParseError:
+            if action_str.lower().startswith("finish"):
+                return None, "错误: finish命令格式不正确"
+            return None, f"错误: 无法解析动作 '{action_str}'"
+
+        if action.is_finish:
+            return None, f"FINISH: {action.answer}"
+        if action.name not in self.tools:
+            return None, f"错误: 未定义的工具 '{action.name}'"
+        return self.tools[action.name], action
+
+    async def aexecute_action(self, action_str: str) -> str:
+        """
+        异步执行动作，协程工具直接等待，同步工具放入线程池执行
+
+        Args:
+            action_str: 动作字符串
+
+        Returns:
+            执行结果
+        """
+        tool, action = self._resolve_tool(action_str)
+        if tool is None:
+            return action
+        return await self._ainvoke(action.name, tool, action.args, action.kwargs)
+
     def run(self, user_query: str, max_iterations: int = None, 
-            stream: bool = False, verbose: bool = True) -> str:
+            stream: bool = False, verbose: bool = True,
+            session: AgentSession = None) -> str:
         """
         运行智能体
       
@@ -147,87 +342,606 @@ class TravelAssistantAgent:
             user_query: 用户查询
             max_iterations: 最大迭代次数
             stream: 是否使用流式输出
-            verbose: 是否打印详细信息
+            verbose: 是否打印详细信息（通过追踪事件输出）
+            session: 会话（可选），传入时在该会话的历史上继续对话，
+                不传时使用智能体自带的会话并清空历史
           
         Returns:
             最终结果
         """
         max_iterations = max_iterations or DEFAULT_CONFIG["max_iterations"]
-        self.conversation_history = [f"用户请求: {user_query}"]
-      
-        if verbose:
-            print(f"🤖 智能体开始处理请求: {user_query}")
-      
+        session = self._resolve_session(session)
+
+        with self._trace_run(user_query, verbose) as trace, prefetching(self._start_prefetch(user_query)):
+            self._start(session, user_query)
+            if self.mode == "function_calling":
+                return self._run_function_calling(session, max_iterations, stream, trace)
+
+            with self._planning(user_query) as plan:
+                if plan is not None and plan.template is not None:
+                    self._replay_plan(session, plan, trace)
+                return self._run_react(session, max_iterations, stream, trace, plan)
+
+    def _run_react(self, session: AgentSession, max_iterations: int, stream: bool,
+                   trace, plan: PlanRun = None) -> str:
+        """ReAct 模式的执行循环"""
+        tracer = get_tracer()
         for iteration in range(1, max_iterations + 1):
-            if verbose:
-                print(f"\n🔄 第 {iteration} 轮循环")
-          
-            # 构建完整prompt
-            full_prompt = "\n".join(self.conversation_history)
-          
-            # 调用LLM
-            messages = [
-                {"role": "system", "content": self.system_prompt},
-                {"role": "user", "content": full_prompt}
-            ]
-          
-            if stream:
-                if verbose:
-                    print("💭 思考中: ", end="")
-              
-                # 流式输出
-                llm_output = ""
-                for chunk in self.client.chat(messages, stream=True):
+            with tracer.span("agent.iteration", iteration=iteration) as step:
+                messages = session.history.messages()
+
+                with tracer.span("llm.chat", stream=stream, messages=len(messages)) as llm:
+                    if stream:
+                        # 流式输出，识别到完整动作后立即执行工具
+                        llm_output, pending = self._stream_output(messages, llm)
+                    else:
+                        llm_output, pending = self.client.chat(messages, stream=False), {}
+                        llm.add_event("llm.output", text=llm_output)
+
+                actions = self._handle_output(session, llm_output)
+                if actions is None:
+                    return self._finish_incomplete(session, max_iterations, trace, "parse_error")
+
+                observations = self._collect_observations(actions, pending)
+                final_answer = self._handle_observations(session, actions, observations, step)
+                if final_answer is not None:
+                    trace.set("iterations", iteration)
+                    if plan is not None:
+                        plan.answered = True
+                    return final_answer
+                self._note_step(plan, actions, observations)
+
+        return self._finish_incomplete(session, max_iterations, trace)
+
+    async def arun(self, user_query: str, max_iterations: int = None,
+                   stream: bool = False, verbose: bool = False,
+                   session: AgentSession = None) -> str:
+        """
+        异步运行智能体，需要配合 AsyncSiliconFlowClient 使用
+
+        Args:
+            user_query: 用户查询
+            max_iterations: 最大迭代次数
+            stream: 是否使用流式输出
+            verbose: 是否打印详细信息
+            session: 会话（可选），含义同 run
+
+        Returns:
+            最终结果
+        """
+        max_iterations = max_iterations or DEFAULT_CONFIG["max_iterations"]
+        session = self._resolve_session(session)
+
+        with self._trace_run(user_query, verbose) as trace, prefetching(self._astart_prefetch(user_query)):
+            self._start(session, user_query)
+            if self.mode == "function_calling":
+                return await self._arun_function_calling(session, max_iterations, stream, trace)
+
+            with self._planning(user_query) as plan:
+                if plan is not None and plan.template is not None:
+                    await self._areplay_plan(session, plan, trace)
+                return await self._arun_react(session, max_iterations, stream, trace, plan)
+
+    async def _arun_react(self, session: AgentSession, max_iterations: int, stream: bool,
+                          trace, plan: PlanRun = None) -> str:
+        """ReAct 模式的异步执行循环"""
+        tracer = get_tracer()
+        for iteration in range(1, max_iterations + 1):
+            with tracer.span("agent.iteration", iteration=iteration) as step:
+                messages = session.history.messages()
+
+                with tracer.span("llm.chat", stream=stream, messages=len(messages)) as llm:
+                    if stream:
+                        llm_output, pending = await self._astream_output(messages, llm)
+                    else:
+                        llm_output, pending = await self.client.chat(messages, stream=False), {}
+                        llm.add_event("llm.output", text=llm_output)
+
+                actions = self._handle_output(session, llm_output)
+                if actions is None:
+                    return self._finish_incomplete(session, max_iterations, trace, "parse_error")
+
+                missing = [a for a in actions if a not in pending]
+                results = dict(zip(missing, await self.aexecute_actions(missing)))
+                observations = [await pending[a] if a in pending else results[a] for a in actions]
+                for action_str, task in pending.items():
+                    if action_str not in actions:
+                        task.cancel()
+                final_answer = self._handle_observations(session, actions, observations, step)
+                if final_answer is not None:
+                    trace.set("iterations", iteration)
+                    if plan is not None:
+                        plan.answered = True
+                    return final_answer
+                self._note_step(plan, actions, observations)
+
+        return self._finish_incomplete(session, max_iterations, trace)
+
+    def run_many(self, queries, concurrency: int = None,
+                 checkpoint: str = None, **kwargs):
+        """
+        以有限并发批量运行查询，按完成顺序产出结果
+
+        Args:
+            queries: 查询迭代器，元素为字符串、(id, query) 或 {"id", "query"}
+            concurrency: 最大并发数
+            checkpoint: JSONL 检查点文件，续跑时跳过已成功的查询
+            **kwargs: 透传给 run 的参数
+
+        Returns:
+            BatchResult 迭代器；完整统计可通过 BatchRunner 获取
+        """
+        return BatchRunner(self, concurrency, checkpoint, **kwargs).run(queries)
+
+    def arun_many(self, queries, concurrency: int = None,
+                  checkpoint: str = None, **kwargs):
+        """
+        run_many 的异步版本，需要配合 AsyncSiliconFlowClient 使用
+
+        Returns:
+            BatchResult 异步迭代器
+        """
+        return BatchRunner(self, concurrency, checkpoint, **kwargs).arun(queries)
+
+    def _resolve_session(self, session: AgentSession) -> AgentSession:
+        """未指定会话时使用自带会话，并保持每次 run 重新开始的行为"""
+        if session is None:
+            session = self._session
+            session.reset()
+        return session
+
+    def _run_function_calling(self, session: AgentSession, max_iterations: int,
+                              stream: bool, trace) -> str:
+        """
+        函数调用模式的执行循环
+
+        模型返回 tool_calls 时并行执行并以 tool 消息回传结果；
+        不再调用工具时，回复内容即为最终答案，不存在格式解析失败。
+        """
+        tracer = get_tracer()
+        schemas = self.tool_schemas
+        for iteration in range(1, max_iterations + 1):
+            with tracer.span("agent.iteration", iteration=iteration) as step:
+                messages = session.history.messages()
+                with tracer.span("llm.chat", stream=stream, messages=len(messages)) as llm:
+                    if stream:
+                        content, tool_calls, pending = self._stream_tool_calls(messages, schemas, llm)
+                    else:
+                        content, tool_calls, pending = self._chat_tool_calls(
+                            self.client.chat(messages, stream=False, tools=schemas), llm)
+
+                if not tool_calls:
+                    return self._finish_function_calling(session, content, iteration, step, trace)
+
+                executor = self._get_executor()
+                for index, call in enumerate(tool_calls):
+                    if index not in pending:
+                        pending[index] = executor.submit(
+                            bind_context(self.call_tool), call["function"]["name"], call["function"].get("arguments", ""))
+                observations = [pending[i].result() for i in range(len(tool_calls))]
+                self._record_tool_calls(session, content, tool_calls, observations, step)
+
+        return self._finish_incomplete(session, max_iterations, trace)
+
+    async def _arun_function_calling(self, session: AgentSession, max_iterations: int,
+                                     stream: bool, trace) -> str:
+        """函数调用模式的异步执行循环"""
+        tracer = get_tracer()
+        schemas = self.tool_schemas
+        for iteration in range(1, max_iterations + 1):
+            with tracer.span("agent.iteration", iteration=iteration) as step:
+                messages = session.history.messages()
+                with tracer.span("llm.chat", stream=stream, messages=len(messages)) as llm:
+                    if stream:
+                        content, tool_calls, pending = await self._astream_tool_calls(messages, schemas, llm)
+                    else:
+                        content, tool_calls, pending = self._chat_tool_calls(
+                            await self.client.chat(messages, stream=False, tools=schemas), llm)
+
+                if not tool_calls:
+                    return self._finish_function_calling(session, content, iteration, step, trace)
+
+                for index, call in enumerate(tool_calls):
+                    if index not in pending:
+                        pending[index] = asyncio.ensure_future(
+                            self.acall_tool(call["function"]["name"], call["function"].get("arguments", "")))
+                observations = [await pending[i] for i in range(len(tool_calls))]
+                self._record_tool_calls(session, content, tool_calls, observations, step)
+
+        return self._finish_incomplete(session, max_iterations, trace)
+
+    def _stream_tool_calls(self, messages: list, schemas: list, span) -> tuple:
+        """
+        读取函数调用模式的流式输出，每个工具调用的参数接收完整后立即提交执行
+
+        Returns:
+            (回复内容, tool_calls, {序号: Future})
+        """
+        start = time.perf_counter()
+        stream = self.client.chat(messages, stream=True, tools=schemas)
+        if not hasattr(stream, "tool_calls"):
+            # 客户端的流只返回文本分块（不是 ChatStream），无法拼接工具调用，改用非流式调用
+            close = getattr(stream, "close", None)
+            if close is not None:
+                close()
+            return self._chat_tool_calls(self.client.chat(messages, stream=False, tools=schemas), span)
+        pending = {}
+        executor = self._get_executor()
+
+        def dispatch(index, call):
+            if span and not pending:
+                span.set("first_tool_call", time.perf_counter() - start)
+            pending[index] = executor.submit(
+                bind_context(self.call_tool), call["function"]["name"], call["function"]["arguments"])
+
+        stream.on_tool_call = dispatch
+        content = ""
+        for chunk in stream:
+            if span and not content:
+                span.set("ttft", time.perf_counter() - start)
+            span.stream(chunk)
+            content += chunk
+        return content, stream.tool_calls, pending
+
+    async def _astream_tool_calls(self, messages: list, schemas: list, span) -> tuple:
+        """_stream_tool_calls 的异步版本，工具调用以任务方式提前执行"""
+        start = time.perf_counter()
+        stream = await self.client.chat(messages, stream=True, tools=schemas)
+        if not hasattr(stream, "tool_calls"):
+            aclose = getattr(stream, "aclose", None)
+            if aclose is not None:
+                await aclose()
+            return self._chat_tool_calls(await self.client.chat(messages, stream=False, tools=schemas), span)
+        pending = {}
+
+        def dispatch(index, call):
+            if span and not pending:
+                span.set("first_tool_call", time.perf_counter() - start)
+            pending[index] = asyncio.ensure_future(
+                self.acall_tool(call["function"]["name"], call["function"]["arguments"]))
+
+        stream.on_tool_call = dispatch
+        content = ""
+        async for chunk in stream:
+            if span and not content:
+                span.set("ttft", time.perf_counter() - start)
+            span.stream(chunk)
+            content += chunk
+        return content, stream.tool_calls, pending
+
+    @staticmethod
+    def _chat_tool_calls(message: dict, span) -> tuple:
+        """
+        拆分非流式调用返回的 assistant 消息
+
+        Returns:
+            (回复内容, tool_calls, {})
+        """
+        content = message.get("content") or ""
+        if content:
+            span.add_event("llm.output", text=content)
+        return content, message.get("tool_calls"), {}
+
+    def _record_tool_calls(self, session: AgentSession, content: str, tool_calls: list,
+                           observations: List[str], span):
+        """记录一轮工具调用及其结果"""
+        if content:
+            session.conversation_history.append(f"Thought: {content}")
+            span.add_event("thought", text=content)
+        session.history.add_assistant(content, tool_calls=tool_calls)
+        for call, observation in zip(tool_calls, observations):
+            action = format_call(call)
+            session.conversation_history.append(f"Action: {action}")
+            span.add_event("action", action=action)
+            session.conversation_history.append(f"Observation: {observation}")
+            span.add_event("observation", text=observation)
+            session.history.add_tool_result(call["id"], self.compactor.compact(observation),
+                                            summary=self.compactor.summarize(observation))
+
+    def _finish_function_calling(self, session: AgentSession, answer: str,
+                                 iteration: int, step, trace) -> str:
+        """没有工具调用的回复即为最终答案"""
+        session.history.add_assistant(answer)
+        session.conversation_history.append(f"Answer: {answer}")
+        step.add_event("finish", answer=answer)
+        trace.set("iterations", iteration)
+        return answer
+
+    def _trace_run(self, user_query: str, verbose: bool):
+        """开始一次运行的根 span，verbose 时附加终端打印导出器"""
+        exporters = (VerboseExporter(),) if verbose else ()
+        return get_tracer().span("agent.run", exporters=exporters, query=user_query)
+
+    def _stream_output(self, messages: list, span) -> tuple:
+        """
+        读取流式输出，完整的工具动作一经识别就提交到线程池执行
+
+        Args:
+            messages: 消息列表
+            span: 本次LLM调用的 span，记录首个分块延迟并转发输出片段
+
+        Returns:
+            (已接受的输出文本, {动作字符串: Future})
+        """
+        start = time.perf_counter()
+        chunks = self.client.chat(messages, stream=True)
+        if not self.stream_early_stop:
+            llm_output = ""
+            for chunk in chunks:
+                if span and not llm_output:
+                    span.set("ttft", time.perf_counter() - start)
+                llm_output += chunk
+                span.stream(chunk)
+            return llm_output, {}
+
+        parser = StreamingActionParser()
+        pending = {}
+        try:
+            for chunk in chunks:
+                if span and not parser.text:
+                    span.set("ttft", time.perf_counter() - start)
+                span.stream(chunk)
+                for action in parser.feed(chunk):
+                    self._dispatch(action, pending)
+                if parser.done:
+                    span.set("early_stop", True)
+                    break
+        finally:
+            # 提前结束时关闭HTTP流，不再为多余的输出付费
+            close = getattr(chunks, "close", None)
+            if close is not None:
+                close()
+        for action in parser.close():
+            self._dispatch(action, pending)
+        return parser.text, pending
+
+    async def _astream_output(self, messages: list, span) -> tuple:
+        """
+        异步读取流式输出，完整的工具动作一经识别就创建任务执行
+
+        Args:
+            messages: 消息列表
+            span: 本次LLM调用的 span
+
+        Returns:
+            (已接受的输出文本, {动作字符串: Task})
+        """
+        start = time.perf_counter()
+        chunks = await self.client.chat(messages, stream=True)
+        parser = StreamingActionParser()
+        pending = {}
+        llm_output = ""
+        first = True
+        try:
+            async for chunk in chunks:
+                if first:
+                    span.set("ttft", time.perf_counter() - start)
+                    first = False
+                span.stream(chunk)
+                if not self.stream_early_stop:
                     llm_output += chunk
-                    if verbose:
-                        print(chunk, end="", flush=True)
-              
-                if verbose:
-                    print()
+                    continue
+                for action in parser.feed(chunk):
+                    if not action.lower().startswith("finish") and action not in pending:
+                        pending[action] = asyncio.ensure_future(self.aexecute_action(action))
+                if parser.done:
+                    span.set("early_stop", True)
+                    break
+        finally:
+            aclose = getattr(chunks, "aclose", None)
+            if aclose is not None:
+                await aclose()
+        if not self.stream_early_stop:
+            return llm_output, {}
+        for action in parser.close():
+            if not action.lower().startswith("finish") and action not in pending:
+                pending[action] = asyncio.ensure_future(self.aexecute_action(action))
+        return parser.text, pending
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        """获取执行工具的线程池"""
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.max_parallel_tools,
+                thread_name_prefix="travel-tool",
+            )
+        return self._executor
+
+    def _dispatch(self, action_str: str, pending: dict):
+        """提前提交工具动作，finish 动作不提前执行"""
+        if action_str.lower().startswith("finish") or action_str in pending:
+            return
+        pending[action_str] = self._get_executor().submit(bind_context(self.execute_action), action_str)
+
+    def _collect_observations(self, actions: List[str], pending: dict) -> List[str]:
+        """汇总观察结果，已提前执行的动作直接取结果"""
+        missing = [a for a in actions if a not in pending]
+        results = dict(zip(missing, self.execute_actions(missing))) if missing else {}
+        return [pending[a].result() if a in pending else results[a] for a in actions]
+
+    def _start(self, session: AgentSession, user_query: str):
+        """在会话中开始新一轮请求，已有历史的会话在原有消息后追加"""
+        if session.history is None:
+            session.history = ConversationHistory(self.system_prompt, max_prompt_tokens=self.max_prompt_tokens)
+        session.conversation_history.append(f"用户请求: {user_query}")
+        session.history.add_user(f"用户请求: {user_query}")
+        session.touch()
+
+    def _handle_output(self, session: AgentSession, llm_output: str):
+        """
+        解析并记录LLM输出
+
+        Returns:
+            本轮要执行的动作列表，无法解析时返回None
+        """
+        with get_tracer().span("agent.parse") as span:
+            thought, actions = self.parse_actions(llm_output)
+            span.set("actions", len(actions))
+
+            if not thought or not actions:
+                span.add_event("parse_error")
+                session.conversation_history.append("错误: 无法解析输出格式")
+                return None
+
+            # 与工具调用同时出现的finish无法参考本轮结果，只执行工具调用
+            tool_actions = [a for a in actions if not a.lower().startswith("finish")]
+            if tool_actions:
+                actions = tool_actions
             else:
-                llm_output = self.client.chat(messages, stream=False)
-                if verbose:
-                    print(f"💭 思考结果: {llm_output[:100]}...")
-          
-            # 解析输出
-            thought, action_str = self.parse_llm_output(llm_output)
-          
-            if not thought or not action_str:
-                if verbose:
-                    print("⚠️ 无法解析输出格式")
-                self.conversation_history.append("错误: 无法解析输出格式")
-                break
-          
-            # 记录思考
-            self.conversation_history.append(f"Thought: {thought}")
-            if verbose:
-                print(f"🤔 思考: {thought}")
-          
-            # 执行行动
-            self.conversation_history.append(f"Action: {action_str}")
-            if verbose:
-                print(f"🔧 行动: {action_str}")
-          
-            observation = self.execute_action(action_str)
-          
-            # 检查是否完成
-            if observation.startswith("FINISH:"):
-                final_answer = observation[7:].strip()
-                if verbose:
-                    print(f"\n✅ 任务完成: {final_answer[:100]}...")
-                return final_answer
-          
-            # 记录观察
-            self.conversation_history.append(f"Observation: {observation}")
-            if verbose:
-                print(f"👀 观察: {observation[:100]}...")
+                actions = actions[:1]
+            self._record_actions(session, thought, actions, span)
+        return actions
+
+    def _record_actions(self, session: AgentSession, thought: str, actions: List[str], span):
+        """记录思考和本轮动作"""
+        session.conversation_history.append(f"Thought: {thought}")
+        span.add_event("thought", text=thought)
+        for action_str in actions:
+            session.conversation_history.append(f"Action: {action_str}")
+            span.add_event("action", action=action_str)
+        session.history.add_assistant(
+            "\n".join([f"Thought: {thought}"] + [f"Action: {a}" for a in actions])
+        )
+
+    def _handle_observations(self, session: AgentSession, actions: List[str], observations: List[str], span):
+        """
+        记录观察结果
+
+        Args:
+            span: 本轮迭代的 span
+
+        Returns:
+            任务完成时返回最终答案，否则返回None
+        """
+        # 检查是否完成
+        if len(observations) == 1 and observations[0].startswith("FINISH:"):
+            final_answer = observations[0][7:].strip()
+            span.add_event("finish", answer=final_answer)
+            return final_answer
       
-        # 达到最大迭代次数
-        if verbose:
-            print(f"⚠️ 达到最大迭代次数 ({max_iterations})，任务未完成")
+        # 对话记录保留可读文本，发送给模型的是压缩后的形式
+        compact = [self.compactor.compact(o) for o in observations]
+        summaries = [self.compactor.summarize(o) for o in observations]
+
+        # 记录观察，多个动作时标注对应的动作
+        if len(actions) > 1:
+            observations = [f"[{a}] {o}" for a, o in zip(actions, observations)]
+            compact = [f"[{a}] {o}" for a, o in zip(actions, compact)]
+            if None not in summaries:
+                summaries = [f"[{a}] {o}" for a, o in zip(actions, summaries)]
+        for observation in observations:
+            session.conversation_history.append(f"Observation: {observation}")
+            span.add_event("observation", text=observation)
+        session.history.add_observation(
+            "\nObservation: ".join(compact),
+            summary=None if None in summaries else "\nObservation: ".join(summaries),
+        )
+        return None
+
+    @contextlib.contextmanager
+    def _planning(self, user_query: str):
+        """ReAct 模式开启计划缓存时，记录本次运行的动作序列或重放已有模板"""
+        if self.plan_cache is None or self.mode != "react":
+            yield None
+            return
+        plan = self.plan_cache.begin(user_query)
+        try:
+            yield plan
+        finally:
+            plan.close()
+
+    def _plan_calls(self, actions: List[str]):
+        """把动作字符串转换为 [(工具名称, 关键字参数), ...]，无法转换时返回 None"""
+        calls = []
+        for action_str in actions:
+            tool, action = self._resolve_tool(action_str)
+            if tool is None:
+                return None
+            try:
+                bound = inspect.signature(tool).bind(*action.args, **action.kwargs)
+            except (TypeError, ValueError):
+                return None
+            calls.append((action.name, dict(bound.arguments)))
+        return calls
+
+    def _note_step(self, plan: PlanRun, actions: List[str], observations: List[str]):
+        if plan is not None:
+            plan.add_step(self._plan_calls(actions), observations)
+
+    def _plan_step(self, plan: PlanRun, step: list):
+        """填充模板中的一轮，无法填充时返回 None"""
+        calls = []
+        for name, args in step:
+            kwargs = plan.resolve(args)
+            if kwargs is None or name not in self.tools:
+                return None
+            calls.append((name, kwargs))
+        return calls
+
+    def _replay_plan(self, session: AgentSession, plan: PlanRun, trace):
+        """
+        按模板执行工具并写入历史，之后的 LLM 调用只需根据结果生成最终答案
+
+        模板无法填充时停止重放，已执行的步骤保留在历史中，由 LLM 继续处理。
+        """
+        with get_tracer().span("agent.replay", steps=len(plan.template)) as span:
+            for step in plan.template:
+                calls = self._plan_step(plan, step)
+                if calls is None:
+                    plan.failed = True
+                    break
+                if len(calls) == 1:
+                    name, kwargs = calls[0]
+                    observations = [self._invoke(name, self.tools[name], (), kwargs)]
+                else:
+                    executor = self._get_executor()
+                    futures = [executor.submit(bind_context(self._invoke), name, self.tools[name], (), kwargs)
+                               for name, kwargs in calls]
+                    observations = [future.result() for future in futures]
+                self._record_replayed(session, plan, calls, observations, span)
+        self._count_replay(plan, trace)
+
+    async def _areplay_plan(self, session: AgentSession, plan: PlanRun, trace):
+        """_replay_plan 的异步版本"""
+        with get_tracer().span("agent.replay", steps=len(plan.template)) as span:
+            for step in plan.template:
+                calls = self._plan_step(plan, step)
+                if calls is None:
+                    plan.failed = True
+                    break
+                observations = list(await asyncio.gather(
+                    *(self._ainvoke(name, self.tools[name], (), kwargs) for name, kwargs in calls)))
+                self._record_replayed(session, plan, calls, observations, span)
+        self._count_replay(plan, trace)
+
+    def _record_replayed(self, session: AgentSession, plan: PlanRun, calls: list,
+                         observations: List[str], span):
+        actions = [format_action(name, kwargs) for name, kwargs in calls]
+        self._record_actions(session, "按已验证的计划执行", actions, span)
+        self._handle_observations(session, actions, observations, span)
+        plan.add_step(calls, observations, replayed=True)
+
+    def _count_replay(self, plan: PlanRun, trace):
+        self.plan_cache.count_replay(plan.replayed)
+        trace.set("plan_replayed", plan.replayed)
+
+    def _finish_incomplete(self, session: AgentSession, max_iterations: int, span,
+                           reason: str = "max_iterations") -> str:
+        """
+        未能正常完成时返回最后的观察结果
+
+        Args:
+            reason: 未完成的原因，max_iterations 表示迭代次数用完，
+                parse_error 表示LLM输出无法解析而提前结束
+        """
+        span.set("incomplete", reason)
+        if reason == "max_iterations":
+            span.add_event("max_iterations", max_iterations=max_iterations)
+        else:
+            span.add_event("incomplete", reason=reason)
       
         # 尝试返回最后的结果
-        for entry in reversed(self.conversation_history):
+        for entry in reversed(session.conversation_history):
             if entry.startswith("Observation:"):
                 return entry[12:].strip()
       
@@ -244,4 +958,10 @@ class TravelAssistantAgent:
   
     def clear_history(self):
         """清空对话历史"""
-        self.conversation_history = []
+        self._session.reset()
+
+    def close(self):
+        """释放并行执行工具所用的线程池"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
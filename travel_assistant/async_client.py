@@ -0,0 +1,259 @@
+"""
+SiliconFlow 异步客户端模块
+基于 aiohttp，单个事件循环即可驱动大量并发会话
+"""
+
+import asyncio
+from typing import Any, Dict
+
+from urllib.parse import urlparse
+
+from .config import DEFAULT_CONFIG, SUPPORTED_MODELS
+from .rate_limit import RateLimiter, estimate_request_tokens, get_rate_limiter
+from .resilience import CircuitOpenError, Resilience, parse_retry_after
+from .sse import AsyncChatStream
+from .tracing import current_span, record_usage
+
+try:
+    import aiohttp
+except ImportError:  # pragma: no cover - 可选依赖
+    aiohttp = None
+
+
+class AsyncSiliconFlowClient:
+    """
+    SiliconFlow API 异步客户端
+    接口与 SiliconFlowClient 保持一致，所有网络方法均为协程
+    """
+
+    def __init__(self, api_key: str,
+                 model: str = None,
+                 base_url: str = None,
+                 temperature: float = None,
+                 timeout: int = None,
+                 session: "aiohttp.ClientSession" = None,
+                 pool_maxsize: int = None,
+                 resilience: Resilience = None,
+                 rate_limiter: RateLimiter = None):
+        """
+        初始化客户端
+
+        Args:
+            api_key: SiliconFlow API密钥
+            model: 模型名称或别名
+            base_url: API基础URL
+            temperature: 温度参数
+            timeout: 请求超时时间
+            session: 外部传入的 aiohttp 会话，不传则在首次请求时创建
+            pool_maxsize: 连接池最大连接数
+            resilience: 重试与熔断策略，不传则使用默认配置
+            rate_limiter: 限流器，不传则使用同一密钥共享的限流器（与同步客户端共用）
+        """
+        if aiohttp is None:
+            raise ImportError("异步客户端需要安装 aiohttp: pip install travel-assistant-agent[async]")
+
+        self.api_key = api_key
+        self.model = model or DEFAULT_CONFIG["default_model"]
+
+        # 如果传入的是别名，转换为完整模型名
+        if self.model in SUPPORTED_MODELS:
+            self.model = SUPPORTED_MODELS[self.model]
+
+        self.base_url = base_url or DEFAULT_CONFIG["api_base_url"]
+        self.temperature = temperature or DEFAULT_CONFIG["default_temperature"]
+        self.timeout = timeout or DEFAULT_CONFIG["timeout"]
+        self.pool_maxsize = pool_maxsize or DEFAULT_CONFIG["async_pool_maxsize"]
+
+        # 设置请求头
+        self.headers = {
+            "Authorization": f"Bearer {api_key}",
+            "Content-Type": "application/json"
+        }
+
+        # 验证配置
+        self._validate_config()
+
+        self._owns_session = session is None
+        self.session = session
+        self.resilience = resilience or Resilience()
+        self.upstream = f"llm:{urlparse(self.base_url).netloc}"
+        self.rate_limiter = rate_limiter if rate_limiter is not None else get_rate_limiter(api_key)
+
+    def _validate_config(self):
+        """验证配置"""
+        if not self.api_key:
+            raise ValueError("API密钥不能为空")
+
+        if not self.model:
+            raise ValueError("模型名称不能为空")
+
+    def _get_session(self) -> "aiohttp.ClientSession":
+        """获取会话，必须在事件循环中调用"""
+        if self.session is None or self.session.closed:
+            connector = aiohttp.TCPConnector(limit=self.pool_maxsize)
+            self.session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+            )
+            self._owns_session = True
+        return self.session
+
+    async def close(self):
+        """关闭客户端持有的会话"""
+        if self._owns_session and self.session is not None:
+            await self.session.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+
+    async def chat(self, messages: list,
+                   stream: bool = False,
+                   temperature: float = None,
+                   max_tokens: int = 1000,
+                   tools: list = None,
+                   tool_choice: Any = None) -> Any:
+        """
+        发送聊天请求
+
+        Args:
+            messages: 消息列表
+            stream: 是否使用流式输出
+            temperature: 温度参数
+            max_tokens: 最大token数
+            tools: 函数调用模式的工具 Schema 列表（可选）
+            tool_choice: 工具选择策略，如 "auto"、"none"
+
+        Returns:
+            流式模式下返回 AsyncChatStream，非流式模式下返回字符串；
+            传入 tools 时非流式模式返回完整的 assistant 消息字典
+        """
+        temp = temperature or self.temperature
+
+        payload = {
+            "model": self.model,
+            "messages": messages,
+            "temperature": temp,
+            "max_tokens": max_tokens,
+            "stream": stream
+        }
+        if tools:
+            payload["tools"] = tools
+            if tool_choice is not None:
+                payload["tool_choice"] = tool_choice
+        if stream and DEFAULT_CONFIG["stream_include_usage"]:
+            payload["stream_options"] = {"include_usage": True}
+
+        span = current_span()
+        span.set("model", self.model)
+        session = self._get_session()
+
+        # 每次尝试（包括重试）都先经过限流，429 时整个队列暂停
+        limiter = self.rate_limiter
+        cost = estimate_request_tokens(payload) if limiter is not None else 0
+        waits = []
+
+        async def post():
+            if limiter is not None:
+                waits.append(await limiter.aacquire(cost))
+                span.set("rate_limit_wait", sum(waits))
+            response = await session.post(
+                f"{self.base_url}/chat/completions",
+                headers=self.headers,
+                json=payload,
+            )
+            try:
+                response.raise_for_status()
+            except Exception:
+                response.release()
+                if limiter is not None and response.status == 429:
+                    limiter.penalize(cost, parse_retry_after(response.headers.get("Retry-After")))
+                raise
+            return response
+
+        try:
+            # 429/5xx/超时按策略退避重试，上游故障时熔断
+            response = await self.resilience.acall(post, self.upstream)
+
+            if stream:
+                return self._handle_stream_response(response, limiter, cost)
+            else:
+                try:
+                    return await self._handle_normal_response(response, message=bool(tools),
+                                                              limiter=limiter, cost=cost)
+                finally:
+                    response.release()
+
+        except CircuitOpenError:
+            raise
+        except asyncio.TimeoutError:
+            raise TimeoutError(f"请求超时 ({self.timeout}秒)")
+        except aiohttp.ClientError as e:
+            raise ConnectionError(f"网络请求失败: {str(e)}")
+
+    async def _handle_normal_response(self, response: "aiohttp.ClientResponse",
+                                      message: bool = False, limiter: RateLimiter = None,
+                                      cost: int = 0) -> Any:
+        """处理非流式响应，message 为 True 时返回完整的消息字典"""
+        data = await response.json(content_type=None)
+        if "choices" not in data or not data["choices"]:
+            raise ValueError("API响应格式错误")
+
+        record_usage(data.get("usage"))
+        if limiter is not None:
+            limiter.settle(cost, (data.get("usage") or {}).get("total_tokens"))
+        if message:
+            return data["choices"][0]["message"]
+        return data["choices"][0]["message"]["content"]
+
+    def _handle_stream_response(self, response: "aiohttp.ClientResponse", limiter: RateLimiter = None,
+                                cost: int = 0) -> AsyncChatStream:
+        """处理流式响应，按网络分块增量解码，关闭时按 usage 归还多扣的token"""
+        def close():
+            response.release()
+            if limiter is not None:
+                limiter.settle(cost, (stream.usage or {}).get("total_tokens"))
+
+        stream = AsyncChatStream(response.content.iter_any(), on_close=close)
+        return stream
+
+    async def get_available_models(self) -> list:
+        """
+        获取可用的模型列表（需要API支持）
+
+        Returns:
+            模型名称列表
+        """
+        try:
+            session = self._get_session()
+            async with session.get(f"{self.base_url}/models", headers=self.headers) as response:
+                if response.status == 200:
+                    data = await response.json(content_type=None)
+                    if isinstance(data, dict) and 'data' in data:
+                        return [model['id'] for model in data['data']]
+                    elif isinstance(data, list):
+                        return data
+            return []
+
+        except Exception:
+            # 如果API不支持，返回预设模型列表
+            return list(SUPPORTED_MODELS.values())
+
+    async def get_usage(self) -> Dict[str, Any]:
+        """
+        获取API使用情况（需要API支持）
+
+        Returns:
+            使用情况字典
+        """
+        try:
+            session = self._get_session()
+            async with session.get(f"{self.base_url}/usage", headers=self.headers) as response:
+                if response.status == 200:
+                    return await response.json(content_type=None)
+            return {}
+
+        except Exception:
+            return {}
@@ -0,0 +1,288 @@
+"""
+批量查询模块
+以有限并发执行大量查询，共享智能体的客户端连接池和工具缓存，
+按完成顺序返回结果，并可写入 JSONL 检查点以便中断后续跑
+
+用法:
+    python -m travel_assistant.batch queries.txt --checkpoint results.jsonl --concurrency 8
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import asdict, dataclass
+from typing import Any, AsyncIterator, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from .config import DEFAULT_CONFIG
+from .rate_limit import request_priority
+from .sessions import AgentSession
+from .stats import summarize_latencies
+
+
+@dataclass
+class BatchResult:
+    """
+    单个查询的结果
+
+    Attributes:
+        id: 查询ID
+        query: 查询内容
+        answer: 最终答案，失败时为 None
+        latency: 耗时（秒）
+        error: 错误信息，成功时为 None
+    """
+    id: str
+    query: str
+    answer: Optional[str]
+    latency: float
+    error: Optional[str] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+def _normalize(queries: Iterable) -> Iterator[Tuple[str, str]]:
+    """将查询统一为 (id, query)；支持字符串、(id, query) 元组和 {"id", "query"} 字典"""
+    for index, item in enumerate(queries):
+        if isinstance(item, str):
+            yield str(index), item
+        elif isinstance(item, dict):
+            yield str(item.get("id", index)), item["query"]
+        else:
+            query_id, query = item
+            yield str(query_id), query
+
+
+def load_checkpoint(path: str) -> Set[str]:
+    """
+    读取检查点中已成功完成的查询ID
+
+    Args:
+        path: JSONL 检查点文件
+
+    Returns:
+        已完成的查询ID集合
+    """
+    done = set()
+    if not path or not os.path.exists(path):
+        return done
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                # 中断时可能留下不完整的最后一行
+                continue
+            if record.get("error") is None:
+                done.add(str(record["id"]))
+    return done
+
+
+class BatchRunner:
+    """
+    批量查询执行器
+
+    每个查询使用独立的 AgentSession，因此同一个智能体可以安全地并发执行。
+    同时在途的查询数不超过 concurrency，输入可以是任意长度的迭代器。
+    LLM 请求以 batch 优先级限流，交互会话的请求先放行。
+    """
+
+    def __init__(self, agent, concurrency: int = None, checkpoint: str = None, **run_kwargs):
+        """
+        初始化批量执行器
+
+        Args:
+            agent: TravelAssistantAgent
+            concurrency: 最大并发数
+            checkpoint: JSONL 检查点文件路径，已成功的查询在续跑时跳过
+            **run_kwargs: 透传给 agent.run / agent.arun 的参数
+        """
+        self.agent = agent
+        self.concurrency = concurrency or DEFAULT_CONFIG["batch_concurrency"]
+        self.checkpoint = checkpoint
+        self.run_kwargs = run_kwargs
+        self.run_kwargs.setdefault("verbose", False)
+        self.results: List[BatchResult] = []
+        self.skipped = 0
+        self._elapsed = 0.0
+
+    def run(self, queries: Iterable) -> Iterator[BatchResult]:
+        """
+        使用线程池执行查询，按完成顺序产出结果
+
+        Args:
+            queries: 查询迭代器
+
+        Yields:
+            BatchResult
+        """
+        pending_inputs = self._pending(queries)
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor, \
+                self._open_checkpoint() as sink:
+            in_flight = set()
+            for query_id, query in pending_inputs:
+                in_flight.add(executor.submit(self._run_one, query_id, query))
+                if len(in_flight) >= self.concurrency:
+                    finished, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                    yield from self._record(sink, (f.result() for f in finished))
+            while in_flight:
+                finished, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                yield from self._record(sink, (f.result() for f in finished))
+        self._elapsed += time.perf_counter() - start
+
+    async def arun(self, queries: Iterable) -> AsyncIterator[BatchResult]:
+        """
+        在事件循环中执行查询，需要智能体使用异步客户端
+
+        Args:
+            queries: 查询迭代器
+
+        Yields:
+            BatchResult
+        """
+        pending_inputs = self._pending(queries)
+        start = time.perf_counter()
+        with self._open_checkpoint() as sink:
+            in_flight = set()
+            for query_id, query in pending_inputs:
+                in_flight.add(asyncio.ensure_future(self._arun_one(query_id, query)))
+                if len(in_flight) >= self.concurrency:
+                    finished, in_flight = await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+                    for result in self._record(sink, (t.result() for t in finished)):
+                        yield result
+            while in_flight:
+                finished, in_flight = await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+                for result in self._record(sink, (t.result() for t in finished)):
+                    yield result
+        self._elapsed += time.perf_counter() - start
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        获取批量执行统计
+
+        Returns:
+            完成数、失败数、跳过数、总耗时、吞吐量（queries/s）和延迟百分位
+        """
+        failed = sum(1 for r in self.results if not r.ok)
+        return {
+            "completed": len(self.results) - failed,
+            "failed": failed,
+            "skipped": self.skipped,
+            "elapsed": self._elapsed,
+            "throughput": len(self.results) / self._elapsed if self._elapsed else 0.0,
+            "latency": summarize_latencies(r.latency for r in self.results),
+        }
+
+    def _pending(self, queries: Iterable) -> Iterator[Tuple[str, str]]:
+        """跳过检查点中已完成的查询"""
+        done = load_checkpoint(self.checkpoint)
+        for query_id, query in _normalize(queries):
+            if query_id in done:
+                self.skipped += 1
+                continue
+            yield query_id, query
+
+    def _run_one(self, query_id: str, query: str) -> BatchResult:
+        start = time.perf_counter()
+        try:
+            with request_priority("batch"):
+                answer = self.agent.run(query, session=AgentSession(), **self.run_kwargs)
+            return BatchResult(query_id, query, answer, time.perf_counter() - start)
+        except Exception as e:
+            return BatchResult(query_id, query, None, time.perf_counter() - start, str(e))
+
+    async def _arun_one(self, query_id: str, query: str) -> BatchResult:
+        start = time.perf_counter()
+        try:
+            with request_priority("batch"):
+                answer = await self.agent.arun(query, session=AgentSession(), **self.run_kwargs)
+            return BatchResult(query_id, query, answer, time.perf_counter() - start)
+        except Exception as e:
+            return BatchResult(query_id, query, None, time.perf_counter() - start, str(e))
+
+    def _open_checkpoint(self):
+        if self.checkpoint:
+            return open(self.checkpoint, "a", encoding="utf-8")
+        return _NullSink()
+
+    def _record(self, sink, results: Iterable[BatchResult]) -> Iterator[BatchResult]:
+        """记录结果并逐条写入检查点"""
+        for result in results:
+            self.results.append(result)
+            sink.write(json.dumps(asdict(result), ensure_ascii=False) + "\n")
+            sink.flush()
+            yield result
+
+
+class _NullSink:
+    """未配置检查点时的空写入目标"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def write(self, data: str):
+        pass
+
+    def flush(self):
+        pass
+
+
+def format_stats(stats: Dict[str, Any]) -> str:
+    """
+    格式化批量执行统计
+
+    Args:
+        stats: BatchRunner.stats() 的返回值
+
+    Returns:
+        多行文本
+    """
+    latency = stats["latency"]
+    return "\n".join([
+        f"完成: {stats['completed']}  失败: {stats['failed']}  跳过: {stats['skipped']}",
+        f"总耗时: {stats['elapsed']:.2f}s  吞吐量: {stats['throughput']:.2f} queries/s",
+        f"延迟: p50={latency['p50']:.3f}s  p90={latency['p90']:.3f}s  "
+        f"p99={latency['p99']:.3f}s  max={latency['max']:.3f}s",
+    ])
+
+
+def main():
+    """命令行入口：每行一个查询"""
+    from .agent import TravelAssistantAgent
+    from .client import SiliconFlowClient
+
+    parser = argparse.ArgumentParser(description="批量执行旅行助手查询")
+    parser.add_argument("queries", help="查询文件，每行一个查询")
+    parser.add_argument("--checkpoint", default=None, help="JSONL 检查点/结果文件")
+    parser.add_argument("--concurrency", type=int, default=None)
+    parser.add_argument("--model", default=None)
+    args = parser.parse_args()
+
+    api_key = os.environ.get("SILICONFLOW_API_KEY")
+    if not api_key:
+        raise SystemExit("请设置 SILICONFLOW_API_KEY 环境变量")
+
+    with open(args.queries, encoding="utf-8") as f:
+        queries = [line.strip() for line in f if line.strip()]
+
+    concurrency = args.concurrency or DEFAULT_CONFIG["batch_concurrency"]
+    with SiliconFlowClient(api_key=api_key, model=args.model, pool_maxsize=concurrency) as client:
+        agent = TravelAssistantAgent(client)
+        runner = BatchRunner(agent, concurrency=concurrency, checkpoint=args.checkpoint)
+        for result in runner.run(queries):
+            status = "✅" if result.ok else f"❌ {result.error}"
+            print(f"[{result.id}] {result.latency:.2f}s {status}")
+        agent.close()
+    print(format_stats(runner.stats()))
+
+
+if __name__ == "__main__":
+    main()
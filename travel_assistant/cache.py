@@ -0,0 +1,282 @@
+"""
+缓存模块
+线程安全的 TTL + LRU 缓存，支持命中统计、单飞（single-flight）加载和可选的持久化二级存储
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional
+
+from .config import CITY_MAPPING, DEFAULT_CONFIG
+from .store import PersistentStore, get_store
+
+
+_MISSING = object()
+
+# 英文名（小写，去除空格和撇号）到中文名的反向映射
+_ENGLISH_TO_CITY = {
+    english.lower().replace(" ", "").replace("'", ""): chinese
+    for chinese, english in CITY_MAPPING.items()
+}
+
+
+def normalize_city(city: str) -> str:
+    """
+    规范化城市名称，中文名和 CITY_MAPPING 中的英文名解析为同一个键
+
+    Args:
+        city: 城市名称（中文或英文）
+
+    Returns:
+        规范化后的城市名称，已知城市返回中文名
+    """
+    if city in CITY_MAPPING:
+        return city
+    city = (city or "").strip()
+    if city in CITY_MAPPING:
+        return city
+    return _ENGLISH_TO_CITY.get(city.lower().replace(" ", "").replace("'", ""), city)
+
+
+class _Flight:
+    """一次进行中的加载"""
+
+    __slots__ = ("event", "value", "error")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class TTLCache:
+    """
+    线程安全的 TTL + LRU 缓存
+
+    超过容量时淘汰最久未使用的条目，过期条目在访问时惰性清除。
+    get_or_load 对同一个键的并发未命中只触发一次加载。
+    设置 store 后，内存未命中时先查询持久化存储，加载结果同时写入存储，
+    同一主机的其他进程和重启后的进程都能命中。
+    """
+
+    def __init__(self, maxsize: int = None, ttl: Optional[float] = None,
+                 clock: Callable[[], float] = time.monotonic,
+                 store: PersistentStore = None, namespace: str = "tools"):
+        """
+        初始化缓存
+
+        Args:
+            maxsize: 最大条目数
+            ttl: 默认过期时间（秒），None表示永不过期
+            clock: 时钟函数，便于测试
+            store: 持久化二级存储（可选）
+            namespace: 在存储中使用的命名空间
+        """
+        self.maxsize = maxsize or DEFAULT_CONFIG["tool_cache_size"]
+        self.ttl = ttl
+        self._clock = clock
+        self.store = store
+        self.namespace = namespace
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self._inflight: Dict[Hashable, _Flight] = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.loads = 0
+        self.store_hits = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def _lookup(self, key: Hashable) -> Any:
+        """在持有锁的情况下查找，返回 _MISSING 表示未命中"""
+        entry = self._data.get(key)
+        if entry is None:
+            return _MISSING
+        value, expires_at = entry
+        if expires_at is not None and expires_at <= self._clock():
+            del self._data[key]
+            return _MISSING
+        self._data.move_to_end(key)
+        return value
+
+    def _store(self, key: Hashable, value: Any, ttl: Optional[float]):
+        """在持有锁的情况下写入"""
+        expires_at = None if ttl is None else self._clock() + ttl
+        self._data[key] = (value, expires_at)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """
+        读取缓存
+
+        Args:
+            key: 缓存键
+            default: 未命中时的返回值
+
+        Returns:
+            缓存值或默认值
+        """
+        with self._lock:
+            value = self._lookup(key)
+            if value is _MISSING:
+                self.misses += 1
+                return default
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any, ttl: Any = _MISSING):
+        """
+        写入缓存
+
+        Args:
+            key: 缓存键
+            value: 缓存值
+            ttl: 过期时间（秒），不传使用默认值，None表示永不过期
+        """
+        with self._lock:
+            self._store(key, value, self.ttl if ttl is _MISSING else ttl)
+
+    def get_or_load(self, key: Hashable, loader: Callable[[], Any], ttl: Any = _MISSING) -> Any:
+        """
+        读取缓存，未命中时调用loader加载并写入
+
+        同一个键的并发未命中只有一个线程执行loader，其余线程等待其结果。
+        loader抛出的异常会传递给所有等待者，且不会被缓存。
+
+        Args:
+            key: 缓存键
+            loader: 加载函数
+            ttl: 过期时间（秒），不传使用默认值
+
+        Returns:
+            缓存值
+        """
+        with self._lock:
+            value = self._lookup(key)
+            if value is not _MISSING:
+                self.hits += 1
+                return value
+            self.misses += 1
+            flight = self._inflight.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._inflight[key] = _Flight()
+
+        if not leader:
+            flight.event.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+
+        ttl = self.ttl if ttl is _MISSING else ttl
+        try:
+            persisted = self._load_persisted(key)
+            if persisted is not None:
+                flight.value, ttl = persisted
+            else:
+                flight.value = loader()
+                if self.store is not None:
+                    self.store.set(self.namespace, key, flight.value, ttl)
+        except BaseException as e:
+            flight.error = e
+            raise
+        else:
+            with self._lock:
+                if persisted is not None:
+                    self.store_hits += 1
+                else:
+                    self.loads += 1
+                self._store(key, flight.value, ttl)
+            return flight.value
+        finally:
+            with self._lock:
+                del self._inflight[key]
+            flight.event.set()
+
+    def _load_persisted(self, key: Hashable) -> Optional[tuple]:
+        """
+        从持久化存储读取
+
+        Returns:
+            (值, 剩余有效期)，未设置存储或未命中时返回 None
+        """
+        if self.store is None:
+            return None
+        found = self.store.lookup(self.namespace, key)
+        if found is None:
+            return None
+        value, expires = found
+        return value, None if expires is None else max(expires - time.time(), 0.0)
+
+    def invalidate(self, key: Hashable):
+        """删除指定键（包括持久化存储中的条目）"""
+        with self._lock:
+            self._data.pop(key, None)
+        if self.store is not None:
+            self.store.delete(self.namespace, key)
+
+    def clear(self):
+        """清空缓存和统计（包括持久化存储中本命名空间的条目）"""
+        with self._lock:
+            self._data.clear()
+            self.hits = self.misses = self.evictions = self.loads = self.store_hits = 0
+        if self.store is not None:
+            self.store.clear(self.namespace)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        获取缓存统计
+
+        Returns:
+            包含命中、未命中、淘汰、加载、存储命中次数和命中率的字典
+        """
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "loads": self.loads,
+                "store_hits": self.store_hits,
+                "hit_rate": self.hits / total if total else 0.0,
+            }
+
+
+_tool_cache: Optional[TTLCache] = None
+_tool_cache_lock = threading.Lock()
+
+
+def get_tool_cache() -> TTLCache:
+    """
+    获取进程内共享的工具结果缓存，配置了 persistent_store_path 时以持久化存储为二级缓存
+
+    Returns:
+        共享的 TTLCache
+    """
+    global _tool_cache
+    if _tool_cache is None:
+        with _tool_cache_lock:
+            if _tool_cache is None:
+                _tool_cache = TTLCache(store=get_store())
+    return _tool_cache
+
+
+def set_tool_cache(cache: Optional[TTLCache]):
+    """
+    替换共享的工具结果缓存
+
+    Args:
+        cache: 新的缓存，传入None时下次使用会重新创建
+    """
+    global _tool_cache
+    with _tool_cache_lock:
+        _tool_cache = cache
+
@@ -3,8 +3,15 @@ SiliconFlow 客户端模块
 """
 
 import requests
-from typing import Dict, Any, Iterator
+from typing import Dict, Any
+from urllib.parse import urlparse
 from .config import DEFAULT_CONFIG, SUPPORTED_MODELS
+from .http_pool import create_session
+from .rate_limit import RateLimiter, estimate_request_tokens, get_rate_limiter
+from .resilience import CircuitOpenError, Resilience, parse_retry_after
+from .response_cache import ResponseCache
+from .sse import ChatStream
+from .tracing import current_span, record_usage
 
 
 class SiliconFlowClient:
@@ -17,7 +24,14 @@ class SiliconFlowClient:
                  model: str = None,
                  base_url: str = None,
                  temperature: float = None,
-                 timeout: int = None):
+                 timeout: int = None,
+                 session: requests.Session = None,
+                 pool_connections: int = None,
+                 pool_maxsize: int = None,
+                 max_retries: int = None,
+                 response_cache: ResponseCache = None,
+                 resilience: Resilience = None,
+                 rate_limiter: RateLimiter = None):
         """
         初始化客户端
 
@@ -27,6 +41,13 @@ class SiliconFlowClient:
             base_url: API基础URL
             temperature: 温度参数
             timeout: 请求超时时间
+            session: 外部传入的会话（可与工具共享），不传则自动创建
+            pool_connections: 连接池数量
+            pool_maxsize: 每个主机的最大连接数
+            max_retries: 连接失败重试次数
+            response_cache: 响应缓存（可选），命中时不再请求API
+            resilience: 重试与熔断策略，不传则使用默认配置
+            rate_limiter: 限流器，不传则使用同一密钥共享的限流器（未配置 rate_limit_rpm/tpm 时不限流）
         """
         self.api_key = api_key
         self.model = model or DEFAULT_CONFIG["default_model"]
@@ -48,6 +69,18 @@ class SiliconFlowClient:
         # 验证配置
         self._validate_config()
 
+        # 连接池会话，复用TCP/TLS连接
+        self._owns_session = session is None
+        self.session = session or create_session(
+            pool_connections=pool_connections,
+            pool_maxsize=pool_maxsize,
+            max_retries=max_retries,
+        )
+        self.response_cache = response_cache
+        self.resilience = resilience or Resilience()
+        self.upstream = f"llm:{urlparse(self.base_url).netloc}"
+        self.rate_limiter = rate_limiter if rate_limiter is not None else get_rate_limiter(api_key)
+
     def _validate_config(self):
         """验证配置"""
         if not self.api_key:
@@ -56,10 +89,23 @@ class SiliconFlowClient:
         if not self.model:
             raise ValueError("模型名称不能为空")
 
+    def close(self):
+        """关闭客户端持有的连接池"""
+        if self._owns_session:
+            self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
     def chat(self, messages: list,
              stream: bool = False,
              temperature: float = None,
-             max_tokens: int = 1000) -> Any:
+             max_tokens: int = 1000,
+             tools: list = None,
+             tool_choice: Any = None) -> Any:
         """
         发送聊天请求
       
@@ -68,9 +114,13 @@ class SiliconFlowClient:
             stream: 是否使用流式输出
             temperature: 温度参数
             max_tokens: 最大token数
+            tools: 函数调用模式的工具 Schema 列表（可选）
+            tool_choice: 工具选择策略，如 "auto"、"none"
           
         Returns:
-            流式模式下返回生成器，非流式模式下返回字符串
+            流式模式下返回 ChatStream（迭代得到内容分块，结束后可读取
+            finish_reason、usage 和 tool_calls），非流式模式下返回字符串；
+            传入 tools 时非流式模式返回完整的 assistant 消息字典
         """
         temp = temperature or self.temperature
       
@@ -81,57 +131,104 @@ class SiliconFlowClient:
             "max_tokens": max_tokens,
             "stream": stream
         }
-      
-        try:
-            response = requests.post(
+        if tools:
+            payload["tools"] = tools
+            if tool_choice is not None:
+                payload["tool_choice"] = tool_choice
+        if stream and DEFAULT_CONFIG["stream_include_usage"]:
+            # 让最后一个分块带上 usage
+            payload["stream_options"] = {"include_usage": True}
+
+        span = current_span()
+        span.set("model", self.model)
+
+        # 查询响应缓存，函数调用模式的响应不缓存
+        cache_key = None
+        if self.response_cache is not None and not tools:
+            cache_key = self.response_cache.make_key(payload)
+            entry = self.response_cache.get(cache_key)
+            span.set("cache_hit", entry is not None)
+            if entry is not None:
+                return self.response_cache.replay(entry) if stream else entry["content"]
+
+        # 每次尝试（包括重试）都先经过限流，429 时整个队列暂停
+        limiter = self.rate_limiter
+        cost = estimate_request_tokens(payload) if limiter is not None else 0
+        waits = []
+
+        def post():
+            if limiter is not None:
+                waits.append(limiter.acquire(cost))
+                span.set("rate_limit_wait", sum(waits))
+            response = self.session.post(
                 f"{self.base_url}/chat/completions",
                 headers=self.headers,
                 json=payload,
                 timeout=self.timeout,
                 stream=stream
             )
-          
-            response.raise_for_status()
+            try:
+                response.raise_for_status()
+            except requests.exceptions.HTTPError:
+                response.close()
+                if limiter is not None and response.status_code == 429:
+                    limiter.penalize(cost, parse_retry_after(response.headers.get("Retry-After")))
+                raise
+            return response
+
+        try:
+            # 429/5xx/超时按策略退避重试，上游故障时熔断
+            response = self.resilience.call(post, self.upstream)
           
             if stream:
-                return self._handle_stream_response(response)
+                chunks = self._handle_stream_response(response, limiter, cost)
+                if cache_key is not None:
+                    # 完整读取后写入缓存，提前关闭的流不完整，不写入
+                    chunks.record(lambda recorded, usage: self.response_cache.put(
+                        cache_key, "".join(recorded), usage=usage, chunks=recorded))
+                return chunks
             else:
-                return self._handle_normal_response(response)
+                return self._handle_normal_response(response, cache_key, message=bool(tools),
+                                                    limiter=limiter, cost=cost)
                 
+        except CircuitOpenError:
+            raise
         except requests.exceptions.Timeout:
             raise TimeoutError(f"请求超时 ({self.timeout}秒)")
         except requests.exceptions.RequestException as e:
             raise ConnectionError(f"网络请求失败: {str(e)}")
   
-    def _handle_normal_response(self, response: requests.Response) -> str:
-        """处理非流式响应"""
+    def _handle_normal_response(self, response: requests.Response, cache_key: str = None,
+                                message: bool = False, limiter: RateLimiter = None, cost: int = 0) -> Any:
+        """处理非流式响应，message 为 True 时返回完整的消息字典"""
         data = response.json()
         if "choices" not in data or not data["choices"]:
             raise ValueError("API响应格式错误")
-      
-        return data["choices"][0]["message"]["content"]
-  
-    def _handle_stream_response(self, response: requests.Response) -> Iterator[str]:
-        """处理流式响应"""
-        for line in response.iter_lines():
-            if line:
-                line = line.decode('utf-8')
-              
-                # 跳过SSE格式的注释行
-                if line.startswith('data: '):
-                    data = line[6:]  # 移除 "data: " 前缀
-                  
-                    if data == '[DONE]':
-                        break
-                  
-                    try:
-                        chunk = requests.json.loads(data)
-                        if (chunk.get('choices') and
-                                chunk['choices'][0].get('delta') and
-                                chunk['choices'][0]['delta'].get('content')):
-                            yield chunk['choices'][0]['delta']['content']
-                    except Exception:
-                        continue
+
+        record_usage(data.get("usage"))
+        if limiter is not None:
+            limiter.settle(cost, (data.get("usage") or {}).get("total_tokens"))
+        if message:
+            return data["choices"][0]["message"]
+        content = data["choices"][0]["message"]["content"]
+        if cache_key is not None:
+            self.response_cache.put(cache_key, content, usage=data.get("usage"))
+        return content
+
+    def _handle_stream_response(self, response: requests.Response, limiter: RateLimiter = None,
+                                cost: int = 0) -> ChatStream:
+        """
+        处理流式响应，按网络分块增量解码，调用方提前关闭流时同时关闭HTTP连接
+
+        流关闭时按最后一块的 usage 归还多扣的token；提前关闭的流没有 usage，不归还。
+        """
+        def close():
+            response.close()
+            if limiter is not None:
+                limiter.settle(cost, (stream.usage or {}).get("total_tokens"))
+
+        stream = ChatStream(response.iter_content(chunk_size=None), on_close=close)
+        return stream
   
     def get_available_models(self) -> list:
         """
@@ -141,7 +238,7 @@ class SiliconFlowClient:
             模型名称列表
         """
         try:
-            response = requests.get(
+            response = self.session.get(
                 f"{self.base_url}/models",
                 headers=self.headers,
                 timeout=self.timeout
@@ -167,7 +264,7 @@ class SiliconFlowClient:
             使用情况字典
         """
         try:
-            response = requests.get(
+            response = self.session.get(
                 f"{self.base_url}/usage",
                 headers=self.headers,
                 timeout=self.timeout
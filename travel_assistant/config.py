@@ -4,10 +4,105 @@
 
 DEFAULT_CONFIG = {
     "api_base_url": "https://api.siliconflow.cn/v1",
+    "weather_base_url": "https://wttr.in",
     "default_model": "deepseek-ai/DeepSeek-V2.5",
     "default_temperature": 0.7,
     "max_iterations": 5,
+    "max_parallel_tools": 4,
+    "stream_early_stop": True,
+    # 执行模式: "react"（Thought/Action 文本）或 "function_calling"（原生 tools / tool_calls）
+    "agent_mode": "react",
+    # 第一次 LLM 调用期间预取请求中城市的天气/酒店（只预取只读工具）
+    "prefetch_enabled": False,
+    "prefetch_tools": ["get_weather", "get_hotels"],
+    "prefetch_max_cities": 3,
+    # 计划模板缓存：同形状请求按已验证的动作序列执行工具，只调用一次 LLM 生成答案
+    "plan_cache_enabled": False,
+    "plan_cache_size": 1024,
+    "plan_cache_ttl": 3600,
+    "plan_min_support": 2,
+    "plan_min_confidence": 0.8,
+    "plan_max_failures": 2,
+    # 流式请求要求服务端在最后一个分块返回 usage
+    "stream_include_usage": True,
+    # 提示token预算，超出时压缩较早的对话
+    "max_prompt_tokens": 6000,
+    "history_keep_recent": 4,
+    # 观察结果以紧凑形式发送，之后已有该数量助手轮次的观察结果替换为摘要
+    "observation_compaction": True,
+    "observation_keep_recent": 1,
+    # 多会话管理
+    "max_sessions": 10000,
+    "session_idle_timeout": 1800,
+    "session_max_memory_bytes": 256 * 1024 * 1024,
+    "session_evict_interval": 60,
+    # 批量查询
+    "batch_concurrency": 8,
+    # 多进程工作池：进程数（None表示CPU核数）、每个进程的并发线程数和进程启动方式
+    "worker_processes": None,
+    "worker_threads": 4,
+    "worker_start_method": "spawn",
     "timeout": 30,
+    # 连接池配置
+    "pool_connections": 10,
+    "pool_maxsize": 20,
+    # 连接阶段的重试次数；请求级重试由 resilience 模块统一处理，避免两层重试叠加
+    "max_retries": 0,
+    "retry_backoff_factor": 0.3,
+    "async_pool_maxsize": 100,
+    # 重试、熔断与重试预算
+    "retry_max_attempts": 3,
+    "retry_base_delay": 0.2,
+    "retry_max_delay": 5.0,
+    "retry_after_max": 30,
+    "retry_budget_ratio": 0.2,
+    "retry_budget_min_per_sec": 1,
+    "breaker_failure_threshold": 5,
+    "breaker_recovery_timeout": 30,
+    # 客户端限流，同一 API 密钥共享：每分钟请求数/token数上限（None表示不限）、令牌桶可积累的秒数、
+    # 最大排队数、默认排队超时（秒）和 429 未给出 Retry-After 时的暂停时间（秒）
+    "rate_limit_rpm": None,
+    "rate_limit_tpm": None,
+    "rate_limit_burst": 10,
+    "rate_limit_max_queue": 1000,
+    "rate_limit_timeout": 30,
+    "rate_limit_penalty": 1.0,
+    # 多模型路由与对冲请求
+    "routing_models": ["deepseek-v2.5", "qwen2.5-14b"],
+    "routing_fallback_models": ["qwen2.5-7b", "llama-3.2-3b"],
+    "routing_max_inflight": 32,
+    "routing_max_error_rate": 0.5,
+    "routing_probe_interval": 30,
+    "routing_decision_log": 200,
+    "hedge_delay": 2.0,
+    "hedge_percentile": 95,
+    "hedge_min_samples": 20,
+    "hedge_budget_ratio": 0.1,
+    # get_weather_many 的并发查询数和总等待时间（秒）
+    "weather_many_concurrency": 8,
+    "weather_many_timeout": 15,
+    # 工具结果缓存
+    "tool_cache_size": 1024,
+    # 进程间共享的持久化存储（SQLite），None表示不启用；工具缓存和响应缓存未命中内存时查询
+    "persistent_store_path": None,
+    "persistent_store_max_entries": 100000,
+    "persistent_store_compact_interval": 300,
+    # 景点/酒店知识库，None表示使用打包的 data/knowledge.json
+    "knowledge_path": None,
+    "knowledge_reload_interval": 5,
+    # LLM响应缓存
+    "response_cache_size": 512,
+}
+
+# 各工具结果的缓存时间（秒），None表示永不过期
+TOOL_CACHE_TTL = {
+    "get_weather": 600,
+}
+
+# 函数调用模式下不向模型暴露的工具参数（内部开关，使用默认值）
+TOOL_HIDDEN_PARAMS = {
+    "get_weather": ["use_english"],
+    "get_weather_many": ["use_english"],
 }
 
 # 支持的模型列表
@@ -0,0 +1,186 @@
+"""
+原生函数调用模块
+根据工具函数的签名和文档字符串生成 OpenAI 风格的 tools JSON Schema，
+并解析模型返回的 tool_calls
+"""
+
+import inspect
+import json
+import re
+from typing import Any, Callable, Dict, Iterable, List, Union, get_args, get_origin
+
+from .config import TOOL_HIDDEN_PARAMS
+
+
+# 函数调用模式的系统提示词：工具说明由 tools 字段提供，不需要行动格式说明
+FUNCTION_CALLING_PROMPT = (
+    "你是一个智能旅行助手。请根据用户的请求调用工具收集信息，"
+    "互不依赖的查询可以同时调用多个工具。信息足够时直接用中文给出最终答案。"
+)
+
+_JSON_TYPES = {
+    str: "string",
+    int: "integer",
+    float: "number",
+    bool: "boolean",
+    list: "array",
+    dict: "object",
+}
+
+
+def _json_type(annotation: Any) -> Dict[str, Any]:
+    """类型注解对应的 JSON Schema，List[str] 这样的泛型带上元素类型"""
+    origin = get_origin(annotation)
+    if origin in (list, tuple, set):
+        items = get_args(annotation)
+        return {"type": "array", "items": _json_type(items[0]) if items else {"type": "string"}}
+    if origin is dict:
+        return {"type": "object"}
+    return {"type": _JSON_TYPES.get(annotation, "string")}
+
+
+# 文档字符串 Args: 段落中的 "name: 描述" 行
+_ARG_LINE = re.compile(r"^\s*(\w+)\s*(?:\([^)]*\))?\s*[:：]\s*(.+?)\s*$")
+_SECTION = re.compile(r"^\s*(?:Args|Arguments|Returns|Raises|Yields)\s*[:：]\s*$")
+
+
+def _parse_doc(doc: str) -> tuple:
+    """
+    解析文档字符串
+
+    Returns:
+        (函数说明, {参数名: 参数说明})
+    """
+    if not doc:
+        return "", {}
+    lines = inspect.cleandoc(doc).splitlines()
+    summary = lines[0].strip() if lines else ""
+    params = {}
+    in_args = False
+    for line in lines[1:]:
+        if _SECTION.match(line):
+            in_args = line.strip().rstrip(":：") in ("Args", "Arguments")
+            continue
+        if in_args:
+            match = _ARG_LINE.match(line)
+            if match:
+                params[match.group(1)] = match.group(2)
+    return summary, params
+
+
+def tool_schema(name: str, fn: Callable, exclude: Iterable[str] = None) -> Dict[str, Any]:
+    """
+    根据函数签名生成工具的 JSON Schema
+
+    参数类型取自类型注解（缺省为 string），没有默认值的参数为必填，
+    函数说明和参数说明取自文档字符串的首行和 Args 段落。
+
+    Args:
+        name: 工具名称
+        fn: 工具函数
+        exclude: 不向模型暴露的参数（必须有默认值），默认取自 TOOL_HIDDEN_PARAMS
+
+    Returns:
+        OpenAI 格式的 {"type": "function", "function": {...}}
+
+    Raises:
+        ValueError: 排除了没有默认值的参数
+    """
+    summary, docs = _parse_doc(inspect.getdoc(fn))
+    hidden = set(TOOL_HIDDEN_PARAMS.get(name, ()) if exclude is None else exclude)
+    properties = {}
+    required = []
+    for param in inspect.signature(fn).parameters.values():
+        if param.kind in (param.VAR_POSITIONAL, param.VAR_KEYWORD):
+            continue
+        if param.name in hidden:
+            if param.default is param.empty:
+                raise ValueError(f"工具 {name} 的必填参数 {param.name} 不能隐藏")
+            continue
+        prop = _json_type(param.annotation)
+        if param.name in docs:
+            prop["description"] = docs[param.name]
+        properties[param.name] = prop
+        if param.default is param.empty:
+            required.append(param.name)
+    return {
+        "type": "function",
+        "function": {
+            "name": name,
+            "description": summary or name,
+            "parameters": {"type": "object", "properties": properties, "required": required},
+        },
+    }
+
+
+def build_tool_schemas(tools: Dict[str, Callable]) -> List[Dict[str, Any]]:
+    """
+    生成工具注册表的全部 Schema
+
+    Args:
+        tools: {工具名称: 工具函数}
+
+    Returns:
+        可直接作为请求 tools 字段的列表
+    """
+    return [tool_schema(name, fn) for name, fn in tools.items()]
+
+
+def parse_arguments(arguments: Union[str, Dict[str, Any], None]) -> Dict[str, Any]:
+    """
+    解析工具调用的参数
+
+    Args:
+        arguments: 模型返回的 JSON 字符串，部分兼容接口直接返回已解析的对象
+
+    Returns:
+        参数字典
+
+    Raises:
+        ValueError: 不是合法的 JSON 对象
+    """
+    if isinstance(arguments, dict):
+        return arguments
+    if arguments is None:
+        return {}
+    if not isinstance(arguments, str):
+        raise ValueError(f"参数必须是JSON字符串或对象，收到 {type(arguments).__name__}")
+    if not arguments.strip():
+        return {}
+    value = json.loads(arguments)
+    if not isinstance(value, dict):
+        raise ValueError("参数必须是JSON对象")
+    return value
+
+
+def format_call(call: Dict[str, Any]) -> str:
+    """
+    把工具调用格式化为与 ReAct 模式一致的动作字符串，用于对话记录和打印
+
+    Args:
+        call: OpenAI 格式的工具调用
+
+    Returns:
+        形如 get_weather(city="北京") 的字符串
+    """
+    function = call["function"]
+    try:
+        args = parse_arguments(function.get("arguments", ""))
+    except ValueError:
+        return f"{function['name']}({function.get('arguments', '')})"
+    return format_action(function["name"], args)
+
+
+def format_action(name: str, kwargs: Dict[str, Any]) -> str:
+    """
+    把工具名称和关键字参数格式化为 ReAct 动作字符串
+
+    Args:
+        name: 工具名称
+        kwargs: 关键字参数
+
+    Returns:
+        形如 get_weather(city="北京") 的字符串
+    """
+    rendered = ", ".join(f"{k}={json.dumps(v, ensure_ascii=False)}" for k, v in kwargs.items())
+    return f"{name}({rendered})"
@@ -0,0 +1,245 @@
+"""
+对话历史模块
+以结构化消息列表保存对话，增量追加，保持提示前缀稳定以便服务端复用前缀缓存
+"""
+
+import re
+from typing import Any, Callable, Dict, List, Optional
+
+from .config import DEFAULT_CONFIG
+
+
+# 中日韩字符大致一个字一个token，其余字符大致四个字符一个token
+_CJK = re.compile(r"[\u3000-\u303f\u3400-\u4dbf\u4e00-\u9fff\uff00-\uffef]")
+
+# 每条消息的固定开销（角色标记等）
+_MESSAGE_OVERHEAD = 4
+
+_SUMMARY_HEADER = "较早的对话摘要:"
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    粗略估计文本的token数
+
+    Args:
+        text: 文本
+
+    Returns:
+        估计的token数
+    """
+    if not text:
+        return 0
+    cjk = len(_CJK.findall(text))
+    return cjk + (len(text) - cjk + 3) // 4
+
+
+def _message_text(message: Dict[str, Any]) -> str:
+    """消息的文本形式，函数调用模式的工具调用和工具结果转换为 Action/Observation 行"""
+    content = message.get("content") or ""
+    if message["role"] == "tool":
+        return f"Observation: {content}"
+    calls = message.get("tool_calls")
+    if calls:
+        actions = [f"Action: {c['function']['name']}({c['function'].get('arguments', '')})" for c in calls]
+        return "\n".join([content] + actions if content else actions)
+    return content
+
+
+def summarize_messages(messages: List[Dict[str, Any]], max_chars: int = 80) -> str:
+    """
+    将较早的消息压缩为摘要：保留思考和动作，观察结果只保留开头
+
+    Args:
+        messages: 待压缩的消息
+        max_chars: 每行保留的最大字符数
+
+    Returns:
+        摘要文本
+    """
+    lines = []
+    for message in messages:
+        for line in _message_text(message).splitlines():
+            line = line.strip()
+            if not line or line == _SUMMARY_HEADER:
+                continue
+            if len(line) > max_chars:
+                line = line[:max_chars] + "…"
+            lines.append(line)
+            # 观察结果只保留第一行
+            if line.startswith("Observation:"):
+                break
+    return _SUMMARY_HEADER + "\n" + "\n".join(lines)
+
+
+class ConversationHistory:
+    """
+    结构化对话历史
+
+    消息按 system / user / assistant / observation 顺序增量追加，
+    函数调用模式下 observation 为带 tool_call_id 的 tool 消息。
+    只有超过 token 预算时才压缩较早的消息，且一次压缩到预算的
+    compact_ratio 以下，避免每一轮都改变提示前缀。
+    带摘要的观察结果在之后又有 keep_observations 轮助手消息时替换为摘要。
+    """
+
+    def __init__(self, system_prompt: str = "",
+                 max_prompt_tokens: int = None,
+                 keep_recent: int = None,
+                 compact_ratio: float = 0.6,
+                 summarizer: Optional[Callable[[List[Dict[str, str]]], str]] = None,
+                 keep_observations: int = None):
+        """
+        初始化对话历史
+
+        Args:
+            system_prompt: 系统提示词
+            max_prompt_tokens: 提示的token预算，None表示不限制
+            keep_recent: 压缩时始终保留的最近消息数
+            compact_ratio: 压缩后的目标token数占预算的比例
+            summarizer: 摘要函数，默认使用 summarize_messages
+            keep_observations: 观察结果保留完整形式的助手轮数
+        """
+        self.max_prompt_tokens = max_prompt_tokens
+        self.keep_recent = keep_recent if keep_recent is not None else DEFAULT_CONFIG["history_keep_recent"]
+        self.compact_ratio = compact_ratio
+        self.summarizer = summarizer or summarize_messages
+        self.keep_observations = (keep_observations if keep_observations is not None
+                                  else DEFAULT_CONFIG["observation_keep_recent"])
+        self.compactions = 0
+        # 通过 messages() 发送出去的估计token总数
+        self.sent_tokens = 0
+        self._messages: List[Dict[str, str]] = []
+        self._tokens: List[int] = []
+        # 观察结果尚未替换的摘要，其他消息为 None
+        self._summaries: List[Optional[str]] = []
+        self._pending = 0
+        self._total = 0
+        if system_prompt:
+            self._append("system", system_prompt)
+
+    def __len__(self) -> int:
+        return len(self._messages)
+
+    @property
+    def total_chars(self) -> int:
+        """所有消息内容的字符数"""
+        return sum(len(_message_text(m)) for m in self._messages)
+
+    @property
+    def total_tokens(self) -> int:
+        """当前提示的估计token数"""
+        return self._total
+
+    def _append(self, role: str, content: str, summary: str = None, **extra):
+        message = {"role": role, "content": content, **extra}
+        tokens = estimate_tokens(_message_text(message) if extra else content) + _MESSAGE_OVERHEAD
+        self._messages.append(message)
+        self._tokens.append(tokens)
+        self._summaries.append(summary)
+        self._total += tokens
+        if summary is not None:
+            self._pending += 1
+        elif role == "assistant" and self._pending:
+            self._summarize_observations()
+
+    def _summarize_observations(self):
+        """把之后已有 keep_observations 轮助手消息的观察结果替换为摘要"""
+        turns = 0
+        for i in range(len(self._messages) - 1, -1, -1):
+            role = self._messages[i]["role"]
+            if role == "assistant":
+                turns += 1
+            elif turns >= self.keep_observations and self._summaries[i] is not None:
+                content = self._summaries[i]
+                self._summaries[i] = None
+                self._pending -= 1
+                if role == "user":
+                    content = f"Observation: {content}"
+                message = dict(self._messages[i], content=content)
+                tokens = estimate_tokens(_message_text(message)) + _MESSAGE_OVERHEAD
+                self._messages[i] = message
+                self._total += tokens - self._tokens[i]
+                self._tokens[i] = tokens
+
+    def add_user(self, content: str):
+        """追加用户消息"""
+        self._append("user", content)
+
+    def add_assistant(self, content: str, tool_calls: List[Dict[str, Any]] = None):
+        """
+        追加助手消息
+
+        Args:
+            content: 消息内容
+            tool_calls: 函数调用模式下的工具调用（OpenAI 格式）
+        """
+        if tool_calls:
+            self._append("assistant", content or None, tool_calls=tool_calls)
+        else:
+            self._append("assistant", content)
+
+    def add_observation(self, content: str, summary: str = None):
+        """
+        追加工具观察结果（以用户消息发送）
+
+        Args:
+            content: 观察结果
+            summary: 较早轮次使用的摘要，None表示始终保留原文
+        """
+        self._append("user", f"Observation: {content}", summary=summary)
+
+    def add_tool_result(self, tool_call_id: str, content: str, summary: str = None):
+        """追加函数调用模式下的工具结果，summary 含义同 add_observation"""
+        self._append("tool", content, summary=summary, tool_call_id=tool_call_id)
+
+    def messages(self) -> List[Dict[str, str]]:
+        """
+        获取发送给LLM的消息列表，超出预算时先压缩
+
+        Returns:
+            消息列表的浅拷贝
+        """
+        if self.max_prompt_tokens and self._total > self.max_prompt_tokens:
+            self._compact()
+        self.sent_tokens += self._total
+        return list(self._messages)
+
+    def _compact(self):
+        """将较早的消息合并为一条摘要，直到低于目标token数"""
+        # 系统提示和第一条用户请求始终保留
+        head = 0
+        while head < len(self._messages) and self._messages[head]["role"] == "system":
+            head += 1
+        head += 1
+        tail = max(head, len(self._messages) - self.keep_recent)
+        if tail <= head:
+            return
+
+        target = int(self.max_prompt_tokens * self.compact_ratio)
+        end = head
+        remaining = self._total
+        while end < tail and remaining > target:
+            remaining -= self._tokens[end]
+            end += 1
+        if end == head:
+            return
+        # 工具结果必须紧跟对应的工具调用，不能与之分开
+        while end < len(self._messages) and self._messages[end]["role"] == "tool":
+            remaining -= self._tokens[end]
+            end += 1
+
+        # 之前的摘要会被一起压缩，摘要本身过长时只保留最近的部分
+        summary = self.summarizer(self._messages[head:end])
+        budget = max(target - remaining, 0)
+        lines = summary.splitlines()
+        while len(lines) > 1 and estimate_tokens("\n".join(lines)) + _MESSAGE_OVERHEAD > budget:
+            del lines[1]
+        summary = "\n".join(lines)
+        tokens = estimate_tokens(summary) + _MESSAGE_OVERHEAD
+        self._messages[head:end] = [{"role": "user", "content": summary}]
+        self._tokens[head:end] = [tokens]
+        self._pending -= sum(1 for summary in self._summaries[head:end] if summary is not None)
+        self._summaries[head:end] = [None]
+        self._total = sum(self._tokens)
+        self.compactions += 1
@@ -0,0 +1,99 @@
+"""
+HTTP 连接池模块
+为客户端和工具函数提供可复用的 keep-alive 会话
+"""
+
+import threading
+from typing import Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from .config import DEFAULT_CONFIG
+
+
+def create_session(pool_connections: int = None,
+                   pool_maxsize: int = None,
+                   max_retries: int = None,
+                   backoff_factor: float = None,
+                   keep_alive: bool = True) -> requests.Session:
+    """
+    创建带连接池的会话
+
+    Args:
+        pool_connections: 缓存的主机连接池数量
+        pool_maxsize: 每个主机连接池的最大连接数
+        max_retries: 连接失败时的重试次数
+        backoff_factor: 重试退避系数
+        keep_alive: 是否复用连接
+
+    Returns:
+        配置好的 requests.Session
+    """
+    pool_connections = pool_connections or DEFAULT_CONFIG["pool_connections"]
+    pool_maxsize = pool_maxsize or DEFAULT_CONFIG["pool_maxsize"]
+    if max_retries is None:
+        max_retries = DEFAULT_CONFIG["max_retries"]
+    if backoff_factor is None:
+        backoff_factor = DEFAULT_CONFIG["retry_backoff_factor"]
+
+    # 只对连接阶段的错误重试，避免重复提交已发送的POST请求
+    retry = Retry(
+        total=max_retries,
+        connect=max_retries,
+        read=0,
+        status=0,
+        backoff_factor=backoff_factor,
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(
+        pool_connections=pool_connections,
+        pool_maxsize=pool_maxsize,
+        max_retries=retry,
+    )
+
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    if not keep_alive:
+        session.headers["Connection"] = "close"
+    return session
+
+
+_shared_session: Optional[requests.Session] = None
+_shared_lock = threading.Lock()
+
+
+def get_shared_session() -> requests.Session:
+    """
+    获取进程内共享的会话（工具函数默认使用）
+
+    Returns:
+        共享的 requests.Session
+    """
+    global _shared_session
+    if _shared_session is None:
+        with _shared_lock:
+            if _shared_session is None:
+                _shared_session = create_session()
+    return _shared_session
+
+
+def set_shared_session(session: Optional[requests.Session]):
+    """
+    替换共享会话
+
+    Args:
+        session: 新的会话，传入None时下次使用会重新创建
+    """
+    global _shared_session
+    with _shared_lock:
+        old, _shared_session = _shared_session, session
+    if old is not None and old is not session:
+        old.close()
+
+
+def close_shared_session():
+    """关闭共享会话"""
+    set_shared_session(None)
@@ -0,0 +1,299 @@
+"""
+知识库模块
+景点和酒店数据从打包的 JSON 文件加载一次，预先按 (城市, 天气类型) 和 (城市, 预算)
+建立索引；天气关键词编译为单个正则。文件修改后自动热加载，无需重启进程。
+"""
+
+import json
+import os
+import re
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+from .config import DEFAULT_CONFIG
+from .observations import ToolResult
+
+
+DEFAULT_KNOWLEDGE_PATH = os.path.join(os.path.dirname(__file__), "data", "knowledge.json")
+
+# 无法识别天气时使用的类型
+GENERAL_WEATHER = "一般"
+
+# 天气描述的取值很少，缓存分类结果；超过上限时整体清空
+_MEMO_SIZE = 4096
+
+
+class WeatherMatcher:
+    """
+    天气描述分类器
+
+    所有关键词编译为一个正则，一遍扫描后取优先级最高（配置中靠前）的天气类型，
+    与逐类型判断 any(k in text ...) 的结果一致。
+    """
+
+    def __init__(self, weather_types: Dict[str, List[str]]):
+        """
+        初始化分类器
+
+        Args:
+            weather_types: 天气类型到关键词列表的映射，按优先级排列
+        """
+        self._types = list(weather_types)
+        self._priority = {}
+        for priority, keywords in enumerate(weather_types.values()):
+            for keyword in keywords:
+                self._priority.setdefault(keyword.lower(), priority)
+        # 长关键词优先，避免被其前缀抢先匹配
+        keywords = sorted(self._priority, key=len, reverse=True)
+        self._pattern = re.compile("|".join(map(re.escape, keywords))) if keywords else None
+        self._memo: Dict[str, str] = {}
+
+    def classify(self, weather: Optional[str]) -> str:
+        """
+        识别天气类型
+
+        Args:
+            weather: 天气描述（中文或英文）
+
+        Returns:
+            天气类型，无法识别时返回 "一般"
+        """
+        if not weather or self._pattern is None:
+            return GENERAL_WEATHER
+        result = self._memo.get(weather)
+        if result is None:
+            if len(self._memo) >= _MEMO_SIZE:
+                self._memo.clear()
+            result = self._memo[weather] = self._classify(weather)
+        return result
+
+    def _classify(self, weather: str) -> str:
+        best = None
+        for match in self._pattern.finditer(weather.lower()):
+            priority = self._priority[match.group()]
+            if best is None or priority < best:
+                best = priority
+                if best == 0:
+                    break
+        return GENERAL_WEATHER if best is None else self._types[best]
+
+
+class KnowledgeIndex:
+    """
+    一份不可变的知识库快照，所有回复文本在加载时预先生成
+    """
+
+    def __init__(self, data: dict):
+        """
+        根据原始数据建立索引
+
+        Args:
+            data: knowledge.json 的内容
+        """
+        self.version = data.get("version")
+        self.matcher = WeatherMatcher(data.get("weather_types", {}))
+        self.attractions: Dict[tuple, str] = {}
+        self.hotels: Dict[tuple, str] = {}
+
+        weather_types = list(data.get("weather_types", {})) + [GENERAL_WEATHER]
+        fallback = data.get("weather_fallback", {})
+        for city, by_weather in data.get("attractions", {}).items():
+            first = next(iter(by_weather), None)
+            for weather_type in weather_types:
+                if weather_type in by_weather:
+                    self.attractions[(city, weather_type)] = _attraction_result(
+                        f"根据{weather_type}天气，为您推荐{city}的景点:\n\n",
+                        city, weather_type, by_weather[weather_type],
+                    )
+                    continue
+                source = fallback.get(weather_type)
+                if source not in by_weather:
+                    source = first
+                if source is not None:
+                    self.attractions[(city, weather_type)] = _attraction_result(
+                        f"为您推荐{city}的景点:\n\n", city, source, by_weather[source],
+                    )
+
+        titles = data.get("budget_titles", {})
+        defaults = data.get("default_hotels", {})
+        for city, by_budget in data.get("hotels", {}).items():
+            for budget, title in titles.items():
+                names = by_budget.get(budget) or defaults.get(budget)
+                if names:
+                    self.hotels[(city, budget)] = ToolResult(
+                        _numbered(f"{title}:", names),
+                        {"city": city, "budget": budget, "hotels": list(names)},
+                        summary=f"{city}{title}: " + "、".join(names),
+                    )
+
+        self.cities = frozenset(city for city, _ in self.attractions) | frozenset(
+            city for city, _ in self.hotels)
+
+
+def _attraction_result(intro: str, city: str, weather_type: str, items: List[str]) -> ToolResult:
+    """生成景点推荐结果，摘要只保留景点名称"""
+    return ToolResult(
+        intro + _numbered(f"{city}{weather_type}推荐景点:", items),
+        {"city": city, "weather_type": weather_type, "attractions": list(items)},
+        summary=f"{city}{weather_type}景点: " + "、".join(item.split(" - ")[0] for item in items),
+    )
+
+
+def _numbered(title: str, items: List[str]) -> str:
+    """生成带编号的列表文本"""
+    return title + "".join(f"\n{i}. {item}" for i, item in enumerate(items, 1))
+
+
+def load_index(path: str) -> KnowledgeIndex:
+    """
+    从 JSON 文件加载知识库
+
+    Args:
+        path: 文件路径
+
+    Returns:
+        KnowledgeIndex
+    """
+    with open(path, encoding="utf-8") as f:
+        return KnowledgeIndex(json.load(f))
+
+
+class KnowledgeStore:
+    """
+    支持热加载的知识库
+
+    查询时最多每 check_interval 秒检查一次文件修改时间，文件变化后由发现变化的
+    线程重新建立索引并整体替换，其余线程期间继续使用旧索引；加载失败时保留旧索引。
+    """
+
+    def __init__(self, path: str = None, check_interval: float = None,
+                 clock: Callable[[], float] = time.monotonic):
+        """
+        初始化知识库
+
+        Args:
+            path: 知识库文件路径，默认使用打包的 data/knowledge.json
+            check_interval: 检查文件修改的间隔（秒），0表示每次查询都检查
+            clock: 时钟函数，便于测试
+        """
+        self.path = path or DEFAULT_CONFIG["knowledge_path"] or DEFAULT_KNOWLEDGE_PATH
+        self.check_interval = (check_interval if check_interval is not None
+                               else DEFAULT_CONFIG["knowledge_reload_interval"])
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._mtime = os.stat(self.path).st_mtime_ns
+        self._index = load_index(self.path)
+        self._next_check = clock() + self.check_interval
+        self.reloads = 0
+        self.last_error: Optional[Exception] = None
+
+    @property
+    def index(self) -> KnowledgeIndex:
+        """当前索引"""
+        if self._clock() >= self._next_check:
+            self._check()
+        return self._index
+
+    def classify_weather(self, weather: Optional[str]) -> str:
+        """识别天气类型"""
+        return self.index.matcher.classify(weather)
+
+    def attraction(self, city: str, weather_type: str = GENERAL_WEATHER) -> Optional[str]:
+        """
+        查询景点推荐
+
+        Args:
+            city: 规范化后的城市名
+            weather_type: 天气类型
+
+        Returns:
+            推荐文本，城市不在知识库中时返回 None
+        """
+        return self.index.attractions.get((city, weather_type))
+
+    def hotel(self, city: str, budget: str) -> Optional[str]:
+        """
+        查询酒店推荐
+
+        Args:
+            city: 规范化后的城市名
+            budget: 预算（经济/中等/豪华）
+
+        Returns:
+            推荐文本，没有数据时返回 None
+        """
+        return self.index.hotels.get((city, budget))
+
+    def reload(self) -> bool:
+        """
+        立即重新加载知识库
+
+        Returns:
+            是否加载成功
+        """
+        with self._lock:
+            return self._reload_locked()
+
+    def _check(self):
+        """文件修改时间变化时重新加载"""
+        if not self._lock.acquire(blocking=False):
+            # 其他线程正在检查，继续使用当前索引
+            return
+        try:
+            if self._clock() < self._next_check:
+                return
+            self._next_check = self._clock() + self.check_interval
+            try:
+                mtime = os.stat(self.path).st_mtime_ns
+            except OSError as e:
+                self.last_error = e
+                return
+            if mtime != self._mtime:
+                self._reload_locked()
+        finally:
+            self._lock.release()
+
+    def _reload_locked(self) -> bool:
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+            index = load_index(self.path)
+        except (OSError, ValueError) as e:
+            self.last_error = e
+            return False
+        self._index = index
+        self._mtime = mtime
+        self.reloads += 1
+        self.last_error = None
+        return True
+
+
+_knowledge: Optional[KnowledgeStore] = None
+_knowledge_lock = threading.Lock()
+
+
+def get_knowledge() -> KnowledgeStore:
+    """
+    获取进程内共享的知识库
+
+    Returns:
+        共享的 KnowledgeStore
+    """
+    global _knowledge
+    if _knowledge is None:
+        with _knowledge_lock:
+            if _knowledge is None:
+                _knowledge = KnowledgeStore()
+    return _knowledge
+
+
+def set_knowledge(store: Optional[KnowledgeStore]):
+    """
+    替换共享的知识库
+
+    Args:
+        store: 新的知识库，传入None时下次使用会重新加载默认文件
+    """
+    global _knowledge
+    with _knowledge_lock:
+        _knowledge = store
@@ -0,0 +1,99 @@
+"""
+观察结果压缩模块
+工具在可读文本之外返回结构化数据，智能体把紧凑的规范形式发送给模型，
+较早轮次的观察结果进一步替换为一行摘要
+"""
+
+import re
+from typing import Any, Dict, Optional
+
+
+class ToolResult(str):
+    """
+    带结构化数据的工具结果
+
+    本身就是原来的可读文本，现有调用方不受影响；data 为结构化数据，
+    summary 为一行摘要。
+    """
+
+    def __new__(cls, text: str, data: Dict[str, Any] = None, summary: str = None):
+        result = super().__new__(cls, text)
+        result.data = data
+        result.summary = summary
+        return result
+
+    def __reduce__(self):
+        return ToolResult, (str(self), self.data, self.summary)
+
+
+# 表情符号和变体选择符，只起装饰作用
+_DECORATION = re.compile("[\u2300-\u23ff\u2600-\u27bf\u2b00-\u2bff\ufe0f\u200d\U0001f000-\U0001faff]+")
+
+_SUMMARY_CHARS = 60
+
+
+def _value(value: Any) -> str:
+    if isinstance(value, (list, tuple)):
+        return "、".join(map(str, value))
+    return str(value)
+
+
+def _clean(text: str) -> str:
+    """去掉装饰字符、行首缩进和空行"""
+    lines = (_DECORATION.sub("", line).strip() for line in text.splitlines())
+    return "\n".join(line for line in lines if line)
+
+
+class ObservationCompactor:
+    """
+    默认的观察结果压缩器
+
+    ToolResult 压缩为一行 key=value（列表以顿号连接，比 JSON 少了引号和括号），
+    普通文本去掉装饰字符和空行；
+    摘要优先使用工具提供的 summary，否则取第一行。需要其他格式时继承并覆盖
+    compact / summarize。
+    """
+
+    def compact(self, observation: str) -> str:
+        """
+        生成发送给模型的紧凑形式
+
+        Args:
+            observation: 工具结果
+
+        Returns:
+            紧凑文本
+        """
+        data = getattr(observation, "data", None)
+        if data is not None:
+            return " ".join(f"{k}={_value(v)}" for k, v in data.items())
+        return _clean(observation)
+
+    def summarize(self, observation: str) -> str:
+        """
+        生成较早轮次使用的一行摘要
+
+        Args:
+            observation: 工具结果
+
+        Returns:
+            摘要文本
+        """
+        summary = getattr(observation, "summary", None)
+        if summary:
+            return summary
+        text = _clean(observation)
+        first = text.split("\n", 1)[0]
+        if len(first) > _SUMMARY_CHARS or "\n" in text:
+            first = first[:_SUMMARY_CHARS] + "…"
+        return first
+
+
+class VerbatimCompactor(ObservationCompactor):
+    """原样发送观察结果，也不生成摘要（压缩前的行为）"""
+
+    def compact(self, observation: str) -> str:
+        return str(observation)
+
+    def summarize(self, observation: str) -> Optional[str]:
+        return None
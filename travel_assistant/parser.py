@@ -0,0 +1,349 @@
+"""
+ReAct 输出解析模块
+预编译的单遍解析器，解析 Thought / Action / finish，支持中英文标签和带引号的参数
+"""
+
+import re
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+
+# 单个预编译正则一次扫描出所有思考和动作，标签只在行首识别（参数中的 "action:" 不是标签）
+_TOKEN = re.compile(
+    r"^[ \t]*(?:(?:thought|思考)[ \t]*[:：]\s*(?P<thought>[^\n]*)"
+    r"|(?:action|行动)[ \t]*[:：][ \t]*(?P<action>[^\n]*))",
+    re.IGNORECASE | re.MULTILINE,
+)
+# 常见的简单调用 tool(key="value", ...) 走快速路径
+_SIMPLE_CALL = re.compile(r"""(\w+)\s*\(((?:\s*\w+\s*=\s*(?:"[^"\\\n]*"|'[^'\\\n]*')\s*,?)*)\s*\)""")
+_SIMPLE_PAIR = re.compile(r"""(\w+)\s*=\s*(?:"([^"\\\n]*)"|'([^'\\\n]*)')""")
+_INLINE_ACTION = re.compile(r"(?:action|行动)[ \t]*[:：][ \t]*", re.IGNORECASE)
+_CALL_HEAD = re.compile(r"\s*(\w+)\s*\(")
+_KEY = re.compile(r"\s*(\w+)\s*=\s*")
+_CALL_SPECIAL = re.compile(r"[()\"']")
+_STRING_STOP = {'"': re.compile(r'["\\]'), "'": re.compile(r"['\\]")}
+_AFTER_QUOTE = re.compile(r"[ \t\r\n]*")
+_ARG_SEP = re.compile(r"[\s,]*")
+_BARE_STOP = re.compile(r"[(),]")
+_LIST_STOP = re.compile(r"[,\]]")
+_ESCAPES = {"n": "\n", "t": "\t", "r": "\r", "\\": "\\", '"': '"', "'": "'"}
+
+
+class ParseError(ValueError):
+    """动作字符串无法解析"""
+
+
+@dataclass
+class Action:
+    """
+    解析后的动作
+
+    Attributes:
+        name: 工具名称，finish 动作为 "finish"
+        args: 位置参数
+        kwargs: 关键字参数
+        raw: 原始动作字符串
+    """
+    name: str
+    args: List[Any] = field(default_factory=list)
+    kwargs: Dict[str, Any] = field(default_factory=dict)
+    raw: str = ""
+
+    @property
+    def is_finish(self) -> bool:
+        return self.name.lower() == "finish"
+
+    @property
+    def answer(self) -> Optional[str]:
+        """finish 动作的最终答案"""
+        if not self.is_finish:
+            return None
+        if "answer" in self.kwargs:
+            return str(self.kwargs["answer"])
+        if self.args:
+            return str(self.args[0])
+        return ""
+
+
+@dataclass
+class ParsedOutput:
+    """
+    解析后的 LLM 输出
+
+    Attributes:
+        thought: 思考内容
+        actions: 按出现顺序排列的原始动作字符串
+    """
+    thought: Optional[str] = None
+    actions: List[str] = field(default_factory=list)
+
+
+def _scan_string(text: str, pos: int, quote: str, partial: bool = False) -> tuple:
+    """
+    扫描引号字符串，返回 (值, 结束位置)
+
+    只有后面紧跟逗号、右括号或右方括号的引号才视为结束引号，
+    因此未转义的内嵌引号（如 "他说"你好""）也能正确处理。
+    """
+    stop = _STRING_STOP[quote]
+    parts = []
+    n = len(text)
+    i = pos
+    while True:
+        match = stop.search(text, i)
+        if match is None:
+            return None, -1
+        j = match.start()
+        parts.append(text[i:j])
+        if text[j] == "\\":
+            if j + 1 >= n:
+                return None, -1
+            nxt = text[j + 1]
+            parts.append(_ESCAPES.get(nxt, "\\" + nxt))
+            i = j + 2
+            continue
+        after = _AFTER_QUOTE.match(text, j + 1)
+        if after.end() < n:
+            if text[after.end()] in ",)]":
+                return "".join(parts), j + 1
+        elif not partial:
+            return "".join(parts), j + 1
+        parts.append(quote)
+        i = j + 1
+
+
+def starts_call(text: str) -> bool:
+    """判断文本是否以函数调用开头，例如 get_weather("""
+    return _CALL_HEAD.match(text) is not None
+
+
+def find_call_end(text: str, pos: int = 0, partial: bool = False) -> int:
+    """
+    查找函数调用的右括号位置（忽略引号中的括号）
+
+    Args:
+        text: 文本
+        pos: 函数调用在文本中的起始位置
+        partial: 文本是否可能尚未结束（流式输出），为True时末尾的引号不视为闭合
+
+    Returns:
+        右括号之后的位置，调用不完整时返回 -1
+    """
+    head = _CALL_HEAD.match(text, pos)
+    if not head:
+        return -1
+    depth = 1
+    i = head.end()
+    while True:
+        match = _CALL_SPECIAL.search(text, i)
+        if match is None:
+            return -1
+        i = match.start()
+        ch = text[i]
+        if ch == "(":
+            depth += 1
+        elif ch == ")":
+            depth -= 1
+            if depth == 0:
+                return i + 1
+        elif _quote_starts_value(text, i):
+            # 只有出现在参数值开头的引号才开始字符串，避免 Xi'an 这样的撇号
+            _, i = _scan_string(text, i + 1, ch, partial)
+            if i < 0:
+                return -1
+            continue
+        i += 1
+
+
+def _quote_starts_value(text: str, pos: int) -> bool:
+    """判断引号前面（忽略空白）是否为 ( , = [ 之一"""
+    j = pos - 1
+    while j >= 0 and text[j] in " \t\r\n":
+        j -= 1
+    return j >= 0 and text[j] in "(,=["
+
+
+def parse_output(llm_output: str) -> ParsedOutput:
+    """
+    单遍解析 LLM 输出
+
+    思考内容从标签开始到下一个标签或行尾；动作内容到行尾，
+    如果是括号跨行的函数调用（例如多行的 finish 答案）则到括号闭合为止。
+    与流式解析一致，已有动作之后出现 Thought/Action 以外的内容（例如模型自行编造的
+    Observation）或识别出 finish 时停止，后面的动作不执行。
+
+    Args:
+        llm_output: LLM原始输出
+
+    Returns:
+        ParsedOutput
+    """
+    result = ParsedOutput()
+    last_end = 0
+    for match in _TOKEN.finditer(llm_output):
+        if match.start() < last_end:
+            # 跨行调用内部的行
+            continue
+        if result.actions and llm_output[last_end:match.start()].strip():
+            break
+        body = match.group("action")
+        if body is None:
+            thought = match.group("thought")
+            # 思考和动作写在同一行时拆开
+            inline = _INLINE_ACTION.search(thought)
+            if inline is not None:
+                body = thought[inline.end():]
+                thought = thought[:inline.start()]
+            if result.thought is None:
+                result.thought = thought.strip()
+            if body is None:
+                last_end = match.end()
+                continue
+            start = match.start("thought") + inline.end()
+            end = match.end("thought")
+        else:
+            start = match.start("action")
+            end = match.end("action")
+
+        # 本行括号未闭合时，调用可能跨行
+        if body.count("(") > body.count(")"):
+            call_end = find_call_end(llm_output, start)
+            if call_end > end:
+                body = llm_output[start:call_end]
+                line_end = llm_output.find("\n", call_end)
+                end = line_end if line_end >= 0 else len(llm_output)
+        last_end = end
+        body = body.strip()
+        if body:
+            result.actions.append(body)
+            if body.lower().startswith("finish"):
+                break
+    return result
+
+
+def _parse_call(text: str, pos: int, action: Action) -> int:
+    """
+    从参数列表开头单遍解析参数，直到右括号
+
+    Args:
+        text: 动作字符串
+        pos: 左括号之后的位置
+        action: 写入参数的 Action
+
+    Returns:
+        右括号之后的位置，调用不完整时返回 -1
+    """
+    n = len(text)
+    i = pos
+    while True:
+        sep = _ARG_SEP.match(text, i)
+        i = sep.end()
+        if i >= n:
+            return -1
+        if text[i] == ")":
+            return i + 1
+        key = None
+        key_match = _KEY.match(text, i)
+        if key_match:
+            key = key_match.group(1)
+            i = key_match.end()
+        if i < n and text[i] in "\"'":
+            value, i = _scan_string(text, i + 1, text[i])
+            if i < 0:
+                return -1
+        elif i < n and text[i] == "[":
+            value, i = _scan_list(text, i + 1)
+            if i < 0:
+                return -1
+        else:
+            # 未加引号的值到同层的逗号或右括号为止，嵌套括号内的逗号属于值本身
+            start = i
+            depth = 0
+            while True:
+                match = _BARE_STOP.search(text, i)
+                if match is None:
+                    return -1
+                i = match.start()
+                ch = text[i]
+                if ch == "(":
+                    depth += 1
+                elif depth and ch == ")":
+                    depth -= 1
+                elif not depth:
+                    break
+                i += 1
+            value = text[start:i].strip().strip("\"'")
+        if key is None:
+            action.args.append(value)
+        else:
+            action.kwargs[key] = value
+
+
+def _scan_list(text: str, pos: int) -> tuple:
+    """
+    扫描列表参数 [a, "b", 'c']，返回 (字符串列表, 右方括号之后的位置)
+
+    元素可以加引号，也可以不加；不支持嵌套列表。
+    """
+    n = len(text)
+    items = []
+    i = pos
+    while True:
+        i = _ARG_SEP.match(text, i).end()
+        if i >= n:
+            return None, -1
+        if text[i] == "]":
+            return items, i + 1
+        if text[i] in "\"'":
+            item, i = _scan_string(text, i + 1, text[i])
+            if i < 0:
+                return None, -1
+        else:
+            match = _LIST_STOP.search(text, i)
+            if match is None:
+                return None, -1
+            item = text[i:match.start()].strip()
+            i = match.start()
+        items.append(item)
+
+
+def parse_action(action_str: str) -> Action:
+    """
+    解析动作字符串
+
+    支持 tool(key="value", key2='v,2')、列表参数 key=["a", "b"]、位置参数、转义字符，
+    以及 finish 的简化写法（finish: 答案 / finish 答案）。
+
+    Args:
+        action_str: 动作字符串
+
+    Returns:
+        Action
+
+    Raises:
+        ParseError: 无法解析时抛出
+    """
+    text = action_str.strip()
+    action = Action(name="", raw=text)
+
+    simple = _SIMPLE_CALL.fullmatch(text)
+    if simple:
+        action.name = simple.group(1)
+        for key, double, single in _SIMPLE_PAIR.findall(simple.group(2)):
+            action.kwargs[key] = double or single
+        return action
+
+    head = _CALL_HEAD.match(text)
+    if head and _parse_call(text, head.end(), action) > 0:
+        action.name = head.group(1)
+        return action
+    action.args.clear()
+    action.kwargs.clear()
+
+    if text.lower().startswith("finish"):
+        # 简化的finish格式
+        action.name = "finish"
+        action.args.append(text[6:].strip().lstrip(":：").strip('()"\' \n'))
+        return action
+
+    raise ParseError(f"无法解析动作 '{action_str}'")
@@ -0,0 +1,354 @@
+"""
+计划模板缓存模块
+按规范化的请求形状（城市、预算抽象为槽位）记录成功运行的动作序列，
+再次遇到同形状的请求时直接按模板执行工具，只调用一次 LLM 生成最终答案
+"""
+
+import json
+import re
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+from .cache import TTLCache, normalize_city
+from .config import DEFAULT_CONFIG
+from .prefetch import find_budget, find_cities
+
+
+# 规范化形状时去掉的空白和标点
+_NOISE = re.compile(r"[\s，。！？、,.!?;；:：~～]+")
+
+# 工具返回的失败结果，含失败步骤的运行不记录，重放时视为失败
+FAILURE_PREFIXES = ("错误", "❌", "⚠️", "⏰")
+
+
+def query_shape(query: str) -> Tuple[str, Dict[str, str]]:
+    """
+    计算请求形状
+
+    已知城市按出现顺序替换为 {city0}、{city1}，预算关键词替换为 {budget}，
+    再去掉空白和标点、转为小写。
+
+    Args:
+        query: 用户请求
+
+    Returns:
+        (形状, {槽位名: 值})
+    """
+    slots: Dict[str, str] = {}
+    parts = []
+    last = 0
+    for start, end, city in find_cities(query):
+        name = next((k for k, v in slots.items() if v == city), None)
+        if name is None:
+            name = f"city{len(slots)}"
+            slots[name] = city
+        parts.append(query[last:start])
+        parts.append("{" + name + "}")
+        last = end
+    parts.append(query[last:])
+    shape = "".join(parts)
+
+    budget = find_budget(query)
+    if budget is not None:
+        slots["budget"] = budget[0]
+        shape = shape.replace(budget[1], "{budget}")
+    return _NOISE.sub("", shape).lower(), slots
+
+
+def is_failure(observation: str) -> bool:
+    """工具结果是否表示失败"""
+    return observation.startswith(FAILURE_PREFIXES)
+
+
+def _abstract(value: Any, slots: Dict[str, str], observations: List[str]) -> Dict[str, Any]:
+    """
+    把一个参数值抽象为模板参数
+
+    与槽位相同的值记为槽位，全部由槽位组成的列表记为槽位列表；
+    是之前某个观察结果中 "字段: 值" 行的值时记为该字段；其他值原样保留。
+    """
+    if isinstance(value, list) and value:
+        specs = [_abstract(item, slots, []) for item in value]
+        if all("slot" in spec for spec in specs):
+            return {"slots": [spec["slot"] for spec in specs]}
+    if isinstance(value, str):
+        city = normalize_city(value)
+        for name, slot in slots.items():
+            if value == slot or city == slot:
+                return {"slot": name}
+        if value:
+            for index, observation in enumerate(observations):
+                for line in observation.splitlines():
+                    field, sep, rest = line.partition(":")
+                    if sep and field.strip() and value in rest:
+                        return {"obs": index, "field": field.strip()}
+    return {"value": value}
+
+
+def _field(observation: str, field: str) -> Optional[str]:
+    for line in observation.splitlines():
+        name, sep, rest = line.partition(":")
+        if sep and name.strip() == field:
+            return rest.strip()
+    return None
+
+
+class PlanRun:
+    """
+    一次运行的计划记录与重放状态
+    """
+
+    def __init__(self, cache: "PlanCache", shape: str, slots: Dict[str, str], template: Optional[list]):
+        self.cache = cache
+        self.shape = shape
+        self.slots = slots
+        # 可以重放的模板，没有可信模板时为 None
+        self.template = template
+        self.steps: List[List[Tuple[str, Dict[str, Any]]]] = []
+        self.observations: List[str] = []
+        self.replayed = 0
+        self.failed = False
+        # 运行给出最终答案时由智能体设置
+        self.answered = False
+
+    def resolve(self, args: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        用本次请求的槽位和已有观察结果填充模板参数
+
+        Returns:
+            关键字参数，依赖的观察结果中没有对应字段时返回 None
+        """
+        kwargs = {}
+        for name, spec in args.items():
+            if "slot" in spec:
+                value = self.slots.get(spec["slot"])
+            elif "slots" in spec:
+                value = [self.slots.get(n) for n in spec["slots"]]
+                if None in value:
+                    return None
+            elif "obs" in spec:
+                if spec["obs"] >= len(self.observations):
+                    return None
+                value = _field(self.observations[spec["obs"]], spec["field"])
+            else:
+                value = spec["value"]
+            if value is None:
+                return None
+            kwargs[name] = value
+        return kwargs
+
+    def add_step(self, calls: Optional[List[Tuple[str, Dict[str, Any]]]], observations: List[str],
+                 replayed: bool = False):
+        """
+        记录一轮工具调用
+
+        Args:
+            calls: [(工具名称, 关键字参数), ...]，无法抽象的动作传入 None
+            observations: 对应的观察结果
+            replayed: 是否为模板重放的步骤
+        """
+        if calls is None or any(is_failure(o) for o in observations):
+            self.failed = True
+        else:
+            self.steps.append(calls)
+        self.observations.extend(observations)
+        if replayed:
+            self.replayed += 1
+
+    def close(self):
+        """
+        运行结束
+
+        重放的运行只做确认：LLM 没有追加步骤并给出最终答案时计为成功，否则计为失败；
+        正常运行成功完成时记录动作序列。
+        """
+        if self.template is not None:
+            success = self.replayed == len(self.template) and self.answered and not self.failed and len(self.steps) == self.replayed
+            self.cache.feedback(self.shape, success)
+        elif self.answered and not self.failed and self.steps:
+            self.cache.record(self.shape, self.slots, self.steps, self.observations)
+
+
+class PlanCache:
+    """
+    计划模板缓存
+
+    同一形状可能记录到不同的动作序列，出现次数最多的序列至少出现 min_support 次、
+    且占该形状全部记录的比例不低于 min_confidence 时才会被重放。
+    重放后 LLM 追加了步骤或工具失败即计为一次失败，失败超过 max_failures 次时删除该形状。
+    """
+
+    def __init__(self, maxsize: int = None, ttl: Optional[float] = -1,
+                 min_support: int = None, min_confidence: float = None,
+                 max_failures: int = None):
+        """
+        初始化缓存
+
+        Args:
+            maxsize: 最多保存的形状数
+            ttl: 模板有效期（秒），None表示永不过期，默认取配置
+            min_support: 重放所需的最少一致记录数
+            min_confidence: 重放所需的最低一致比例
+            max_failures: 允许的重放失败次数
+        """
+        self._plans = TTLCache(
+            maxsize=maxsize or DEFAULT_CONFIG["plan_cache_size"],
+            ttl=DEFAULT_CONFIG["plan_cache_ttl"] if ttl == -1 else ttl,
+        )
+        self.min_support = min_support or DEFAULT_CONFIG["plan_min_support"]
+        self.min_confidence = DEFAULT_CONFIG["plan_min_confidence"] if min_confidence is None else min_confidence
+        self.max_failures = DEFAULT_CONFIG["plan_max_failures"] if max_failures is None else max_failures
+        self._lock = threading.Lock()
+        self.recorded = 0
+        self.replays = 0
+        self.confirmed = 0
+        self.rejected = 0
+        self.invalidated = 0
+        self.llm_calls_avoided = 0
+
+    def begin(self, query: str) -> PlanRun:
+        """
+        开始一次运行，查找请求形状对应的可信模板
+
+        Args:
+            query: 用户请求
+
+        Returns:
+            PlanRun，template 不为 None 时可以重放
+        """
+        shape, slots = query_shape(query)
+        return PlanRun(self, shape, slots, self.lookup(shape))
+
+    def lookup(self, shape: str) -> Optional[list]:
+        """
+        查找可信模板
+
+        Returns:
+            模板步骤列表 [[(工具名称, {参数名: 模板参数}), ...], ...]，没有时返回 None
+        """
+        entry = self._plans.get(shape)
+        if entry is None:
+            return None
+        with self._lock:
+            best = max(entry["variants"].values(), key=lambda v: v["count"])
+            if best["count"] < self.min_support or best["count"] / entry["total"] < self.min_confidence:
+                return None
+            return best["plan"]
+
+    def record(self, shape: str, slots: Dict[str, str],
+               steps: List[List[Tuple[str, Dict[str, Any]]]], observations: List[str]):
+        """
+        记录一次成功运行的动作序列
+
+        Args:
+            shape: 请求形状
+            slots: 本次请求的槽位
+            steps: 每轮的 [(工具名称, 关键字参数), ...]
+            observations: 按顺序排列的全部观察结果
+        """
+        plan = []
+        offset = 0
+        for calls in steps:
+            # 参数只能来自之前各轮的观察结果
+            earlier = observations[:offset]
+            plan.append([[name, {k: _abstract(v, slots, earlier) for k, v in kwargs.items()}]
+                         for name, kwargs in calls])
+            offset += len(calls)
+        key = json.dumps(plan, ensure_ascii=False, sort_keys=True)
+
+        with self._lock:
+            entry = self._plans.get(shape)
+            if entry is None:
+                entry = {"variants": {}, "total": 0, "failures": 0}
+                self._plans.set(shape, entry)
+            variant = entry["variants"].setdefault(key, {"plan": plan, "count": 0})
+            variant["count"] += 1
+            entry["total"] += 1
+            self.recorded += 1
+
+    def feedback(self, shape: str, success: bool):
+        """记录一次重放的结果，失败过多时删除该形状"""
+        with self._lock:
+            if success:
+                self.confirmed += 1
+                return
+            self.rejected += 1
+            entry = self._plans.get(shape)
+            if entry is None:
+                return
+            entry["failures"] += 1
+            if entry["failures"] > self.max_failures:
+                self._plans.invalidate(shape)
+                self.invalidated += 1
+
+    def count_replay(self, steps: int):
+        """记录一次重放，steps 为省去的 LLM 调用数"""
+        with self._lock:
+            self.replays += 1
+            self.llm_calls_avoided += steps
+
+    def invalidate(self, query: str = None):
+        """
+        删除模板
+
+        Args:
+            query: 请求或形状（形状规范化后不变），不传时清空全部模板
+        """
+        if query is None:
+            self._plans.clear()
+            return
+        self._plans.invalidate(query_shape(query)[0])
+
+    def __len__(self) -> int:
+        return len(self._plans)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        获取缓存统计
+
+        Returns:
+            形状数、记录次数、重放次数、确认/否决次数以及省去的 LLM 调用数
+        """
+        with self._lock:
+            finished = self.confirmed + self.rejected
+            return {
+                "shapes": len(self._plans),
+                "recorded": self.recorded,
+                "replays": self.replays,
+                "confirmed": self.confirmed,
+                "rejected": self.rejected,
+                "invalidated": self.invalidated,
+                "success_rate": self.confirmed / finished if finished else 0.0,
+                "llm_calls_avoided": self.llm_calls_avoided,
+            }
+
+
+_plan_cache: Optional[PlanCache] = None
+_plan_cache_lock = threading.Lock()
+
+
+def get_plan_cache() -> PlanCache:
+    """
+    获取进程内共享的计划模板缓存
+
+    Returns:
+        共享的 PlanCache
+    """
+    global _plan_cache
+    if _plan_cache is None:
+        with _plan_cache_lock:
+            if _plan_cache is None:
+                _plan_cache = PlanCache()
+    return _plan_cache
+
+
+def set_plan_cache(cache: Optional[PlanCache]):
+    """
+    替换共享的计划模板缓存
+
+    Args:
+        cache: 新的缓存，传入None时下次使用会重新创建
+    """
+    global _plan_cache
+    with _plan_cache_lock:
+        _plan_cache = cache
@@ -0,0 +1,332 @@
+"""
+工具预取模块
+从用户请求中识别城市和预算，在第一次 LLM 调用进行的同时提前执行只读工具；
+模型请求相同的调用时直接使用预取结果，否则丢弃
+"""
+
+import asyncio
+import contextlib
+import contextvars
+import functools
+import inspect
+import re
+import threading
+import time
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .cache import normalize_city
+from .config import CITY_MAPPING, DEFAULT_CONFIG
+from .tracing import bind, current_span
+
+
+# 中文城市名和英文城市名，较长的名称优先匹配；英文名两侧不能紧邻字母（中文字符也属于 \w，不能用 \b）
+_CITY_PATTERN = re.compile(
+    "|".join(sorted(
+        [re.escape(c) for c in CITY_MAPPING]
+        + [r"(?<![A-Za-z])" + re.escape(e) + r"(?![A-Za-z])" for e in CITY_MAPPING.values()],
+        key=len, reverse=True,
+    )),
+    re.IGNORECASE,
+)
+
+# 预算关键词，与知识库中的预算档位对应
+BUDGET_KEYWORDS = {
+    "经济": ("经济", "便宜", "实惠", "穷游", "低价", "预算有限"),
+    "豪华": ("豪华", "高端", "奢华", "五星", "顶级"),
+    "中等": ("中等", "中档", "适中", "舒适"),
+}
+
+HOTEL_KEYWORDS = ("酒店", "住宿", "宾馆", "民宿", "住哪", "住在", "hotel")
+
+
+def find_cities(query: str) -> List[Tuple[int, int, str]]:
+    """
+    找出请求中提到的已知城市
+
+    Args:
+        query: 用户请求
+
+    Returns:
+        [(起始位置, 结束位置, 规范化城市名), ...]，按出现顺序
+    """
+    found = []
+    for match in _CITY_PATTERN.finditer(query):
+        city = normalize_city(match.group(0))
+        if city in CITY_MAPPING:
+            found.append((match.start(), match.end(), city))
+    return found
+
+
+def find_budget(query: str) -> Optional[Tuple[str, str]]:
+    """
+    识别请求中的预算档位
+
+    Returns:
+        (预算档位, 命中的关键词)，没有提到预算时返回 None
+    """
+    for budget, words in BUDGET_KEYWORDS.items():
+        for word in words:
+            if word in query:
+                return budget, word
+    return None
+
+
+def analyze_query(query: str, max_cities: int = None) -> List[Tuple[str, Dict[str, Any]]]:
+    """
+    从用户请求中推测第一轮可能的工具调用
+
+    每个识别到的城市预取天气；请求提到住宿时按识别到的预算（默认中等）预取酒店。
+
+    Args:
+        query: 用户请求
+        max_cities: 最多预取的城市数
+
+    Returns:
+        [(工具名称, 关键字参数), ...]
+    """
+    max_cities = max_cities or DEFAULT_CONFIG["prefetch_max_cities"]
+    cities = []
+    for _, _, city in find_cities(query):
+        if city not in cities:
+            cities.append(city)
+            if len(cities) >= max_cities:
+                break
+
+    wants_hotel = any(k in query.lower() for k in HOTEL_KEYWORDS)
+    budget = find_budget(query)
+
+    calls = [("get_weather", {"city": city}) for city in cities]
+    if wants_hotel or budget is not None:
+        calls += [("get_hotels", {"city": city, "budget": budget[0] if budget else "中等"}) for city in cities]
+    return calls
+
+
+class PrefetchStats:
+    """
+    预取统计，进程内所有智能体共用
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.issued = 0
+        self.hits = 0
+        self.wasted = 0
+        self.saved_seconds = 0.0
+
+    def record(self, issued: int = 0, hits: int = 0, wasted: int = 0, saved: float = 0.0):
+        with self._lock:
+            self.issued += issued
+            self.hits += hits
+            self.wasted += wasted
+            self.saved_seconds += saved
+
+    def reset(self):
+        with self._lock:
+            self.issued = self.hits = self.wasted = 0
+            self.saved_seconds = 0.0
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        获取统计
+
+        Returns:
+            发起次数、命中次数、丢弃次数、命中率以及节省的总延迟（秒）
+        """
+        with self._lock:
+            return {
+                "issued": self.issued,
+                "hits": self.hits,
+                "wasted": self.wasted,
+                "hit_rate": self.hits / self.issued if self.issued else 0.0,
+                "saved_seconds": self.saved_seconds,
+            }
+
+
+_stats = PrefetchStats()
+
+
+def get_prefetch_stats() -> PrefetchStats:
+    """获取进程内共享的预取统计"""
+    return _stats
+
+
+class _Entry:
+    __slots__ = ("future", "started", "finished")
+
+    def __init__(self, started: float):
+        self.future = None
+        self.started = started
+        self.finished = None
+
+
+class Prefetcher:
+    """
+    单次运行的预取任务
+
+    调用键由工具签名绑定参数（补全默认值、规范化城市名）得到，
+    因此 get_weather(city="Beijing") 能命中以 "北京" 预取的结果。
+    """
+
+    def __init__(self, tools: Dict[str, Callable], stats: PrefetchStats = None):
+        """
+        初始化预取任务
+
+        Args:
+            tools: 智能体的工具字典
+            stats: 统计对象，默认使用进程内共享的统计
+        """
+        self.tools = tools
+        self.stats = stats or get_prefetch_stats()
+        self._entries: Dict[tuple, _Entry] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.saved_seconds = 0.0
+
+    def _key(self, name: str, tool: Callable, args: tuple, kwargs: Dict[str, Any]) -> Optional[tuple]:
+        """计算调用键，参数与签名不匹配时返回 None"""
+        try:
+            bound = inspect.signature(tool).bind(*args, **kwargs)
+        except (TypeError, ValueError):
+            return None
+        bound.apply_defaults()
+        items = []
+        for param, value in bound.arguments.items():
+            if param == "city" and isinstance(value, str):
+                value = normalize_city(value)
+            items.append((param, repr(value)))
+        return (name, tuple(items))
+
+    def _calls(self, query: str):
+        allowed = DEFAULT_CONFIG["prefetch_tools"]
+        for name, kwargs in analyze_query(query):
+            tool = self.tools.get(name)
+            if name not in allowed or tool is None:
+                continue
+            key = self._key(name, tool, (), kwargs)
+            if key is not None and key not in self._entries:
+                yield key, tool, kwargs
+
+    def start(self, query: str, executor) -> int:
+        """
+        在线程池中开始预取
+
+        Args:
+            query: 用户请求
+            executor: 线程池
+
+        Returns:
+            发起的预取数
+        """
+        for key, tool, kwargs in self._calls(query):
+            entry = _Entry(time.perf_counter())
+            entry.future = executor.submit(self._timed, entry, tool, kwargs)
+            self._entries[key] = entry
+        self.stats.record(issued=len(self._entries))
+        return len(self._entries)
+
+    def astart(self, query: str) -> int:
+        """
+        在事件循环中开始预取，协程工具作为任务执行，同步工具放入默认线程池
+
+        Args:
+            query: 用户请求
+
+        Returns:
+            发起的预取数
+        """
+        loop = asyncio.get_running_loop()
+        for key, tool, kwargs in self._calls(query):
+            entry = _Entry(time.perf_counter())
+            if asyncio.iscoroutinefunction(tool):
+                entry.future = asyncio.ensure_future(self._atimed(entry, tool, kwargs))
+            else:
+                entry.future = loop.run_in_executor(None, self._timed, entry, tool, kwargs)
+            self._entries[key] = entry
+        self.stats.record(issued=len(self._entries))
+        return len(self._entries)
+
+    @staticmethod
+    def _timed(entry: _Entry, tool: Callable, kwargs: Dict[str, Any]):
+        try:
+            return tool(**kwargs)
+        finally:
+            entry.finished = time.perf_counter()
+
+    @staticmethod
+    async def _atimed(entry: _Entry, tool: Callable, kwargs: Dict[str, Any]):
+        try:
+            return await tool(**kwargs)
+        finally:
+            entry.finished = time.perf_counter()
+
+    def take(self, name: str, tool: Callable, args: tuple, kwargs: Dict[str, Any]):
+        """
+        取出与调用匹配的预取结果，每个结果只能取一次
+
+        节省的延迟为 min(执行耗时, 预取开始至今的时间)。
+
+        Returns:
+            Future（concurrent 或 asyncio），没有匹配时返回 None
+        """
+        if not self._entries:
+            return None
+        key = self._key(name, tool, args, kwargs)
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is None:
+                return None
+            elapsed = time.perf_counter() - entry.started
+            saved = min(entry.finished - entry.started, elapsed) if entry.finished is not None else elapsed
+            self.hits += 1
+            self.saved_seconds += saved
+        self.stats.record(hits=1, saved=saved)
+        return entry.future
+
+    def finish(self):
+        """结束运行，丢弃未被使用的预取结果"""
+        with self._lock:
+            wasted, self._entries = len(self._entries), {}
+        if wasted:
+            self.stats.record(wasted=wasted)
+        span = current_span()
+        span.set("prefetch_hits", self.hits)
+        span.set("prefetch_saved", self.saved_seconds)
+
+
+_active: ContextVar[Optional[Prefetcher]] = ContextVar("travel_assistant_prefetch", default=None)
+
+
+def active_prefetcher() -> Optional[Prefetcher]:
+    """当前运行的预取任务，未开启预取时为 None"""
+    return _active.get()
+
+
+def bind_context(fn: Callable) -> Callable:
+    """
+    让提交到线程池的函数继承当前 span 和预取任务
+
+    没有预取任务时等同于 tracing.bind，只能用于一次提交。
+    """
+    if _active.get() is None:
+        return bind(fn)
+    return functools.partial(contextvars.copy_context().run, fn)
+
+
+@contextlib.contextmanager
+def prefetching(prefetcher: Optional[Prefetcher]):
+    """
+    在 with 块内把预取任务设为当前任务，退出时丢弃未使用的结果
+
+    Args:
+        prefetcher: 预取任务，为 None 时什么也不做
+    """
+    if prefetcher is None:
+        yield None
+        return
+    token = _active.set(prefetcher)
+    try:
+        yield prefetcher
+    finally:
+        _active.reset(token)
+        prefetcher.finish()
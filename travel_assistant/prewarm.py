@@ -0,0 +1,97 @@
+"""
+预热模块
+发布新版本前把全部预设城市的天气写入持久化存储，新启动的工作进程直接命中，
+不会在流量进来时集中请求 wttr.in
+
+用法:
+    python -m travel_assistant.prewarm --store /var/cache/travel_assistant.db
+"""
+
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List
+
+from .cache import TTLCache, normalize_city
+from .config import CITY_MAPPING, DEFAULT_CONFIG
+from .store import PersistentStore, get_store
+from .weather import get_report, report_cache_key
+
+
+def prewarm(store: PersistentStore = None, cities: List[str] = None,
+            concurrency: int = None, force: bool = False) -> Dict[str, Any]:
+    """
+    查询城市天气并写入持久化存储
+
+    Args:
+        store: 持久化存储，默认使用共享存储
+        cities: 城市列表，默认为 CITY_MAPPING 中的全部城市
+        concurrency: 并发查询数
+        force: 为True时即使存储中已有未过期的结果也重新查询
+
+    Returns:
+        写入、跳过（已有结果）和失败的城市以及耗时
+    """
+    store = store if store is not None else get_store()
+    if store is None:
+        raise ValueError("未配置持久化存储: 请设置 persistent_store_path 或传入 store")
+    cities = list(dict.fromkeys(normalize_city(c) for c in (cities or CITY_MAPPING)))
+    concurrency = concurrency or DEFAULT_CONFIG["weather_many_concurrency"]
+
+    # 独立的内存缓存，结果经由它写入存储，不占用本进程的共享工具缓存
+    cache = TTLCache(maxsize=len(cities) + 1, store=store)
+    skipped = []
+    for city in cities:
+        key = report_cache_key(city)
+        if force:
+            store.delete(cache.namespace, key)
+        elif store.lookup(cache.namespace, key) is not None:
+            skipped.append(city)
+    pending = [c for c in cities if c not in skipped]
+
+    start = time.perf_counter()
+    warmed, failed = [], {}
+    with ThreadPoolExecutor(max_workers=max(1, min(concurrency, len(pending)))) as executor:
+        futures = {city: executor.submit(get_report, city, cache=cache) for city in pending}
+        for city, future in futures.items():
+            try:
+                future.result()
+                warmed.append(city)
+            except Exception as e:
+                failed[city] = str(e)
+    return {
+        "warmed": warmed,
+        "skipped": skipped,
+        "failed": failed,
+        "elapsed": time.perf_counter() - start,
+    }
+
+
+def main():
+    """命令行入口"""
+    parser = argparse.ArgumentParser(description="预热持久化存储中的城市天气")
+    parser.add_argument("--store", default=None, help="数据库文件路径，默认取 persistent_store_path 配置")
+    parser.add_argument("--cities", nargs="*", default=None, help="城市列表，默认全部预设城市")
+    parser.add_argument("--concurrency", type=int, default=None)
+    parser.add_argument("--force", action="store_true", help="忽略已有结果重新查询")
+    args = parser.parse_args()
+
+    path = args.store or DEFAULT_CONFIG["persistent_store_path"]
+    if not path:
+        raise SystemExit("请通过 --store 指定数据库文件路径")
+    store = PersistentStore(path)
+    try:
+        result = prewarm(store, cities=args.cities, concurrency=args.concurrency, force=args.force)
+        for city, error in result["failed"].items():
+            print(f"❌ {city}: {error}")
+        print(f"写入: {len(result['warmed'])}  跳过: {len(result['skipped'])}  "
+              f"失败: {len(result['failed'])}  耗时: {result['elapsed']:.2f}s")
+        print(f"存储: {store.stats()['entries']} 条")
+    finally:
+        store.close()
+    if result["failed"]:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
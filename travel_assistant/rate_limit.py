@@ -0,0 +1,400 @@
+"""
+限流模块
+SiliconFlow 按 API 密钥限制每分钟请求数（RPM）和token数（TPM）。客户端在发送前按请求数和
+估计token数两个令牌桶排队，同一密钥的所有客户端共享同一个限流器；排队的请求按优先级放行
+（交互会话优先于批量任务），超过截止时间仍未放行的请求失败，突发流量不再触发成片的 429
+"""
+
+import asyncio
+import contextlib
+import contextvars
+import heapq
+import itertools
+import json
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+from .config import DEFAULT_CONFIG
+from .history import _MESSAGE_OVERHEAD, _message_text, estimate_tokens
+from .stats import LatencyHistogram
+
+
+# 优先级，数值越小越先放行
+PRIORITIES = {"interactive": 0, "batch": 10}
+
+# 当前上下文的 (优先级, 排队超时)
+_priority = contextvars.ContextVar("travel_assistant_priority", default=("interactive", None))
+
+
+class RateLimitExceeded(TimeoutError):
+    """请求在截止时间内未能放行，或等待队列已满"""
+
+
+@contextlib.contextmanager
+def request_priority(priority: str, timeout: float = None):
+    """
+    在 with 块内以指定优先级发送 LLM 请求
+
+    Args:
+        priority: PRIORITIES 中的名称，如 "interactive"、"batch"
+        timeout: 每次请求的最长排队时间（秒），默认为 rate_limit_timeout
+    """
+    if priority not in PRIORITIES:
+        raise ValueError(f"未知的优先级: {priority}")
+    token = _priority.set((priority, timeout))
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+def estimate_request_tokens(payload: Dict[str, Any]) -> int:
+    """
+    估计一次聊天请求计入 TPM 的token数：提示（消息和工具 Schema）加上 max_tokens
+
+    Args:
+        payload: 聊天请求体
+
+    Returns:
+        估计的token数
+    """
+    tokens = sum(estimate_tokens(_message_text(m)) + _MESSAGE_OVERHEAD for m in payload.get("messages", []))
+    if payload.get("tools"):
+        tokens += estimate_tokens(json.dumps(payload["tools"], ensure_ascii=False))
+    return tokens + (payload.get("max_tokens") or 0)
+
+
+class TokenBucket:
+    """
+    令牌桶
+
+    每秒补充 rate 个令牌，最多积累 capacity 个。超过容量的请求在桶满时放行并记为欠额，
+    后续请求等欠额补足，不会永远等待。不加锁，由 RateLimiter 持锁调用。
+    """
+
+    def __init__(self, rate: float, capacity: float, now: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = now
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        """取出 amount 个令牌前还需等待的时间（秒）"""
+        self._refill(now)
+        missing = min(amount, self.capacity) - self.tokens
+        return max(missing / self.rate, 0.0)
+
+    def take(self, amount: float, now: float):
+        self._refill(now)
+        self.tokens -= amount
+
+    def refund(self, amount: float):
+        """归还（amount 为负时追加扣除）令牌"""
+        self.tokens = min(self.capacity, self.tokens + amount)
+
+
+class _Waiter:
+    __slots__ = ("rank", "seq", "priority", "cost", "enqueued", "deadline", "loop", "wakeup")
+
+    def __init__(self, rank: int, seq: int, priority: str, cost: int, enqueued: float, deadline: float):
+        self.rank = rank
+        self.seq = seq
+        self.priority = priority
+        self.cost = cost
+        self.enqueued = enqueued
+        self.deadline = deadline
+        # 异步等待者的事件循环和唤醒事件，同步等待者使用条件变量
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.wakeup: Optional[asyncio.Event] = None
+
+    def __lt__(self, other: "_Waiter") -> bool:
+        return (self.rank, self.seq) < (other.rank, other.seq)
+
+
+class RateLimiter:
+    """
+    按请求数和token数限流的优先级队列
+
+    只有队首（优先级最高、同优先级中最早排队）的请求可以取令牌，大请求不会被
+    源源不断的小请求饿死；上游返回 429 时整个队列暂停 Retry-After 秒。
+
+    用法:
+        waited = limiter.acquire(estimate_request_tokens(payload))
+    """
+
+    def __init__(self, rpm: float = None, tpm: float = None, burst: float = None,
+                 max_queue: int = None, timeout: float = None,
+                 clock: Callable[[], float] = time.monotonic):
+        """
+        初始化限流器
+
+        Args:
+            rpm: 每分钟请求数上限，None表示不限
+            tpm: 每分钟token数上限，None表示不限
+            burst: 令牌桶最多积累多少秒的配额
+            max_queue: 最大排队请求数，超出时立即失败
+            timeout: 默认的最长排队时间（秒）
+            clock: 时钟函数，便于测试
+        """
+        burst = burst if burst is not None else DEFAULT_CONFIG["rate_limit_burst"]
+        self._clock = clock
+        now = clock()
+        self.requests = TokenBucket(rpm / 60, max(rpm / 60 * burst, 1), now) if rpm else None
+        self.tokens = TokenBucket(tpm / 60, max(tpm / 60 * burst, 1), now) if tpm else None
+        self.max_queue = max_queue if max_queue is not None else DEFAULT_CONFIG["rate_limit_max_queue"]
+        self.timeout = timeout if timeout is not None else DEFAULT_CONFIG["rate_limit_timeout"]
+        self._cond = threading.Condition()
+        self._queue = []
+        self._seq = itertools.count()
+        self._paused_until = 0.0
+        self.granted = 0
+        self.rejected = 0
+        self.timed_out = 0
+        self.throttled = 0
+        self.queue_peak = 0
+        self.waits = {name: LatencyHistogram() for name in PRIORITIES}
+
+    def _enqueue(self, cost: int, priority: Optional[str], timeout: Optional[float]) -> _Waiter:
+        """在持有锁的情况下排队，优先级和超时未指定时取当前上下文的设置"""
+        context_priority, context_timeout = _priority.get()
+        priority = priority or context_priority
+        if priority not in PRIORITIES:
+            raise ValueError(f"未知的优先级: {priority}")
+        if timeout is None:
+            timeout = context_timeout if context_timeout is not None else self.timeout
+        if len(self._queue) >= self.max_queue:
+            self.rejected += 1
+            raise RateLimitExceeded(f"限流队列已满 ({self.max_queue})")
+        now = self._clock()
+        waiter = _Waiter(PRIORITIES[priority], next(self._seq), priority, cost, now, now + timeout)
+        heapq.heappush(self._queue, waiter)
+        self.queue_peak = max(self.queue_peak, len(self._queue))
+        return waiter
+
+    def _delay(self, waiter: _Waiter, now: float) -> Optional[float]:
+        """队首请求还需等待的时间，不是队首时返回 None"""
+        if self._queue[0] is not waiter:
+            return None
+        delay = self._paused_until - now
+        if self.requests is not None:
+            delay = max(delay, self.requests.wait_time(1, now))
+        if self.tokens is not None:
+            delay = max(delay, self.tokens.wait_time(waiter.cost, now))
+        return max(delay, 0.0)
+
+    def _grant(self, waiter: _Waiter, now: float) -> float:
+        heapq.heappop(self._queue)
+        if self.requests is not None:
+            self.requests.take(1, now)
+        if self.tokens is not None:
+            self.tokens.take(waiter.cost, now)
+        self.granted += 1
+        waited = now - waiter.enqueued
+        self.waits[waiter.priority].record(waited)
+        self._notify()
+        return waited
+
+    def _abandon(self, waiter: _Waiter, timed_out: bool):
+        self._queue.remove(waiter)
+        heapq.heapify(self._queue)
+        if timed_out:
+            self.timed_out += 1
+            self.waits[waiter.priority].record(self._clock() - waiter.enqueued)
+        self._notify()
+
+    def _notify(self):
+        """
+        在持有锁的情况下唤醒等待者：同步等待者通过条件变量；只有队首可以取令牌，
+        因此异步等待者中只唤醒队首，其余的不轮询，直到成为队首或超时
+        """
+        self._cond.notify_all()
+        if self._queue:
+            head = self._queue[0]
+            if head.loop is not None:
+                try:
+                    head.loop.call_soon_threadsafe(head.wakeup.set)
+                except RuntimeError:
+                    # 事件循环已经关闭
+                    pass
+
+    def _expired(self, waiter: _Waiter, now: float) -> RateLimitExceeded:
+        self._abandon(waiter, timed_out=True)
+        return RateLimitExceeded(f"限流排队超时 ({now - waiter.enqueued:.1f}秒)")
+
+    def acquire(self, cost: int = 0, priority: str = None, timeout: float = None) -> float:
+        """
+        排队直到请求可以发送
+
+        Args:
+            cost: 估计的token数
+            priority: 优先级，默认取 request_priority 设置的值（未设置时为 interactive）
+            timeout: 最长排队时间（秒）
+
+        Returns:
+            排队等待的时间（秒）
+
+        Raises:
+            RateLimitExceeded: 队列已满或排队超时
+        """
+        with self._cond:
+            waiter = self._enqueue(cost, priority, timeout)
+            try:
+                while True:
+                    now = self._clock()
+                    delay = self._delay(waiter, now)
+                    if delay == 0:
+                        return self._grant(waiter, now)
+                    remaining = waiter.deadline - now
+                    if remaining <= 0:
+                        raise self._expired(waiter, now)
+                    self._cond.wait(remaining if delay is None else min(delay, remaining))
+            except BaseException:
+                if waiter in self._queue:
+                    self._abandon(waiter, timed_out=False)
+                raise
+
+    async def aacquire(self, cost: int = 0, priority: str = None, timeout: float = None) -> float:
+        """
+        acquire 的异步版本，等待期间不阻塞事件循环
+
+        Args:
+            cost: 估计的token数
+            priority: 优先级
+            timeout: 最长排队时间（秒）
+
+        Returns:
+            排队等待的时间（秒）
+        """
+        with self._cond:
+            waiter = self._enqueue(cost, priority, timeout)
+            waiter.loop = asyncio.get_running_loop()
+            waiter.wakeup = asyncio.Event()
+        try:
+            while True:
+                with self._cond:
+                    now = self._clock()
+                    delay = self._delay(waiter, now)
+                    if delay == 0:
+                        return self._grant(waiter, now)
+                    remaining = waiter.deadline - now
+                    if remaining <= 0:
+                        raise self._expired(waiter, now)
+                    # 在锁内清除，之后的唤醒不会丢失
+                    waiter.wakeup.clear()
+                try:
+                    await asyncio.wait_for(waiter.wakeup.wait(),
+                                           remaining if delay is None else min(delay, remaining))
+                except asyncio.TimeoutError:
+                    pass
+        except BaseException:
+            with self._cond:
+                if waiter in self._queue:
+                    self._abandon(waiter, timed_out=False)
+            raise
+
+    def settle(self, reserved: int, used: Optional[int]):
+        """
+        请求完成后按实际用量归还多扣的token（max_tokens 通常远大于实际生成量）
+
+        Args:
+            reserved: 发送前扣除的估计token数
+            used: 响应中的 total_tokens，未知时不调整
+        """
+        if self.tokens is None or used is None:
+            return
+        with self._cond:
+            self.tokens.refund(reserved - used)
+            self._notify()
+
+    def penalize(self, reserved: int = 0, retry_after: float = None):
+        """
+        上游返回 429：归还本次扣除的token，整个队列暂停 retry_after 秒
+
+        Args:
+            reserved: 本次请求扣除的token数（被拒绝的请求不计入配额）
+            retry_after: 上游给出的 Retry-After，没有时使用 rate_limit_penalty
+        """
+        pause = retry_after if retry_after is not None else DEFAULT_CONFIG["rate_limit_penalty"]
+        with self._cond:
+            self.throttled += 1
+            self._paused_until = max(self._paused_until, self._clock() + pause)
+            if self.tokens is not None:
+                self.tokens.refund(reserved)
+
+    def queue_depth(self) -> Dict[str, int]:
+        """各优先级排队中的请求数"""
+        with self._cond:
+            depth = dict.fromkeys(PRIORITIES, 0)
+            for waiter in self._queue:
+                depth[waiter.priority] += 1
+        return depth
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        获取限流统计
+
+        Returns:
+            各优先级的排队数和等待时间分布、放行/拒绝/超时/429 次数和令牌桶余量
+        """
+        depth = self.queue_depth()
+        with self._cond:
+            now = self._clock()
+            for bucket in (self.requests, self.tokens):
+                if bucket is not None:
+                    bucket._refill(now)
+            return {
+                "queue_depth": sum(depth.values()),
+                "queue_depth_by_priority": depth,
+                "queue_peak": self.queue_peak,
+                "granted": self.granted,
+                "rejected": self.rejected,
+                "timed_out": self.timed_out,
+                "throttled": self.throttled,
+                "paused_for": max(self._paused_until - now, 0.0),
+                "available_requests": self.requests.tokens if self.requests is not None else None,
+                "available_tokens": self.tokens.tokens if self.tokens is not None else None,
+                "wait": {name: h.snapshot() for name, h in self.waits.items()},
+            }
+
+
+_limiters: Dict[str, RateLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(api_key: str) -> Optional[RateLimiter]:
+    """
+    获取进程内按 API 密钥共享的限流器
+
+    Args:
+        api_key: API密钥，配额按密钥计算
+
+    Returns:
+        RateLimiter；rate_limit_rpm 和 rate_limit_tpm 都未配置时返回 None
+    """
+    if not DEFAULT_CONFIG["rate_limit_rpm"] and not DEFAULT_CONFIG["rate_limit_tpm"]:
+        return None
+    limiter = _limiters.get(api_key)
+    if limiter is None:
+        with _limiters_lock:
+            limiter = _limiters.get(api_key)
+            if limiter is None:
+                limiter = _limiters[api_key] = RateLimiter(DEFAULT_CONFIG["rate_limit_rpm"],
+                                                           DEFAULT_CONFIG["rate_limit_tpm"])
+    return limiter
+
+
+def rate_limiters() -> list:
+    """进程内所有共享的限流器"""
+    with _limiters_lock:
+        return list(_limiters.values())
+
+
+def reset_rate_limiters():
+    """清空共享的限流器"""
+    with _limiters_lock:
+        _limiters.clear()
@@ -0,0 +1,524 @@
+"""
+容错模块
+为 LLM 和工具上游提供带抖动的指数退避重试（遵守 Retry-After）、
+按上游划分的熔断器和重试预算，避免重试放大故障期间的负载
+"""
+
+import asyncio
+import random
+import threading
+import time
+from collections import deque
+from email.utils import parsedate_to_datetime
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+import requests
+
+from .config import DEFAULT_CONFIG
+from .rate_limit import RateLimitExceeded
+
+
+# 可以重试的 HTTP 状态码
+RETRY_STATUSES = frozenset({408, 429, 500, 502, 503, 504})
+
+
+class RetryableError(Exception):
+    """
+    可重试的错误，工具函数可以主动抛出
+
+    Attributes:
+        retry_after: 上游建议的等待时间（秒）
+    """
+
+    def __init__(self, message: str = "", retry_after: float = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class CircuitOpenError(ConnectionError):
+    """熔断器打开，请求未发出直接失败"""
+
+    def __init__(self, upstream: str, retry_in: float):
+        super().__init__(f"{upstream} 暂时不可用，{retry_in:.0f}秒后重试")
+        self.upstream = upstream
+        self.retry_in = retry_in
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """
+    解析 Retry-After 响应头
+
+    Args:
+        value: 秒数或 HTTP 日期
+
+    Returns:
+        等待秒数，无法解析时返回 None
+    """
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError, OverflowError):
+        return None
+
+
+def _status_of(exc: Exception) -> Tuple[Optional[int], Any]:
+    """取出 HTTP 错误的状态码和响应头（兼容 requests 和 aiohttp）"""
+    response = getattr(exc, "response", None)
+    if isinstance(exc, requests.exceptions.HTTPError) and response is not None:
+        return response.status_code, response.headers
+    status = getattr(exc, "status", None)
+    if isinstance(status, int):
+        return status, getattr(exc, "headers", None)
+    return None, None
+
+
+def classify_exception(exc: Exception) -> Tuple[bool, Optional[float]]:
+    """
+    判断异常是否值得重试
+
+    Args:
+        exc: 异常
+
+    Returns:
+        (是否可重试, Retry-After 秒数)
+    """
+    if isinstance(exc, RetryableError):
+        return True, exc.retry_after
+    if isinstance(exc, CircuitOpenError):
+        return False, None
+    status, headers = _status_of(exc)
+    if status is not None:
+        if status in RETRY_STATUSES:
+            return True, parse_retry_after(headers.get("Retry-After") if headers else None)
+        return False, None
+    if isinstance(exc, (requests.exceptions.Timeout, requests.exceptions.ConnectionError,
+                        TimeoutError, ConnectionError, asyncio.TimeoutError)):
+        return True, None
+    return False, None
+
+
+class RetryPolicy:
+    """
+    带完全抖动的指数退避策略
+
+    第 n 次重试前等待 [0, min(max_delay, base_delay * 2^(n-1))) 之间的随机时间；
+    上游给出 Retry-After 时至少等待该时间，超过 max_retry_after 则放弃重试。
+    """
+
+    def __init__(self, max_attempts: int = None, base_delay: float = None,
+                 max_delay: float = None, max_retry_after: float = None,
+                 rng: Callable[[], float] = random.random):
+        """
+        初始化重试策略
+
+        Args:
+            max_attempts: 最多尝试次数（含第一次）
+            base_delay: 基础退避时间（秒）
+            max_delay: 退避时间上限（秒）
+            max_retry_after: 可接受的最长 Retry-After（秒）
+            rng: 返回 [0, 1) 随机数的函数，便于测试
+        """
+        self.max_attempts = max_attempts or DEFAULT_CONFIG["retry_max_attempts"]
+        self.base_delay = base_delay if base_delay is not None else DEFAULT_CONFIG["retry_base_delay"]
+        self.max_delay = max_delay if max_delay is not None else DEFAULT_CONFIG["retry_max_delay"]
+        self.max_retry_after = (max_retry_after if max_retry_after is not None
+                                else DEFAULT_CONFIG["retry_after_max"])
+        self._rng = rng
+
+    def delay(self, retry: int, retry_after: float = None) -> Optional[float]:
+        """
+        计算第 retry 次重试前的等待时间
+
+        Args:
+            retry: 重试序号，从1开始
+            retry_after: 上游建议的等待时间
+
+        Returns:
+            等待秒数，返回 None 表示不应重试
+        """
+        backoff = self._rng() * min(self.max_delay, self.base_delay * (2 ** (retry - 1)))
+        if retry_after is None:
+            return backoff
+        if retry_after > self.max_retry_after:
+            return None
+        return max(retry_after, backoff)
+
+
+class RetryBudget:
+    """
+    重试预算
+
+    在滑动窗口内，重试次数不超过 请求数 * ratio + min_per_sec * window，
+    上游整体故障时重试量被限制在正常流量的固定比例内。
+    """
+
+    def __init__(self, ratio: float = None, min_per_sec: float = None,
+                 window: int = 10, clock: Callable[[], float] = time.monotonic):
+        """
+        初始化重试预算
+
+        Args:
+            ratio: 允许的重试/请求比例
+            min_per_sec: 低流量时每秒至少允许的重试数
+            window: 滑动窗口长度（秒）
+            clock: 时钟函数，便于测试
+        """
+        self.ratio = ratio if ratio is not None else DEFAULT_CONFIG["retry_budget_ratio"]
+        self.min_per_sec = (min_per_sec if min_per_sec is not None
+                            else DEFAULT_CONFIG["retry_budget_min_per_sec"])
+        self.window = window
+        self._clock = clock
+        self._buckets = deque()  # [秒, 请求数, 重试数]
+        self._lock = threading.Lock()
+        self.exhausted = 0
+
+    def _bucket(self) -> list:
+        """在持有锁的情况下获取当前秒的计数桶，并丢弃窗口外的桶"""
+        now = int(self._clock())
+        while self._buckets and self._buckets[0][0] <= now - self.window:
+            self._buckets.popleft()
+        if not self._buckets or self._buckets[-1][0] != now:
+            self._buckets.append([now, 0, 0])
+        return self._buckets[-1]
+
+    def record_request(self):
+        """记录一次首次请求"""
+        with self._lock:
+            self._bucket()[1] += 1
+
+    def try_retry(self) -> bool:
+        """
+        申请一次重试
+
+        Returns:
+            预算充足时返回 True 并扣减
+        """
+        with self._lock:
+            bucket = self._bucket()
+            requests_ = sum(b[1] for b in self._buckets)
+            retries = sum(b[2] for b in self._buckets)
+            if retries < requests_ * self.ratio + self.min_per_sec * self.window:
+                bucket[2] += 1
+                return True
+            self.exhausted += 1
+            return False
+
+
+class CircuitBreaker:
+    """
+    熔断器
+
+    连续失败 failure_threshold 次后打开，recovery_timeout 秒内的请求直接失败；
+    之后进入半开状态放行一个探测请求，成功则关闭，失败则重新打开。
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, name: str, failure_threshold: int = None,
+                 recovery_timeout: float = None, clock: Callable[[], float] = time.monotonic):
+        """
+        初始化熔断器
+
+        Args:
+            name: 上游名称
+            failure_threshold: 打开熔断器的连续失败次数
+            recovery_timeout: 打开后到允许探测的时间（秒）
+            clock: 时钟函数，便于测试
+        """
+        self.name = name
+        self.failure_threshold = failure_threshold or DEFAULT_CONFIG["breaker_failure_threshold"]
+        self.recovery_timeout = (recovery_timeout if recovery_timeout is not None
+                                 else DEFAULT_CONFIG["breaker_recovery_timeout"])
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self._probe_id = 0
+        self.rejected = 0
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            self._refresh()
+            return self._state
+
+    def _refresh(self):
+        if self._state == self.OPEN and self._clock() >= self._opened_at + self.recovery_timeout:
+            self._state = self.HALF_OPEN
+            self._probing = False
+
+    def allow(self) -> bool:
+        """
+        判断是否放行请求
+
+        Returns:
+            是否放行
+        """
+        return self.admit() is not None
+
+    def admit(self) -> Optional[int]:
+        """
+        判断是否放行请求，并告知本次请求是否持有半开状态的探测名额
+
+        Returns:
+            None 表示拒绝；0 表示正常放行；正数为探测编号，交还名额时传给 release_probe
+        """
+        with self._lock:
+            self._refresh()
+            if self._state == self.CLOSED:
+                return 0
+            if self._state == self.HALF_OPEN and not self._probing:
+                self._probing = True
+                self._probe_id += 1
+                return self._probe_id
+            self.rejected += 1
+            return None
+
+    def retry_in(self) -> float:
+        """距离允许探测的剩余秒数"""
+        with self._lock:
+            return max(self._opened_at + self.recovery_timeout - self._clock(), 0.0)
+
+    def release_probe(self, probe: int):
+        """
+        请求没有到达上游（如本地限流拒绝或被取消），交还半开状态的探测名额，不计成功或失败
+
+        Args:
+            probe: admit 返回的探测编号，名额已经转给其他请求时忽略
+        """
+        with self._lock:
+            if self._probing and probe == self._probe_id:
+                self._probing = False
+
+    def record_success(self):
+        """记录一次成功"""
+        with self._lock:
+            self._state = self.CLOSED
+            self._failures = 0
+            self._probing = False
+
+    def record_failure(self):
+        """记录一次失败"""
+        with self._lock:
+            self._failures += 1
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                self._state = self.OPEN
+                self._opened_at = self._clock()
+                self._probing = False
+
+
+class _Upstream:
+    __slots__ = ("breaker", "budget")
+
+    def __init__(self, name: str):
+        self.breaker = CircuitBreaker(name)
+        self.budget = RetryBudget()
+
+
+_upstreams: Dict[str, _Upstream] = {}
+_upstreams_lock = threading.Lock()
+
+
+def _get_upstream(name: str) -> _Upstream:
+    upstream = _upstreams.get(name)
+    if upstream is None:
+        with _upstreams_lock:
+            upstream = _upstreams.setdefault(name, _Upstream(name))
+    return upstream
+
+
+def get_breaker(name: str) -> CircuitBreaker:
+    """
+    获取进程内共享的上游熔断器
+
+    Args:
+        name: 上游名称，例如 "llm:api.siliconflow.cn"
+
+    Returns:
+        CircuitBreaker
+    """
+    return _get_upstream(name).breaker
+
+
+def get_retry_budget(name: str) -> RetryBudget:
+    """
+    获取进程内共享的上游重试预算
+
+    Args:
+        name: 上游名称
+
+    Returns:
+        RetryBudget
+    """
+    return _get_upstream(name).budget
+
+
+def reset_upstreams():
+    """清空所有上游的熔断器和重试预算"""
+    with _upstreams_lock:
+        _upstreams.clear()
+
+
+class Resilience:
+    """
+    重试 + 熔断 + 重试预算的组合
+
+    用法:
+        resilience.call(lambda: session.get(url), "weather:wttr.in")
+    """
+
+    def __init__(self, policy: RetryPolicy = None,
+                 classify: Callable[[Exception], Tuple[bool, Optional[float]]] = classify_exception,
+                 sleep: Callable[[float], None] = time.sleep):
+        """
+        初始化容错层
+
+        Args:
+            policy: 重试策略
+            classify: 异常分类函数
+            sleep: 同步等待函数，便于测试
+        """
+        self.policy = policy or RetryPolicy()
+        self.classify = classify
+        self._sleep = sleep
+        self.retries = 0
+
+    def _before_attempt(self, upstream: _Upstream, name: str, attempt: int) -> int:
+        """放行本次尝试，返回熔断器的探测编号（0 表示不是探测请求）"""
+        probe = upstream.breaker.admit()
+        if probe is None:
+            raise CircuitOpenError(name, upstream.breaker.retry_in())
+        if attempt == 1:
+            upstream.budget.record_request()
+        return probe
+
+    def _after_failure(self, upstream: _Upstream, exc: Exception, attempt: int,
+                       probe: int) -> Optional[float]:
+        """记录失败并返回重试前的等待时间，返回 None 表示放弃"""
+        if isinstance(exc, RateLimitExceeded):
+            # 本地限流拒绝的请求没有到达上游
+            if probe:
+                upstream.breaker.release_probe(probe)
+            return None
+        retryable, retry_after = self.classify(exc)
+        if not retryable:
+            status, _ = _status_of(exc)
+            if status is not None and 400 <= status < 500:
+                # 明确的客户端错误说明上游仍然可用
+                upstream.breaker.record_success()
+            elif probe:
+                # 其他错误（如响应不是合法JSON）无法判断上游状态，熔断器保持不变
+                upstream.breaker.release_probe(probe)
+            return None
+        upstream.breaker.record_failure()
+        if attempt >= self.policy.max_attempts:
+            return None
+        delay = self.policy.delay(attempt, retry_after)
+        if delay is None or not upstream.budget.try_retry():
+            return None
+        self.retries += 1
+        return delay
+
+    def call(self, fn: Callable[[], Any], upstream: str) -> Any:
+        """
+        执行调用，失败时按策略重试
+
+        Args:
+            fn: 无参调用
+            upstream: 上游名称，决定使用哪个熔断器和重试预算
+
+        Returns:
+            fn 的返回值
+
+        Raises:
+            CircuitOpenError: 熔断器打开
+            Exception: 不可重试或重试耗尽时抛出最后一次的异常
+        """
+        state = _get_upstream(upstream)
+        attempt = 1
+        while True:
+            probe = self._before_attempt(state, upstream, attempt)
+            try:
+                result = fn()
+            except Exception as e:
+                delay = self._after_failure(state, e, attempt, probe)
+                if delay is None:
+                    raise
+                self._sleep(delay)
+                attempt += 1
+                continue
+            except BaseException:
+                # 取消（如对冲请求的落选者）不是上游故障，只交还本次持有的探测名额
+                if probe:
+                    state.breaker.release_probe(probe)
+                raise
+            state.breaker.record_success()
+            return result
+
+    async def acall(self, fn: Callable[[], Awaitable[Any]], upstream: str) -> Any:
+        """
+        call 的异步版本
+
+        Args:
+            fn: 返回协程的无参调用
+            upstream: 上游名称
+
+        Returns:
+            协程的结果
+        """
+        state = _get_upstream(upstream)
+        attempt = 1
+        while True:
+            probe = self._before_attempt(state, upstream, attempt)
+            try:
+                result = await fn()
+            except Exception as e:
+                delay = self._after_failure(state, e, attempt, probe)
+                if delay is None:
+                    raise
+                await asyncio.sleep(delay)
+                attempt += 1
+                continue
+            except BaseException:
+                # 取消（如对冲请求的落选者）不是上游故障，只交还本次持有的探测名额
+                if probe:
+                    state.breaker.release_probe(probe)
+                raise
+            state.breaker.record_success()
+            return result
+
+
+_resilience: Optional[Resilience] = None
+
+
+def get_resilience() -> Resilience:
+    """
+    获取进程内共享的默认容错层（工具函数使用）
+
+    Returns:
+        Resilience
+    """
+    global _resilience
+    if _resilience is None:
+        _resilience = Resilience()
+    return _resilience
+
+
+def set_resilience(resilience: Optional[Resilience]):
+    """
+    替换共享的默认容错层
+
+    Args:
+        resilience: 新的容错层，传入None时下次使用会重新创建
+    """
+    global _resilience
+    _resilience = resilience
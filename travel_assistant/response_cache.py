@@ -0,0 +1,266 @@
+"""
+LLM 响应缓存模块
+以请求负载的规范化哈希为键缓存 chat 响应，支持内存、SQLite 和进程间共享的持久化存储后端
+"""
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from .cache import TTLCache
+from .config import DEFAULT_CONFIG
+from .sse import ChatStream
+from .store import PersistentStore, get_store
+
+
+def make_cache_key(payload: Dict[str, Any]) -> str:
+    """
+    计算请求负载的规范化哈希
+
+    stream 和 stream_options 字段不参与计算，流式和非流式请求共用缓存条目。
+
+    Args:
+        payload: chat 请求负载
+
+    Returns:
+        十六进制哈希字符串
+    """
+    canonical = {k: v for k, v in payload.items() if k not in ("stream", "stream_options")}
+    data = json.dumps(canonical, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(data.encode("utf-8")).hexdigest()
+
+
+class MemoryBackend:
+    """内存 LRU 后端"""
+
+    def __init__(self, maxsize: int = None, max_age: Optional[float] = None):
+        """
+        初始化后端
+
+        Args:
+            maxsize: 最大条目数
+            max_age: 条目最长保存时间（秒），None表示不过期
+        """
+        self._cache = TTLCache(
+            maxsize=maxsize or DEFAULT_CONFIG["response_cache_size"],
+            ttl=max_age,
+        )
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        return self._cache.get(key)
+
+    def set(self, key: str, entry: Dict[str, Any]):
+        self._cache.set(key, entry)
+
+    def clear(self):
+        self._cache.clear()
+
+    def __len__(self) -> int:
+        return len(self._cache)
+
+
+class SQLiteBackend:
+    """SQLite 磁盘后端，进程重启后缓存仍然有效"""
+
+    def __init__(self, path: str, maxsize: int = None, max_age: Optional[float] = None):
+        """
+        初始化后端
+
+        Args:
+            path: 数据库文件路径
+            maxsize: 最大条目数，超过时淘汰最久未访问的条目
+            max_age: 条目最长保存时间（秒），None表示不过期
+        """
+        self.path = path
+        self.maxsize = maxsize or DEFAULT_CONFIG["response_cache_size"]
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+            "created REAL NOT NULL, accessed REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, created FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            if self.max_age is not None and row[1] + self.max_age <= now:
+                self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._conn.commit()
+                return None
+            self._conn.execute("UPDATE responses SET accessed = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+        return json.loads(row[0])
+
+    def set(self, key: str, entry: Dict[str, Any]):
+        now = time.time()
+        value = json.dumps(entry, ensure_ascii=False)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, value, created, accessed) VALUES (?, ?, ?, ?)",
+                (key, value, now, now),
+            )
+            self._evict(now)
+            self._conn.commit()
+
+    def _evict(self, now: float):
+        """按保存时间和容量淘汰条目"""
+        if self.max_age is not None:
+            self._conn.execute("DELETE FROM responses WHERE created <= ?", (now - self.max_age,))
+        self._conn.execute(
+            "DELETE FROM responses WHERE key IN ("
+            "SELECT key FROM responses ORDER BY accessed DESC LIMIT -1 OFFSET ?)",
+            (self.maxsize,),
+        )
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM responses")
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+
+class PersistentBackend:
+    """
+    持久化存储后端
+
+    与工具缓存共用同一个 PersistentStore（不同命名空间），同一主机的多个工作进程共享，
+    读操作不加锁也不写入，适合多进程部署。
+    """
+
+    def __init__(self, store: PersistentStore = None, namespace: str = "responses",
+                 max_age: Optional[float] = None):
+        """
+        初始化后端
+
+        Args:
+            store: 持久化存储，默认使用共享存储（需要配置 persistent_store_path）
+            namespace: 在存储中使用的命名空间
+            max_age: 条目最长保存时间（秒），None表示不过期
+        """
+        self.store = store if store is not None else get_store()
+        if self.store is None:
+            raise ValueError("未配置持久化存储: 请设置 persistent_store_path 或传入 store")
+        self.namespace = namespace
+        self.max_age = max_age
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        return self.store.get(self.namespace, key)
+
+    def set(self, key: str, entry: Dict[str, Any]):
+        self.store.set(self.namespace, key, entry, self.max_age)
+
+    def clear(self):
+        self.store.clear(self.namespace)
+
+    def __len__(self) -> int:
+        return self.store.count(self.namespace)
+
+
+class ResponseCache:
+    """
+    chat 响应缓存
+
+    非流式响应缓存完整内容和 usage，流式响应在完整读取后缓存所有分块，
+    命中时按原分块重放。
+    """
+
+    def __init__(self, backend=None):
+        """
+        初始化缓存
+
+        Args:
+            backend: 存储后端，默认使用 MemoryBackend
+        """
+        self.backend = backend if backend is not None else MemoryBackend()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.saved_prompt_tokens = 0
+        self.saved_completion_tokens = 0
+
+    make_key = staticmethod(make_cache_key)
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """
+        读取缓存，命中时累计节省的token数
+
+        Args:
+            key: 缓存键
+
+        Returns:
+            缓存条目，包含 content、chunks 和 usage
+        """
+        entry = self.backend.get(key)
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            usage = entry.get("usage") or {}
+            self.saved_prompt_tokens += usage.get("prompt_tokens", 0)
+            self.saved_completion_tokens += usage.get("completion_tokens", 0)
+        return entry
+
+    def put(self, key: str, content: str, usage: Dict[str, Any] = None, chunks: list = None):
+        """
+        写入缓存
+
+        Args:
+            key: 缓存键
+            content: 完整响应内容
+            usage: API返回的token用量
+            chunks: 流式响应的原始分块
+        """
+        self.backend.set(key, {"content": content, "chunks": chunks, "usage": usage})
+
+    @staticmethod
+    def replay(entry: Dict[str, Any]) -> ChatStream:
+        """按原分块重放缓存的响应，返回的流同样带有 finish_reason 和 usage"""
+        chunks = entry.get("chunks")
+        if chunks is None:
+            chunks = [entry["content"]] if entry["content"] else []
+        return ChatStream.replay(chunks, usage=entry.get("usage"))
+
+    def clear(self):
+        """清空缓存和统计"""
+        self.backend.clear()
+        with self._lock:
+            self.hits = self.misses = 0
+            self.saved_prompt_tokens = self.saved_completion_tokens = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        获取缓存统计
+
+        Returns:
+            命中次数、未命中次数、命中率以及节省的token数
+        """
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "size": len(self.backend),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+                "saved_prompt_tokens": self.saved_prompt_tokens,
+                "saved_completion_tokens": self.saved_completion_tokens,
+                "saved_total_tokens": self.saved_prompt_tokens + self.saved_completion_tokens,
+            }
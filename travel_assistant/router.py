@@ -0,0 +1,580 @@
+"""
+多模型路由模块
+包装多个客户端，按观测到的延迟和错误率为每次调用选择模型，
+支持对冲请求（主模型超过 p95 仍未返回时并发请求备选模型，取先返回者）
+以及负载过高时降级到较小的模型
+"""
+
+import asyncio
+import threading
+import time
+from collections import Counter, OrderedDict, deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Dict, List, Optional, Tuple
+
+from .config import DEFAULT_CONFIG, SUPPORTED_MODELS
+from .resilience import RetryBudget
+from .stats import LatencyHistogram
+from .tracing import bind, current_span
+
+
+# 延迟和错误率的指数滑动平均系数
+_EWMA_ALPHA = 0.2
+
+
+class ModelStats:
+    """单个模型的观测数据"""
+
+    def __init__(self, model: str):
+        self.model = model
+        self.histogram = LatencyHistogram()
+        self.ewma_latency: Optional[float] = None
+        self.error_rate = 0.0
+        self.requests = 0
+        self.errors = 0
+        self.inflight = 0
+        self.hedge_wins = 0
+        self.last_error_at = float("-inf")
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "error_rate": self.error_rate,
+            "inflight": self.inflight,
+            "ewma_latency": self.ewma_latency,
+            "hedge_wins": self.hedge_wins,
+            "latency": self.histogram.snapshot(),
+        }
+
+
+def _resolve(models) -> List[str]:
+    return [SUPPORTED_MODELS.get(m, m) for m in models]
+
+
+class _Router:
+    """路由策略和统计，同步与异步路由客户端共用"""
+
+    def __init__(self, clients: list, fallback_clients: list = None,
+                 hedge: bool = True, hedge_delay: float = None,
+                 max_inflight: int = None, max_error_rate: float = None):
+        """
+        初始化路由
+
+        Args:
+            clients: 主模型客户端，按偏好排序
+            fallback_clients: 降级用的较小模型客户端
+            hedge: 是否启用对冲请求
+            hedge_delay: 样本不足时的对冲等待时间（秒）
+            max_inflight: 每个主模型的最大并发请求数，超过后降级
+            max_error_rate: 错误率超过该值的模型暂时不参与路由
+        """
+        if not clients:
+            raise ValueError("至少需要一个客户端")
+        self.clients: "OrderedDict[str, Any]" = OrderedDict((c.model, c) for c in clients)
+        self.fallback_clients: "OrderedDict[str, Any]" = OrderedDict(
+            (c.model, c) for c in (fallback_clients or []) if c.model not in self.clients)
+        self.hedge = hedge
+        self.hedge_delay = hedge_delay if hedge_delay is not None else DEFAULT_CONFIG["hedge_delay"]
+        self.max_inflight = max_inflight or DEFAULT_CONFIG["routing_max_inflight"]
+        self.max_error_rate = (max_error_rate if max_error_rate is not None
+                               else DEFAULT_CONFIG["routing_max_error_rate"])
+        self.hedge_budget = RetryBudget(ratio=DEFAULT_CONFIG["hedge_budget_ratio"])
+        self.stats = {model: ModelStats(model)
+                      for model in list(self.clients) + list(self.fallback_clients)}
+        self.decisions = deque(maxlen=DEFAULT_CONFIG["routing_decision_log"])
+        self.reasons = Counter()
+        self.hedges = 0
+        self._lock = threading.Lock()
+
+    @property
+    def model(self) -> str:
+        """首选模型，兼容单客户端接口"""
+        return next(iter(self.clients))
+
+    def _client(self, model: str):
+        return self.clients.get(model) or self.fallback_clients[model]
+
+    def _healthy(self, stats: ModelStats, now: float) -> bool:
+        # 错误率过高的模型在一段时间后重新放行，以便探测是否恢复
+        return (stats.error_rate <= self.max_error_rate
+                or now - stats.last_error_at >= DEFAULT_CONFIG["routing_probe_interval"])
+
+    def _score(self, stats: ModelStats) -> float:
+        """越小越好；没有样本的模型得分为0，先探测一次"""
+        if stats.ewma_latency is None:
+            return 0.0
+        return (stats.ewma_latency * (1 + 2 * stats.error_rate)
+                * (1 + stats.inflight / self.max_inflight))
+
+    def route(self) -> Tuple[List[str], str]:
+        """
+        选择模型
+
+        Returns:
+            (按优先级排列的候选模型, 路由原因)
+        """
+        now = time.monotonic()
+        with self._lock:
+            healthy = [m for m in self.clients if self._healthy(self.stats[m], now)]
+            available = [m for m in healthy if self.stats[m].inflight < self.max_inflight]
+            if available:
+                reason = "best"
+            else:
+                available = [m for m in self.fallback_clients if self._healthy(self.stats[m], now)]
+                reason = "fallback_load" if healthy else "fallback_errors"
+            if not available:
+                available = list(self.stats)
+                reason = "any"
+            ranked = sorted(available, key=lambda m: self._score(self.stats[m]))
+            # 其余模型作为对冲和失败转移的备选
+            ranked += sorted((m for m in self.stats if m not in ranked),
+                             key=lambda m: self._score(self.stats[m]))
+        return ranked, reason
+
+    def _hedge_after(self, model: str) -> float:
+        """主模型的 p95 延迟，样本不足时使用默认值"""
+        histogram = self.stats[model].histogram
+        if histogram.count < DEFAULT_CONFIG["hedge_min_samples"]:
+            return self.hedge_delay
+        return histogram.percentile(DEFAULT_CONFIG["hedge_percentile"])
+
+    def _begin(self, model: str):
+        with self._lock:
+            stats = self.stats[model]
+            stats.inflight += 1
+            stats.requests += 1
+
+    def _end(self, model: str, latency: Optional[float], ok: Optional[bool]):
+        """
+        结束一次请求
+
+        Args:
+            ok: 是否成功，None 表示请求被取消（如对冲落败），不计入成功或失败
+        """
+        with self._lock:
+            stats = self.stats[model]
+            stats.inflight -= 1
+            if ok is None:
+                return
+            stats.error_rate += _EWMA_ALPHA * ((0.0 if ok else 1.0) - stats.error_rate)
+            if not ok:
+                stats.errors += 1
+                stats.last_error_at = time.monotonic()
+            elif latency is not None:
+                stats.ewma_latency = (latency if stats.ewma_latency is None else
+                                      stats.ewma_latency + _EWMA_ALPHA * (latency - stats.ewma_latency))
+        if ok and latency is not None:
+            stats.histogram.record(latency)
+
+    def _decide(self, primary: str, reason: str, hedged_to: Optional[str],
+                winner: Optional[str], latency: float):
+        span = current_span()
+        if span:
+            span.set("route_reason", reason)
+            if winner is not None:
+                span.set("model", winner)
+            if hedged_to is not None:
+                span.set("hedged_to", hedged_to)
+        with self._lock:
+            self.reasons[reason] += 1
+            if hedged_to is not None:
+                self.hedges += 1
+                if winner == hedged_to:
+                    self.stats[winner].hedge_wins += 1
+            self.decisions.append({
+                "model": primary,
+                "reason": reason,
+                "hedged_to": hedged_to,
+                "winner": winner,
+                "latency": latency,
+            })
+
+    def routing_stats(self) -> Dict[str, Any]:
+        """
+        获取路由统计
+
+        Returns:
+            各模型的请求数、错误率、并发数、对冲胜出次数和延迟直方图，
+            以及路由原因计数和最近的路由决策
+        """
+        with self._lock:
+            decisions = list(self.decisions)
+            reasons = dict(self.reasons)
+            hedges = self.hedges
+        return {
+            "models": {model: stats.snapshot() for model, stats in self.stats.items()},
+            "reasons": reasons,
+            "hedges": hedges,
+            "decisions": decisions,
+        }
+
+
+class _StreamProxy:
+    """
+    路由客户端返回的流的公共部分
+
+    记录首个分块的延迟，流结束或被关闭时释放并发计数；finish_reason、usage、tool_calls、
+    on_tool_call 等属性转发给上游的流，因此可以像客户端的流一样使用。
+    """
+
+    def __init__(self, router: _Router, model: str, start: float, stream):
+        self._router = router
+        self._model = model
+        self._start = start
+        self._stream = stream
+        self._first_latency = None
+        self._ended = False
+
+    def __getattr__(self, name: str) -> Any:
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return getattr(self._stream, name)
+
+    @property
+    def on_tool_call(self):
+        return self._stream.on_tool_call
+
+    @on_tool_call.setter
+    def on_tool_call(self, callback):
+        self._stream.on_tool_call = callback
+
+    def _record_chunk(self):
+        if self._first_latency is None:
+            self._first_latency = time.perf_counter() - self._start
+
+
+class _TrackedStream(_StreamProxy):
+    """同步路由客户端返回的流，用法同 ChatStream"""
+
+    def __init__(self, router: _Router, model: str, start: float, stream):
+        super().__init__(router, model, start, stream)
+        self._chunks = iter(stream)
+
+    def __iter__(self):
+        return self
+
+    def __next__(self) -> str:
+        try:
+            chunk = next(self._chunks)
+        except StopIteration:
+            self._finish(True)
+            raise
+        except BaseException:
+            self._finish(False)
+            raise
+        self._record_chunk()
+        return chunk
+
+    def _finish(self, ok: bool):
+        if self._ended:
+            return
+        self._ended = True
+        try:
+            close = getattr(self._stream, "close", None)
+            if close is not None:
+                close()
+        finally:
+            self._router._end(self._model, self._first_latency, ok)
+
+    def close(self):
+        """关闭流并释放连接，提前关闭不算作失败"""
+        self._finish(True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+class _AsyncTrackedStream(_StreamProxy):
+    """异步路由客户端返回的流，用法同 AsyncChatStream，关闭使用 aclose()"""
+
+    def __init__(self, router: _Router, model: str, start: float, stream):
+        super().__init__(router, model, start, stream)
+        self._chunks = stream.__aiter__()
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self) -> str:
+        try:
+            chunk = await self._chunks.__anext__()
+        except StopAsyncIteration:
+            await self._afinish(True)
+            raise
+        except asyncio.CancelledError:
+            await self._afinish(None)
+            raise
+        except BaseException:
+            await self._afinish(False)
+            raise
+        self._record_chunk()
+        return chunk
+
+    async def _afinish(self, ok: Optional[bool]):
+        if self._ended:
+            return
+        self._ended = True
+        try:
+            aclose = getattr(self._stream, "aclose", None)
+            if aclose is not None:
+                await aclose()
+        finally:
+            self._router._end(self._model, self._first_latency, ok)
+
+    async def aclose(self):
+        """关闭流并释放连接，提前关闭不算作失败"""
+        await self._afinish(True)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.aclose()
+
+
+class RoutingClient(_Router):
+    """
+    同步路由客户端，接口与 SiliconFlowClient 一致，可直接交给 TravelAssistantAgent
+
+    对冲请求在线程池中执行；同步请求无法中途取消，落败的请求在后台完成后被丢弃
+    （尚未开始的会被取消）。流式请求不做对冲，只在建立连接失败时转移到备选模型。
+    """
+
+    def __init__(self, clients: list, fallback_clients: list = None, **kwargs):
+        super().__init__(clients, fallback_clients, **kwargs)
+        self._executor = ThreadPoolExecutor(max_workers=2 * self.max_inflight,
+                                            thread_name_prefix="router")
+
+    @classmethod
+    def from_models(cls, api_key: str, models: list = None, fallback_models: list = None,
+                    router_kwargs: dict = None, **client_kwargs) -> "RoutingClient":
+        """
+        按模型名称创建路由客户端，所有客户端共享一个连接池
+
+        Args:
+            api_key: API密钥
+            models: 主模型名称或别名
+            fallback_models: 降级模型名称或别名
+            router_kwargs: 传给路由客户端的参数
+            **client_kwargs: 传给 SiliconFlowClient 的参数
+
+        Returns:
+            RoutingClient
+        """
+        from .client import SiliconFlowClient
+
+        models = _resolve(models or DEFAULT_CONFIG["routing_models"])
+        fallback_models = _resolve(fallback_models if fallback_models is not None
+                                   else DEFAULT_CONFIG["routing_fallback_models"])
+        first = SiliconFlowClient(api_key=api_key, model=models[0], **client_kwargs)
+        client_kwargs["session"] = first.session
+
+        def make(model):
+            return first if model == first.model else SiliconFlowClient(
+                api_key=api_key, model=model, **client_kwargs)
+
+        return cls([make(m) for m in models], [make(m) for m in fallback_models],
+                   **(router_kwargs or {}))
+
+    def close(self):
+        """关闭线程池和所有客户端"""
+        self._executor.shutdown(wait=False)
+        for client in {id(c): c for c in list(self.clients.values())
+                       + list(self.fallback_clients.values())}.values():
+            client.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def _call(self, model: str, messages: list, kwargs: dict) -> Tuple[str, float]:
+        self._begin(model)
+        start = time.perf_counter()
+        try:
+            result = self._client(model).chat(messages, stream=False, **kwargs)
+        except Exception:
+            self._end(model, None, False)
+            raise
+        latency = time.perf_counter() - start
+        self._end(model, latency, True)
+        return result, latency
+
+    def chat(self, messages: list, stream: bool = False, **kwargs) -> Any:
+        """
+        发送聊天请求
+
+        Args:
+            messages: 消息列表
+            stream: 是否使用流式输出
+            **kwargs: 透传给客户端的参数（temperature、max_tokens）
+
+        Returns:
+            流式模式下返回与 ChatStream 接口一致的流，非流式模式下返回字符串
+        """
+        ranked, reason = self.route()
+        if stream:
+            return self._chat_stream(ranked, reason, messages, kwargs)
+
+        primary = ranked[0]
+        start = time.perf_counter()
+        futures = {self._executor.submit(bind(self._call), primary, messages, kwargs): primary}
+        backups = iter(ranked[1:])
+        hedged_to = None
+        self.hedge_budget.record_request()
+
+        done, pending = wait(futures, timeout=self._hedge_after(primary))
+        if not done and self.hedge and self.hedge_budget.try_retry():
+            hedged_to = next(backups, None)
+            if hedged_to is not None:
+                futures[self._executor.submit(bind(self._call), hedged_to, messages, kwargs)] = hedged_to
+
+        error = None
+        pending = set(futures)
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                try:
+                    result, _ = future.result()
+                except Exception as e:
+                    error = e
+                    continue
+                for other in pending:
+                    other.cancel()
+                self._decide(primary, reason, hedged_to, futures[future], time.perf_counter() - start)
+                return result
+            if not pending and hedged_to is None:
+                # 主模型失败且尚未对冲，立即转移到下一个模型
+                hedged_to = next(backups, None)
+                if hedged_to is not None:
+                    future = self._executor.submit(bind(self._call), hedged_to, messages, kwargs)
+                    futures[future] = hedged_to
+                    pending = {future}
+
+        self._decide(primary, reason, hedged_to, None, time.perf_counter() - start)
+        raise error
+
+    def _chat_stream(self, ranked: list, reason: str, messages: list, kwargs: dict) -> _TrackedStream:
+        error = None
+        for model in ranked[:2]:
+            self._begin(model)
+            start = time.perf_counter()
+            try:
+                chunks = self._client(model).chat(messages, stream=True, **kwargs)
+            except Exception as e:
+                self._end(model, None, False)
+                error = e
+                continue
+            self._decide(ranked[0], reason, None if model == ranked[0] else model, model, 0.0)
+            return _TrackedStream(self, model, start, chunks)
+        raise error
+
+
+class AsyncRoutingClient(_Router):
+    """
+    异步路由客户端，包装多个 AsyncSiliconFlowClient
+
+    对冲请求中落败的一方会被真正取消并关闭连接。
+    """
+
+    async def close(self):
+        """关闭所有客户端"""
+        for client in list(self.clients.values()) + list(self.fallback_clients.values()):
+            await client.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+
+    async def _call(self, model: str, messages: list, kwargs: dict) -> str:
+        self._begin(model)
+        start = time.perf_counter()
+        try:
+            result = await self._client(model).chat(messages, stream=False, **kwargs)
+        except asyncio.CancelledError:
+            self._end(model, None, None)
+            raise
+        except Exception:
+            self._end(model, None, False)
+            raise
+        self._end(model, time.perf_counter() - start, True)
+        return result
+
+    async def chat(self, messages: list, stream: bool = False, **kwargs) -> Any:
+        """
+        发送聊天请求
+
+        Args:
+            messages: 消息列表
+            stream: 是否使用流式输出
+            **kwargs: 透传给客户端的参数
+
+        Returns:
+            流式模式下返回与 AsyncChatStream 接口一致的流，非流式模式下返回字符串
+        """
+        ranked, reason = self.route()
+        if stream:
+            return await self._chat_stream(ranked, reason, messages, kwargs)
+
+        primary = ranked[0]
+        start = time.perf_counter()
+        tasks = {asyncio.ensure_future(self._call(primary, messages, kwargs)): primary}
+        backups = iter(ranked[1:])
+        hedged_to = None
+        self.hedge_budget.record_request()
+
+        done, _ = await asyncio.wait(tasks, timeout=self._hedge_after(primary))
+        if not done and self.hedge and self.hedge_budget.try_retry():
+            hedged_to = next(backups, None)
+            if hedged_to is not None:
+                tasks[asyncio.ensure_future(self._call(hedged_to, messages, kwargs))] = hedged_to
+
+        error = None
+        pending = set(tasks)
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is not None:
+                        error = task.exception()
+                        continue
+                    self._decide(primary, reason, hedged_to, tasks[task], time.perf_counter() - start)
+                    return task.result()
+                if not pending and hedged_to is None:
+                    hedged_to = next(backups, None)
+                    if hedged_to is not None:
+                        task = asyncio.ensure_future(self._call(hedged_to, messages, kwargs))
+                        tasks[task] = hedged_to
+                        pending = {task}
+        finally:
+            for task in pending:
+                task.cancel()
+
+        self._decide(primary, reason, hedged_to, None, time.perf_counter() - start)
+        raise error
+
+    async def _chat_stream(self, ranked: list, reason: str, messages: list,
+                           kwargs: dict) -> _AsyncTrackedStream:
+        error = None
+        for model in ranked[:2]:
+            # 与同步路径一致，首个分块延迟从发起连接开始计算
+            self._begin(model)
+            start = time.perf_counter()
+            try:
+                chunks = await self._client(model).chat(messages, stream=True, **kwargs)
+            except asyncio.CancelledError:
+                self._end(model, None, None)
+                raise
+            except Exception as e:
+                self._end(model, None, False)
+                error = e
+                continue
+            self._decide(ranked[0], reason, None if model == ranked[0] else model, model, 0.0)
+            return _AsyncTrackedStream(self, model, start, chunks)
+        raise error
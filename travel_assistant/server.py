@@ -0,0 +1,205 @@
+"""
+本地 HTTP / WebSocket 服务
+基于 aiohttp，所有连接共享一个 SessionManager
+
+用法:
+    SILICONFLOW_API_KEY=... python -m travel_assistant.server --port 8080
+"""
+
+import argparse
+import asyncio
+import functools
+import json
+import math
+import os
+
+from .config import DEFAULT_CONFIG
+from .rate_limit import RateLimitExceeded, rate_limiters
+from .resilience import CircuitOpenError
+from .sessions import SessionManager
+from .tracing import PrometheusExporter, get_tracer
+
+try:
+    from aiohttp import web, WSMsgType
+except ImportError:  # pragma: no cover - 可选依赖
+    web = None
+
+# 后台清理任务在应用中的键
+_EVICT_TASK = web.AppKey("evict_task", asyncio.Task) if web is not None else None
+
+
+async def _handle_query(manager: SessionManager, session_id, query: str) -> dict:
+    """在会话中处理查询，同步客户端放入线程池执行"""
+    if asyncio.iscoroutinefunction(manager.agent.client.chat):
+        return await manager.arun(session_id, query)
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(None, functools.partial(manager.run, session_id, query))
+
+
+def _error_status(exc: Exception) -> int:
+    """把处理查询时的异常映射为 HTTP 状态码：本地限流 429、熔断 503、上游失败或超时 502"""
+    if isinstance(exc, RateLimitExceeded):
+        return 429
+    if isinstance(exc, CircuitOpenError):
+        return 503
+    if isinstance(exc, (ConnectionError, TimeoutError, asyncio.TimeoutError)):
+        return 502
+    return 500
+
+
+def _error_body(exc: Exception) -> dict:
+    return {"error": str(exc) or type(exc).__name__}
+
+
+def create_app(manager: SessionManager, evict_interval: float = None,
+               metrics: PrometheusExporter = None) -> "web.Application":
+    """
+    创建 aiohttp 应用
+
+    路由:
+        POST   /sessions                   创建会话
+        POST   /sessions/{session_id}/messages  在会话中提问 {"query": "..."}
+        DELETE /sessions/{session_id}      关闭会话
+        POST   /chat                       {"session_id": 可选, "query": "..."}
+        GET    /stats                      会话统计（启用限流时包含各限流器的排队和等待时间）
+        GET    /metrics                    Prometheus 指标（传入 metrics 时）
+        GET    /ws                         WebSocket，每条消息为 {"session_id": 可选, "query": "..."}
+
+    Args:
+        manager: 会话管理器
+        evict_interval: 清理空闲会话的间隔（秒）
+        metrics: Prometheus 导出器（可选），注册为全局追踪导出器
+
+    Returns:
+        web.Application
+    """
+    if web is None:
+        raise ImportError("服务需要安装 aiohttp: pip install travel-assistant-agent[async]")
+
+    evict_interval = evict_interval or DEFAULT_CONFIG["session_evict_interval"]
+    routes = web.RouteTableDef()
+
+    async def _read_query(request) -> tuple:
+        try:
+            body = await request.json()
+        except json.JSONDecodeError:
+            raise web.HTTPBadRequest(text="请求体必须是JSON")
+        query = body.get("query")
+        if not query:
+            raise web.HTTPBadRequest(text="缺少 query 字段")
+        return body.get("session_id"), query
+
+    async def _answer(session_id, query: str):
+        try:
+            return web.json_response(await _handle_query(manager, session_id, query))
+        except Exception as e:
+            headers = None
+            if isinstance(e, CircuitOpenError):
+                headers = {"Retry-After": str(math.ceil(e.retry_in))}
+            return web.json_response(_error_body(e), status=_error_status(e), headers=headers)
+
+    @routes.post("/sessions")
+    async def create_session(request):
+        session = manager.get_or_create()
+        return web.json_response({"session_id": session.session_id})
+
+    @routes.post("/sessions/{session_id}/messages")
+    async def post_message(request):
+        session_id = request.match_info["session_id"]
+        if session_id not in manager:
+            raise web.HTTPNotFound(text="会话不存在或已过期")
+        _, query = await _read_query(request)
+        return await _answer(session_id, query)
+
+    @routes.delete("/sessions/{session_id}")
+    async def delete_session(request):
+        if not manager.close_session(request.match_info["session_id"]):
+            raise web.HTTPNotFound(text="会话不存在或已过期")
+        return web.json_response({"ok": True})
+
+    @routes.post("/chat")
+    async def chat(request):
+        session_id, query = await _read_query(request)
+        return await _answer(session_id, query)
+
+    @routes.get("/stats")
+    async def stats(request):
+        stats = manager.stats()
+        limiters = rate_limiters()
+        if limiters:
+            stats["rate_limits"] = [limiter.stats() for limiter in limiters]
+        return web.json_response(stats)
+
+    if metrics is not None:
+        get_tracer().add_exporter(metrics)
+
+        @routes.get("/metrics")
+        async def metrics_endpoint(request):
+            return web.Response(text=metrics.render(), content_type="text/plain")
+
+    @routes.get("/ws")
+    async def websocket(request):
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        session_id = None
+        async for msg in ws:
+            if msg.type != WSMsgType.TEXT:
+                continue
+            try:
+                data = json.loads(msg.data)
+                query = data["query"]
+            except (json.JSONDecodeError, KeyError, TypeError):
+                await ws.send_json({"error": "消息格式应为 {\"query\": \"...\"}"})
+                continue
+            session_id = data.get("session_id") or session_id
+            try:
+                result = await _handle_query(manager, session_id, query)
+            except Exception as e:
+                # 单条消息失败只回复错误，连接保持
+                await ws.send_json({**_error_body(e), "status": _error_status(e)})
+                continue
+            session_id = result["session_id"]
+            await ws.send_json(result)
+        return ws
+
+    async def _evict_loop(app):
+        while True:
+            await asyncio.sleep(evict_interval)
+            manager.evict_idle()
+
+    async def _start_background(app):
+        app[_EVICT_TASK] = asyncio.ensure_future(_evict_loop(app))
+
+    async def _stop_background(app):
+        app[_EVICT_TASK].cancel()
+
+    app = web.Application()
+    app.add_routes(routes)
+    app.on_startup.append(_start_background)
+    app.on_cleanup.append(_stop_background)
+    return app
+
+
+def main():
+    """命令行入口"""
+    from .agent import TravelAssistantAgent
+    from .async_client import AsyncSiliconFlowClient
+
+    parser = argparse.ArgumentParser(description="旅行助手多会话服务")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--model", default=None)
+    parser.add_argument("--metrics", action="store_true", help="开启追踪并提供 /metrics")
+    args = parser.parse_args()
+
+    api_key = os.environ.get("SILICONFLOW_API_KEY")
+    if not api_key:
+        raise SystemExit("请设置 SILICONFLOW_API_KEY 环境变量")
+
+    agent = TravelAssistantAgent(AsyncSiliconFlowClient(api_key=api_key, model=args.model))
+    metrics = PrometheusExporter() if args.metrics else None
+    web.run_app(create_app(SessionManager(agent), metrics=metrics), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,261 @@
+"""
+会话管理模块
+多个轻量会话共享同一个智能体（客户端、工具注册表、线程池），各自保存对话历史
+"""
+
+import asyncio
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+from .config import DEFAULT_CONFIG
+
+
+class AgentSession:
+    """
+    单个会话的状态
+
+    只保存对话历史和少量元数据，客户端和工具由智能体共享。
+    """
+
+    __slots__ = ("session_id", "conversation_history", "history",
+                 "created_at", "last_active", "turns", "lock", "_alock", "inflight")
+
+    def __init__(self, session_id: str = None):
+        """
+        初始化会话
+
+        Args:
+            session_id: 会话ID，不传则自动生成
+        """
+        self.session_id = session_id or uuid.uuid4().hex
+        self.conversation_history: List[str] = []
+        self.history = None
+        self.created_at = self.last_active = time.monotonic()
+        self.turns = 0
+        self.lock = threading.Lock()
+        self._alock = None
+        # 进行中（包括等待会话锁）的请求数，由 SessionManager 在持锁时维护
+        self.inflight = 0
+
+    @property
+    def alock(self) -> asyncio.Lock:
+        """异步模式下串行化同一会话的请求"""
+        if self._alock is None:
+            self._alock = asyncio.Lock()
+        return self._alock
+
+    def touch(self):
+        """记录一次活动"""
+        self.last_active = time.monotonic()
+        self.turns += 1
+
+    def reset(self):
+        """清空会话历史"""
+        self.conversation_history = []
+        self.history = None
+
+    def memory_estimate(self) -> int:
+        """
+        估计会话历史占用的内存（字节）
+
+        Returns:
+            历史文本的字符数之和乘以每字符的估计字节数
+        """
+        chars = sum(len(entry) for entry in self.conversation_history)
+        if self.history is not None:
+            chars += self.history.total_chars
+        return chars * 2
+
+
+class SessionManager:
+    """
+    会话管理器
+
+    所有会话共享一个智能体实例；同一会话的请求串行执行，不同会话可以并发。
+    空闲超时的会话会被淘汰，会话数或估计内存超过上限时淘汰最久未活动的会话。
+    """
+
+    def __init__(self, agent, max_sessions: int = None,
+                 idle_timeout: float = None, max_memory_bytes: int = None):
+        """
+        初始化会话管理器
+
+        Args:
+            agent: 共享的 TravelAssistantAgent
+            max_sessions: 最大会话数
+            idle_timeout: 空闲超时时间（秒）
+            max_memory_bytes: 所有会话历史的估计内存上限（字节）
+        """
+        self.agent = agent
+        self.max_sessions = max_sessions or DEFAULT_CONFIG["max_sessions"]
+        self.idle_timeout = idle_timeout or DEFAULT_CONFIG["session_idle_timeout"]
+        self.max_memory_bytes = max_memory_bytes or DEFAULT_CONFIG["session_max_memory_bytes"]
+        self._sessions: "OrderedDict[str, AgentSession]" = OrderedDict()
+        self._memory: Dict[str, int] = {}
+        self._total_memory = 0
+        self._lock = threading.Lock()
+        self.created = 0
+        self.evicted = 0
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def __contains__(self, session_id: str) -> bool:
+        return session_id in self._sessions
+
+    def get_or_create(self, session_id: str = None) -> AgentSession:
+        """
+        获取会话，不存在时创建
+
+        Args:
+            session_id: 会话ID，不传则创建新会话
+
+        Returns:
+            AgentSession
+        """
+        with self._lock:
+            return self._get_or_create_locked(session_id)
+
+    def _get_or_create_locked(self, session_id: Optional[str], checkout: bool = False) -> AgentSession:
+        """获取或创建会话（需持有锁），checkout 时在淘汰之前计入进行中的请求"""
+        session = self._sessions.get(session_id) if session_id else None
+        if session is not None:
+            self._sessions.move_to_end(session.session_id)
+            if checkout:
+                session.inflight += 1
+            return session
+        session = AgentSession(session_id)
+        self._sessions[session.session_id] = session
+        self._memory[session.session_id] = 0
+        self.created += 1
+        if checkout:
+            session.inflight += 1
+        self._evict_locked()
+        return session
+
+    def _checkout(self, session_id: Optional[str]) -> AgentSession:
+        """取出会话并标记为进行中，进行中的会话不会被淘汰"""
+        with self._lock:
+            return self._get_or_create_locked(session_id, checkout=True)
+
+    def _checkin(self, session: AgentSession):
+        with self._lock:
+            session.inflight -= 1
+
+    def close_session(self, session_id: str) -> bool:
+        """
+        关闭会话
+
+        Args:
+            session_id: 会话ID
+
+        Returns:
+            会话是否存在
+        """
+        with self._lock:
+            return self._remove_locked(session_id)
+
+    def run(self, session_id: Optional[str], user_query: str, **kwargs) -> Dict[str, Any]:
+        """
+        在会话中处理一次请求
+
+        Args:
+            session_id: 会话ID，不传则创建新会话
+            user_query: 用户查询
+            **kwargs: 透传给 agent.run 的参数
+
+        Returns:
+            {"session_id": ..., "answer": ...}
+        """
+        kwargs.setdefault("verbose", False)
+        session = self._checkout(session_id)
+        try:
+            with session.lock:
+                answer = self.agent.run(user_query, session=session, **kwargs)
+        finally:
+            self._checkin(session)
+        self._account(session)
+        return {"session_id": session.session_id, "answer": answer}
+
+    async def arun(self, session_id: Optional[str], user_query: str, **kwargs) -> Dict[str, Any]:
+        """
+        在会话中异步处理一次请求，需要智能体使用异步客户端
+
+        Args:
+            session_id: 会话ID，不传则创建新会话
+            user_query: 用户查询
+            **kwargs: 透传给 agent.arun 的参数
+
+        Returns:
+            {"session_id": ..., "answer": ...}
+        """
+        session = self._checkout(session_id)
+        try:
+            async with session.alock:
+                answer = await self.agent.arun(user_query, session=session, **kwargs)
+        finally:
+            self._checkin(session)
+        self._account(session)
+        return {"session_id": session.session_id, "answer": answer}
+
+    def evict_idle(self) -> int:
+        """
+        淘汰空闲超时的会话
+
+        Returns:
+            淘汰的会话数
+        """
+        deadline = time.monotonic() - self.idle_timeout
+        with self._lock:
+            expired = [sid for sid, s in self._sessions.items()
+                       if s.last_active < deadline and not s.inflight]
+            for sid in expired:
+                self._remove_locked(sid)
+            self.evicted += len(expired)
+            return len(expired)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        获取会话统计
+
+        Returns:
+            当前会话数、累计创建/淘汰数和估计内存
+        """
+        with self._lock:
+            return {
+                "sessions": len(self._sessions),
+                "created": self.created,
+                "evicted": self.evicted,
+                "memory_bytes": self._total_memory,
+            }
+
+    def _account(self, session: AgentSession):
+        """更新会话的内存估计并按上限淘汰"""
+        size = session.memory_estimate()
+        with self._lock:
+            if session.session_id not in self._memory:
+                return
+            self._total_memory += size - self._memory[session.session_id]
+            self._memory[session.session_id] = size
+            self._sessions.move_to_end(session.session_id)
+            self._evict_locked()
+
+    def _evict_locked(self):
+        """按会话数和内存上限淘汰最久未活动的会话（需持有锁）"""
+        while self._sessions and (len(self._sessions) > self.max_sessions
+                                  or self._total_memory > self.max_memory_bytes):
+            victim = next((sid for sid, s in self._sessions.items() if not s.inflight), None)
+            if victim is None:
+                break
+            self._remove_locked(victim)
+            self.evicted += 1
+
+    def _remove_locked(self, session_id: str) -> bool:
+        session = self._sessions.pop(session_id, None)
+        if session is None:
+            return False
+        self._total_memory -= self._memory.pop(session_id, 0)
+        return True
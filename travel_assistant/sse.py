@@ -0,0 +1,382 @@
+"""
+SSE 流式响应解码模块
+在原始字节上增量解析 Server-Sent Events，支持多行 data、event/id/retry 字段、
+CRLF 换行以及跨网络分块的 UTF-8 多字节字符；ChatStream 在此之上解析
+OpenAI 兼容的聊天分块，拼接工具调用的参数增量，并保留最后一块中的 finish_reason 和 usage
+"""
+
+import json
+from collections import deque
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from .tracing import record_usage
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - 可选依赖
+    orjson = None
+
+# 可选的快速 JSON 后端
+loads = orjson.loads if orjson is not None else json.loads
+
+DONE = "[DONE]"
+
+
+class SSEEvent:
+    """
+    一个完整的 SSE 事件
+    """
+
+    __slots__ = ("event", "data", "id", "retry")
+
+    def __init__(self, data: str, event: str = "message", id: str = None, retry: int = None):
+        self.data = data
+        self.event = event
+        self.id = id
+        self.retry = retry
+
+    def __repr__(self):
+        return f"SSEEvent(event={self.event!r}, data={self.data!r}, id={self.id!r})"
+
+
+class SSEDecoder:
+    """
+    增量 SSE 解码器
+
+    按网络分块喂入原始字节，返回已经完整的事件。只在事件完整后才做 UTF-8 解码，
+    因此被拆开的多字节字符不会出错。
+    """
+
+    def __init__(self):
+        self._buffer = b""
+        self._data: List[bytes] = []
+        self._event = None
+        self._retry = None
+        self.last_event_id = None
+
+    def feed(self, chunk: bytes) -> List[SSEEvent]:
+        """
+        喂入一个字节分块
+
+        Args:
+            chunk: 原始字节
+
+        Returns:
+            本次分块中完成的事件列表
+        """
+        buffer = self._buffer + chunk if self._buffer else chunk
+        held = b""
+        if b"\r" in buffer:
+            # 末尾的 \r 可能与下一块开头的 \n 组成 CRLF，留到下次处理
+            if buffer.endswith(b"\r"):
+                buffer, held = buffer[:-1], b"\r"
+            buffer = buffer.replace(b"\r\n", b"\n").replace(b"\r", b"\n")
+        lines = buffer.split(b"\n")
+        self._buffer = lines.pop() + held
+
+        events = []
+        for line in lines:
+            if not line:
+                # 规范要求 data 为空的事件不派发
+                if self._data and self._data != [b""]:
+                    events.append(self._dispatch())
+                else:
+                    self._data = []
+                    self._event = None
+            elif line.startswith(b"data:"):
+                # 最常见的情况放在最前面
+                value = line[5:]
+                self._data.append(value[1:] if value[:1] == b" " else value)
+            elif line[:1] != b":":
+                self._field(line)
+        return events
+
+    def close(self) -> List[SSEEvent]:
+        """
+        结束解码
+
+        规范要求丢弃流末尾不完整的事件，这里为兼容缺少最后空行的服务端，
+        仍然返回已经收到的数据。
+
+        Returns:
+            剩余的事件列表
+        """
+        events = self.feed(b"\n\n") if self._buffer or self._data else []
+        self._buffer = b""
+        return events
+
+    def _field(self, line: bytes):
+        """处理 data 以外的字段，未知字段按规范忽略"""
+        field, _, value = line.partition(b":")
+        if value[:1] == b" ":
+            value = value[1:]
+        if field == b"data":
+            self._data.append(value)
+        elif field == b"event":
+            self._event = value.decode("utf-8", "replace")
+        elif field == b"id":
+            if b"\0" not in value:
+                self.last_event_id = value.decode("utf-8", "replace")
+        elif field == b"retry":
+            if value.isdigit():
+                self._retry = int(value)
+
+    def _dispatch(self) -> SSEEvent:
+        data = self._data[0] if len(self._data) == 1 else b"\n".join(self._data)
+        event = SSEEvent(data.decode("utf-8"), self._event or "message",
+                         self.last_event_id, self._retry)
+        self._data = []
+        self._event = None
+        return event
+
+
+class _ChatStreamState:
+    """
+    聊天分块解析，同步和异步流共用
+    """
+
+    def __init__(self, on_close: Callable = None):
+        self._decoder = SSEDecoder()
+        self._pending = deque()
+        self._on_close = on_close
+        self._on_complete = None
+        self._recorded = None
+        self.finish_reason: Optional[str] = None
+        self.usage: Optional[Dict[str, Any]] = None
+        self.tool_calls: List[Dict[str, Any]] = []
+        # 每个工具调用的参数接收完整时调用 on_tool_call(index, call)
+        self.on_tool_call: Optional[Callable[[int, Dict[str, Any]], None]] = None
+        self._tool_calls_done = 0
+        self.model: Optional[str] = None
+        self.id: Optional[str] = None
+        self.done = False
+        self.closed = False
+
+    def record(self, callback: Callable[[List[str], Optional[Dict[str, Any]]], None]):
+        """
+        记录所有内容分块，流完整结束时调用 callback(分块列表, usage)
+
+        提前关闭的流不会触发回调。
+
+        Returns:
+            self
+        """
+        self._recorded = []
+        self._on_complete = callback
+        return self
+
+    def _handle(self, events: List[SSEEvent]):
+        for event in events:
+            data = event.data
+            if data == DONE:
+                self.done = True
+                return
+            if event.event == "error":
+                raise ConnectionError(f"流式响应出错: {data}")
+            try:
+                chunk = loads(data)
+            except ValueError:
+                raise ValueError(f"流式数据块格式错误: {data[:200]!r}")
+            self._consume(chunk)
+
+    def _consume(self, chunk: Dict[str, Any]):
+        choices = chunk.get("choices")
+        if choices:
+            choice = choices[0]
+            delta = choice.get("delta")
+            if delta:
+                content = delta.get("content")
+                if content:
+                    self._pending.append(content)
+                    if self._recorded is not None:
+                        self._recorded.append(content)
+                calls = delta.get("tool_calls")
+                if calls:
+                    self._merge_tool_calls(calls)
+            reason = choice.get("finish_reason")
+            if reason:
+                self.finish_reason = reason
+        elif "error" in chunk:
+            error = chunk["error"]
+            message = error.get("message", error) if isinstance(error, dict) else error
+            raise ConnectionError(f"流式响应出错: {message}")
+        usage = chunk.get("usage")
+        if usage:
+            self.usage = usage
+            record_usage(usage)
+        if self.model is None:
+            self.model = chunk.get("model")
+            self.id = chunk.get("id")
+
+    def _merge_tool_calls(self, deltas: List[Dict[str, Any]]):
+        """拼接工具调用增量：id 和名称出现一次，参数分多块到达"""
+        for delta in deltas:
+            index = delta.get("index", len(self.tool_calls) - 1 if self.tool_calls else 0)
+            while len(self.tool_calls) <= index:
+                self.tool_calls.append({"id": None, "type": "function",
+                                        "function": {"name": "", "arguments": ""}})
+            call = self.tool_calls[index]
+            if delta.get("id"):
+                call["id"] = delta["id"]
+            function = delta.get("function") or {}
+            if function.get("name"):
+                call["function"]["name"] += function["name"]
+            if function.get("arguments"):
+                call["function"]["arguments"] += function["arguments"]
+        # 出现新的工具调用说明之前的调用已经完整
+        self._complete_tool_calls(len(self.tool_calls) - 1)
+
+    def _complete_tool_calls(self, upto: int):
+        while self._tool_calls_done < upto:
+            index = self._tool_calls_done
+            self._tool_calls_done += 1
+            call = self.tool_calls[index]
+            if call["id"] is None:
+                call["id"] = f"call_{index}"
+            if self.on_tool_call is not None:
+                self.on_tool_call(index, call)
+
+    def _finish(self):
+        """流结束：完成剩余的工具调用，触发记录回调"""
+        self._complete_tool_calls(len(self.tool_calls))
+        self.done = True
+        if self._on_complete is not None:
+            callback, self._on_complete = self._on_complete, None
+            callback(self._recorded, self.usage)
+
+    def _release(self):
+        if not self.closed:
+            self.closed = True
+            if self._on_close is not None:
+                self._on_close()
+
+
+class ChatStream(_ChatStreamState):
+    """
+    同步流式聊天响应
+
+    迭代得到内容分块（str），读取完毕后 finish_reason、usage 可用；
+    调用 close() 或提前退出 with 块会关闭底层 HTTP 连接。
+    """
+
+    def __init__(self, byte_chunks: Iterable[bytes], on_close: Callable[[], None] = None):
+        """
+        初始化流
+
+        Args:
+            byte_chunks: 原始字节分块迭代器，如 response.iter_content(chunk_size=None)
+            on_close: 关闭流时调用，用于释放连接
+        """
+        super().__init__(on_close)
+        self._chunks = iter(byte_chunks)
+
+    @classmethod
+    def replay(cls, chunks: List[str], usage: Dict[str, Any] = None,
+               finish_reason: str = "stop") -> "ChatStream":
+        """
+        由缓存的内容分块构造已经结束的流，接口与网络流一致
+
+        Args:
+            chunks: 内容分块
+            usage: 缓存的token用量
+            finish_reason: 结束原因，只有完整结束的流会被缓存
+
+        Returns:
+            ChatStream
+        """
+        stream = cls(())
+        stream._pending.extend(chunks)
+        stream.done = True
+        stream.finish_reason = finish_reason
+        stream.usage = usage
+        return stream
+
+    def __iter__(self):
+        return self
+
+    def __next__(self) -> str:
+        pending = self._pending
+        while not pending:
+            if self.done:
+                self._finish()
+                self.close()
+                raise StopIteration
+            try:
+                chunk = next(self._chunks)
+            except StopIteration:
+                # 服务端没有发送 [DONE] 就结束了
+                self._handle(self._decoder.close())
+                self.done = True
+                continue
+            except BaseException:
+                self.close()
+                raise
+            try:
+                self._handle(self._decoder.feed(chunk))
+            except Exception:
+                self.close()
+                raise
+        return pending.popleft()
+
+    def close(self):
+        """关闭流并释放连接"""
+        self._release()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+class AsyncChatStream(_ChatStreamState):
+    """
+    异步流式聊天响应，用法同 ChatStream，关闭使用 aclose()
+    """
+
+    def __init__(self, byte_chunks, on_close: Callable[[], None] = None):
+        """
+        初始化流
+
+        Args:
+            byte_chunks: 原始字节分块异步迭代器，如 response.content.iter_any()
+            on_close: 关闭流时调用，用于释放连接
+        """
+        super().__init__(on_close)
+        self._chunks = byte_chunks.__aiter__()
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self) -> str:
+        pending = self._pending
+        while not pending:
+            if self.done:
+                self._finish()
+                await self.aclose()
+                raise StopAsyncIteration
+            try:
+                chunk = await self._chunks.__anext__()
+            except StopAsyncIteration:
+                self._handle(self._decoder.close())
+                self.done = True
+                continue
+            except BaseException:
+                await self.aclose()
+                raise
+            try:
+                self._handle(self._decoder.feed(chunk))
+            except Exception:
+                await self.aclose()
+                raise
+        return pending.popleft()
+
+    async def aclose(self):
+        """关闭流并释放连接"""
+        self._release()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.aclose()
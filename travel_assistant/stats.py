@@ -0,0 +1,130 @@
+"""
+统计工具模块
+"""
+
+import bisect
+import math
+import threading
+from typing import Any, Dict, Iterable, Sequence
+
+
+def percentile(values: Sequence[float], p: float) -> float:
+    """
+    计算百分位数（线性插值）
+
+    Args:
+        values: 数值序列
+        p: 百分位，0-100
+
+    Returns:
+        百分位数，序列为空时返回 0.0
+    """
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * p / 100
+    low = math.floor(rank)
+    high = math.ceil(rank)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+def summarize_latencies(latencies: Iterable[float],
+                        percentiles: Sequence[float] = (50, 90, 99)) -> Dict[str, float]:
+    """
+    汇总延迟分布
+
+    Args:
+        latencies: 延迟（秒）
+        percentiles: 需要计算的百分位
+
+    Returns:
+        包含 count、mean、max 和 p50/p90/p99 等键的字典
+    """
+    values = sorted(latencies)
+    summary = {
+        "count": len(values),
+        "mean": sum(values) / len(values) if values else 0.0,
+        "max": values[-1] if values else 0.0,
+    }
+    for p in percentiles:
+        summary[f"p{p:g}"] = percentile(values, p)
+    return summary
+
+
+# 默认的延迟分桶上界（秒）
+DEFAULT_BUCKETS = (0.05, 0.1, 0.2, 0.3, 0.5, 0.75, 1.0, 1.5, 2.0, 3.0, 5.0, 7.5, 10.0, 15.0, 30.0, 60.0)
+
+
+class LatencyHistogram:
+    """
+    固定分桶的延迟直方图
+
+    内存占用与样本数无关，百分位数在桶内线性插值，适合长期运行的服务统计。
+    """
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        """
+        初始化直方图
+
+        Args:
+            buckets: 递增的分桶上界（秒），最后隐含一个 +inf 桶
+        """
+        self.bounds = tuple(buckets)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, value: float):
+        """记录一个样本（秒）"""
+        index = bisect.bisect_left(self.bounds, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.count += 1
+            self.total += value
+            if value > self.max:
+                self.max = value
+
+    def percentile(self, p: float) -> float:
+        """
+        估计百分位数
+
+        Args:
+            p: 百分位，0-100
+
+        Returns:
+            估计值（秒），没有样本时返回 0.0
+        """
+        with self._lock:
+            if not self.count:
+                return 0.0
+            target = self.count * p / 100
+            seen = 0
+            for index, n in enumerate(self.counts):
+                if n and seen + n >= target:
+                    low = self.bounds[index - 1] if index > 0 else 0.0
+                    high = self.bounds[index] if index < len(self.bounds) else self.max
+                    return min(low + (high - low) * (target - seen) / n, self.max)
+                seen += n
+            return self.max
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        导出直方图
+
+        Returns:
+            包含 count、mean、max、p50/p95/p99 和各桶计数的字典
+        """
+        summary = {
+            "count": self.count,
+            "mean": self.total / self.count if self.count else 0.0,
+            "max": self.max,
+            "p50": self.percentile(50),
+            "p95": self.percentile(95),
+            "p99": self.percentile(99),
+        }
+        labels = [f"le_{b:g}" for b in self.bounds] + ["le_inf"]
+        with self._lock:
+            summary["buckets"] = dict(zip(labels, self.counts))
+        return summary
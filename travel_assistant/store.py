@@ -0,0 +1,287 @@
+"""
+持久化存储模块
+基于 SQLite WAL 的进程间共享存储，保存工具结果和 LLM 响应，
+进程重启或发布新版本后无需重新请求 wttr.in 和 LLM 即可命中
+"""
+
+import json
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+from .config import DEFAULT_CONFIG
+
+
+def _encode_key(key: Hashable) -> str:
+    """缓存键转为跨进程稳定的文本，元组与列表编码相同"""
+    return json.dumps(key, ensure_ascii=False, sort_keys=True, separators=(",", ":"), default=repr)
+
+
+class PersistentStore:
+    """
+    持久化键值存储
+
+    WAL 模式下读操作互不阻塞，也不阻塞写操作；同一时刻只有一个写入者，
+    其余进程的写入按 busy_timeout 等待。每个线程使用独立连接，读操作只读不写，
+    过期和超出容量的条目在写入时按 compact_interval 定期清理（compact）。
+
+    值使用 pickle 序列化，只应打开本机可信的数据库文件。
+    """
+
+    def __init__(self, path: str, max_entries: int = None, compact_interval: float = None,
+                 busy_timeout: float = 5.0, clock: Callable[[], float] = time.time):
+        """
+        初始化存储
+
+        Args:
+            path: 数据库文件路径，不存在时创建
+            max_entries: 最多保存的条目数，超过时删除最早写入的条目
+            compact_interval: 自动清理的间隔（秒），0表示每次写入后都清理
+            busy_timeout: 等待其他写入者的最长时间（秒）
+            clock: 时钟函数（墙上时间，进程间一致），便于测试
+        """
+        self.path = path
+        self.max_entries = max_entries or DEFAULT_CONFIG["persistent_store_max_entries"]
+        self.compact_interval = (compact_interval if compact_interval is not None
+                                 else DEFAULT_CONFIG["persistent_store_compact_interval"])
+        self.busy_timeout = busy_timeout
+        self._clock = clock
+        self._local = threading.local()
+        self._write_lock = threading.Lock()
+        self._connections = []
+        self._connections_lock = threading.Lock()
+        self._next_compact = clock() + self.compact_interval
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.compactions = 0
+        self.errors = 0
+        self._stats_lock = threading.Lock()
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        conn = self._connection()
+        with self._write_lock:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                "namespace TEXT NOT NULL, key TEXT NOT NULL, value BLOB NOT NULL, "
+                "created REAL NOT NULL, expires REAL, "
+                "PRIMARY KEY (namespace, key)) WITHOUT ROWID"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS entries_created ON entries (created)")
+            conn.commit()
+
+    def _connection(self) -> sqlite3.Connection:
+        """当前线程的连接"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=self.busy_timeout, check_same_thread=False)
+            # WAL 下 NORMAL 只在断电时可能丢失最近的提交，缓存数据可以接受
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            with self._connections_lock:
+                self._connections.append(conn)
+        return conn
+
+    def lookup(self, namespace: str, key: Hashable) -> Optional[Tuple[Any, Optional[float]]]:
+        """
+        读取条目
+
+        Args:
+            namespace: 命名空间，如 "tools"、"responses"
+            key: 缓存键
+
+        Returns:
+            (值, 过期时间戳)，过期时间为 None 表示永不过期；未命中或已过期时返回 None
+        """
+        try:
+            row = self._connection().execute(
+                "SELECT value, expires FROM entries WHERE namespace = ? AND key = ?",
+                (namespace, _encode_key(key)),
+            ).fetchone()
+            if row is None or (row[1] is not None and row[1] <= self._clock()):
+                row = None
+            else:
+                value = pickle.loads(row[0])
+        except Exception:
+            # 数据库不可用或旧版本写入的条目无法反序列化时视为未命中
+            row = None
+        with self._stats_lock:
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return value, row[1]
+
+    def get(self, namespace: str, key: Hashable, default: Any = None) -> Any:
+        """
+        读取值
+
+        Returns:
+            缓存值，未命中时返回默认值
+        """
+        found = self.lookup(namespace, key)
+        return default if found is None else found[0]
+
+    def set(self, namespace: str, key: Hashable, value: Any, ttl: Optional[float] = None):
+        """
+        写入条目，值无法序列化时忽略
+
+        Args:
+            namespace: 命名空间
+            key: 缓存键
+            value: 缓存值
+            ttl: 过期时间（秒），None表示永不过期
+        """
+        try:
+            blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        except Exception:
+            return
+        now = self._clock()
+        conn = self._connection()
+        with self._write_lock:
+            try:
+                conn.execute(
+                    "INSERT OR REPLACE INTO entries (namespace, key, value, created, expires) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (namespace, _encode_key(key), blob, now, None if ttl is None else now + ttl),
+                )
+                conn.commit()
+                self.writes += 1
+                if now >= self._next_compact:
+                    self._compact_locked(conn, now)
+            except sqlite3.Error:
+                # 其他进程长时间占用写锁时放弃本次写入，缓存只是优化
+                conn.rollback()
+                self.errors += 1
+
+    def delete(self, namespace: str, key: Hashable):
+        """删除条目"""
+        self._delete("DELETE FROM entries WHERE namespace = ? AND key = ?",
+                     (namespace, _encode_key(key)))
+
+    def clear(self, namespace: str = None):
+        """
+        清空条目
+
+        Args:
+            namespace: 只清空该命名空间，不传时清空全部
+        """
+        if namespace is None:
+            self._delete("DELETE FROM entries", ())
+        else:
+            self._delete("DELETE FROM entries WHERE namespace = ?", (namespace,))
+
+    def _delete(self, sql: str, params: tuple):
+        """执行删除语句，与 set 一样在数据库被其他进程锁住时放弃并计入错误数"""
+        conn = self._connection()
+        with self._write_lock:
+            try:
+                conn.execute(sql, params)
+                conn.commit()
+            except sqlite3.Error:
+                conn.rollback()
+                self.errors += 1
+
+    def compact(self) -> int:
+        """
+        立即清理过期和超出容量的条目，并截断 WAL 文件
+
+        Returns:
+            删除的条目数
+        """
+        conn = self._connection()
+        with self._write_lock:
+            return self._compact_locked(conn, self._clock())
+
+    def _compact_locked(self, conn: sqlite3.Connection, now: float) -> int:
+        self._next_compact = now + self.compact_interval
+        removed = conn.execute(
+            "DELETE FROM entries WHERE expires IS NOT NULL AND expires <= ?", (now,)
+        ).rowcount
+        removed += conn.execute(
+            "DELETE FROM entries WHERE (namespace, key) IN ("
+            "SELECT namespace, key FROM entries ORDER BY created DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,),
+        ).rowcount
+        conn.commit()
+        # 其他进程正在读取时无法完全截断，下次清理时再试
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        self.compactions += 1
+        return removed
+
+    def count(self, namespace: str = None) -> int:
+        """条目数（包括尚未清理的过期条目），可只统计一个命名空间"""
+        if namespace is None:
+            return len(self)
+        return self._connection().execute(
+            "SELECT COUNT(*) FROM entries WHERE namespace = ?", (namespace,)).fetchone()[0]
+
+    def __len__(self) -> int:
+        return self._connection().execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        获取存储统计
+
+        Returns:
+            条目数、本进程的命中/未命中/写入/清理/写入失败次数和文件大小
+        """
+        with self._stats_lock:
+            hits, misses = self.hits, self.misses
+        total = hits + misses
+        size = sum(os.path.getsize(p) for p in (self.path, self.path + "-wal") if os.path.exists(p))
+        return {
+            "entries": len(self),
+            "max_entries": self.max_entries,
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": hits / total if total else 0.0,
+            "writes": self.writes,
+            "compactions": self.compactions,
+            "errors": self.errors,
+            "file_bytes": size,
+        }
+
+    def close(self):
+        """关闭所有线程的连接"""
+        with self._connections_lock:
+            connections, self._connections = self._connections, []
+        for conn in connections:
+            conn.close()
+        self._local = threading.local()
+
+
+_store: Optional[PersistentStore] = None
+_store_lock = threading.Lock()
+
+
+def get_store() -> Optional[PersistentStore]:
+    """
+    获取进程内共享的持久化存储
+
+    Returns:
+        配置了 persistent_store_path 时返回共享的 PersistentStore，否则返回 None
+    """
+    global _store
+    if _store is None and DEFAULT_CONFIG["persistent_store_path"]:
+        with _store_lock:
+            if _store is None:
+                _store = PersistentStore(DEFAULT_CONFIG["persistent_store_path"])
+    return _store
+
+
+def set_store(store: Optional[PersistentStore]):
+    """
+    替换共享的持久化存储
+
+    Args:
+        store: 新的存储，传入None时下次使用按配置重新打开
+    """
+    global _store
+    with _store_lock:
+        _store = store
@@ -0,0 +1,112 @@
+"""
+流式输出增量解析模块
+在 LLM 流式输出过程中识别完整的 Action，便于提前执行工具并尽早关闭连接
+"""
+
+import re
+from typing import List
+
+from .parser import find_call_end, starts_call
+
+
+# 行首的动作标签
+_ACTION_PREFIX = re.compile(r"^\s*(?:Action|行动)[:：]\s*", re.IGNORECASE)
+_LABELS = ("action", "行动")
+
+
+class StreamingActionParser:
+    """
+    增量动作解析器
+
+    逐块喂入流式输出，一旦某一行的 Action 完整（括号闭合或遇到换行）
+    就立即返回该动作。已识别出动作后，如果后续出现非 Action 内容
+    （例如模型自行编造的 Observation）或识别出 finish，done 变为 True，
+    调用方可以停止读取流。
+    """
+
+    def __init__(self):
+        self.text = ""          # 已接受的输出文本
+        self.actions: List[str] = []
+        self.done = False
+        self._line = ""
+
+    def feed(self, chunk: str) -> List[str]:
+        """
+        喂入一个分块
+
+        Args:
+            chunk: 流式输出的文本分块
+
+        Returns:
+            本次新识别出的完整动作列表
+        """
+        new_actions = []
+        if self.done:
+            return new_actions
+
+        pieces = chunk.split("\n")
+        for i, piece in enumerate(pieces):
+            self._line += piece
+            line_ended = i < len(pieces) - 1
+            action = self._check_line(line_ended)
+            if action is not None:
+                new_actions.append(action)
+            if self.done:
+                break
+        return new_actions
+
+    def close(self) -> List[str]:
+        """
+        流结束时处理最后一行
+
+        Returns:
+            最后一行中识别出的动作
+        """
+        if self.done or not self._line:
+            return []
+        action = self._check_line(True)
+        self.done = True
+        return [action] if action is not None else []
+
+    def _accept_line(self, line_ended: bool):
+        """将当前行加入已接受文本"""
+        self.text += self._line + ("\n" if line_ended else "")
+        self._line = ""
+
+    def _check_line(self, line_ended: bool):
+        """检查当前行，返回识别出的动作或None"""
+        line = self._line
+        prefix = _ACTION_PREFIX.match(line)
+
+        if prefix is None:
+            stripped = line.lstrip().lower()
+            # 已有动作之后出现非 Action 内容，停止读取
+            if self.actions and stripped and not any(
+                    label.startswith(stripped) or stripped.startswith(label) for label in _LABELS):
+                self.done = True
+                return None
+            if line_ended:
+                self._accept_line(True)
+            return None
+
+        body = line[prefix.end():].strip()
+        end = find_call_end(body, partial=True)
+        complete = end > 0
+        if not complete and not line_ended:
+            return None
+        if not complete and starts_call(body):
+            # 括号尚未闭合，动作跨行，继续累积
+            self._line += "\n"
+            return None
+
+        # 截断到闭合括号为止，丢弃同一行后面的多余内容
+        if complete:
+            body = body[:end]
+            self._line = line[:prefix.end()] + body
+        self._accept_line(True)
+        if not body:
+            return None
+        self.actions.append(body)
+        if body.lower().startswith("finish"):
+            self.done = True
+        return body
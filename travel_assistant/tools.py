@@ -2,8 +2,21 @@
 工具函数模块
 """
 
+import re
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import List
+
 import requests
-from .config import CITY_MAPPING
+from .cache import normalize_city
+from .config import DEFAULT_CONFIG
+from .knowledge import GENERAL_WEATHER, get_knowledge
+from .observations import ToolResult
+from .resilience import CircuitOpenError
+from .tracing import bind
+from .weather import get_report
+
+# 模型有时把城市列表写成一个字符串
+_CITY_SEPARATORS = re.compile(r"[,，、;；\s]+")
 
 
 def get_weather(city: str, use_english: bool = True) -> str:
@@ -15,107 +28,149 @@ def get_weather(city: str, use_english: bool = True) -> str:
         use_english: 是否使用英文查询（兼容性更好）
       
     Returns:
-        格式化的天气信息
+        格式化的天气信息（ToolResult，附带结构化数据）
     """
-    # 城市名称映射
-    query_city = city
-    if use_english and city in CITY_MAPPING:
-        query_city = CITY_MAPPING[city]
+    try:
+        return get_report(city, use_english).current_result(city)
+    except CircuitOpenError:
+        return f"⚠️ 天气服务暂时不可用，请不要重复查询{city}天气，可以先根据其他信息回答"
+    except requests.exceptions.Timeout:
+        return f"⏰ 查询{city}天气超时，请稍后重试"
+    except Exception as e:
+        return f"❌ 查询天气失败: {str(e)}"
+
+
+def get_weather_many(cities: List[str], use_english: bool = True) -> str:
+    """
+    并发查询多个城市的天气，一次调用完成多城市对比
   
-    url = f"https://wttr.in/{query_city}?format=j1"
+    与 get_weather 共用缓存；超过 weather_many_timeout 仍未返回的城市标记为超时，
+    其余城市照常返回（超时的查询在后台完成后仍会写入缓存）。
   
-    try:
-        response = requests.get(url, timeout=10)
-        response.raise_for_status()
-        data = response.json()
-      
-        # 提取天气信息
-        current = data['current_condition'][0]
-        weather_desc = current['weatherDesc'][0]['value']
-        temp_c = current['temp_C']
-        humidity = current.get('humidity', 'N/A')
-        wind_speed = current.get('windspeedKmph', 'N/A')
-        feels_like = current.get('FeelsLikeC', temp_c)
-      
-        # 构建结果
-        result_lines = [
-            f"📍 {city} 当前天气",
-            f"  天气状况: {weather_desc}",
-            f"  温度: {temp_c}°C (体感: {feels_like}°C)",
-            f"  湿度: {humidity}%",
-            f"  风速: {wind_speed} km/h"
-        ]
-      
-        # 添加预报信息（如果有）
-        if 'weather' in data:
-            today_forecast = data['weather'][0]
-            if 'maxtempC' in today_forecast and 'mintempC' in today_forecast:
-                result_lines.append(
-                    f"  最高/最低温度: {today_forecast['maxtempC']}°C / {today_forecast['mintempC']}°C"
-                )
+    Args:
+        cities: 城市名称列表（中文或英文）
+        use_english: 是否使用英文查询（兼容性更好）
       
-        return "\n".join(result_lines)
+    Returns:
+        各城市的天气信息
+    """
+    if isinstance(cities, str):
+        cities = _CITY_SEPARATORS.split(cities)
+    names = []
+    seen = set()
+    for city in cities:
+        city = str(city).strip()
+        if city and normalize_city(city) not in seen:
+            seen.add(normalize_city(city))
+            names.append(city)
+    if not names:
+        return "错误: 请至少提供一个城市"
+
+    executor = ThreadPoolExecutor(
+        max_workers=min(len(names), DEFAULT_CONFIG["weather_many_concurrency"]),
+        thread_name_prefix="weather-many",
+    )
+    try:
+        futures = {city: executor.submit(bind(get_report), city, use_english) for city in names}
+        wait(futures.values(), timeout=DEFAULT_CONFIG["weather_many_timeout"])
+    finally:
+        # 不等待超时的查询，它们完成后仍会写入缓存
+        executor.shutdown(wait=False)
+
+    blocks, data, failed = [], {}, []
+    for city, future in futures.items():
+        if not future.done():
+            error = f"⏰ 查询{city}天气超时"
+        else:
+            try:
+                report = future.result()
+            except CircuitOpenError:
+                error = f"⚠️ 天气服务暂时不可用，未能查询{city}天气"
+            except requests.exceptions.Timeout:
+                error = f"⏰ 查询{city}天气超时"
+            except Exception as e:
+                error = f"❌ 查询{city}天气失败: {str(e)}"
+            else:
+                result = report.current_result(city)
+                blocks.append(str(result))
+                today = report.day(0)
+                data[city] = f"{report.description} {result.data['temp_c']}°C"
+                if today is not None and today.min_c is not None and today.max_c is not None:
+                    data[city] += f" {today.min_c}~{today.max_c}°C"
+                continue
+        blocks.append(error)
+        failed.append(city)
+
+    if failed and len(failed) == len(names):
+        # 全部失败时与 get_weather 一样以失败前缀开头
+        return "\n".join(blocks)
+    if failed:
+        data["failed"] = failed
+    return ToolResult(
+        "\n\n".join(blocks), data,
+        summary="；".join(f"{city} {data[city]}" for city in names if city in data),
+    )
+
+
+def get_forecast(city: str, days: int = 3) -> str:
+    """
+    查询城市未来几天的天气预报，与 get_weather 共用同一次查询
+  
+    Args:
+        city: 城市名称（中文或英文）
+        days: 预报天数（wttr.in 最多提供3天）
       
+    Returns:
+        逐日的天气预报
+    """
+    try:
+        return get_report(city).forecast_result(city, int(days))
+    except CircuitOpenError:
+        return f"⚠️ 天气服务暂时不可用，请不要重复查询{city}天气预报"
     except requests.exceptions.Timeout:
-        return f"⏰ 查询{city}天气超时，请稍后重试"
+        return f"⏰ 查询{city}天气预报超时，请稍后重试"
     except Exception as e:
-        return f"❌ 查询天气失败: {str(e)}"
+        return f"❌ 查询天气预报失败: {str(e)}"
 
 
-def get_attraction(city: str, weather: str = None) -> str:
+def get_attraction(city: str, weather: str = None, day: int = 0) -> str:
     """
     根据城市和天气推荐景点
   
+    不传 weather 时使用该城市的结构化天气（与 get_weather 共用缓存和同一次查询），
+    因此可以和 get_weather 在同一轮调用，不必等模型转述天气。
+  
     Args:
         city: 城市名称
         weather: 天气描述（可选）
+        day: 出行日期相对今天的天数，不传 weather 时按当天预报推荐
       
     Returns:
         景点推荐信息
     """
-    # 景点数据库
-    attractions_db = {
-        "北京": {
-            "晴天": "北京晴天推荐景点:\n1. 故宫 - 晴天下的红墙黄瓦格外壮观\n2. 颐和园 - 游湖赏景最佳时机\n3. 八达岭长城 - 登高望远，视野开阔\n4. 天坛公园 - 古建筑在阳光下更显宏伟\n5. 奥林匹克公园 - 适合户外运动",
-            "雨天": "北京雨天推荐景点:\n1. 国家博物馆 - 丰富的文物收藏\n2. 首都博物馆 - 了解北京历史文化\n3. 中国科学技术馆 - 有趣的科学体验\n4. 798艺术区 - 室内画廊和咖啡馆\n5. 王府井百货 - 购物美食一站式",
-            "阴天": "北京阴天推荐景点:\n1. 颐和园 - 阴天游园别有一番风味\n2. 圆明园 - 历史文化遗址\n3. 什刹海 - 漫步湖边很舒适\n4. 南锣鼓巷 - 逛胡同小店\n5. 雍和宫 - 参观佛教寺庙",
-            "雪天": "北京雪天推荐景点:\n1. 故宫 - 雪中紫禁城宛如仙境\n2. 颐和园 - 雪景中的皇家园林\n3. 景山公园 - 俯瞰雪中故宫全景\n4. 北海公园 - 雪中划船别有情趣",
-            "雾天": "北京雾天建议室内景点:\n1. 国家大剧院 - 欣赏演出\n2. 北京天文馆 - 探索宇宙\n3. 老舍茶馆 - 体验传统文化"
-        },
-        # ... 其他城市的数据库
-    }
-  
-    # 确定天气类型
-    weather_type = "一般"
-    if weather:
-        weather_lower = weather.lower()
-        if any(k in weather_lower for k in ["晴", "sunny"]):
-            weather_type = "晴天"
-        elif any(k in weather_lower for k in ["雨", "rain"]):
-            weather_type = "雨天"
-        elif any(k in weather_lower for k in ["阴", "cloud"]):
-            weather_type = "阴天"
-        elif any(k in weather_lower for k in ["雪", "snow"]):
-            weather_type = "雪天"
-        elif any(k in weather_lower for k in ["雾", "fog"]):
-            weather_type = "雾天"
+    index = get_knowledge().index
+    if weather is None:
+        try:
+            weather_type = get_report(city).weather_type_on(int(day))
+        except Exception:
+            # 天气服务不可用时给出通用推荐
+            weather_type = GENERAL_WEATHER
+    else:
+        weather_type = index.matcher.classify(weather)
+    city = normalize_city(city)
   
     # 获取推荐
-    if city in attractions_db:
-        if weather_type in attractions_db[city]:
-            return (f"根据{weather_type}天气，为您推荐{city}的景点:\n\n"
-                f"{attractions_db[city][weather_type]}")
-        else:
-            first_type = next(iter(attractions_db[city]))
-            return f"为您推荐{city}的景点:\n\n{attractions_db[city][first_type]}"
+    result = index.attractions.get((city, weather_type))
+    if result is not None:
+        return result
+
+    # 通用推荐
+    if weather_type == "雨天":
+        return f"由于{city}是{weather_type}，建议游览室内景点：博物馆、美术馆、科技馆、购物中心等。"
+    elif weather_type == "晴天":
+        return f"{city}是{weather_type}，适合户外活动：公园、湖边、山区、历史古迹等。"
     else:
-        # 通用推荐
-        if weather_type == "雨天":
-            return f"由于{city}是{weather_type}，建议游览室内景点：博物馆、美术馆、科技馆、购物中心等。"
-        elif weather_type == "晴天":
-            return f"{city}是{weather_type}，适合户外活动：公园、湖边、山区、历史古迹等。"
-        else:
-            return f"推荐{city}的知名景点：市中心、文化街区、美食街等。"
+        return f"推荐{city}的知名景点：市中心、文化街区、美食街等。"
 
 
 def get_hotels(city: str, budget: str = "中等") -> str:
@@ -129,29 +184,18 @@ def get_hotels(city: str, budget: str = "中等") -> str:
     Returns:
         酒店推荐信息
     """
-    # 简化的酒店数据库
-    hotels_db = {
-        "北京": {
-            "经济": "经济型酒店:\n1. 如家酒店（王府井店）\n2. 7天连锁酒店\n3. 汉庭酒店\n4. 格林豪泰酒店",
-            "中等": "中等价位酒店:\n1. 全季酒店\n2. 亚朵酒店\n3. 桔子水晶酒店\n4. 和颐酒店",
-            "豪华": "豪华酒店:\n1. 北京王府半岛酒店\n2. 北京华尔道夫酒店\n3. 北京瑰丽酒店\n4. 北京柏悦酒店"
-        },
-        "上海": {
-            "经济": "经济型酒店:\n1. 如家酒店（南京路店）\n2. 锦江之星\n3. 布丁酒店\n4. 速8酒店",
-            "中等": "中等价位酒店:\n1. 全季酒店\n2. 亚朵酒店\n3. 桔子水晶酒店\n4. 和颐酒店",
-            "豪华": "豪华酒店:\n1. 上海外滩华尔道夫酒店\n2. 上海浦东丽思卡尔顿酒店\n3. 上海半岛酒店\n4. 上海宝格丽酒店"
-        }
-    }
-  
-    if city in hotels_db and budget in hotels_db[city]:
-        return hotels_db[city][budget]
-    else:
-        return f"建议您通过携程、去哪儿等平台查询{city}的{budget}价位酒店。"
+    city = normalize_city(city)
+    result = get_knowledge().index.hotels.get((city, budget))
+    if result is not None:
+        return result
+    return f"建议您通过携程、去哪儿等平台查询{city}的{budget}价位酒店。"
 
 
 # 工具函数字典，方便智能体调用
 AVAILABLE_TOOLS = {
     "get_weather": get_weather,
+    "get_weather_many": get_weather_many,
+    "get_forecast": get_forecast,
     "get_attraction": get_attraction,
     "get_hotels": get_hotels,
 }
@@ -0,0 +1,451 @@
+"""
+追踪与指标模块
+智能体循环中的每轮迭代、LLM调用、解析和工具执行都记录为 span，
+通过可插拔的导出器输出（回调、OpenTelemetry、Prometheus 文本格式），
+verbose 打印也是其中一个导出器。
+
+没有任何导出器时 span() 返回共享的空 span，开销只有一次函数调用。
+"""
+
+import contextvars
+import functools
+import itertools
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from .rate_limit import rate_limiters
+from .stats import DEFAULT_BUCKETS, LatencyHistogram
+
+try:
+    from opentelemetry import trace as otel_trace
+except ImportError:  # pragma: no cover - 可选依赖
+    otel_trace = None
+
+
+_ids = itertools.count(1)
+
+
+class Span:
+    """
+    一次操作的耗时、属性和事件
+    """
+
+    __slots__ = ("name", "trace_id", "span_id", "parent_id", "start", "end",
+                 "start_ns", "attributes", "events", "exporters", "_token")
+
+    def __init__(self, name: str, parent: "Span" = None, exporters: Sequence = (),
+                 attributes: Dict[str, Any] = None):
+        self.name = name
+        self.span_id = next(_ids)
+        self.parent_id = parent.span_id if parent is not None else None
+        self.trace_id = parent.trace_id if parent is not None else self.span_id
+        self.exporters = exporters
+        self.attributes = attributes or {}
+        self.events = []
+        self.start_ns = time.time_ns()
+        self.start = time.perf_counter()
+        self.end = None
+        self._token = None
+
+    def __bool__(self):
+        return True
+
+    @property
+    def duration(self) -> float:
+        """耗时（秒），未结束时为已经过的时间"""
+        return (self.end if self.end is not None else time.perf_counter()) - self.start
+
+    def set(self, key: str, value: Any):
+        """设置属性"""
+        self.attributes[key] = value
+
+    def add_event(self, name: str, **attributes):
+        """
+        记录事件
+
+        Args:
+            name: 事件名称
+            **attributes: 事件属性
+        """
+        event = (name, time.perf_counter() - self.start, attributes)
+        self.events.append(event)
+        for exporter in self.exporters:
+            exporter.on_event(self, event)
+
+    def stream(self, text: str):
+        """转发流式输出片段，只交给导出器，不保存在 span 中"""
+        for exporter in self.exporters:
+            exporter.on_stream(self, text)
+
+    def finish(self, error: BaseException = None):
+        """结束 span 并导出"""
+        if self.end is not None:
+            return
+        self.end = time.perf_counter()
+        if error is not None:
+            self.attributes["error"] = f"{type(error).__name__}: {error}"
+        for exporter in self.exporters:
+            exporter.on_end(self)
+
+    def __enter__(self) -> "Span":
+        self._token = _current.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        _current.reset(self._token)
+        self.finish(exc_val)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """导出为字典"""
+        return {
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "duration": self.duration,
+            "attributes": dict(self.attributes),
+            "events": [{"name": n, "offset": o, **a} for n, o, a in self.events],
+        }
+
+
+class _NoopSpan:
+    """追踪关闭时使用的空 span，所有操作都不做任何事"""
+
+    __slots__ = ()
+    exporters = ()
+
+    def __bool__(self):
+        return False
+
+    def set(self, key, value):
+        pass
+
+    def add_event(self, name, **attributes):
+        pass
+
+    def stream(self, text):
+        pass
+
+    def finish(self, error=None):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+_current = contextvars.ContextVar("travel_assistant_span", default=NOOP_SPAN)
+
+
+def current_span():
+    """当前上下文中的 span，没有时返回空 span"""
+    return _current.get()
+
+
+def record_usage(usage: Optional[Dict[str, Any]]):
+    """
+    把 API 返回的 usage 记录到当前 span
+
+    Args:
+        usage: {"prompt_tokens", "completion_tokens", "total_tokens"}
+    """
+    span = _current.get()
+    if usage and span is not NOOP_SPAN:
+        for key in ("prompt_tokens", "completion_tokens", "total_tokens"):
+            if key in usage:
+                span.attributes[key] = usage[key]
+
+
+def bind(fn: Callable) -> Callable:
+    """
+    让提交到线程池的函数继承当前 span
+
+    追踪关闭时原样返回函数；每次调用 bind 生成一个上下文副本，只能用于一次提交。
+    """
+    if _current.get() is NOOP_SPAN:
+        return fn
+    context = contextvars.copy_context()
+    return functools.partial(context.run, fn)
+
+
+class SpanExporter:
+    """
+    导出器基类，按需覆盖各个钩子
+    """
+
+    def on_start(self, span: Span):
+        """span 开始"""
+
+    def on_event(self, span: Span, event: tuple):
+        """span 记录了事件 (名称, 相对开始的偏移秒数, 属性)"""
+
+    def on_stream(self, span: Span, text: str):
+        """span 转发了流式输出片段"""
+
+    def on_end(self, span: Span):
+        """span 结束"""
+
+
+class CallbackExporter(SpanExporter):
+    """span 结束时调用回调函数"""
+
+    def __init__(self, callback: Callable[[Span], None]):
+        self.callback = callback
+
+    def on_end(self, span: Span):
+        self.callback(span)
+
+
+class Tracer:
+    """
+    span 工厂，持有全局导出器
+    """
+
+    def __init__(self, exporters: Sequence[SpanExporter] = ()):
+        """
+        初始化追踪器
+
+        Args:
+            exporters: 全局导出器，对所有请求生效
+        """
+        self.exporters = tuple(exporters)
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.exporters)
+
+    def add_exporter(self, exporter: SpanExporter):
+        """添加全局导出器"""
+        with self._lock:
+            self.exporters = self.exporters + (exporter,)
+
+    def remove_exporter(self, exporter: SpanExporter):
+        """移除全局导出器"""
+        with self._lock:
+            self.exporters = tuple(e for e in self.exporters if e is not exporter)
+
+    def span(self, name: str, exporters: Sequence[SpanExporter] = (), **attributes):
+        """
+        开始一个 span，作为上下文管理器使用
+
+        子 span 沿用父 span 的导出器，根 span 使用全局导出器，exporters 只作用于这个 span 及其子 span。
+
+        Args:
+            name: span 名称
+            exporters: 仅对这次追踪生效的额外导出器（如 verbose 打印）
+            **attributes: 初始属性
+
+        Returns:
+            Span，没有任何导出器时返回 NOOP_SPAN
+        """
+        parent = _current.get()
+        if parent is NOOP_SPAN:
+            if not (self.exporters or exporters):
+                return NOOP_SPAN
+            parent = None
+            active = self.exporters + tuple(exporters)
+        else:
+            active = parent.exporters + tuple(exporters) if exporters else parent.exporters
+        span = Span(name, parent, active, attributes)
+        for exporter in active:
+            exporter.on_start(span)
+        return span
+
+
+class VerboseExporter(SpanExporter):
+    """
+    把智能体的执行过程打印到终端，即原来的 verbose 输出
+    """
+
+    def __init__(self, write: Callable[..., None] = None):
+        self.write = write or print
+
+    def on_start(self, span: Span):
+        if span.name == "agent.run":
+            self.write(f"🤖 智能体开始处理请求: {span.attributes.get('query')}")
+        elif span.name == "agent.iteration":
+            self.write(f"\n🔄 第 {span.attributes['iteration']} 轮循环")
+        elif span.name == "llm.chat" and span.attributes.get("stream"):
+            self.write("💭 思考中: ", end="")
+
+    def on_stream(self, span: Span, text: str):
+        self.write(text, end="", flush=True)
+
+    def on_event(self, span: Span, event: tuple):
+        name, _, attrs = event
+        if name == "llm.output":
+            self.write(f"💭 思考结果: {attrs['text'][:100]}...")
+        elif name == "parse_error":
+            self.write("⚠️ 无法解析输出格式")
+        elif name == "thought":
+            self.write(f"🤔 思考: {attrs['text']}")
+        elif name == "action":
+            self.write(f"🔧 行动: {attrs['action']}")
+        elif name == "observation":
+            self.write(f"👀 观察: {attrs['text'][:100]}...")
+        elif name == "finish":
+            self.write(f"\n✅ 任务完成: {attrs['answer'][:100]}...")
+        elif name == "max_iterations":
+            self.write(f"⚠️ 达到最大迭代次数 ({attrs['max_iterations']})，任务未完成")
+        elif name == "incomplete":
+            self.write(f"⚠️ 提前结束 ({attrs['reason']})，任务未完成")
+
+    def on_end(self, span: Span):
+        if span.name == "llm.chat" and span.attributes.get("stream"):
+            self.write()
+
+
+class PrometheusExporter(SpanExporter):
+    """
+    按 span 名称汇总耗时直方图和 token 计数，输出 Prometheus 文本格式
+
+    同时输出 LLM 请求的限流排队时间和共享限流器当前的排队数。
+    """
+
+    TOKEN_KEYS = ("prompt_tokens", "completion_tokens")
+
+    def __init__(self, prefix: str = "travel_assistant", buckets: Sequence[float] = DEFAULT_BUCKETS):
+        """
+        初始化导出器
+
+        Args:
+            prefix: 指标名前缀
+            buckets: 直方图分桶上界（秒）
+        """
+        self.prefix = prefix
+        self.buckets = buckets
+        self.durations = {}
+        self.ttft = LatencyHistogram(buckets)
+        self.rate_limit_wait = LatencyHistogram(buckets)
+        self.tokens = dict.fromkeys(self.TOKEN_KEYS, 0)
+        self.errors = {}
+        self._lock = threading.Lock()
+
+    def _histogram(self, name: str) -> LatencyHistogram:
+        histogram = self.durations.get(name)
+        if histogram is None:
+            with self._lock:
+                histogram = self.durations.setdefault(name, LatencyHistogram(self.buckets))
+        return histogram
+
+    def on_end(self, span: Span):
+        name = span.name
+        if name == "tool":
+            name = f"tool.{span.attributes.get('tool', 'unknown')}"
+        self._histogram(name).record(span.duration)
+        attrs = span.attributes
+        if "ttft" in attrs:
+            self.ttft.record(attrs["ttft"])
+        if "rate_limit_wait" in attrs:
+            self.rate_limit_wait.record(attrs["rate_limit_wait"])
+        if "error" in attrs:
+            with self._lock:
+                self.errors[name] = self.errors.get(name, 0) + 1
+        if "prompt_tokens" in attrs or "completion_tokens" in attrs:
+            with self._lock:
+                for key in self.TOKEN_KEYS:
+                    self.tokens[key] += attrs.get(key) or 0
+
+    def render(self) -> str:
+        """
+        导出 Prometheus 文本格式
+
+        Returns:
+            文本格式的指标
+        """
+        p = self.prefix
+        lines = [f"# TYPE {p}_span_duration_seconds histogram"]
+        for name, histogram in sorted(self.durations.items()):
+            lines.extend(_histogram_lines(f"{p}_span_duration_seconds", f'span="{name}"', histogram))
+        lines.append(f"# TYPE {p}_llm_time_to_first_token_seconds histogram")
+        lines.extend(_histogram_lines(f"{p}_llm_time_to_first_token_seconds", "", self.ttft))
+        lines.append(f"# TYPE {p}_llm_rate_limit_wait_seconds histogram")
+        lines.extend(_histogram_lines(f"{p}_llm_rate_limit_wait_seconds", "", self.rate_limit_wait))
+        lines.append(f"# TYPE {p}_llm_rate_limit_queue_depth gauge")
+        depth = {}
+        for limiter in rate_limiters():
+            for priority, count in limiter.queue_depth().items():
+                depth[priority] = depth.get(priority, 0) + count
+        for priority, count in sorted(depth.items()):
+            lines.append(f'{p}_llm_rate_limit_queue_depth{{priority="{priority}"}} {count}')
+        lines.append(f"# TYPE {p}_llm_tokens_total counter")
+        for key in self.TOKEN_KEYS:
+            lines.append(f'{p}_llm_tokens_total{{type="{key.split("_")[0]}"}} {self.tokens[key]}')
+        lines.append(f"# TYPE {p}_span_errors_total counter")
+        for name, count in sorted(self.errors.items()):
+            lines.append(f'{p}_span_errors_total{{span="{name}"}} {count}')
+        return "\n".join(lines) + "\n"
+
+
+def _histogram_lines(metric: str, labels: str, histogram: LatencyHistogram) -> List[str]:
+    """按 Prometheus 约定输出累计分桶、总和与计数"""
+    sep = "," if labels else ""
+    lines = []
+    cumulative = 0
+    bounds = [f"{b:g}" for b in histogram.bounds] + ["+Inf"]
+    for bound, count in zip(bounds, list(histogram.counts)):
+        cumulative += count
+        lines.append(f'{metric}_bucket{{{labels}{sep}le="{bound}"}} {cumulative}')
+    suffix = f"{{{labels}}}" if labels else ""
+    lines.append(f"{metric}_sum{suffix} {histogram.total}")
+    lines.append(f"{metric}_count{suffix} {histogram.count}")
+    return lines
+
+
+class OpenTelemetryExporter(SpanExporter):
+    """
+    把 span 转发给 OpenTelemetry，需要安装 opentelemetry-api 并配置 SDK
+    """
+
+    def __init__(self, tracer_provider=None, name: str = "travel_assistant"):
+        """
+        初始化导出器
+
+        Args:
+            tracer_provider: OpenTelemetry TracerProvider，不传则使用全局配置
+            name: instrumentation 名称
+        """
+        if otel_trace is None:
+            raise ImportError("OpenTelemetry导出需要安装: pip install travel-assistant-agent[otel]")
+        self._tracer = otel_trace.get_tracer(name, tracer_provider=tracer_provider)
+        self._spans = {}
+
+    def on_start(self, span: Span):
+        parent = self._spans.get(span.parent_id)
+        context = otel_trace.set_span_in_context(parent) if parent is not None else None
+        self._spans[span.span_id] = self._tracer.start_span(
+            span.name, context=context, start_time=span.start_ns,
+        )
+
+    def on_end(self, span: Span):
+        otel_span = self._spans.pop(span.span_id, None)
+        if otel_span is None:
+            return
+        for key, value in span.attributes.items():
+            if isinstance(value, (str, bool, int, float)):
+                otel_span.set_attribute(key, value)
+        for name, offset, attrs in span.events:
+            otel_span.add_event(name, attributes={k: str(v) for k, v in attrs.items()},
+                                timestamp=span.start_ns + int(offset * 1e9))
+        otel_span.end(end_time=span.start_ns + int(span.duration * 1e9))
+
+
+# 全局追踪器
+_tracer = Tracer()
+
+
+def get_tracer() -> Tracer:
+    """获取全局追踪器"""
+    return _tracer
+
+
+def set_tracer(tracer: Optional[Tracer]):
+    """替换全局追踪器，传入 None 时恢复为不导出的追踪器"""
+    global _tracer
+    _tracer = tracer or Tracer()
@@ -0,0 +1,245 @@
+"""
+天气数据模块
+wttr.in 的 format=j1 数据（当前天气和多日逐小时预报）只解析一次，
+以结构化的 WeatherReport 按城市缓存，天气、预报和景点推荐工具共用同一次查询
+"""
+
+from dataclasses import dataclass, field
+from typing import Any, List, Optional
+
+from .cache import TTLCache, get_tool_cache, normalize_city
+from .config import CITY_MAPPING, DEFAULT_CONFIG, TOOL_CACHE_TTL
+from .http_pool import get_shared_session
+from .knowledge import get_knowledge
+from .observations import ToolResult
+from .resilience import get_resilience
+
+
+def _int(value: Any) -> Optional[int]:
+    """wttr.in 的数值字段是字符串，无法解析时返回 None"""
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _text(value: Optional[int]) -> str:
+    return "N/A" if value is None else str(value)
+
+
+def _description(entry: dict) -> str:
+    try:
+        return entry["weatherDesc"][0]["value"].strip()
+    except (KeyError, IndexError, TypeError, AttributeError):
+        return ""
+
+
+@dataclass
+class DayForecast:
+    """单日预报"""
+
+    date: str
+    description: str
+    max_c: Optional[int] = None
+    min_c: Optional[int] = None
+    # 当天逐小时预报中的最大降水概率（%）
+    chance_of_rain: Optional[int] = None
+    weather_type: str = ""
+
+    def line(self) -> str:
+        """一行预报文本"""
+        text = f"{self.date}: {self.description or '未知'} {_text(self.min_c)}~{_text(self.max_c)}°C"
+        if self.chance_of_rain is not None:
+            text += f" 降水概率 {self.chance_of_rain}%"
+        return text
+
+
+@dataclass
+class WeatherReport:
+    """
+    一个城市的结构化天气
+
+    weather_type 为按知识库关键词识别出的天气类型，解析时计算一次，
+    景点推荐直接使用，不必再由模型转述天气描述。
+    """
+
+    city: str
+    description: str
+    temp_c: Optional[int] = None
+    feels_like_c: Optional[int] = None
+    humidity: Optional[int] = None
+    wind_kmph: Optional[int] = None
+    weather_type: str = ""
+    days: List[DayForecast] = field(default_factory=list)
+
+    def day(self, offset: int = 0) -> Optional[DayForecast]:
+        """第 offset 天的预报（0 为今天），超出预报范围时返回 None"""
+        if 0 <= offset < len(self.days):
+            return self.days[offset]
+        return None
+
+    def weather_type_on(self, offset: int = 0) -> str:
+        """第 offset 天的天气类型，今天使用当前天气"""
+        if offset == 0:
+            return self.weather_type
+        forecast = self.day(offset)
+        return forecast.weather_type if forecast is not None else self.weather_type
+
+    def current_result(self, name: str) -> ToolResult:
+        """
+        生成 get_weather 的结果
+
+        Args:
+            name: 显示用的城市名（调用方传入的名称）
+        """
+        feels_like = self.feels_like_c if self.feels_like_c is not None else self.temp_c
+        lines = [
+            f"📍 {name} 当前天气",
+            f"  天气状况: {self.description}",
+            f"  温度: {_text(self.temp_c)}°C (体感: {_text(feels_like)}°C)",
+            f"  湿度: {_text(self.humidity)}%",
+            f"  风速: {_text(self.wind_kmph)} km/h",
+        ]
+        data = {
+            "city": name,
+            "weather": self.description,
+            "temp_c": _text(self.temp_c),
+            "feels_like_c": _text(feels_like),
+            "humidity": _text(self.humidity),
+            "wind_kmph": _text(self.wind_kmph),
+        }
+        today = self.day(0)
+        if today is not None and today.max_c is not None and today.min_c is not None:
+            lines.append(f"  最高/最低温度: {today.max_c}°C / {today.min_c}°C")
+            data["max_c"] = str(today.max_c)
+            data["min_c"] = str(today.min_c)
+        return ToolResult("\n".join(lines), data,
+                          summary=f"{name}天气: {self.description} {_text(self.temp_c)}°C")
+
+    def forecast_result(self, name: str, days: int) -> ToolResult:
+        """
+        生成 get_forecast 的结果
+
+        Args:
+            name: 显示用的城市名
+            days: 天数，超出数据范围时按实际天数返回
+        """
+        forecasts = self.days[:max(days, 1)]
+        if not forecasts:
+            return ToolResult(f"{name}暂无多日预报，当前天气: {self.description}",
+                              {"city": name, "forecast": []},
+                              summary=f"{name}暂无预报")
+        lines = [f"📅 {name} 未来{len(forecasts)}天天气"]
+        lines += [f"  {d.line()}" for d in forecasts]
+        return ToolResult(
+            "\n".join(lines),
+            {"city": name, "forecast": [d.line() for d in forecasts]},
+            summary=f"{name}未来{len(forecasts)}天: " + "、".join(d.description or "未知" for d in forecasts),
+        )
+
+
+def _day(entry: dict, classify) -> DayForecast:
+    hourly = entry.get("hourly") or []
+    # 优先使用正午的描述，没有时取中间时段
+    noon = next((h for h in hourly if str(h.get("time")) == "1200"), None)
+    if noon is None and hourly:
+        noon = hourly[len(hourly) // 2]
+    description = _description(noon) if noon is not None else ""
+    chances = [c for c in (_int(h.get("chanceofrain")) for h in hourly) if c is not None]
+    return DayForecast(
+        date=entry.get("date", ""),
+        description=description,
+        max_c=_int(entry.get("maxtempC")),
+        min_c=_int(entry.get("mintempC")),
+        chance_of_rain=max(chances) if chances else None,
+        weather_type=classify(description),
+    )
+
+
+def parse_report(city: str, data: dict) -> WeatherReport:
+    """
+    解析 format=j1 数据
+
+    Args:
+        city: 规范化后的城市名
+        data: wttr.in 返回的JSON
+
+    Returns:
+        WeatherReport
+
+    Raises:
+        KeyError: 数据中没有当前天气
+    """
+    current = data["current_condition"][0]
+    description = current["weatherDesc"][0]["value"]
+    classify = get_knowledge().classify_weather
+    return WeatherReport(
+        city=city,
+        description=description,
+        temp_c=_int(current.get("temp_C")),
+        feels_like_c=_int(current.get("FeelsLikeC")),
+        humidity=_int(current.get("humidity")),
+        wind_kmph=_int(current.get("windspeedKmph")),
+        weather_type=classify(description),
+        days=[_day(entry, classify) for entry in data.get("weather") or []],
+    )
+
+
+def fetch_weather_data(query_city: str) -> dict:
+    """
+    从 wttr.in（或 weather_base_url 指定的兼容服务）获取原始天气数据
+
+    Args:
+        query_city: 查询用的城市名称
+
+    Returns:
+        format=j1 的JSON数据
+    """
+    url = f"{DEFAULT_CONFIG['weather_base_url']}/{query_city}?format=j1"
+    response = get_shared_session().get(url, timeout=10)
+    response.raise_for_status()
+    return response.json()
+
+
+def report_cache_key(city: str, use_english: bool = True) -> tuple:
+    """
+    天气数据的缓存键
+
+    英文查询和中文查询可能得到不同的结果（地名解析不同），因此分开缓存。
+
+    Args:
+        city: 城市名称（中文或英文）
+        use_english: 是否使用英文查询
+
+    Returns:
+        工具缓存中的键
+    """
+    return ("get_weather", normalize_city(city), bool(use_english))
+
+
+def get_report(city: str, use_english: bool = True, cache: TTLCache = None) -> WeatherReport:
+    """
+    获取城市的结构化天气，缓存未命中时查询一次 wttr.in
+
+    中英文城市名共用同一个缓存条目（按 use_english 区分），并发的相同查询只发起一次请求。
+
+    Args:
+        city: 城市名称（中文或英文）
+        use_english: 是否使用英文查询（兼容性更好）
+        cache: 使用的缓存，默认为共享的工具缓存
+
+    Returns:
+        WeatherReport
+
+    Raises:
+        CircuitOpenError: 天气服务熔断
+        requests.exceptions.RequestException: 查询失败
+    """
+    key = normalize_city(city)
+    query_city = CITY_MAPPING.get(key, key) if use_english else key
+    return (cache if cache is not None else get_tool_cache()).get_or_load(
+        report_cache_key(key, use_english),
+        lambda: parse_report(key, get_resilience().call(
+            lambda: fetch_weather_data(query_city), "weather:wttr.in")),
+        ttl=TOOL_CACHE_TTL["get_weather"],
+    )
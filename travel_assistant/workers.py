@@ -0,0 +1,391 @@
+"""
+多进程工作池模块
+多个工作进程从共享队列领取查询，绕开 GIL 和阻塞的 requests 调用对单进程并发的限制；
+工具缓存（以及可选的 LLM 响应缓存）通过本机的持久化存储在进程间共享，关闭时可以排空队列
+
+用法:
+    python -m travel_assistant.workers queries.txt --workers 4 --threads 4
+"""
+
+import argparse
+import functools
+import itertools
+import multiprocessing
+import os
+import queue
+import signal
+import tempfile
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional
+
+from .batch import BatchResult, _normalize, format_stats
+from .config import DEFAULT_CONFIG
+from .rate_limit import request_priority
+from .stats import summarize_latencies
+from .store import PersistentStore
+
+
+def build_agent(api_key: str, model: str = None, base_url: str = None, **agent_kwargs):
+    """
+    在工作进程中创建智能体，配合 functools.partial 作为可序列化的工厂使用
+
+    Args:
+        api_key: SiliconFlow API密钥
+        model: 模型名称或别名
+        base_url: API基础URL
+        **agent_kwargs: 透传给 TravelAssistantAgent 的参数
+
+    Returns:
+        TravelAssistantAgent
+    """
+    from .agent import TravelAssistantAgent
+    from .client import SiliconFlowClient
+
+    return TravelAssistantAgent(SiliconFlowClient(api_key=api_key, model=model, base_url=base_url),
+                                **agent_kwargs)
+
+
+def _share_caches(agent, store_path: str, share_responses: bool):
+    """工作进程启动时把工具缓存（和响应缓存）接到共享存储上"""
+    from .cache import set_tool_cache
+    from .response_cache import PersistentBackend, ResponseCache
+    from .store import set_store
+
+    DEFAULT_CONFIG["persistent_store_path"] = store_path
+    set_store(None)
+    set_tool_cache(None)
+    client = getattr(agent, "client", None)
+    if share_responses and client is not None and getattr(client, "response_cache", False) is None:
+        client.response_cache = ResponseCache(PersistentBackend())
+
+
+def _worker_main(worker_id: int, factory: Callable, tasks, results, stop, slots,
+                 config: Dict[str, Any], store_path: str, share_responses: bool):
+    """
+    工作进程入口
+
+    每个进程用 len(slots) 个线程并发执行查询；收到 None 的线程退出。stop 被设置后
+    领取到的查询不再执行，直接标记为取消。父进程退出时工作进程也随之退出。
+    slots 为共享内存数组，第 i 个线程正在执行的任务ID写在 slots[i]（空闲为 -1），
+    进程崩溃时父进程据此找出丢失的查询。
+    """
+    from .sessions import AgentSession
+
+    # 中断和终止信号由父进程统一处理，工作进程按父进程的指示排空或取消
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    if hasattr(signal, "SIGTERM"):
+        signal.signal(signal.SIGTERM, signal.SIG_IGN)
+    DEFAULT_CONFIG.update(config)
+    agent = factory()
+    _share_caches(agent, store_path, share_responses)
+    parent = os.getppid()
+
+    def serve(slot: int):
+        while True:
+            try:
+                item = tasks.get(timeout=1)
+            except queue.Empty:
+                if os.getppid() != parent:
+                    return
+                continue
+            if item is None:
+                return
+            task_id, query_id, query, run_kwargs = item
+            if stop.is_set():
+                results.put(("cancelled", worker_id, task_id, None))
+                continue
+            slots[slot] = task_id
+            start = time.perf_counter()
+            try:
+                with request_priority("batch"):
+                    answer = agent.run(query, session=AgentSession(), **run_kwargs)
+                result = BatchResult(query_id, query, answer, time.perf_counter() - start)
+            except Exception as e:
+                result = BatchResult(query_id, query, None, time.perf_counter() - start, str(e))
+            results.put(("done", worker_id, task_id, result))
+            slots[slot] = -1
+
+    pool = [threading.Thread(target=serve, args=(i,), name=f"worker-{worker_id}-{i}")
+            for i in range(len(slots))]
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    close = getattr(agent, "close", None)
+    if close is not None:
+        close()
+
+
+class WorkerPool:
+    """
+    多进程工作池
+
+    查询放入共享队列，由 workers 个进程（每个进程 threads 个线程）领取执行，
+    结果以 Future[BatchResult] 返回。工作进程异常退出时，其在途查询标记为失败并补充新进程。
+    工具缓存通过 store_path 指定的 SQLite 存储共享，未指定时使用 persistent_store_path 配置，
+    仍为空时在临时目录创建、关闭时删除。
+    """
+
+    def __init__(self, factory: Callable = None, workers: int = None, threads: int = None,
+                 store_path: str = None, share_responses: bool = False,
+                 start_method: str = None, **run_kwargs):
+        """
+        初始化并启动工作进程
+
+        Args:
+            factory: 在工作进程中创建智能体的可序列化工厂（模块级函数或 functools.partial），
+                默认使用 SILICONFLOW_API_KEY 环境变量创建
+            workers: 工作进程数
+            threads: 每个进程的并发线程数
+            store_path: 共享存储路径
+            share_responses: 是否同时共享 LLM 响应缓存（仅对未设置响应缓存的客户端生效）
+            start_method: 进程启动方式（spawn/fork/forkserver）
+            **run_kwargs: 透传给 agent.run 的参数
+        """
+        if factory is None:
+            api_key = os.environ.get("SILICONFLOW_API_KEY")
+            if not api_key:
+                raise ValueError("请传入 factory 或设置 SILICONFLOW_API_KEY 环境变量")
+            factory = functools.partial(build_agent, api_key)
+        self.factory = factory
+        self.workers = workers or DEFAULT_CONFIG["worker_processes"] or os.cpu_count() or 1
+        self.threads = threads or DEFAULT_CONFIG["worker_threads"]
+        self.share_responses = share_responses
+        self.run_kwargs = run_kwargs
+        self.run_kwargs.setdefault("verbose", False)
+
+        self._tmpdir = None
+        store_path = store_path or DEFAULT_CONFIG["persistent_store_path"]
+        if not store_path:
+            self._tmpdir = tempfile.mkdtemp(prefix="travel-assistant-")
+            store_path = os.path.join(self._tmpdir, "store.db")
+        self.store_path = store_path
+
+        self._ctx = multiprocessing.get_context(start_method or DEFAULT_CONFIG["worker_start_method"])
+        self._tasks = self._ctx.Queue()
+        self._results = self._ctx.Queue()
+        self._stop = self._ctx.Event()
+        self._lock = threading.Lock()
+        self._ids = itertools.count()
+        self._futures: Dict[int, Future] = {}
+        self._processes: Dict[int, tuple] = {}
+        self._worker_ids = itertools.count()
+        self._closing = False
+        self._collecting = True
+        self.results = []
+        self.restarts = 0
+        self._started_at = time.perf_counter()
+        self._closed_at = None
+
+        # 先创建存储文件，避免多个进程同时初始化
+        PersistentStore(self.store_path).close()
+
+        for _ in range(self.workers):
+            self._spawn()
+        self._collector = threading.Thread(target=self._collect, name="worker-pool-collector", daemon=True)
+        self._collector.start()
+
+    def _spawn(self):
+        worker_id = next(self._worker_ids)
+        slots = self._ctx.Array("q", [-1] * self.threads, lock=False)
+        process = self._ctx.Process(
+            target=_worker_main,
+            args=(worker_id, self.factory, self._tasks, self._results, self._stop, slots,
+                  dict(DEFAULT_CONFIG), self.store_path, self.share_responses),
+            name=f"travel-assistant-worker-{worker_id}",
+            daemon=True,
+        )
+        process.start()
+        self._processes[worker_id] = (process, slots)
+
+    def submit(self, query: str, query_id: str = None) -> Future:
+        """
+        提交查询
+
+        Args:
+            query: 用户请求
+            query_id: 查询ID，默认使用递增编号
+
+        Returns:
+            完成时结果为 BatchResult 的 Future
+        """
+        with self._lock:
+            if self._closing:
+                raise RuntimeError("工作池已关闭")
+            task_id = next(self._ids)
+            future = Future()
+            future.set_running_or_notify_cancel()
+            self._futures[task_id] = future
+        self._tasks.put((task_id, str(task_id) if query_id is None else query_id, query, self.run_kwargs))
+        return future
+
+    def run(self, queries: Iterable) -> Iterator[BatchResult]:
+        """
+        提交一批查询，按完成顺序产出结果
+
+        Args:
+            queries: 字符串、(id, query) 元组或 {"id", "query"} 字典的迭代器
+
+        Yields:
+            BatchResult
+        """
+        done = queue.Queue()
+        count = 0
+        for query_id, query in _normalize(queries):
+            self.submit(query, query_id).add_done_callback(
+                lambda future, item=(query_id, query): done.put((item, future)))
+            count += 1
+        for _ in range(count):
+            (query_id, query), future = done.get()
+            error = future.exception()
+            # 取消或工作进程异常退出的查询同样以失败结果返回
+            yield future.result() if error is None else BatchResult(query_id, query, None, 0.0, str(error))
+
+    def _collect(self):
+        """接收工作进程的消息，完成 Future，并处理异常退出的进程"""
+        while self._collecting or self._futures:
+            try:
+                kind, worker_id, task_id, result = self._results.get(timeout=0.2)
+            except queue.Empty:
+                self._check_workers()
+                if not self._collecting and not any(p.is_alive() for p, _ in self._processes.values()):
+                    break
+                continue
+            with self._lock:
+                future = self._futures.pop(task_id, None)
+                if kind == "done":
+                    self.results.append(result)
+            if future is None:
+                continue
+            if kind == "done":
+                future.set_result(result)
+            else:
+                future.set_exception(RuntimeError("工作池关闭，查询已取消"))
+
+    def _check_workers(self):
+        """工作进程异常退出时，在途查询标记为失败，未关闭时补充新进程"""
+        for worker_id, (process, slots) in list(self._processes.items()):
+            if process.is_alive() or process.exitcode == 0:
+                continue
+            with self._lock:
+                del self._processes[worker_id]
+                futures = [self._futures.pop(t) for t in slots if t in self._futures]
+            for future in futures:
+                future.set_exception(RuntimeError(f"工作进程异常退出 (exitcode={process.exitcode})"))
+            if not self._closing:
+                self.restarts += 1
+                self._spawn()
+
+    def close(self, drain: bool = True, timeout: Optional[float] = None):
+        """
+        关闭工作池
+
+        Args:
+            drain: 为True时执行完队列中的全部查询再退出；为False时只等待在途查询，
+                队列中尚未开始的查询标记为取消
+            timeout: 等待的最长时间（秒），超时后强制终止工作进程，未完成的查询标记为失败
+        """
+        with self._lock:
+            if self._closing:
+                return
+            self._closing = True
+        if not drain:
+            self._stop.set()
+        for _ in range(len(self._processes) * self.threads):
+            self._tasks.put(None)
+
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for process, _ in list(self._processes.values()):
+            process.join(None if deadline is None else max(deadline - time.monotonic(), 0))
+        for process, _ in list(self._processes.values()):
+            if process.is_alive():
+                process.terminate()
+                process.join()
+
+        self._collecting = False
+        self._collector.join(timeout=5)
+        with self._lock:
+            remaining, self._futures = self._futures, {}
+        for future in remaining.values():
+            future.set_exception(RuntimeError("工作池关闭时查询未完成"))
+        self._closed_at = time.perf_counter()
+        self._tasks.close()
+        self._results.close()
+        if self._tmpdir is not None:
+            for name in os.listdir(self._tmpdir):
+                os.remove(os.path.join(self._tmpdir, name))
+            os.rmdir(self._tmpdir)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close(drain=exc_type is None)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        获取工作池统计
+
+        Returns:
+            进程数、完成数、失败数、重启次数、吞吐量（queries/s）和延迟百分位
+        """
+        with self._lock:
+            results = list(self.results)
+            pending = len(self._futures)
+        elapsed = (self._closed_at or time.perf_counter()) - self._started_at
+        failed = sum(1 for r in results if not r.ok)
+        return {
+            "workers": self.workers,
+            "threads": self.threads,
+            "completed": len(results) - failed,
+            "failed": failed,
+            "skipped": 0,
+            "pending": pending,
+            "restarts": self.restarts,
+            "elapsed": elapsed,
+            "throughput": len(results) / elapsed if elapsed else 0.0,
+            "latency": summarize_latencies(r.latency for r in results),
+        }
+
+
+def main():
+    """命令行入口：每行一个查询，收到 SIGTERM/SIGINT 时不再开始新的查询，等待在途查询完成后退出"""
+    parser = argparse.ArgumentParser(description="多进程执行旅行助手查询")
+    parser.add_argument("queries", help="查询文件，每行一个查询")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--threads", type=int, default=None)
+    parser.add_argument("--store", default=None, help="共享存储路径，默认使用临时文件")
+    parser.add_argument("--share-responses", action="store_true", help="同时共享 LLM 响应缓存")
+    parser.add_argument("--model", default=None)
+    parser.add_argument("--drain-timeout", type=float, default=60)
+    args = parser.parse_args()
+
+    api_key = os.environ.get("SILICONFLOW_API_KEY")
+    if not api_key:
+        raise SystemExit("请设置 SILICONFLOW_API_KEY 环境变量")
+
+    with open(args.queries, encoding="utf-8") as f:
+        queries = [line.strip() for line in f if line.strip()]
+
+    def shutdown(signum, frame):
+        raise KeyboardInterrupt
+
+    signal.signal(signal.SIGTERM, shutdown)
+    pool = WorkerPool(functools.partial(build_agent, api_key, args.model), workers=args.workers,
+                      threads=args.threads, store_path=args.store, share_responses=args.share_responses)
+    try:
+        for result in pool.run(queries):
+            status = "✅" if result.ok else f"❌ {result.error}"
+            print(f"[{result.id}] {result.latency:.2f}s {status}")
+    except KeyboardInterrupt:
+        print("收到停止信号，等待在途查询完成...")
+        pool.close(drain=False, timeout=args.drain_timeout)
+    finally:
+        pool.close(timeout=args.drain_timeout)
+    print(format_stats(pool.stats()))
+
+
+if __name__ == "__main__":
+    main()